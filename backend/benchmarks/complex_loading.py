@@ -0,0 +1,116 @@
+"""
+Benchmark load trang chi tiết complex (user-049).
+
+Chạy từ thư mục backend:
+    python benchmarks/complex_loading.py [--images 20] [--amenities 8] [--courts 12] [--reviews 20] [--repeat 5]
+
+So sánh, trên một complex có số ảnh / tiện ích / sân / review cho trước:
+  - joinedload nối chuỗi mọi collection trong một câu lệnh (như route trước đây): ảnh × tiện ích × sân × review dòng
+  - COMPLEX_LOADERS['detail']: selectinload mỗi collection, joinedload chỉ cho quan hệ many-to-one
+  - document lưu sẵn trong complex_documents (ComplexDocumentStore.document_json)
+Chạy trên SQLite tạm nên số ms chỉ để so sánh tương đối; số câu lệnh giống trên PostgreSQL.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Database tạm, đặt trước khi import src.main (giống tests/conftest.py)
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sportsync-bench-'), 'bench.db')}"
+os.environ['DATABASE_REPLICA_URLS'] = ''
+os.environ['OCCUPANCY_STORE'] = 'off'
+os.environ['RESPONSE_CACHE'] = 'off'
+os.environ['LIFECYCLE_INTERVAL'] = 'off'
+os.environ['EVENT_BRIDGE'] = ''
+
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import joinedload
+
+
+@compiles(BigInteger, 'sqlite')
+def _sqlite_big_integer(type_, compiler, **kwargs):
+    return 'INTEGER'
+
+
+from src.main import app
+from src.models.database import db, Amenity, Court, CourtComplex, CourtComplexAmenity, CourtComplexImage, Review, User
+from src.services.complex_documents import ComplexDocumentStore
+from src.services.complex_loading import build_detail_document, load_complex
+
+CHAINED_JOINEDLOAD = (
+    joinedload(CourtComplex.images),
+    joinedload(CourtComplex.amenities_rel).joinedload(CourtComplexAmenity.amenity),
+    joinedload(CourtComplex.courts),
+    joinedload(CourtComplex.reviews).joinedload(Review.customer),
+)
+
+
+def make_complex(args):
+    owner = User(fullName='Owner', email='owner@bench.local', role='Owner', accountStatus=1)
+    db.session.add(owner)
+    db.session.flush()
+    complex = CourtComplex(ownerId=owner.id, name='Sân cầu lông Cầu Giấy', address='12 Trần Thái Tông', city='Hà Nội',
+                           phoneNumber='1', sportType='Cầu lông', status='Active', mainImage='https://img.local/3.jpg')
+    db.session.add(complex)
+    db.session.flush()
+    amenities = [Amenity(name=f'Tiện ích {index}', icon='icon') for index in range(args.amenities)]
+    customers = [User(fullName=f'Khách {index}', email=f'{index}@bench.local', role='Customer', accountStatus=1)
+                 for index in range(args.reviews)]
+    db.session.add_all(amenities + customers)
+    db.session.flush()
+    db.session.add_all([CourtComplexImage(complexId=complex.id, imageUrl=f'https://img.local/{index}.jpg')
+                        for index in range(args.images)])
+    db.session.add_all([CourtComplexAmenity(complexId=complex.id, amenityId=amenity.id) for amenity in amenities])
+    db.session.add_all([Court(complexId=complex.id, name=f'Sân {index + 1}') for index in range(args.courts)])
+    db.session.add_all([Review(complexId=complex.id, customerId=customer.id, rating=4, comment='Tốt') for customer in customers])
+    db.session.commit()
+    return complex.id
+
+
+def chained_joinedload(complex_id):
+    complex = db.session.query(CourtComplex).options(*CHAINED_JOINEDLOAD).filter(CourtComplex.id == complex_id).first()
+    return build_detail_document(complex)
+
+
+def measure(label, func, repeat):
+    statements = []
+    count = lambda *_: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        seconds = timeit.timeit(lambda: (func(), db.session.remove()), number=repeat) / repeat
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    print(f'{label:<28} {seconds * 1000:9.2f} ms  {len(statements) / repeat:5.1f} statements')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--amenities', type=int, default=8)
+    parser.add_argument('--courts', type=int, default=12)
+    parser.add_argument('--reviews', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        complex_id = make_complex(args)
+        assert chained_joinedload(complex_id) == build_detail_document(load_complex(complex_id))
+        ComplexDocumentStore.rebuild_all()  # Như `flask complex-documents`
+        assert ComplexDocumentStore.document_json(complex_id, 'public')[1]
+        db.session.remove()
+
+        joined_rows = max(args.images, 1) * max(args.amenities, 1) * max(args.courts, 1) * max(args.reviews, 1)
+        print(f'{args.images} ảnh, {args.amenities} tiện ích, {args.courts} sân, {args.reviews} review '
+              f'({joined_rows} dòng khi joinedload nối chuỗi), {args.repeat} lần')
+        measure('chained joinedload', lambda: chained_joinedload(complex_id), args.repeat)
+        measure('selectinload (detail)', lambda: build_detail_document(load_complex(complex_id)), args.repeat)
+        measure('stored document', lambda: ComplexDocumentStore.document_json(complex_id, 'public'), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark dựng và encode JSON danh sách booking (user-035).
+
+Chạy từ thư mục backend:
+    python benchmarks/serialization.py [--bookings 1000] [--repeat 200]
+
+So sánh:
+  - dựng dict bằng vòng lặp viết tay trong route (như trước đây) và bằng serialize_customer_booking
+  - encode bằng JSON provider mặc định của Flask và OrjsonProvider (JSON_PROVIDER=orjson, nếu đã cài orjson)
+Dữ liệu là object giả (SimpleNamespace) nên chỉ đo phần Python, không gồm query.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from src.services.serializers import OrjsonProvider, serialize_customer_booking, serialize_many
+
+
+def make_bookings(count):
+    complex = SimpleNamespace(name='Sân cầu lông Cầu Giấy', address='12 Trần Thái Tông', city='Hà Nội')
+    court = SimpleNamespace(name='Sân 1', complex=complex)
+    start = datetime(2025, 8, 1, 6)
+    return [SimpleNamespace(
+        id=index, court=court,
+        startTime=start + timedelta(hours=index), endTime=start + timedelta(hours=index + 1),
+        totalPrice=Decimal('120000.00'), status='Confirmed', bookingType='Online', createdAt=start
+    ) for index in range(count)]
+
+
+def hand_written(bookings):
+    """Vòng lặp dựng dict như các route trước khi có serializers.py"""
+    result = []
+    for booking in bookings:
+        result.append({
+            'id': booking.id,
+            'courtName': booking.court.name,
+            'complexName': booking.court.complex.name,
+            'startTime': booking.startTime.isoformat(),
+            'endTime': booking.endTime.isoformat(),
+            'totalPrice': float(booking.totalPrice),
+            'status': booking.status,
+            'bookingType': booking.bookingType,
+            'createdAt': booking.createdAt.isoformat(),
+            'complexAddress': booking.court.complex.address,
+            'complexCity': booking.court.complex.city
+        })
+    return result
+
+
+def measure(label, func, repeat):
+    seconds = timeit.timeit(func, number=repeat) / repeat
+    print(f'{label:<28} {seconds * 1000:8.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    bookings = make_bookings(args.bookings)
+    assert hand_written(bookings) == serialize_many(serialize_customer_booking, bookings)
+
+    print(f'{args.bookings} bookings, {args.repeat} lần')
+    measure('build: hand-written loop', lambda: hand_written(bookings), args.repeat)
+    measure('build: serializers.py', lambda: serialize_many(serialize_customer_booking, bookings), args.repeat)
+
+    app = Flask(__name__)
+    payload = {'bookings': hand_written(bookings)}
+    with app.app_context():
+        default = app.json
+        measure('encode: default provider', lambda: default.response(payload), args.repeat)
+        try:
+            orjson_provider = OrjsonProvider(app)
+        except ImportError:
+            print('encode: orjson provider      (orjson chưa cài)')
+            return
+        assert json.loads(default.response(payload).get_data()) == json.loads(orjson_provider.response(payload).get_data())
+        measure('encode: orjson provider', lambda: orjson_provider.response(payload), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""add bookingDate and time range index to bookings
+
+Revision ID: 2e7c94a1d6b8
+Revises: 9b41e7d2c053
+Create Date: 2025-08-25 09:31:06.418552
+
+bookingDate = ngày của startTime (ứng dụng gán khi tạo / đổi giờ booking, PostgreSQL kiểm tra
+bằng CHECK constraint). Trên PostgreSQL thêm GiST index trên tsrange(startTime, endTime)
+cho kiểm tra trùng lịch (services/booking_ranges.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e7c94a1d6b8'
+down_revision = '9b41e7d2c053'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_postgresql = bind.dialect.name == 'postgresql'
+    booking_date = 'CAST("startTime" AS DATE)' if is_postgresql else 'date("startTime")'
+
+    op.add_column('bookings', sa.Column('bookingDate', sa.Date(), nullable=True))
+    op.add_column('bookings_archive', sa.Column('bookingDate', sa.Date(), nullable=True))
+    op.execute(f'UPDATE bookings SET "bookingDate" = {booking_date}')
+    op.execute(f'UPDATE bookings_archive SET "bookingDate" = {booking_date}')
+
+    if is_postgresql:
+        op.alter_column('bookings', 'bookingDate', nullable=False)
+        op.create_check_constraint('ck_bookings_bookingDate', 'bookings', '"bookingDate" = CAST("startTime" AS DATE)')
+        op.execute('CREATE INDEX "ix_bookings_time_range" ON bookings USING gist (tsrange("startTime", "endTime", \'[)\'))')
+    else:
+        with op.batch_alter_table('bookings', schema=None) as batch_op:
+            batch_op.alter_column('bookingDate', existing_type=sa.Date(), nullable=False)
+
+    op.create_index('ix_bookings_bookingDate', 'bookings', ['bookingDate'], unique=False)
+    op.create_index('ix_bookings_createdAt', 'bookings', ['createdAt'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    op.drop_index('ix_bookings_createdAt', table_name='bookings')
+    op.drop_index('ix_bookings_bookingDate', table_name='bookings')
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_bookings_time_range', table_name='bookings')
+        op.drop_constraint('ck_bookings_bookingDate', 'bookings', type_='check')
+
+    with op.batch_alter_table('bookings_archive', schema=None) as batch_op:
+        batch_op.drop_column('bookingDate')
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_column('bookingDate')
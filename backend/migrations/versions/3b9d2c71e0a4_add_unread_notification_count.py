@@ -0,0 +1,43 @@
+"""add unread notification count
+
+Revision ID: 3b9d2c71e0a4
+Revises: f4427233033e
+Create Date: 2025-08-04 09:12:41.512004
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2c71e0a4'
+down_revision = 'f4427233033e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unreadNotificationCount', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_userId_createdAt', ['userId', 'createdAt'], unique=False)
+
+    # Backfill the counter from the existing notifications
+    users = sa.table('users', sa.column('id'), sa.column('unreadNotificationCount'))
+    notifications = sa.table('notifications', sa.column('userId'), sa.column('isRead'))
+    op.execute(
+        users.update().values(
+            unreadNotificationCount=sa.select(sa.func.count())
+            .where(notifications.c.userId == users.c.id, notifications.c.isRead.isnot(sa.true()))
+            .scalar_subquery()
+        )
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_userId_createdAt')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('unreadNotificationCount')
@@ -0,0 +1,38 @@
+"""add booking lifecycle rules
+
+Revision ID: 4d6f0b8e2c15
+Revises: e3b8a61f9d27
+Create Date: 2025-08-18 10:41:07.226531
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d6f0b8e2c15'
+down_revision = 'e3b8a61f9d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('court_complexes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('autoCompleteAfterMinutes', sa.Integer(), server_default='30', nullable=True))
+        # Không có mặc định: NULL = tắt tự hết hạn, owner tự bật trong cài đặt của complex
+        batch_op.add_column(sa.Column('pendingExpiryMinutes', sa.Integer(), nullable=True))
+
+    # Scheduler tìm booking theo (status, startTime/endTime)
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.create_index('ix_bookings_status_startTime', ['status', 'startTime'], unique=False)
+        batch_op.create_index('ix_bookings_status_endTime', ['status', 'endTime'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index('ix_bookings_status_endTime')
+        batch_op.drop_index('ix_bookings_status_startTime')
+
+    with op.batch_alter_table('court_complexes', schema=None) as batch_op:
+        batch_op.drop_column('pendingExpiryMinutes')
+        batch_op.drop_column('autoCompleteAfterMinutes')
@@ -0,0 +1,34 @@
+"""add complex_documents
+
+Revision ID: 5c1b9e7d3a64
+Revises: 7a5d2c8e1f43
+Create Date: 2025-08-29 10:12:37.418205
+
+Document JSON dựng sẵn của trang chi tiết complex, dựng lại khi complex thay đổi.
+Sau khi upgrade chạy `flask complex-documents` để dựng document cho dữ liệu có sẵn.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1b9e7d3a64'
+down_revision = '7a5d2c8e1f43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('complex_documents',
+    sa.Column('complexId', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('updatedAt', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['complexId'], ['court_complexes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('complexId', 'kind')
+    )
+
+
+def downgrade():
+    op.drop_table('complex_documents')
@@ -0,0 +1,43 @@
+"""indexes for keyset pagination of court complexes
+
+Revision ID: 7a5d2c8e1f43
+Revises: 2e7c94a1d6b8
+Create Date: 2025-08-27 14:05:52.671930
+
+Danh sách complex của admin phân trang keyset theo (cột sắp xếp, id): createdAt và status
+không được NULL (giá trị NULL không so sánh được trong điều kiện keyset).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a5d2c8e1f43'
+down_revision = '2e7c94a1d6b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('UPDATE court_complexes SET "createdAt" = CURRENT_TIMESTAMP WHERE "createdAt" IS NULL')
+    op.execute("UPDATE court_complexes SET status = 'Active' WHERE status IS NULL")
+
+    with op.batch_alter_table('court_complexes', schema=None) as batch_op:
+        batch_op.alter_column('createdAt', existing_type=sa.DateTime(), nullable=False)
+        batch_op.alter_column('status', existing_type=sa.String(length=20), nullable=False)
+        batch_op.create_index('ix_court_complexes_createdAt_id', ['createdAt', 'id'], unique=False)
+        batch_op.create_index('ix_court_complexes_name_id', ['name', 'id'], unique=False)
+        batch_op.create_index('ix_court_complexes_city_id', ['city', 'id'], unique=False)
+        batch_op.create_index('ix_court_complexes_status_createdAt', ['status', 'createdAt'], unique=False)
+        batch_op.create_index('ix_court_complexes_ownerId', ['ownerId'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('court_complexes', schema=None) as batch_op:
+        batch_op.drop_index('ix_court_complexes_ownerId')
+        batch_op.drop_index('ix_court_complexes_status_createdAt')
+        batch_op.drop_index('ix_court_complexes_city_id')
+        batch_op.drop_index('ix_court_complexes_name_id')
+        batch_op.drop_index('ix_court_complexes_createdAt_id')
+        batch_op.alter_column('status', existing_type=sa.String(length=20), nullable=True)
+        batch_op.alter_column('createdAt', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,44 @@
+"""add complex coordinates
+
+Revision ID: 7c1e4a92b5d3
+Revises: 3b9d2c71e0a4
+Create Date: 2025-08-06 14:27:09.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.services.geo_service import parse_map_link
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e4a92b5d3'
+down_revision = '3b9d2c71e0a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('court_complexes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+
+    # Backfill coordinates from the existing Google Maps links
+    complexes = sa.table('court_complexes', sa.column('id'), sa.column('googleMapLink'),
+                         sa.column('latitude'), sa.column('longitude'))
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(complexes.c.id, complexes.c.googleMapLink).where(complexes.c.googleMapLink.isnot(None))
+    ).all()
+    for row in rows:
+        lat, lng = parse_map_link(row.googleMapLink)
+        if lat is not None:
+            conn.execute(
+                complexes.update().where(complexes.c.id == row.id).values(latitude=lat, longitude=lng)
+            )
+
+
+def downgrade():
+    with op.batch_alter_table('court_complexes', schema=None) as batch_op:
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
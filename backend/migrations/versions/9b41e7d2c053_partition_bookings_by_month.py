@@ -0,0 +1,205 @@
+"""partition bookings by month and add bookings archive
+
+Revision ID: 9b41e7d2c053
+Revises: 4d6f0b8e2c15
+Create Date: 2025-08-21 10:12:47.305118
+
+Trên PostgreSQL, bảng bookings được dựng lại thành bảng partition theo tháng của startTime
+(một partition cho mỗi tháng từ booking cũ nhất tới 3 tháng tới + partition mặc định) và dữ liệu
+được chép sang. Migration khóa bảng bookings trong lúc chép: chạy khi đã tạm dừng ứng dụng.
+Khóa chính đổi thành (id, startTime) vì PostgreSQL yêu cầu khóa chính chứa cột partition, nên:
+  - id không còn được khóa chính đảm bảo duy nhất: id chỉ lấy từ sequence, và constraint trigger
+    bookings_id_unique kiểm tra lúc commit (khóa advisory theo id để hai transaction không cùng lọt qua);
+  - khóa ngoại booking_products.bookingId -> bookings.id (không có unique trên id) được thay bằng hai
+    constraint trigger kiểm tra lúc commit: booking_products_bookingId_fkey khi thêm / sửa booking_products,
+    bookings_booking_products_fkey khi xóa booking (kiểm tra lúc commit nên chuyển booking giữa các partition,
+    xóa rồi chèn lại trong cùng transaction, vẫn hợp lệ).
+Các database khác giữ khóa chính và khóa ngoại như cũ.
+Thêm bảng bookings_archive và booking_products_archive (sản phẩm của booking được lưu trữ, chuyển cùng booking).
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b41e7d2c053'
+down_revision = '4d6f0b8e2c15'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+BOOKING_INDEXES = (
+    ('ix_bookings_status_startTime', '"status", "startTime"'),
+    ('ix_bookings_status_endTime', '"status", "endTime"'),
+    ('ix_bookings_seriesId', '"seriesId"'),
+    ('ix_bookings_courtId_startTime', '"courtId", "startTime"'),
+)
+
+
+# Các constraint trigger thay cho khóa chính (id) và khóa ngoại booking_products.bookingId trên bảng partition
+INTEGRITY_TRIGGERS = '''
+CREATE FUNCTION bookings_check_id_unique() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('bookings.id'), hashtext(NEW.id::text));
+    IF (SELECT count(*) FROM bookings WHERE id = NEW.id) > 1 THEN
+        RAISE EXCEPTION 'duplicate key value violates unique constraint "bookings_id_unique"'
+            USING ERRCODE = 'unique_violation', DETAIL = 'Key (id)=(' || NEW.id || ') already exists.';
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE FUNCTION booking_products_check_booking() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    -- FOR KEY SHARE như khóa ngoại thật: transaction đang xóa booking phải chờ
+    PERFORM 1 FROM bookings WHERE id = NEW."bookingId" FOR KEY SHARE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'insert or update on table "booking_products" violates foreign key constraint "booking_products_bookingId_fkey"'
+            USING ERRCODE = 'foreign_key_violation', DETAIL = 'Key (bookingId)=(' || NEW."bookingId" || ') is not present in table "bookings".';
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE FUNCTION bookings_check_booking_products() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM booking_products WHERE "bookingId" = OLD.id)
+            AND NOT EXISTS (SELECT 1 FROM bookings WHERE id = OLD.id) THEN
+        RAISE EXCEPTION 'update or delete on table "bookings" violates foreign key constraint "booking_products_bookingId_fkey" on table "booking_products"'
+            USING ERRCODE = 'foreign_key_violation', DETAIL = 'Key (id)=(' || OLD.id || ') is still referenced from table "booking_products".';
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE CONSTRAINT TRIGGER bookings_id_unique AFTER INSERT OR UPDATE OF id ON bookings
+    DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION bookings_check_id_unique();
+CREATE CONSTRAINT TRIGGER "booking_products_bookingId_fkey" AFTER INSERT OR UPDATE OF "bookingId" ON booking_products
+    DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION booking_products_check_booking();
+CREATE CONSTRAINT TRIGGER bookings_booking_products_fkey AFTER DELETE OR UPDATE OF id ON bookings
+    DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION bookings_check_booking_products();
+'''
+
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _partition_bookings(bind):
+    # Sequence của cột id (serial); cột identity hoặc không có default thì tạo sequence mới
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('bookings', 'id')")).scalar()
+    is_identity = bind.execute(sa.text(
+        "SELECT is_identity FROM information_schema.columns "
+        "WHERE table_name = 'bookings' AND column_name = 'id'"
+    )).scalar() == 'YES'
+
+    op.execute('CREATE TABLE bookings_partitioned (LIKE bookings INCLUDING DEFAULTS) PARTITION BY RANGE ("startTime")')
+    if sequence is None or is_identity:
+        sequence = 'bookings_partitioned_id_seq'
+        op.execute(f'CREATE SEQUENCE {sequence}')
+        op.execute(f"ALTER TABLE bookings_partitioned ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY bookings_partitioned.id')
+    op.execute('ALTER TABLE bookings_partitioned ADD CONSTRAINT bookings_partitioned_pkey PRIMARY KEY (id, "startTime")')
+
+    oldest = bind.execute(sa.text('SELECT MIN("startTime") FROM bookings')).scalar() or datetime.now()
+    month = date(oldest.year, oldest.month, 1)
+    last = date.today()
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE bookings_p{month:%Y%m} PARTITION OF bookings_partitioned "
+            f"FOR VALUES FROM ('{month}') TO ('{_next_month(month)}')"
+        )
+        month = _next_month(month)
+    op.execute('CREATE TABLE bookings_pdefault PARTITION OF bookings_partitioned DEFAULT')
+
+    op.execute('INSERT INTO bookings_partitioned SELECT * FROM bookings')
+    op.execute(f"SELECT setval('{sequence}', COALESCE((SELECT MAX(id) FROM bookings_partitioned), 0) + 1, false)")
+
+    # Không CASCADE: khóa ngoại duy nhất tới bookings được thay bằng constraint trigger bên dưới,
+    # phụ thuộc nào khác làm migration dừng lại thay vì bị xóa âm thầm
+    op.drop_constraint('booking_products_bookingId_fkey', 'booking_products', type_='foreignkey')
+    op.execute('DROP TABLE bookings')
+    op.execute('ALTER TABLE bookings_partitioned RENAME TO bookings')
+    op.execute('ALTER TABLE bookings RENAME CONSTRAINT bookings_partitioned_pkey TO bookings_pkey')
+    op.create_foreign_key('bookings_customerId_fkey', 'bookings', 'users', ['customerId'], ['id'])
+    op.create_foreign_key('bookings_courtId_fkey', 'bookings', 'courts', ['courtId'], ['id'])
+    for name, columns in BOOKING_INDEXES:
+        op.execute(f'CREATE INDEX "{name}" ON bookings ({columns})')
+    op.execute(INTEGRITY_TRIGGERS)
+
+
+def _unpartition_bookings(bind):
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('bookings', 'id')")).scalar()
+    op.execute('DROP TRIGGER bookings_booking_products_fkey ON bookings')
+    op.execute('DROP TRIGGER "booking_products_bookingId_fkey" ON booking_products')
+    op.execute('DROP TRIGGER bookings_id_unique ON bookings')
+    op.execute('DROP FUNCTION bookings_check_booking_products(), booking_products_check_booking(), bookings_check_id_unique()')
+    op.execute('CREATE TABLE bookings_plain (LIKE bookings INCLUDING DEFAULTS)')
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY bookings_plain.id')  # Không bị xóa cùng bảng partition
+    op.execute('INSERT INTO bookings_plain SELECT * FROM bookings')
+    op.execute('DROP TABLE bookings')
+    op.execute('ALTER TABLE bookings_plain RENAME TO bookings')
+    op.create_primary_key('bookings_pkey', 'bookings', ['id'])
+    op.create_foreign_key('bookings_customerId_fkey', 'bookings', 'users', ['customerId'], ['id'])
+    op.create_foreign_key('bookings_courtId_fkey', 'bookings', 'courts', ['courtId'], ['id'])
+    op.create_foreign_key('booking_products_bookingId_fkey', 'booking_products', 'bookings', ['bookingId'], ['id'])
+    for name, columns in BOOKING_INDEXES:
+        op.execute(f'CREATE INDEX "{name}" ON bookings ({columns})')
+
+
+def upgrade():
+    op.create_table('bookings_archive',
+        sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column('customerId', sa.String(length=36), nullable=True),
+        sa.Column('courtId', sa.Integer(), nullable=False),
+        sa.Column('walkInCustomerName', sa.String(length=255), nullable=True),
+        sa.Column('walkInCustomerPhone', sa.String(length=20), nullable=True),
+        sa.Column('startTime', sa.DateTime(), nullable=False),
+        sa.Column('endTime', sa.DateTime(), nullable=False),
+        sa.Column('totalPrice', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('bookingType', sa.String(length=20), nullable=True),
+        sa.Column('seriesId', sa.String(length=36), nullable=True),
+        sa.Column('createdAt', sa.DateTime(), nullable=True),
+        sa.Column('archivedAt', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_bookings_archive_courtId_startTime', 'bookings_archive', ['courtId', 'startTime'], unique=False)
+    op.create_index('ix_bookings_archive_createdAt', 'bookings_archive', ['createdAt'], unique=False)
+    op.create_index(op.f('ix_bookings_archive_customerId'), 'bookings_archive', ['customerId'], unique=False)
+
+    op.create_table('booking_products_archive',
+        sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column('bookingId', sa.BigInteger(), nullable=False),
+        sa.Column('productId', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('unitPrice', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('subtotal', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_booking_products_archive_bookingId'), 'booking_products_archive', ['bookingId'], unique=False)
+    # Lưu trữ và kiểm tra khóa ngoại khi xóa booking tìm booking_products theo bookingId
+    op.create_index(op.f('ix_booking_products_bookingId'), 'booking_products', ['bookingId'], unique=False)
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _partition_bookings(bind)
+    else:
+        op.create_index('ix_bookings_courtId_startTime', 'bookings', ['courtId', 'startTime'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _unpartition_bookings(bind)
+    op.drop_index('ix_bookings_courtId_startTime', table_name='bookings')
+
+    op.drop_index(op.f('ix_booking_products_bookingId'), table_name='booking_products')
+    op.drop_index(op.f('ix_booking_products_archive_bookingId'), table_name='booking_products_archive')
+    op.drop_table('booking_products_archive')
+
+    op.drop_index(op.f('ix_bookings_archive_customerId'), table_name='bookings_archive')
+    op.drop_index('ix_bookings_archive_createdAt', table_name='bookings_archive')
+    op.drop_index('ix_bookings_archive_courtId_startTime', table_name='bookings_archive')
+    op.drop_table('bookings_archive')
@@ -0,0 +1,26 @@
+"""add complex version
+
+Revision ID: a5f08d3c6e17
+Revises: 7c1e4a92b5d3
+Create Date: 2025-08-08 10:41:53.207716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5f08d3c6e17'
+down_revision = '7c1e4a92b5d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('court_complexes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('court_complexes', schema=None) as batch_op:
+        batch_op.drop_column('version')
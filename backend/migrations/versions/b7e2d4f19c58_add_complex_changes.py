@@ -0,0 +1,37 @@
+"""add complex_changes
+
+Revision ID: b7e2d4f19c58
+Revises: 5c1b9e7d3a64
+Create Date: 2025-09-02 09:26:14.730518
+
+Nhật ký thay đổi thông tin complex: index facet / geo của mỗi worker đọc các dòng mới theo seq
+thay vì quét version của mọi complex trước mỗi lần tìm kiếm. Dòng complexId NULL: loại sân / tiện ích đổi
+(dữ liệu tham chiếu của mọi worker nạp lại).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4f19c58'
+down_revision = '5c1b9e7d3a64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('complex_changes',
+    sa.Column('seq', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('complexId', sa.Integer(), nullable=True),
+    sa.Column('createdAt', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    with op.batch_alter_table('complex_changes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_complex_changes_createdAt'), ['createdAt'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('complex_changes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_complex_changes_createdAt'))
+
+    op.drop_table('complex_changes')
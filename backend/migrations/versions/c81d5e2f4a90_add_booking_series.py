@@ -0,0 +1,28 @@
+"""add booking series
+
+Revision ID: c81d5e2f4a90
+Revises: a5f08d3c6e17
+Create Date: 2025-08-11 09:12:40.518362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81d5e2f4a90'
+down_revision = 'a5f08d3c6e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seriesId', sa.String(length=36), nullable=True))
+        batch_op.create_index(batch_op.f('ix_bookings_seriesId'), ['seriesId'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_bookings_seriesId'))
+        batch_op.drop_column('seriesId')
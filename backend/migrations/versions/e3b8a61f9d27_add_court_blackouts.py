@@ -0,0 +1,39 @@
+"""add court blackouts
+
+Revision ID: e3b8a61f9d27
+Revises: c81d5e2f4a90
+Create Date: 2025-08-14 16:05:22.907113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b8a61f9d27'
+down_revision = 'c81d5e2f4a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('court_blackouts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('complexId', sa.Integer(), nullable=False),
+        sa.Column('courtId', sa.Integer(), nullable=True),
+        sa.Column('startTime', sa.DateTime(), nullable=False),
+        sa.Column('endTime', sa.DateTime(), nullable=False),
+        sa.Column('recurrence', sa.String(length=10), nullable=True),
+        sa.Column('recurrenceUntil', sa.Date(), nullable=True),
+        sa.Column('reason', sa.String(length=255), nullable=True),
+        sa.Column('createdAt', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['complexId'], ['court_complexes.id'], ),
+        sa.ForeignKeyConstraint(['courtId'], ['courts.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_court_blackouts_complexId_startTime', 'court_blackouts', ['complexId', 'startTime'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_court_blackouts_complexId_startTime', table_name='court_blackouts')
+    op.drop_table('court_blackouts')
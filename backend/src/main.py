@@ -15,6 +15,8 @@ load_dotenv(os.path.join(backend_root, '.env'))
 
 # Import the 'db' instance directly from your database module
 from src.models.database import db
+from src.services.db_routing import database_router, replica_urls
+from src.services.booking_lifecycle import lifecycle_scheduler
 
 # Initialize Migrate globally, but without linking to app/db yet
 migrate = Migrate()
@@ -24,6 +26,24 @@ def create_app():
 
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'default_secret_key_for_dev')
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'default_jwt_secret_key_for_dev')
+    # Token chỉ qua header; riêng SSE stream (EventSource không gửi được header) nhận thêm ?jwt= ngay tại route
+    app.config['JWT_TOKEN_LOCATION'] = ['headers']
+    # Chuyển event SSE giữa các gunicorn worker: '' (tắt), 'postgres' hoặc 'unix:/path/to/dir'
+    app.config['EVENT_BRIDGE'] = os.getenv('EVENT_BRIDGE', '')
+    # Số SSE stream tối đa mở cùng lúc trong mỗi worker (vượt quá trả 503)
+    app.config['SSE_MAX_STREAMS'] = os.getenv('SSE_MAX_STREAMS', '8')
+    # Cache response đọc nhiều: 'memory' (mặc định), 'filesystem:/path/to/dir' hoặc 'off'
+    app.config['RESPONSE_CACHE'] = os.getenv('RESPONSE_CACHE', 'memory')
+    # File mmap chứa bitmap chiếm chỗ của các sân, dùng chung giữa các worker ('' = mặc định trong /dev/shm, 'off' = tắt)
+    app.config['OCCUPANCY_STORE'] = os.getenv('OCCUPANCY_STORE', '')
+    # JSON provider cho response: '' (json của thư viện chuẩn) hoặc 'orjson' (cần cài orjson)
+    app.config['JSON_PROVIDER'] = os.getenv('JSON_PROVIDER', '')
+    # Nén response động lớn hơn số byte này (gzip, hoặc brotli nếu đã cài), 'off' = tắt
+    app.config['COMPRESSION_MIN_SIZE'] = os.getenv('COMPRESSION_MIN_SIZE', '1024')
+    # Chu kỳ (giây) tự động hoàn thành / hết hạn booking đã qua, 'off' = tắt (chạy `flask booking-lifecycle` bằng cron)
+    app.config['LIFECYCLE_INTERVAL'] = os.getenv('LIFECYCLE_INTERVAL', '60')
+    # Chuyển booking đã kết thúc cũ hơn số ngày này sang bookings_archive (leader chạy mỗi ngày), '' (mặc định) / 'off' = tắt
+    app.config['BOOKING_ARCHIVE_AFTER_DAYS'] = os.getenv('BOOKING_ARCHIVE_AFTER_DAYS', '')
 
     CORS(app)
     jwt = JWTManager(app)
@@ -32,10 +52,42 @@ def create_app():
     print(f"DEBUG: DATABASE_URL from .env: {database_url}")
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Read replica: các URL phân cách bằng dấu phẩy ('' = mọi query dùng DATABASE_URL)
+    app.config['SQLALCHEMY_BINDS'] = replica_urls(os.getenv('DATABASE_REPLICA_URLS', ''))
+    # Sau khi ghi, user đọc từ primary trong số giây này (read-your-writes)
+    app.config['REPLICA_PIN_SECONDS'] = os.getenv('REPLICA_PIN_SECONDS', '5')
 
     # Link the globally defined 'db' and 'migrate' instances to the app
     db.init_app(app)
     migrate.init_app(app, db)
+    database_router.init_app(app)
+
+    from src.services.event_hub import event_hub
+    event_hub.init_app(app)
+    # Notification trong ứng dụng khi booking đổi trạng thái (listener before_commit / after_commit)
+    import src.services.booking_notifications
+
+    from src.services.reference_data import reference_data
+    reference_data.init_app(app)
+
+    from src.services.response_cache import response_cache
+    response_cache.init_app(app)
+
+    from src.services.occupancy_store import occupancy_store
+    occupancy_store.init_app(app)
+
+    from src.services.serializers import init_json_provider
+    init_json_provider(app)
+
+    from src.services.compression import response_compressor, static_assets
+    response_compressor.init_app(app)
+    static_assets.init_app(app)
+
+    lifecycle_scheduler.init_app(app)
+
+    # Document chi tiết complex dựng sẵn (listener before_commit + lệnh `flask complex-documents`)
+    from src.services.complex_documents import rebuild_documents_command
+    app.cli.add_command(rebuild_documents_command)
 
     # Register blueprints (keep these imports here to avoid circular dependencies
     # if any blueprint imports from models that depend on 'db' already initialized)
@@ -68,14 +120,14 @@ def create_app():
         if static_folder_path is None:
             return "Static folder not configured", 404
 
-        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-            return send_from_directory(static_folder_path, path)
+        # Tra manifest dựng sẵn lúc khởi động thay vì os.path.exists cho mỗi request
+        # (chạy lại server sau khi build frontend để cập nhật manifest)
+        if path != "" and static_assets.has(path):
+            return static_assets.send(path)
+        elif static_assets.has('index.html'):
+            return static_assets.send('index.html')
         else:
-            index_path = os.path.join(static_folder_path, 'index.html')
-            if os.path.exists(index_path):
-                return send_from_directory(static_folder_path, 'index.html')
-            else:
-                return "index.html not found", 404
+            return "index.html not found", 404
 
     return app
 
@@ -140,4 +192,5 @@ def create_default_data(_app): # Sử dụng _app để tránh nhầm lẫn vớ
 
 if __name__ == '__main__':
     create_default_data(app) # Truyền app instance vào hàm tạo dữ liệu
+    lifecycle_scheduler.start(app)  # Chỉ chạy nền khi khởi động server, không chạy trong lệnh `flask ...`
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
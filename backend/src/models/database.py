@@ -1,8 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from datetime import datetime
 import uuid
 
-db = SQLAlchemy()
+from src.services.db_routing import RoutingSession
+
+# RoutingSession: đọc từ read replica khi được cấu hình (xem services/db_routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Users table
 class User(db.Model):
@@ -15,6 +19,7 @@ class User(db.Model):
     image = db.Column(db.String(500), nullable=True)
     role = db.Column(db.String(50), default='Customer')  # Customer, Owner, Admin
     accountStatus = db.Column(db.Integer, default=1)  # 1: Active, 0: Blocked
+    unreadNotificationCount = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Denormalized, kept in sync by routes/notification.py
     createdAt = db.Column(db.DateTime, default=datetime.utcnow)
     updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -34,6 +39,14 @@ class SportType(db.Model):
 # Court Complexes table
 class CourtComplex(db.Model):
     __tablename__ = 'court_complexes'
+    # Phân trang keyset của danh sách admin: (cột sắp xếp, id) và các cột lọc
+    __table_args__ = (
+        db.Index('ix_court_complexes_createdAt_id', 'createdAt', 'id'),
+        db.Index('ix_court_complexes_name_id', 'name', 'id'),
+        db.Index('ix_court_complexes_city_id', 'city', 'id'),
+        db.Index('ix_court_complexes_status_createdAt', 'status', 'createdAt'),
+        db.Index('ix_court_complexes_ownerId', 'ownerId'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     ownerId = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
@@ -44,6 +57,8 @@ class CourtComplex(db.Model):
     phoneNumber = db.Column(db.String(20), nullable=False)
     sportType = db.Column(db.String(50), nullable=False)  # Moved from Court to CourtComplex
     googleMapLink = db.Column(db.String(1000), nullable=True)  # Google Maps link
+    latitude = db.Column(db.Float, nullable=True)  # Parse từ googleMapLink khi tạo/sửa
+    longitude = db.Column(db.Float, nullable=True)
     
     # Banking information for VietQR
     bankCode = db.Column(db.String(10), nullable=True)  # e.g., "970415" for Vietinbank
@@ -55,8 +70,13 @@ class CourtComplex(db.Model):
     mainImage = db.Column(db.String(500), nullable=True)  # Main display image URL
     rating = db.Column(db.Numeric(3, 2), default=0)
     totalReviews = db.Column(db.Integer, default=0)
-    status = db.Column(db.String(20), default='Active')  # Active, Inactive
-    createdAt = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), nullable=False, default='Active')  # Active, Inactive
+    # Tự động chuyển trạng thái booking đã qua (NULL = tắt), xem services/booking_lifecycle.py
+    autoCompleteAfterMinutes = db.Column(db.Integer, nullable=True, default=30, server_default='30')  # Confirmed -> Completed sau endTime
+    pendingExpiryMinutes = db.Column(db.Integer, nullable=True)  # Pending -> Expired sau startTime, NULL (mặc định) = tắt
+    # Tăng mỗi khi complex hoặc sân, giá, ảnh, tiện ích, review, booking của nó thay đổi (dùng cho ETag)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    createdAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationships
     amenities_rel = db.relationship('CourtComplexAmenity', back_populates='complex', cascade="all, delete-orphan") # <<< ĐẢM BẢO DÒNG NÀY CÓ VÀ ĐÚNG TÊN
@@ -64,6 +84,7 @@ class CourtComplex(db.Model):
     courts = db.relationship('Court', foreign_keys='Court.complexId', backref='complex', lazy=True, cascade='all, delete-orphan')
     reviews = db.relationship('Review', foreign_keys='Review.complexId', backref='complex', lazy=True)
     images = db.relationship('CourtComplexImage', foreign_keys='CourtComplexImage.complexId', backref='complex', lazy=True, cascade='all, delete-orphan')
+    blackouts = db.relationship('CourtBlackout', foreign_keys='CourtBlackout.complexId', lazy=True, cascade='all, delete-orphan')
 
 # Courts table
 class Court(db.Model):
@@ -77,10 +98,18 @@ class Court(db.Model):
     # Relationships
     bookings = db.relationship('Booking', foreign_keys='Booking.courtId', backref='court', lazy=True)
     hourly_rates = db.relationship('HourlyPriceRate', foreign_keys='HourlyPriceRate.courtId', backref='court', lazy=True, cascade='all, delete-orphan')
+    blackouts = db.relationship('CourtBlackout', foreign_keys='CourtBlackout.courtId', backref='court', lazy=True, cascade='all, delete-orphan')
 
 # Bookings table
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        db.Index('ix_bookings_status_startTime', 'status', 'startTime'),
+        db.Index('ix_bookings_status_endTime', 'status', 'endTime'),
+        db.Index('ix_bookings_courtId_startTime', 'courtId', 'startTime'),
+        db.Index('ix_bookings_bookingDate', 'bookingDate'),
+        db.Index('ix_bookings_createdAt', 'createdAt'),
+    )
     
     id = db.Column(db.BigInteger, primary_key=True)
     customerId = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=True)  # Nullable for walk-in
@@ -92,14 +121,63 @@ class Booking(db.Model):
     
     startTime = db.Column(db.DateTime, nullable=False)
     endTime = db.Column(db.DateTime, nullable=False)
+    bookingDate = db.Column(db.Date, nullable=False)  # Ngày của startTime, tự gán theo startTime (lọc / nhóm theo ngày dùng được index)
     totalPrice = db.Column(db.Numeric(10, 2), nullable=False)
-    status = db.Column(db.String(20), default='Pending')  # Pending, Confirmed, Cancelled, Completed
+    status = db.Column(db.String(20), default='Pending')  # Pending, Confirmed, Cancelled, Completed, Rejected, Expired
     bookingType = db.Column(db.String(20), default='Online')  # Online, WalkIn
+    seriesId = db.Column(db.String(36), nullable=True, index=True)  # Chung cho các booking của một lần đặt định kỳ
     createdAt = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     booking_products = db.relationship('BookingProduct', foreign_keys='BookingProduct.bookingId', backref='booking', lazy=True, cascade='all, delete-orphan')
 
+    @validates('startTime')
+    def _sync_booking_date(self, key, start_time):
+        self.bookingDate = start_time.date() if start_time else None
+        return start_time
+
+# Bookings archive table: booking đã kết thúc từ lâu, chuyển khỏi bảng bookings (xem services/booking_archive.py)
+# Cùng các cột với bookings, không có khóa ngoại để user / sân bị xóa không ảnh hưởng lịch sử
+class BookingArchive(db.Model):
+    __tablename__ = 'bookings_archive'
+    __table_args__ = (
+        db.Index('ix_bookings_archive_courtId_startTime', 'courtId', 'startTime'),
+        db.Index('ix_bookings_archive_createdAt', 'createdAt'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)  # Giữ nguyên id của booking
+    customerId = db.Column(db.String(36), nullable=True, index=True)
+    courtId = db.Column(db.Integer, nullable=False)
+    walkInCustomerName = db.Column(db.String(255), nullable=True)
+    walkInCustomerPhone = db.Column(db.String(20), nullable=True)
+    startTime = db.Column(db.DateTime, nullable=False)
+    endTime = db.Column(db.DateTime, nullable=False)
+    bookingDate = db.Column(db.Date, nullable=True)
+    totalPrice = db.Column(db.Numeric(10, 2), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    bookingType = db.Column(db.String(20), nullable=True)
+    seriesId = db.Column(db.String(36), nullable=True)
+    createdAt = db.Column(db.DateTime, nullable=True)
+    archivedAt = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Court blackouts table (đóng sân để bảo trì / sự kiện, có thể lặp lại)
+class CourtBlackout(db.Model):
+    __tablename__ = 'court_blackouts'
+    __table_args__ = (
+        db.Index('ix_court_blackouts_complexId_startTime', 'complexId', 'startTime'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    complexId = db.Column(db.Integer, db.ForeignKey('court_complexes.id'), nullable=False)
+    courtId = db.Column(db.Integer, db.ForeignKey('courts.id'), nullable=True)  # Null: đóng cả khu phức hợp
+    # Lần đóng đầu tiên; các lần lặp lại có cùng độ dài
+    startTime = db.Column(db.DateTime, nullable=False)
+    endTime = db.Column(db.DateTime, nullable=False)
+    recurrence = db.Column(db.String(10), nullable=True)  # None, daily, weekly
+    recurrenceUntil = db.Column(db.Date, nullable=True)  # Ngày bắt đầu của lần lặp cuối (None: không giới hạn)
+    reason = db.Column(db.String(255), nullable=True)
+    createdAt = db.Column(db.DateTime, default=datetime.utcnow)
+
 # Products table
 class Product(db.Model):
     __tablename__ = 'products'
@@ -118,12 +196,24 @@ class BookingProduct(db.Model):
     __tablename__ = 'booking_products'
     
     id = db.Column(db.BigInteger, primary_key=True)
-    bookingId = db.Column(db.BigInteger, db.ForeignKey('bookings.id'), nullable=False)
+    # PostgreSQL: bookings được partition nên khóa ngoại được kiểm tra bằng constraint trigger (migration 9b41e7d2c053)
+    bookingId = db.Column(db.BigInteger, db.ForeignKey('bookings.id'), nullable=False, index=True)
     productId = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     unitPrice = db.Column(db.Numeric(10, 2), nullable=False)
     subtotal = db.Column(db.Numeric(10, 2), nullable=False)
 
+# Sản phẩm của booking đã lưu trữ, chuyển cùng booking sang bookings_archive (xem services/booking_archive.py)
+class BookingProductArchive(db.Model):
+    __tablename__ = 'booking_products_archive'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)  # Giữ nguyên id của booking_products
+    bookingId = db.Column(db.BigInteger, nullable=False, index=True)
+    productId = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    unitPrice = db.Column(db.Numeric(10, 2), nullable=False)
+    subtotal = db.Column(db.Numeric(10, 2), nullable=False)
+
 # Hourly Price Rates table
 class HourlyPriceRate(db.Model):
     __tablename__ = 'hourly_price_rates'
@@ -175,6 +265,10 @@ class Notification(db.Model):
     isRead = db.Column(db.Boolean, default=False)
     createdAt = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_notifications_userId_createdAt', 'userId', 'createdAt'),
+    )
+
 
 # Court Complex Images table
 class CourtComplexImage(db.Model):
@@ -187,3 +281,25 @@ class CourtComplexImage(db.Model):
     isMain = db.Column(db.Boolean, default=False)  # Main display image
     createdAt = db.Column(db.DateTime, default=datetime.utcnow)
 
+
+
+# Complex documents table: JSON dựng sẵn của trang chi tiết complex, dựng lại trong transaction
+# ghi mỗi khi complex thay đổi (xem services/complex_documents.py)
+class ComplexDocument(db.Model):
+    __tablename__ = 'complex_documents'
+
+    complexId = db.Column(db.Integer, db.ForeignKey('court_complexes.id', ondelete='CASCADE'), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)  # public: /api/public/court-complexes/<id>, full: /api/court-complexes/<id>
+    version = db.Column(db.Integer, nullable=False)  # Version của complex lúc dựng
+    body = db.Column(db.Text, nullable=False)  # JSON đã serialize, trả nguyên văn
+    updatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Complex changes table: nhật ký thay đổi thông tin complex (không gồm booking), seq tăng dần.
+# Index trong bộ nhớ của mỗi worker chỉ đọc các dòng sau seq đã thấy (xem services/complex_changes.py)
+class ComplexChange(db.Model):
+    __tablename__ = 'complex_changes'
+
+    seq = db.Column(db.BigInteger, primary_key=True)
+    complexId = db.Column(db.Integer, nullable=True)  # Không FK: complex đã xóa vẫn cần báo cho các index. NULL: loại sân / tiện ích
+    createdAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
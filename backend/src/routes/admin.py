@@ -2,7 +2,10 @@ from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func
-from src.models.database import Booking, Court, db, User, CourtComplex
+from src.models.database import Court, db, User, CourtComplex
+from src.services.booking_archive import BookingHistory
+from src.services.booking_ranges import day_bounds, month_bounds, within
+from src.services.pagination import CursorError, decode_cursor, encode_cursor, keyset_after, page_size
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -36,17 +39,17 @@ def get_admin_statistics():
         # 3. Total Courts
         total_courts = Court.query.count()
 
-        # 4. Total Bookings (all statuses)
-        total_bookings = Booking.query.count()
+        # 4. Total Bookings (all statuses, gồm cả booking đã lưu trữ)
+        total_bookings = db.session.query(BookingHistory).count()
 
         # 5. Total Platform Revenue (from confirmed/completed bookings)
-        total_platform_revenue = db.session.query(func.sum(Booking.totalPrice)).filter(
-            Booking.status.in_(['Confirmed', 'Completed'])
+        total_platform_revenue = db.session.query(func.sum(BookingHistory.totalPrice)).filter(
+            BookingHistory.status.in_(['Confirmed', 'Completed'])
         ).scalar() or 0.0
         
         # 6. Total Confirmed/Completed Bookings (for AOV calculation)
-        total_confirmed_completed_bookings = Booking.query.filter(
-            Booking.status.in_(['Confirmed', 'Completed'])
+        total_confirmed_completed_bookings = db.session.query(BookingHistory).filter(
+            BookingHistory.status.in_(['Confirmed', 'Completed'])
         ).count()
 
         # 7. Average Order Value (AOV)
@@ -57,35 +60,30 @@ def get_admin_statistics():
 
         # --- Monthly Platform Statistics (Current Month) ---
         today = datetime.now()
-        first_day_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        if today.month == 12:
-            last_day_of_month = today.replace(year=today.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-        else:
-            last_day_of_month = today.replace(month=today.month + 1, day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
+        # Khoảng nửa mở [đầu tháng, đầu tháng sau) để dùng được index createdAt
+        first_day_of_month, first_day_of_next_month = month_bounds(today)
         
-        monthly_platform_bookings = Booking.query.filter(
-            Booking.createdAt >= first_day_of_month,
-            Booking.createdAt <= last_day_of_month,
-            Booking.status.in_(['Confirmed', 'Completed'])
+        monthly_platform_bookings = db.session.query(BookingHistory).filter(
+            BookingHistory.createdAt >= first_day_of_month,
+            BookingHistory.createdAt < first_day_of_next_month,
+            BookingHistory.status.in_(['Confirmed', 'Completed'])
         ).count()
 
-        monthly_platform_revenue = db.session.query(func.sum(Booking.totalPrice)).filter(
-            Booking.createdAt >= first_day_of_month,
-            Booking.createdAt <= last_day_of_month,
-            Booking.status.in_(['Confirmed', 'Completed'])
+        monthly_platform_revenue = db.session.query(func.sum(BookingHistory.totalPrice)).filter(
+            BookingHistory.createdAt >= first_day_of_month,
+            BookingHistory.createdAt < first_day_of_next_month,
+            BookingHistory.status.in_(['Confirmed', 'Completed'])
         ).scalar() or 0.0
 
         # --- Daily Bookings Trend (Last 7 days) ---
         daily_bookings_trend = []
         for i in range(7):
             day = today - timedelta(days=6 - i)
-            start_of_day = day.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_of_day = day.replace(hour=23, minute=59, second=59, microsecond=999999)
+            start_of_day, next_day_start = day_bounds(day.date())
 
-            bookings_for_day = Booking.query.filter(
-                Booking.createdAt >= start_of_day,
-                Booking.createdAt <= end_of_day,
-                Booking.status.in_(['Confirmed', 'Completed'])
+            bookings_for_day = db.session.query(BookingHistory).filter(
+                within(BookingHistory.createdAt, start_of_day, next_day_start),
+                BookingHistory.status.in_(['Confirmed', 'Completed'])
             ).count()
             
             daily_bookings_trend.append({
@@ -192,30 +190,108 @@ def update_user_status(user_id):
 @admin_bp.route('/court-complexes', methods=['GET'])
 @jwt_required()
 def get_all_court_complexes():
+    """
+    Court complexes for the Admin panel, keyset-paginated.
+    Query Params:
+        limit (int): Items per page (default: 50, max: 200)
+        cursor (str): nextCursor of the previous page
+        sortBy (str): 'createdAt' (default), 'name', 'city', 'status' or 'ownerName'
+        sortOrder (str): 'asc' or 'desc' (default: 'desc')
+        status (str): Filter by complex status (e.g. 'Active', 'Inactive')
+        city (str): Filter by city
+        ownerId (str): Filter by owner
+        owner (str): Search by owner fullName or email
+        search (str): Search by complex name or address
+    """
     error = admin_required()
     if error:
         return error
     
     try:
-        complexes = CourtComplex.query.all()
-        complexes_data = []
+        try:
+            limit = page_size(request.args.get('limit'))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        sort_by = request.args.get('sortBy', 'createdAt')
+        sort_order = request.args.get('sortOrder', 'desc')
         
-        for complex in complexes:
-            owner = User.query.get(complex.ownerId)
-            complexes_data.append({
-                'id': complex.id,
-                'name': complex.name,
-                'address': complex.address,
-                'city': complex.city,
-                'status': complex.status,
-                'ownerId': complex.ownerId,
-                'ownerName': owner.fullName if owner else 'Unknown',
-                'createdAt': complex.createdAt.isoformat() if complex.createdAt else None
-            })
+        sort_columns = {
+            'createdAt': CourtComplex.createdAt,
+            'name': CourtComplex.name,
+            'city': CourtComplex.city,
+            'status': CourtComplex.status,
+            'ownerName': User.fullName,
+        }
+        if sort_by not in sort_columns:
+            return jsonify({'error': f"sortBy must be one of: {', '.join(sort_columns)}"}), 400
+        if sort_order not in ('asc', 'desc'):
+            return jsonify({'error': "sortOrder must be 'asc' or 'desc'"}), 400
+        descending = sort_order == 'desc'
+        # id làm cột phụ để thứ tự là duy nhất (keyset không bỏ sót / lặp complex trùng giá trị)
+        order_columns = (sort_columns[sort_by], CourtComplex.id)
+        cursor_key = f'{sort_by}:{sort_order}'
+        
+        # Một query: thông tin owner lấy qua join, không query User theo từng complex
+        query = db.session.query(
+            CourtComplex.id, CourtComplex.name, CourtComplex.address, CourtComplex.city,
+            CourtComplex.status, CourtComplex.ownerId, CourtComplex.createdAt,
+            User.fullName.label('ownerName'), User.email.label('ownerEmail')
+        ).outerjoin(User, CourtComplex.ownerId == User.id)
         
-        return jsonify({'courtComplexes': complexes_data}), 200
+        if request.args.get('status'):
+            query = query.filter(CourtComplex.status == request.args['status'])
+        if request.args.get('city'):
+            query = query.filter(CourtComplex.city == request.args['city'])
+        if request.args.get('ownerId'):
+            query = query.filter(CourtComplex.ownerId == request.args['ownerId'])
+        if request.args.get('owner'):
+            owner_pattern = f"%{request.args['owner']}%"
+            query = query.filter(db.or_(User.fullName.ilike(owner_pattern), User.email.ilike(owner_pattern)))
+        if request.args.get('search'):
+            search_pattern = f"%{request.args['search']}%"
+            query = query.filter(db.or_(CourtComplex.name.ilike(search_pattern), CourtComplex.address.ilike(search_pattern)))
+        
+        if request.args.get('cursor'):
+            try:
+                after = decode_cursor(request.args['cursor'], cursor_key)
+            except CursorError as e:
+                return jsonify({'error': str(e)}), 400
+            query = query.filter(keyset_after(order_columns, after, descending))
+        
+        query = query.order_by(*[column.desc() if descending else column.asc() for column in order_columns])
+        # Lấy thêm một dòng để biết còn trang sau hay không (không cần COUNT toàn bảng)
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        complexes_data = [{
+            'id': row.id,
+            'name': row.name,
+            'address': row.address,
+            'city': row.city,
+            'status': row.status,
+            'ownerId': row.ownerId,
+            'ownerName': row.ownerName if row.ownerName is not None else 'Unknown',
+            'ownerEmail': row.ownerEmail,
+            'createdAt': row.createdAt.isoformat() if row.createdAt else None
+        } for row in rows]
+        
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            sort_value = last.ownerName if sort_by == 'ownerName' else getattr(last, sort_by)
+            next_cursor = encode_cursor(cursor_key, [sort_value, last.id])
+        
+        return jsonify({
+            'courtComplexes': complexes_data,
+            'nextCursor': next_cursor,
+            'hasMore': has_more,
+            'limit': limit
+        }), 200
         
     except Exception as e:
+        import traceback
+        traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/users', methods=['GET'])
@@ -1,10 +1,18 @@
-from decimal import Decimal
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, jwt_required
 from src.models.database import db, User, Booking, Court, CourtComplex, HourlyPriceRate
+from src.services.blackout_service import BlackoutService, blackout_message
+from src.services.booking_archive import BookingHistory
+from src.services.booking_ranges import overlaps
+from src.services.db_routing import primary_read
+from src.services.booking_series import BookingSeriesService, SeriesError
 from src.services.email_service import EmailService
 import src.services.email_service as email_service_module
 import src.services.vietqr_service as vietqr_service_module
+from src.services.occupancy_store import occupancy_store
+from src.services.pricing_service import PricingService, PricingError
+from src.services.serializers import serialize_many, serialize_customer_booking
+from src.services.signals import record_booking_change
 from datetime import datetime, timedelta
 import uuid
 
@@ -65,84 +73,33 @@ def create_booking():
                 'error': f'Giờ đặt sân nằm ngoài giờ hoạt động của khu phức hợp ({complex_open_time.strftime("%H:%M")} - {complex_close_time.strftime("%H:%M")}).'
             }), 400
         
+        # Từ chối sớm bằng bitmap chiếm chỗ dùng chung (booking + lịch đóng sân, không cần query booking)
+        if occupancy_store.is_occupied(court.id, start_dt, end_dt):
+            return jsonify({'error': BlackoutService.unavailable_reason(court, start_dt, end_dt)}), 400
+        
+        # Check for court blackouts (bảo trì / đóng sân)
+        blackout = BlackoutService.find_overlapping(court, start_dt, end_dt)
+        if blackout:
+            return jsonify({'error': blackout_message(blackout)}), 400
+        
         # Check for conflicting bookings
         conflicting_booking = Booking.query.filter(
             Booking.courtId == data['courtId'],
             Booking.status.in_(['Pending', 'Confirmed']),
             # Logic kiểm tra overlap giữa 2 khoảng thời gian
-            # (start_A < end_B AND end_A > start_B)
-            db.and_(
-                Booking.startTime < end_dt,
-                Booking.endTime > start_dt
-            )
+            # (start_A < end_B AND end_A > start_B, hoặc tsrange && trên PostgreSQL)
+            overlaps(start_dt, end_dt)
         ).first()
         
         if conflicting_booking:
             return jsonify({'error': 'Time slot is already booked'}), 400
         
-        # --- BẮT ĐẦU LOGIC TÍNH TỔNG GIÁ TỪ API check_availability ---
-        estimated_price_decimal = Decimal(0)
-        
-        day_names_map = {
-            0: "Monday", 1: "Tuesday", 2: "Wednesday", 3: "Thursday",
-            4: "Friday", 5: "Saturday", 6: "Sunday"
-        }
-        current_day_name = day_names_map[start_dt.weekday()]
-
-        all_rates_for_court = HourlyPriceRate.query.filter(
-            HourlyPriceRate.courtId == data['courtId'],
-            db.or_(
-                HourlyPriceRate.dayOfWeek == current_day_name,
-                HourlyPriceRate.dayOfWeek == 'All'
-            )
-        ).order_by(HourlyPriceRate.startTime).all()
-
-        if not all_rates_for_court:
-            return jsonify({
-                'error': 'Không tìm thấy bảng giá cho sân này trong khung giờ yêu cầu.'
-            }), 400
-
-        time_pointer = start_dt # Sử dụng datetime object
-        
-        while time_pointer < end_dt:
-            current_segment_time_only = time_pointer.time()
-            
-            applicable_rate = None
-            for rate in all_rates_for_court:
-                if rate.dayOfWeek == current_day_name and \
-                   rate.startTime <= current_segment_time_only and \
-                   rate.endTime > current_segment_time_only:
-                    applicable_rate = rate
-                    break 
-            
-            if not applicable_rate:
-                for rate in all_rates_for_court:
-                    if rate.dayOfWeek == 'All' and \
-                       rate.startTime <= current_segment_time_only and \
-                       rate.endTime > current_segment_time_only:
-                        applicable_rate = rate
-                        break
-            
-            if not applicable_rate:
-                return jsonify({
-                    'error': f'Không tìm thấy giá cho khung giờ {current_segment_time_only.strftime("%H:%M")} vào {current_day_name}.'
-                }), 400
-
-            segment_end_for_rate_time_only = applicable_rate.endTime
-            segment_end_dt_at_rate = datetime.combine(time_pointer.date(), segment_end_for_rate_time_only)
-
-            current_segment_end = min(end_dt, segment_end_dt_at_rate)
-            
-            duration_seconds_in_segment = (current_segment_end - time_pointer).total_seconds()
-            duration_hours_decimal = Decimal(str(duration_seconds_in_segment / 3600))
-
-            estimated_price_decimal += applicable_rate.price * duration_hours_decimal
-            
-            time_pointer = current_segment_end
-
-        total_price = float(estimated_price_decimal) # Chuyển đổi về float để lưu vào DB và trả về JSON
-        
-        # --- KẾT THÚC LOGIC TÍNH TỔNG GIÁ ---
+        # Tính tổng giá theo bảng giá của sân (dùng chung với check_availability và đặt định kỳ)
+        try:
+            rates = PricingService.load_rates(data['courtId'], [start_dt])
+            total_price = float(PricingService.price_interval(rates, start_dt, end_dt)) # Chuyển đổi về float để lưu vào DB và trả về JSON
+        except PricingError as e:
+            return jsonify({'error': str(e)}), 400
 
         # Create booking
         new_booking = Booking(
@@ -156,6 +113,7 @@ def create_booking():
         )
         
         db.session.add(new_booking)
+        record_booking_change(new_booking, complex=complex)
         db.session.commit()
          # Lấy thông tin chủ sân để gửi email
         owner = User.query.get(complex.ownerId)
@@ -257,7 +215,7 @@ def get_my_bookings():
         limit (int): Items per page (default: 10)
         sortBy (str): Field to sort by (e.g., 'createdAt', 'startTime', 'totalPrice', 'status')
         sortOrder (str): 'asc' or 'desc' (default: 'desc')
-        status (str): Filter by booking status (e.g., 'Pending', 'Confirmed', 'Completed', 'Rejected', 'Cancelled')
+        status (str): Filter by booking status (e.g., 'Pending', 'Confirmed', 'Completed', 'Rejected', 'Cancelled', 'Expired')
         search (str): Search by court name, complex name
     """
     try:
@@ -275,34 +233,34 @@ def get_my_bookings():
         filter_status = request.args.get('status')
         search_query = request.args.get('search')
         
-        # Bắt đầu truy vấn
-        bookings_query = db.session.query(Booking).options(
-            db.joinedload(Booking.court).joinedload(Court.complex) # Load court và complex
+        # Bắt đầu truy vấn (BookingHistory: gồm cả booking đã lưu trữ, xem services/booking_archive.py)
+        bookings_query = db.session.query(BookingHistory).options(
+            db.joinedload(BookingHistory.court).joinedload(Court.complex) # Load court và complex
         ).filter(
-            Booking.customerId == user_id # Chỉ lấy booking của user này
+            BookingHistory.customerId == user_id # Chỉ lấy booking của user này
         )
 
         # Lọc theo trạng thái
-        if filter_status and filter_status in ['Pending', 'Confirmed', 'Completed', 'Rejected', 'Cancelled']:
-            bookings_query = bookings_query.filter(Booking.status == filter_status)
+        if filter_status and filter_status in ['Pending', 'Confirmed', 'Completed', 'Rejected', 'Cancelled', 'Expired']:
+            bookings_query = bookings_query.filter(BookingHistory.status == filter_status)
 
         # Tìm kiếm
         if search_query:
             search_pattern = f"%{search_query}%"
             bookings_query = bookings_query.filter(
                 db.or_(
-                    Booking.court.has(Court.name.ilike(search_pattern)),
-                    Booking.court.has(Court.complex.has(CourtComplex.name.ilike(search_pattern))),
+                    BookingHistory.court.has(Court.name.ilike(search_pattern)),
+                    BookingHistory.court.has(Court.complex.has(CourtComplex.name.ilike(search_pattern))),
                 )
             )
 
         # Sắp xếp
         if sort_by:
             sort_columns = {
-                'createdAt': Booking.createdAt,
-                'startTime': Booking.startTime,
-                'totalPrice': Booking.totalPrice,
-                'status': Booking.status,
+                'createdAt': BookingHistory.createdAt,
+                'startTime': BookingHistory.startTime,
+                'totalPrice': BookingHistory.totalPrice,
+                'status': BookingHistory.status,
                 'courtName': Court.name,
                 'complexName': CourtComplex.name,
             }
@@ -311,41 +269,23 @@ def get_my_bookings():
             if sort_column is not None:
                 # Nếu sắp xếp theo courtName hoặc complexName, cần đảm bảo join với Court và CourtComplex
                 if sort_by in ['courtName', 'complexName']:
-                    bookings_query = bookings_query.join(Court).join(CourtComplex) # Đảm bảo join nếu chưa
+                    bookings_query = bookings_query.join(Court, BookingHistory.courtId == Court.id).join(CourtComplex) # Đảm bảo join nếu chưa
                 
                 if sort_order == 'asc':
                     bookings_query = bookings_query.order_by(sort_column.asc())
                 else:
                     bookings_query = bookings_query.order_by(sort_column.desc())
             else:
-                bookings_query = bookings_query.order_by(Booking.createdAt.desc())
+                bookings_query = bookings_query.order_by(BookingHistory.createdAt.desc())
         else:
-            bookings_query = bookings_query.order_by(Booking.createdAt.desc())
+            bookings_query = bookings_query.order_by(BookingHistory.createdAt.desc())
 
 
         # Thực hiện phân trang
         paginated_bookings = bookings_query.paginate(page=page, per_page=limit, error_out=False)
         
-        bookings_data = []
-        for booking in paginated_bookings.items:
-            # Thông tin khách hàng không cần thiết ở đây vì luôn là user hiện tại
-            # Nhưng chúng ta cần thông tin sân và khu phức hợp
-            court = booking.court
-            complex_data = court.complex
-
-            bookings_data.append({
-                'id': booking.id,
-                'courtName': court.name,
-                'complexName': complex_data.name,
-                'startTime': booking.startTime.isoformat(),
-                'endTime': booking.endTime.isoformat(),
-                'totalPrice': float(booking.totalPrice),
-                'status': booking.status,
-                'bookingType': booking.bookingType, # Có thể hữu ích
-                'createdAt': booking.createdAt.isoformat(),
-                'complexAddress': complex_data.address, # Để hiển thị trong chi tiết
-                'complexCity': complex_data.city,
-            })
+        # Thông tin khách hàng không cần thiết ở đây vì luôn là user hiện tại
+        bookings_data = serialize_many(serialize_customer_booking, paginated_bookings.items)
         
         return jsonify({
             'bookings': bookings_data,
@@ -419,7 +359,9 @@ def cancel_booking(booking_id):
         if booking.startTime < datetime.now() + timedelta(hours=2):
             return jsonify({'error': 'Cannot cancel booking less than 2 hours before start time'}), 400
         
+        previous_status = booking.status
         booking.status = 'Cancelled'
+        record_booking_change(booking, previous_status)
         db.session.commit()
         
         # Send cancellation email
@@ -499,79 +441,31 @@ def create_walk_in_booking():
                 'error': f'Giờ đặt sân nằm ngoài giờ hoạt động của khu phức hợp ({complex_open_time.strftime("%H:%M")} - {complex_close_time.strftime("%H:%M")}).'
             }), 400
         
+        # Từ chối sớm bằng bitmap chiếm chỗ dùng chung (booking + lịch đóng sân, không cần query booking)
+        if occupancy_store.is_occupied(court.id, start_dt, end_dt):
+            return jsonify({'error': BlackoutService.unavailable_reason(court, start_dt, end_dt)}), 400
+        
+        # Check for court blackouts (bảo trì / đóng sân)
+        blackout = BlackoutService.find_overlapping(court, start_dt, end_dt)
+        if blackout:
+            return jsonify({'error': blackout_message(blackout)}), 400
+        
         # Check for conflicting bookings
         conflicting_booking = Booking.query.filter(
             Booking.courtId == data['courtId'],
             Booking.status.in_(['Pending', 'Confirmed']),
-            db.and_(Booking.startTime < end_dt, Booking.endTime > start_dt)
+            overlaps(start_dt, end_dt)
         ).first()
         
         if conflicting_booking:
             return jsonify({'error': 'Time slot is already booked'}), 400
         
-        # --- BẮT ĐẦU LOGIC TÍNH TỔNG GIÁ TỪ API check_availability ---
-        estimated_price_decimal = Decimal(0)
-        
-        day_names_map = {
-            0: "Monday", 1: "Tuesday", 2: "Wednesday", 3: "Thursday",
-            4: "Friday", 5: "Saturday", 6: "Sunday"
-        }
-        current_day_name = day_names_map[start_dt.weekday()]
-
-        all_rates_for_court = HourlyPriceRate.query.filter(
-            HourlyPriceRate.courtId == data['courtId'],
-            db.or_(
-                HourlyPriceRate.dayOfWeek == current_day_name,
-                HourlyPriceRate.dayOfWeek == 'All'
-            )
-        ).order_by(HourlyPriceRate.startTime).all()
-
-        if not all_rates_for_court:
-            return jsonify({
-                'error': 'Không tìm thấy bảng giá cho sân này trong khung giờ yêu cầu.'
-            }), 400
-
-        time_pointer = start_dt
-        
-        while time_pointer < end_dt:
-            current_segment_time_only = time_pointer.time()
-            
-            applicable_rate = None
-            for rate in all_rates_for_court:
-                if rate.dayOfWeek == current_day_name and \
-                   rate.startTime <= current_segment_time_only and \
-                   rate.endTime > current_segment_time_only:
-                    applicable_rate = rate
-                    break 
-            
-            if not applicable_rate:
-                for rate in all_rates_for_court:
-                    if rate.dayOfWeek == 'All' and \
-                       rate.startTime <= current_segment_time_only and \
-                       rate.endTime > current_segment_time_only:
-                        applicable_rate = rate
-                        break
-            
-            if not applicable_rate:
-                return jsonify({
-                    'error': f'Không tìm thấy giá cho khung giờ {current_segment_time_only.strftime("%H:%M")} vào {current_day_name}.'
-                }), 400
-
-            segment_end_for_rate_time_only = applicable_rate.endTime
-            segment_end_dt_at_rate = datetime.combine(time_pointer.date(), segment_end_for_rate_time_only)
-
-            current_segment_end = min(end_dt, segment_end_dt_at_rate)
-            
-            duration_seconds_in_segment = (current_segment_end - time_pointer).total_seconds()
-            duration_hours_decimal = Decimal(str(duration_seconds_in_segment / 3600))
-
-            estimated_price_decimal += applicable_rate.price * duration_hours_decimal
-            
-            time_pointer = current_segment_end
-
-        total_price = float(estimated_price_decimal)
-        
-        # --- KẾT THÚC LOGIC TÍNH TỔNG GIÁ ---
+        # Tính tổng giá theo bảng giá của sân (dùng chung với check_availability và đặt định kỳ)
+        try:
+            rates = PricingService.load_rates(data['courtId'], [start_dt])
+            total_price = float(PricingService.price_interval(rates, start_dt, end_dt)) # Chuyển đổi về float để lưu vào DB và trả về JSON
+        except PricingError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Create walk-in booking
         new_booking = Booking(
@@ -587,6 +481,7 @@ def create_walk_in_booking():
         )
         
         db.session.add(new_booking)
+        record_booking_change(new_booking, complex=complex)
         db.session.commit()
         
         return jsonify({
@@ -613,6 +508,95 @@ def create_walk_in_booking():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@booking_bp.route('/series', methods=['POST'])
+@jwt_required()
+def create_booking_series():
+    """
+    Create a weekly recurring booking series for the current customer.
+    Body: courtId, startTime, endTime (first occurrence), occurrences or until (YYYY-MM-DD),
+          intervalWeeks (default 1), skipConflicts (default false)
+    """
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        court, series, skip_conflicts = BookingSeriesService.parse_request(request.get_json() or {})
+        complex = court.complex
+        if not complex or complex.status != 'Active':
+            return jsonify({'error': 'Court complex not found or inactive'}), 404
+        
+        summary = BookingSeriesService.create_series(
+            court, series, skip_conflicts,
+            customerId=user_id,
+            status='Pending',
+            bookingType='Online'
+        )
+        
+        # Một email tổng hợp cho khách và một cho chủ sân thay vì một email cho mỗi buổi
+        email_service_module.EmailService.send_booking_series_summary(user.email, user.fullName, summary)
+        owner = User.query.get(complex.ownerId)
+        if owner and owner.email:
+            email_service_module.EmailService.send_booking_series_summary(
+                owner.email, owner.fullName, {**summary, 'customerName': user.fullName}, for_owner=True
+            )
+        
+        return jsonify({'message': 'Booking series created successfully', **summary}), 201
+        
+    except SeriesError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@booking_bp.route('/walk-in/series', methods=['POST'])
+@jwt_required()
+def create_walk_in_booking_series():
+    """
+    Create a weekly recurring walk-in series (owner only), e.g. for clubs booking the same slot every week.
+    Body: như /series, thêm customerName và customerPhone
+    """
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role != 'Owner':
+            return jsonify({'error': 'Access denied'}), 403
+        
+        data = request.get_json() or {}
+        for field in ['customerName', 'customerPhone']:
+            if not data.get(field):
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        court, series, skip_conflicts = BookingSeriesService.parse_request(data)
+        if not court.complex or court.complex.ownerId != user_id:
+            return jsonify({'error': 'You can only create bookings for your own courts'}), 403
+        
+        summary = BookingSeriesService.create_series(
+            court, series, skip_conflicts,
+            customerId=None,
+            walkInCustomerName=data['customerName'],
+            walkInCustomerPhone=data['customerPhone'],
+            status='Confirmed', # Walk-in bookings are immediately confirmed
+            bookingType='WalkIn'
+        )
+        
+        return jsonify({'message': 'Walk-in booking series created successfully', **summary}), 201
+        
+    except SeriesError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @booking_bp.route('/<int:booking_id>/payment-info', methods=['GET'])
 @jwt_required()
 def get_payment_info(booking_id):
@@ -681,6 +665,7 @@ def get_payment_info(booking_id):
         return jsonify({'error': str(e)}), 500
 
 @booking_bp.route('/check-availability', methods=['POST'])
+@primary_read  # Kiểm tra ngay trước khi tạo booking: replica trễ sẽ báo trống slot vừa được đặt trên primary
 @jwt_required() 
 def check_availability():
     """Check if a time slot is available for booking and calculate estimated price"""
@@ -723,87 +708,42 @@ def check_availability():
                 'conflictReason': f'Giờ đặt sân nằm ngoài giờ hoạt động của khu phức hợp ({complex_open_time.strftime("%H:%M")} - {complex_close_time.strftime("%H:%M")}).'
             }), 400
 
-        conflicting_booking = Booking.query.filter(
-            Booking.courtId == data['courtId'],
-            Booking.status.in_(['Pending', 'Confirmed']),
-            db.and_(Booking.startTime < end_dt, Booking.endTime > start_dt)
-        ).first()
-        
-        available = conflicting_booking is None
+        conflict_reason = 'Time slot is already booked'
+        if occupancy_store.is_occupied(court.id, start_dt, end_dt):
+            available = False  # Bitmap chiếm chỗ đã cho biết bị trùng, không cần query booking
+            conflict_reason = BlackoutService.unavailable_reason(court, start_dt, end_dt)
+        else:
+            blackout = BlackoutService.find_overlapping(court, start_dt, end_dt)
+            if blackout:
+                available = False
+                conflict_reason = blackout_message(blackout)
+            else:
+                conflicting_booking = Booking.query.filter(
+                    Booking.courtId == data['courtId'],
+                    Booking.status.in_(['Pending', 'Confirmed']),
+                    overlaps(start_dt, end_dt)
+                ).first()
+                
+                available = conflicting_booking is None
         
         # SỬA LỖI Ở ĐÂY: KHỞI TẠO estimated_price VỚI GIÁ TRỊ MẶC ĐỊNH
         estimated_price = 0.0 # Khởi tạo estimated_price với giá trị mặc định float
         
         if available:
-            estimated_price_decimal = Decimal(0) # Giữ nguyên Decimal cho tính toán
-            
-            day_names_map = {
-                0: "Monday", 1: "Tuesday", 2: "Wednesday", 3: "Thursday",
-                4: "Friday", 5: "Saturday", 6: "Sunday"
-            }
-            current_day_name = day_names_map[start_dt.weekday()]
-
-            all_rates_for_court = HourlyPriceRate.query.filter(
-                HourlyPriceRate.courtId == data['courtId'],
-                db.or_(
-                    HourlyPriceRate.dayOfWeek == current_day_name,
-                    HourlyPriceRate.dayOfWeek == 'All'
-                )
-            ).order_by(HourlyPriceRate.startTime).all()
-
-            if not all_rates_for_court:
+            try:
+                rates = PricingService.load_rates(data['courtId'], [start_dt])
+                estimated_price = float(PricingService.price_interval(rates, start_dt, end_dt)) # Gán giá trị vào biến đã khởi tạo
+            except PricingError as e:
                 return jsonify({
                     'available': False,
                     'estimatedPrice': 0,
-                    'conflictReason': 'Không tìm thấy bảng giá cho sân này trong khung giờ yêu cầu.'
+                    'conflictReason': str(e)
                 }), 400
-
-            time_pointer = start_dt
-            
-            while time_pointer < end_dt:
-                current_segment_time_only = time_pointer.time()
-                
-                applicable_rate = None
-                for rate in all_rates_for_court:
-                    if rate.dayOfWeek == current_day_name and \
-                       rate.startTime <= current_segment_time_only and \
-                       rate.endTime > current_segment_time_only: 
-                        applicable_rate = rate
-                        break 
-                
-                if not applicable_rate:
-                    for rate in all_rates_for_court:
-                        if rate.dayOfWeek == 'All' and \
-                           rate.startTime <= current_segment_time_only and \
-                           rate.endTime > current_segment_time_only:
-                            applicable_rate = rate
-                            break
-                
-                if not applicable_rate:
-                    return jsonify({
-                        'available': False,
-                        'estimatedPrice': 0,
-                        'conflictReason': f'Không tìm thấy giá cho khung giờ {current_segment_time_only.strftime("%H:%M")} vào {current_day_name}.'
-                    }), 400
-
-                segment_end_for_rate_time_only = applicable_rate.endTime
-                segment_end_dt_at_rate = datetime.combine(time_pointer.date(), segment_end_for_rate_time_only)
-
-                current_segment_end = min(end_dt, segment_end_dt_at_rate)
-                
-                duration_seconds_in_segment = (current_segment_end - time_pointer).total_seconds()
-                duration_hours_decimal = Decimal(str(duration_seconds_in_segment / 3600)) 
-
-                estimated_price_decimal += applicable_rate.price * duration_hours_decimal
-                
-                time_pointer = current_segment_end
-
-            estimated_price = float(estimated_price_decimal) # Gán giá trị vào biến đã khởi tạo
         
         return jsonify({
             'available': available,
             'estimatedPrice': estimated_price, # estimated_price luôn có giá trị
-            'conflictReason': 'Time slot is already booked' if not available else None
+            'conflictReason': conflict_reason if not available else None
         })
         
     except Exception as e:
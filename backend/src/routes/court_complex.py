@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 # Đảm bảo các imports này đúng với cấu trúc thư mục của bạn
 from src.models.database import db, CourtComplex, Court, SportType, User, HourlyPriceRate, Product, Amenity, CourtComplexAmenity, CourtComplexImage
+from src.services.complex_documents import ComplexDocumentStore
 from src.services.cloudinary_service import CloudinaryService # Đảm bảo service này tồn tại và hoạt động
+from src.services.geo_service import apply_complex_coordinates
+from src.services.signals import record_complex_change
 from datetime import datetime, time
 import traceback # Để in chi tiết lỗi
 
@@ -59,78 +62,14 @@ def get_court_complexes():
 @court_complex_bp.route('/<int:complex_id>', methods=['GET'])
 def get_court_complex_detail(complex_id):
     try:
-        complex = CourtComplex.query.get(complex_id)
-        if not complex:
+        # Một lookup trong bảng complex_documents (dựng lại khi owner sửa complex), trả nguyên văn
+        body, stored = ComplexDocumentStore.document_json(complex_id, 'full')
+        if body is None:
             return jsonify({'error': 'Court complex not found'}), 404
         
-        # Get courts
-        courts = Court.query.filter_by(complexId=complex_id, status='Active').all()
-        courts_data = []
-        
-        for court in courts:
-            # Get hourly price rates for each court
-            hourly_rates = HourlyPriceRate.query.filter_by(courtId=court.id).all()
-            rates_data = []
-            for rate in hourly_rates:
-                rates_data.append({
-                    'id': rate.id,
-                    'dayOfWeek': rate.dayOfWeek,
-                    'startTime': rate.startTime.strftime('%H:%M'),
-                    'endTime': rate.endTime.strftime('%H:%M'),
-                    'price': float(rate.price)
-                })
-
-            courts_data.append({
-                'id': court.id,
-                'name': court.name,
-                'status': court.status,
-                'pricing': rates_data # Include pricing details
-            })
-        
-        # Get complex images
-        complex_images = CourtComplexImage.query.filter_by(complexId=complex_id).all()
-        images_data = []
-        for img in complex_images:
-            images_data.append({
-                'id': img.id,
-                'imageUrl': img.imageUrl,
-                'isMain': img.isMain
-            })
-
-        # Get complex amenities
-        complex_amenities_relationships = CourtComplexAmenity.query.filter_by(complexId=complex_id).all()
-        amenities_data = []
-        for cca in complex_amenities_relationships:
-            amenity = Amenity.query.get(cca.amenityId)
-            if amenity:
-                amenities_data.append({
-                    'id': amenity.id,
-                    'name': amenity.name,
-                    'icon': amenity.icon
-                })
-
-        complex_data = {
-            'id': complex.id,
-            'ownerId': complex.ownerId, # Thêm ownerId
-            'name': complex.name,
-            'address': complex.address,
-            'city': complex.city,
-            'description': complex.description,
-            'phoneNumber': complex.phoneNumber,
-            'sportType': complex.sportType, # Bao gồm sportType
-            'openTime': complex.openTime.strftime('%H:%M') if complex.openTime else None,
-            'closeTime': complex.closeTime.strftime('%H:%M') if complex.closeTime else None,
-            'mainImage': complex.mainImage, # Bao gồm mainImage
-            'rating': float(complex.rating) if complex.rating else 0,
-            'totalReviews': complex.totalReviews or 0,
-            'status': complex.status,
-            'createdAt': complex.createdAt.isoformat(), # Thêm createdAt
-            'courts': courts_data,
-            'images': images_data, # Bao gồm danh sách ảnh
-            'amenities': amenities_data # Bao gồm danh sách tiện ích
-        }
-        
-        return jsonify(complex_data), 200
+        response = Response(body, status=200, mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT' if stored else 'MISS'
+        return response
         
     except Exception as e:
         traceback.print_exc()
@@ -171,13 +110,16 @@ def create_court_complex():
             description=data.get('description', ''),
             phoneNumber=data['phoneNumber'],
             sportType=data['sportType'],
+            googleMapLink=data.get('googleMapLink', ''),
             openTime=open_time,
             closeTime=close_time,
             status='Pending' # Hoặc 'Active' nếu bạn muốn nó tự động kích hoạt
         )
+        apply_complex_coordinates(complex, data)
         
         db.session.add(complex)
         db.session.flush()  # Get the complex ID
+        record_complex_change(complex.id)
 
         # Handle images upload
         if data.get('images') and isinstance(data['images'], list):
@@ -1,10 +1,73 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import delete
 from src.models.database import db, User, Notification
+from src.services.event_hub import event_hub, format_sse, sse_response
+from src.services.serializers import serialize_many, serialize_notification
 from datetime import datetime
 
 notification_bp = Blueprint('notification', __name__)
 
+# Giới hạn số ID trong một lần thao tác hàng loạt
+MAX_BULK_IDS = 500
+
+def _adjust_unread_count(user_id, delta):
+    """Cộng/trừ bộ đếm unreadNotificationCount của user (chưa commit)"""
+    if not delta:
+        return
+    User.query.filter_by(id=user_id).update(
+        {User.unreadNotificationCount: User.unreadNotificationCount + delta},
+        synchronize_session=False
+    )
+
+def _unread():
+    """Điều kiện 'chưa đọc': isRead NULL (dữ liệu cũ) cũng tính là chưa đọc"""
+    return Notification.isRead.isnot(True)
+
+def _delete_notifications(*conditions):
+    """
+    Xóa các notification thỏa điều kiện bằng một câu DELETE ... RETURNING.
+    Trả về (số đã xóa, số chưa đọc trong đó): chỉ dòng thật sự bị xóa bởi câu lệnh này
+    được tính, nên hai request xóa đồng thời không trừ bộ đếm hai lần.
+    """
+    read_flags = db.session.execute(
+        delete(Notification).where(*conditions).returning(Notification.isRead)
+    ).scalars().all()
+    return len(read_flags), sum(1 for is_read in read_flags if not is_read)
+
+def _get_unread_count(user_id):
+    return db.session.query(User.unreadNotificationCount).filter_by(id=user_id).scalar() or 0
+
+def _bulk_target_query(user_id, data):
+    """
+    Build query cho các thao tác hàng loạt.
+    Body nhận một trong hai: {'ids': [1, 2, ...]} hoặc {'before': 'ISO timestamp'}
+    Trả về (query, error_message)
+    """
+    ids = data.get('ids')
+    before = data.get('before')
+
+    if ids is None and not before:
+        return None, 'Either ids or before is required'
+
+    query = Notification.query.filter(Notification.userId == user_id)
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return None, 'ids must be a list of integers'
+        if len(ids) > MAX_BULK_IDS:
+            return None, f'Cannot process more than {MAX_BULK_IDS} notifications at once'
+        query = query.filter(Notification.id.in_(ids))
+
+    if before:
+        try:
+            before_dt = datetime.fromisoformat(before.replace('Z', '+00:00')).replace(tzinfo=None)
+        except (ValueError, AttributeError):
+            return None, 'Invalid before timestamp. Use ISO 8601 format.'
+        query = query.filter(Notification.createdAt <= before_dt)
+
+    return query, None
+
 @notification_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_notifications():
@@ -20,7 +83,7 @@ def get_notifications():
         query = Notification.query.filter_by(userId=current_user_id)
         
         if unread_only:
-            query = query.filter_by(isRead=False)
+            query = query.filter(_unread())
         
         # Pagination
         notifications_pagination = query.order_by(Notification.createdAt.desc()).paginate(
@@ -29,19 +92,10 @@ def get_notifications():
             error_out=False
         )
         
-        notifications_data = []
-        for notification in notifications_pagination.items:
-            notifications_data.append({
-                'id': notification.id,
-                'title': notification.title,
-                'message': notification.message,
-                'type': notification.type,
-                'isRead': notification.isRead,
-                'createdAt': notification.createdAt.isoformat() if notification.createdAt else None
-            })
+        notifications_data = serialize_many(serialize_notification, notifications_pagination.items)
         
-        # Đếm số thông báo chưa đọc
-        unread_count = Notification.query.filter_by(userId=current_user_id, isRead=False).count()
+        # Số thông báo chưa đọc lấy từ bộ đếm trên user (không COUNT(*) lại bảng notifications)
+        unread_count = _get_unread_count(current_user_id)
         
         return jsonify({
             'notifications': notifications_data,
@@ -71,7 +125,11 @@ def mark_as_read(notification_id):
         if notification.userId != current_user_id:
             return jsonify({'error': 'Access denied'}), 403
         
-        notification.isRead = True
+        # UPDATE có điều kiện: chỉ request thật sự đổi trạng thái mới trừ bộ đếm
+        updated = Notification.query.filter(Notification.id == notification_id, _unread()).update(
+            {'isRead': True}, synchronize_session=False
+        )
+        _adjust_unread_count(current_user_id, -updated)
         db.session.commit()
         
         return jsonify({'message': 'Notification marked as read'}), 200
@@ -86,7 +144,10 @@ def mark_all_as_read():
     try:
         current_user_id = get_jwt_identity()
         
-        Notification.query.filter_by(userId=current_user_id, isRead=False).update({'isRead': True})
+        Notification.query.filter(Notification.userId == current_user_id, _unread()).update(
+            {'isRead': True}, synchronize_session=False
+        )
+        User.query.filter_by(id=current_user_id).update({'unreadNotificationCount': 0})
         db.session.commit()
         
         return jsonify({'message': 'All notifications marked as read'}), 200
@@ -109,7 +170,8 @@ def delete_notification(notification_id):
         if notification.userId != current_user_id:
             return jsonify({'error': 'Access denied'}), 403
         
-        db.session.delete(notification)
+        _, deleted_unread = _delete_notifications(Notification.id == notification_id)
+        _adjust_unread_count(current_user_id, -deleted_unread)
         db.session.commit()
         
         return jsonify({'message': 'Notification deleted successfully'}), 200
@@ -118,6 +180,96 @@ def delete_notification(notification_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@notification_bp.route('/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_count():
+    """
+    Endpoint nhẹ để frontend poll liên tục (hỗ trợ cả HEAD).
+    Chỉ đọc bộ đếm trên bảng users, trả về header X-Unread-Count và ETag.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        unread_count = _get_unread_count(current_user_id)
+
+        response = jsonify({'unreadCount': unread_count})
+        response.headers['X-Unread-Count'] = str(unread_count)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.set_etag(f'unread-{unread_count}', weak=True)
+        return response.make_conditional(request)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@notification_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])  # Chỉ route này nhận token qua query string
+def stream_events():
+    """
+    Server-Sent Events stream cho user hiện tại.
+    Event 'notification' khi có thông báo mới, 'booking' khi booking của user (khách hoặc chủ sân) đổi trạng thái.
+    EventSource không gửi được header nên token có thể truyền qua query string ?jwt=<token>.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        unread_count = _get_unread_count(current_user_id)
+        subscription = event_hub.subscribe(f'user:{current_user_id}')
+
+        return sse_response(subscription, [format_sse('unread-count', {'unreadCount': unread_count})])
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@notification_bp.route('/bulk-read', methods=['PUT'])
+@jwt_required()
+def bulk_mark_as_read():
+    """Mark nhiều notification là đã đọc theo danh sách ID hoặc tới một thời điểm"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json() or {}
+
+        query, error = _bulk_target_query(current_user_id, data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        updated = query.filter(_unread()).update(
+            {'isRead': True}, synchronize_session=False
+        )
+        _adjust_unread_count(current_user_id, -updated)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Notifications marked as read',
+            'updated': updated
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@notification_bp.route('/bulk-delete', methods=['POST'])
+@jwt_required()
+def bulk_delete_notifications():
+    """Xóa nhiều notification theo danh sách ID hoặc tới một thời điểm"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json() or {}
+
+        query, error = _bulk_target_query(current_user_id, data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        deleted, deleted_unread = _delete_notifications(query.whereclause)
+        _adjust_unread_count(current_user_id, -deleted_unread)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Notifications deleted successfully',
+            'deleted': deleted
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Helper function để tạo notification (sử dụng trong các module khác)
 def create_notification(user_id, title, message, notification_type='info'):
     """
@@ -139,7 +291,10 @@ def create_notification(user_id, title, message, notification_type='info'):
         )
         
         db.session.add(notification)
+        _adjust_unread_count(user_id, 1)
         db.session.commit()
+
+        event_hub.publish(f'user:{user_id}', 'notification', serialize_notification(notification))
         
         return True
     except Exception as e:
@@ -1,9 +1,22 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.database import db, User, CourtComplex, Court, HourlyPriceRate, Amenity, CourtComplexAmenity, CourtComplexImage, SportType, Booking
+from src.models.database import db, User, CourtComplex, Court, CourtBlackout, HourlyPriceRate, Amenity, CourtComplexAmenity, CourtComplexImage, SportType, Booking
+from src.services.availability_service import AvailabilityService
+from src.services.blackout_service import BlackoutError, BlackoutService
+from src.services.booking_archive import BookingHistory
+from src.services.booking_bulk import BULK_ACTIONS, BookingBulkService, BulkActionError, bulk_bookings_select, parse_booking_ids
+from src.services.booking_export import EXPORT_FORMATS, EXPORT_REPORTS, REVENUE_STATUSES, bookings_export_select, export_response, revenue_export_select
+from src.services.booking_ranges import month_bounds, starts_on_days
 from src.services.cloudinary_service import CloudinaryService
+from src.services.db_routing import database_router
 from datetime import datetime, timedelta
 import src.services.email_service as email_service_module # Import email service
+from src.services.geo_service import apply_complex_coordinates
+from src.services.owner_workspace import DEFAULT_AVAILABILITY_DAYS, MAX_AVAILABILITY_DAYS, OwnerWorkspaceService, estimate_occupancy_rate, serialize_owner_complex, serialize_pending_booking, setup_status
+from src.services.reference_data import reference_data
+from src.services.response_versioning import conditional_get, owner_workspace_etag
+from src.services.serializers import serialize_many, serialize_owner_booking
+from src.services.signals import record_booking_change, record_complex_change
 from sqlalchemy import func, cast 
 import json
 
@@ -20,47 +33,14 @@ def get_setup_status():
         if not user or user.role != 'Owner':
             return jsonify({'error': 'Access denied'}), 403
         
-        # Check if owner has any court complexes
-        complexes = CourtComplex.query.filter_by(ownerId=user_id).all()
+        # Ba query gộp cho mọi complex (trước đây query sân và giá theo từng complex / từng sân)
+        complexes = OwnerWorkspaceService.complexes(db.session, user_id)
+        courts_by_complex = {}
+        for court in OwnerWorkspaceService.courts(db.session, user_id):
+            courts_by_complex.setdefault(court.complexId, []).append(court)
+        rated_court_ids = {rate.courtId for rate in OwnerWorkspaceService.price_rates(db.session, user_id)}
         
-        # New variable name: hasCourtComplex
-        if not complexes:
-            return jsonify({
-                'hasCourtComplex': False, # <<< THAY needsSetup BẰNG hasCourtComplex
-                'setupStep': 'create_complex',
-                'message': 'Bạn cần tạo khu phức hợp sân đầu tiên để bắt đầu kinh doanh.'
-            })
-        
-        # If there are complexes, assume 'hasCourtComplex' is True.
-        # Now, check for completion of details within those complexes.
-        
-        for complex_item in complexes: # Đổi tên biến 'complex' thành 'complex_item' để tránh xung đột với built-in type
-            # Check if any complex needs courts/pricing
-            courts = Court.query.filter_by(complexId=complex_item.id).all()
-            if not courts:
-                return jsonify({
-                    'hasCourtComplex': True, # <<< Đã có complex, nhưng chưa hoàn chỉnh
-                    'setupStep': 'complete_complex',
-                    'complexId': complex_item.id,
-                    'message': f'Khu phức hợp "{complex_item.name}" cần được hoàn thiện thông tin sân và giá cả.'
-                })
-            
-            # Check if courts have pricing
-            for court in courts:
-                rates = HourlyPriceRate.query.filter_by(courtId=court.id).all()
-                if not rates:
-                    return jsonify({
-                        'hasCourtComplex': True, # <<< Đã có complex, sân, nhưng chưa có giá
-                        'setupStep': 'complete_complex',
-                        'complexId': complex_item.id,
-                        'message': f'Sân "{court.name}" cần được thiết lập giá theo khung giờ.'
-                    })
-        
-        # If all checks pass, means setup is complete
-        return jsonify({
-            'hasCourtComplex': True, # <<< Đã hoàn thành
-            'message': 'Thiết lập đã hoàn tất.'
-        })
+        return jsonify(setup_status(complexes, courts_by_complex, rated_court_ids))
         
     except Exception as e:
         import traceback
@@ -78,26 +58,8 @@ def get_setup_data():
         if not user or user.role != 'Owner':
             return jsonify({'error': 'Access denied'}), 403
         
-        # Get sport types
-        sport_types = SportType.query.all()
-        sport_types_data = [{'id': st.id, 'name': st.name} for st in sport_types]
-        
-        # Get amenities
-        amenities = Amenity.query.all()
-        amenities_data = [{'id': a.id, 'name': a.name, 'icon': a.icon} for a in amenities]
-        
-        # Common cities in Vietnam
-        cities = [
-            'Hà Nội', 'Hồ Chí Minh', 'Đà Nẵng', 'Hải Phòng', 'Cần Thơ',
-            'Biên Hòa', 'Huế', 'Nha Trang', 'Buôn Ma Thuột', 'Quy Nhon',
-            'Vũng Tàu', 'Nam Định', 'Phan Thiết', 'Long Xuyên', 'Hạ Long'
-        ]
-        
-        return jsonify({
-            'sportTypes': sport_types_data,
-            'amenities': amenities_data,
-            'cities': cities
-        })
+        # Loại sân, tiện ích, thành phố gợi ý (cache trong bộ nhớ, có ETag)
+        return reference_data.response('setup-data')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -138,9 +100,11 @@ def create_court_complex():
             closeTime=datetime.strptime(data.get('closeTime', '22:00'), '%H:%M').time(),
             status='Active'
         )
+        apply_complex_coordinates(new_complex, data)
         
         db.session.add(new_complex)
         db.session.flush()  # Ghi vào DB để new_complex.id có giá trị
+        record_complex_change(new_complex.id)
         
         # Handle images upload
         if data.get('images'):
@@ -224,48 +188,11 @@ def get_court_complexes():
         if not user or user.role != 'Owner':
             return jsonify({'error': 'Access denied'}), 403
         
-        complexes = CourtComplex.query.filter_by(ownerId=user_id).all()
-        
-        complexes_data = []
-        for complex in complexes:
-            # Get court count
-            court_count = Court.query.filter_by(complexId=complex.id).count()
-            
-            # Get monthly bookings and revenue (current month)
-            current_month = datetime.now().month
-            current_year = datetime.now().year
-            
-            monthly_bookings = db.session.query(Booking).join(Court).filter(
-                Court.complexId == complex.id,
-                db.extract('month', Booking.createdAt) == current_month,
-                db.extract('year', Booking.createdAt) == current_year,
-                Booking.status.in_(['Confirmed', 'Completed'])
-            ).count()
-            
-            monthly_revenue = db.session.query(db.func.sum(Booking.totalPrice)).join(Court).filter(
-                Court.complexId == complex.id,
-                db.extract('month', Booking.createdAt) == current_month,
-                db.extract('year', Booking.createdAt) == current_year,
-                Booking.status.in_(['Confirmed', 'Completed'])
-            ).scalar() or 0
-            
-            complexes_data.append({
-                'id': complex.id,
-                'name': complex.name,
-                'address': complex.address,
-                'city': complex.city,
-                'sportType': complex.sportType,
-                'phoneNumber': complex.phoneNumber,
-                'openTime': complex.openTime.strftime('%H:%M') if complex.openTime else None,  # <<< SỬ DỤNG .strftime()
-                'closeTime': complex.closeTime.strftime('%H:%M') if complex.closeTime else None, # <<< SỬ DỤNG .strftime()
-                'mainImage': complex.mainImage,
-                'rating': float(complex.rating) if complex.rating else 0,
-                'totalReviews': complex.totalReviews,
-                'status': complex.status,
-                'courtCount': court_count,
-                'monthlyBookings': monthly_bookings,
-                'monthlyRevenue': float(monthly_revenue)
-            })
+        # Số sân, số booking và doanh thu tháng này của mọi complex trong một query gộp
+        complexes_data = [
+            serialize_owner_complex(row, row.courtCount, row.monthlyBookings, row.monthlyRevenue)
+            for row in OwnerWorkspaceService.complex_listing(db.session, user_id)
+        ]
         
         return jsonify({'courtComplexes': complexes_data})
         
@@ -292,61 +219,34 @@ def get_statistics():
         ).count()
         
         # --- THỐNG KÊ THEO THÁNG HIỆN TẠI ---
-        # Lấy ngày đầu tiên và cuối cùng của tháng hiện tại
         today = datetime.now()
-        first_day_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        # Tính ngày cuối tháng (cách đơn giản: tháng sau - 1 ngày)
-        if today.month == 12:
-            last_day_of_month = today.replace(year=today.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-        else:
-            last_day_of_month = today.replace(month=today.month + 1, day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
+        # Khoảng nửa mở [đầu tháng, đầu tháng sau) để dùng được index createdAt
+        first_day_of_month, first_day_of_next_month = month_bounds(today)
         
-        # Monthly Bookings
-        monthly_bookings_query = db.session.query(Booking).join(Court).join(CourtComplex).filter(
+        # Monthly Bookings (BookingHistory: gồm cả booking đã lưu trữ)
+        monthly_bookings_query = db.session.query(BookingHistory).join(
+            Court, BookingHistory.courtId == Court.id
+        ).join(CourtComplex, Court.complexId == CourtComplex.id).filter(
             CourtComplex.ownerId == user_id,
-            Booking.createdAt >= first_day_of_month,
-            Booking.createdAt <= last_day_of_month,
-            Booking.status.in_(['Confirmed', 'Completed']) # Chỉ tính các booking đã xác nhận/hoàn thành
+            BookingHistory.createdAt >= first_day_of_month,
+            BookingHistory.createdAt < first_day_of_next_month,
+            BookingHistory.status.in_(['Confirmed', 'Completed']) # Chỉ tính các booking đã xác nhận/hoàn thành
         )
         monthly_bookings = monthly_bookings_query.count()
         
         # Monthly Revenue
-        monthly_revenue_query = db.session.query(func.sum(Booking.totalPrice)).join(Court).join(CourtComplex).filter(
+        monthly_revenue_query = db.session.query(func.sum(BookingHistory.totalPrice)).select_from(BookingHistory).join(
+            Court, BookingHistory.courtId == Court.id
+        ).join(CourtComplex, Court.complexId == CourtComplex.id).filter(
             CourtComplex.ownerId == user_id,
-            Booking.createdAt >= first_day_of_month,
-            Booking.createdAt <= last_day_of_month,
-            Booking.status.in_(['Confirmed', 'Completed'])
+            BookingHistory.createdAt >= first_day_of_month,
+            BookingHistory.createdAt < first_day_of_next_month,
+            BookingHistory.status.in_(['Confirmed', 'Completed'])
         )
         monthly_revenue = monthly_revenue_query.scalar() or 0.0 # Đảm bảo là float/Decimal
         
-        # Tỷ lệ lấp đầy (Occupancy Rate)
-        # Đây là phần phức tạp nhất, cần dữ liệu chi tiết hơn về court complex và courts
-        # Tạm thời tính một cách đơn giản, nếu không có dữ liệu chi tiết hơn
-        # Để tính chính xác, cần: tổng số giờ sân có thể đặt trong tháng / tổng số giờ đã được đặt
-        # Cách đơn giản: nếu có booking, tạm coi là có % lấp đầy nhỏ
-        occupancy_rate = 0.0
-        if total_courts > 0:
-            # Đây chỉ là một ước lượng rất thô.
-            # Để chính xác, cần tính tổng số giờ có sẵn (total_courts * total_hours_in_month)
-            # và tổng số giờ đã đặt (sum of duration of confirmed bookings).
-            # Tạm thời, nếu có booking, giả định có một tỷ lệ nhất định.
-            # Hoặc chỉ tính nếu có monthly_bookings > 0
-            if monthly_bookings > 0 and total_courts > 0:
-                # Giả định trung bình mỗi booking là 1 giờ.
-                # Tổng giờ đặt = monthly_bookings * 1 giờ.
-                # Tổng giờ có sẵn = total_courts * (số giờ hoạt động trung bình mỗi ngày) * (số ngày trong tháng)
-                
-                # Để có một con số thực tế, bạn cần một logic phức tạp hơn:
-                # 1. Lấy giờ mở/đóng cửa của tất cả các khu phức hợp của owner.
-                # 2. Tính tổng số giờ "có thể đặt" cho tất cả các sân trong tháng đó.
-                # 3. Tính tổng số giờ "đã được đặt" từ các booking Confirmed/Completed.
-                # Đây là một con số giả định tạm thời:
-                occupancy_rate = (monthly_bookings / (total_courts * 30 * 10)) * 100 # Giả định 10 giờ/ngày * 30 ngày
-                occupancy_rate = min(occupancy_rate, 100.0) # Không vượt quá 100%
-                occupancy_rate = round(occupancy_rate, 1) # Làm tròn 1 chữ số thập phân
-            else:
-                occupancy_rate = 0.0
-
+        # Tỷ lệ lấp đầy (Occupancy Rate): ước lượng thô, xem estimate_occupancy_rate
+        occupancy_rate = estimate_occupancy_rate(monthly_bookings, total_courts)
 
         return jsonify({
             'overview': {
@@ -364,6 +264,103 @@ def get_statistics():
         return jsonify({'error': str(e)}), 500
 
 
+@owner_bp.route('/workspace', methods=['GET'])
+@jwt_required()
+@conditional_get(owner_workspace_etag)
+def get_workspace():
+    """Dashboard snapshot: setup status, complexes, statistics, pending bookings, courts and availability"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role != 'Owner':
+            return jsonify({'error': 'Access denied'}), 403
+        
+        # Khoảng ngày của lịch availability, mặc định giống /court-complexes/<id>/availability
+        try:
+            start_date = request.args.get('start_date')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else datetime.now().date()
+            end_date = request.args.get('end_date')
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else start_date + timedelta(days=DEFAULT_AVAILABILITY_DAYS)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        if end_date < start_date:
+            return jsonify({'error': 'end_date must not be before start_date'}), 400
+        if (end_date - start_date).days > MAX_AVAILABILITY_DAYS:
+            return jsonify({'error': f'Date range must not exceed {MAX_AVAILABILITY_DAYS} days'}), 400
+        
+        encoding, error = AvailabilityService.calendar_encoding(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        sections, error = OwnerWorkspaceService.parse_sections(request.args.get('sections'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # Các phần độc lập chạy song song, mỗi phần một connection (replica nếu request đọc replica)
+        return jsonify(OwnerWorkspaceService.build(
+            database_router.read_engine(), user_id, start_date, end_date, encoding, sections
+        ))
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+def _filter_owner_bookings(bookings_query, args=None, booking=Booking):
+    """
+    Áp dụng bộ lọc booking của owner (status, courtComplexId, date, search) từ query string,
+    hoặc từ `args` (dict, ví dụ bộ lọc trong body của thao tác hàng loạt).
+    Dùng được cho cả ORM Query và Core select đã join Court/CourtComplex.
+    booking: entity của booking trong query (Booking, hoặc BookingHistory cho báo cáo).
+    Raises ValueError nếu date hoặc courtComplexId sai định dạng.
+    """
+    if args is None:
+        args = request.args
+        filter_complex_id = args.get('courtComplexId', type=int)
+    else:
+        filter_complex_id = int(args['courtComplexId']) if args.get('courtComplexId') else None
+    filter_status = args.get('status')
+    filter_date_str = args.get('date')
+    search_query = args.get('search')
+
+    # Lọc theo trạng thái
+    if filter_status and filter_status in ['Pending', 'Confirmed', 'Completed', 'Rejected', 'Cancelled', 'Expired']:
+        bookings_query = bookings_query.filter(booking.status == filter_status)
+
+    # Lọc theo khu phức hợp
+    if filter_complex_id:
+        bookings_query = bookings_query.filter(CourtComplex.id == filter_complex_id)
+
+    # Lọc theo ngày
+    if filter_date_str:
+        filter_date = datetime.strptime(filter_date_str, '%Y-%m-%d').date()
+        bookings_query = bookings_query.filter(
+            booking.bookingDate == filter_date # Ngày của startTime, cột có index
+        )
+
+    # Tìm kiếm
+    if search_query:
+        search_pattern = f"%{search_query}%"
+        # Cần xử lý tìm kiếm trên User.fullName, User.email an toàn
+        # và trên walkInCustomerName, walkInCustomerPhone
+        search_conditions = [
+            booking.walkInCustomerName.ilike(search_pattern),
+            booking.walkInCustomerPhone.ilike(search_pattern),
+            db.and_(
+                booking.customerId.isnot(None), # Chỉ tìm user đã đăng ký
+                db.or_(
+                    booking.customer.has(User.fullName.ilike(search_pattern)),
+                    booking.customer.has(User.email.ilike(search_pattern)),
+                    # Thêm dòng này nếu User model có phoneNumber và bạn muốn tìm kiếm theo số điện thoại của user đã đăng ký
+                    # booking.customer.has(User.phoneNumber.ilike(search_pattern)), 
+                )
+            )
+        ]
+        bookings_query = bookings_query.filter(db.or_(*search_conditions))
+
+    return bookings_query
+
+
 @owner_bp.route('/bookings', methods=['GET'])
 @jwt_required()
 def get_bookings():
@@ -374,7 +371,7 @@ def get_bookings():
         limit (int): Items per page (default: 10)
         sortBy (str): Field to sort by (e.g., 'createdAt', 'startTime', 'customerName', 'totalPrice', 'status')
         sortOrder (str): 'asc' or 'desc' (default: 'desc')
-        status (str): Filter by booking status (e.g., 'Pending', 'Confirmed', 'Completed', 'Rejected', 'Cancelled')
+        status (str): Filter by booking status (e.g., 'Pending', 'Confirmed', 'Completed', 'Rejected', 'Cancelled', 'Expired')
         courtComplexId (int): Filter by a specific court complex
         date (str): Filter by a specific date (YYYY-MM-DD)
         search (str): Search by customer name, email, or phone
@@ -391,67 +388,31 @@ def get_bookings():
         limit = request.args.get('limit', 10, type=int)
         sort_by = request.args.get('sortBy', 'createdAt')
         sort_order = request.args.get('sortOrder', 'desc')
-        filter_status = request.args.get('status')
-        filter_complex_id = request.args.get('courtComplexId', type=int)
-        filter_date_str = request.args.get('date')
-        search_query = request.args.get('search')
         
-        # Bắt đầu truy vấn với joined loads
-        bookings_query = db.session.query(Booking).options(
-            db.joinedload(Booking.customer),
-            db.joinedload(Booking.court).joinedload(Court.complex)
-        ).join(Court).join(CourtComplex).filter(
+        # Bắt đầu truy vấn với joined loads (BookingHistory: gồm cả booking đã lưu trữ)
+        bookings_query = db.session.query(BookingHistory).options(
+            db.joinedload(BookingHistory.customer),
+            db.joinedload(BookingHistory.court).joinedload(Court.complex)
+        ).join(Court, BookingHistory.courtId == Court.id).join(CourtComplex).filter(
             CourtComplex.ownerId == user_id # Chỉ lấy booking của owner này
         )
 
-        # Lọc theo trạng thái
-        if filter_status and filter_status in ['Pending', 'Confirmed', 'Completed', 'Rejected', 'Cancelled']:
-            bookings_query = bookings_query.filter(Booking.status == filter_status)
-
-        # Lọc theo khu phức hợp
-        if filter_complex_id:
-            bookings_query = bookings_query.filter(CourtComplex.id == filter_complex_id)
-
-        # Lọc theo ngày
-        if filter_date_str:
-            try:
-                filter_date = datetime.strptime(filter_date_str, '%Y-%m-%d').date()
-                bookings_query = bookings_query.filter(
-                    db.func.date(Booking.startTime) == filter_date # Lọc theo phần ngày của startTime
-                )
-            except ValueError:
-                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
-
-        # Tìm kiếm
-        if search_query:
-            search_pattern = f"%{search_query}%"
-            # Cần xử lý tìm kiếm trên User.fullName, User.email an toàn
-            # và trên walkInCustomerName, walkInCustomerPhone
-            search_conditions = [
-                Booking.walkInCustomerName.ilike(search_pattern),
-                Booking.walkInCustomerPhone.ilike(search_pattern),
-                db.and_(
-                    Booking.customerId.isnot(None), # Chỉ tìm user đã đăng ký
-                    db.or_(
-                        Booking.customer.has(User.fullName.ilike(search_pattern)),
-                        Booking.customer.has(User.email.ilike(search_pattern)),
-                        # Thêm dòng này nếu User model có phoneNumber và bạn muốn tìm kiếm theo số điện thoại của user đã đăng ký
-                        # Booking.customer.has(User.phoneNumber.ilike(search_pattern)), 
-                    )
-                )
-            ]
-            bookings_query = bookings_query.filter(db.or_(*search_conditions))
+        # Lọc theo trạng thái, khu phức hợp, ngày và tìm kiếm (dùng chung với export)
+        try:
+            bookings_query = _filter_owner_bookings(bookings_query, booking=BookingHistory)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
 
 
         # Sắp xếp
         if sort_by:
             # Ánh xạ tên cột từ frontend sang các thuộc tính model
             sort_columns = {
-                'createdAt': Booking.createdAt,
-                'startTime': Booking.startTime,
-                'totalPrice': Booking.totalPrice,
-                'status': Booking.status,
-                'customerName': func.coalesce(User.fullName, Booking.walkInCustomerName), # Cần join User model để sắp xếp trên fullName
+                'createdAt': BookingHistory.createdAt,
+                'startTime': BookingHistory.startTime,
+                'totalPrice': BookingHistory.totalPrice,
+                'status': BookingHistory.status,
+                'customerName': func.coalesce(User.fullName, BookingHistory.walkInCustomerName), # Cần join User model để sắp xếp trên fullName
                 'courtName': Court.name,
                 'complexName': CourtComplex.name,
             }
@@ -460,7 +421,7 @@ def get_bookings():
             if sort_column is not None: # Kiểm tra không phải None để tránh lỗi
                 # Nếu sắp xếp theo customerName, cần đảm bảo join User model
                 if sort_by == 'customerName':
-                    bookings_query = bookings_query.outerjoin(User, Booking.customerId == User.id) # Outerjoin User
+                    bookings_query = bookings_query.outerjoin(User, BookingHistory.customerId == User.id) # Outerjoin User
                 
                 if sort_order == 'asc':
                     bookings_query = bookings_query.order_by(sort_column.asc())
@@ -468,52 +429,16 @@ def get_bookings():
                     bookings_query = bookings_query.order_by(sort_column.desc())
             else:
                 # Mặc định sắp xếp nếu sortBy không hợp lệ
-                bookings_query = bookings_query.order_by(Booking.createdAt.desc())
+                bookings_query = bookings_query.order_by(BookingHistory.createdAt.desc())
         else:
-            bookings_query = bookings_query.order_by(Booking.createdAt.desc())
+            bookings_query = bookings_query.order_by(BookingHistory.createdAt.desc())
 
 
         # Thực hiện phân trang
         paginated_bookings = bookings_query.paginate(page=page, per_page=limit, error_out=False)
         
-        bookings_data = []
-        for booking in paginated_bookings.items:
-            customer_email = ''
-            customer_phone = ''
-            customer_full_name = ''
-
-            if booking.customerId: # Booking từ người dùng đã đăng ký
-                customer = booking.customer 
-                if customer:
-                    customer_full_name = customer.fullName
-                    customer_email = customer.email
-                    customer_phone = getattr(customer, 'phoneNumber', '') # Lấy phoneNumber an toàn
-                else: # Fallback nếu customerId có nhưng user không tìm thấy
-                    customer_full_name = 'Người dùng không tồn tại'
-                    customer_email = ''
-                    customer_phone = ''
-            else: # Booking từ khách vãng lai
-                customer_full_name = booking.walkInCustomerName
-                customer_email = '' 
-                customer_phone = booking.walkInCustomerPhone
-            
-            bookings_data.append({
-                'id': booking.id,
-                'customerName': customer_full_name,
-                'customerEmail': customer_email,
-                'customerPhone': customer_phone,
-                'courtName': booking.court.name,
-                'complexName': booking.court.complex.name,
-                'startTime': booking.startTime.isoformat(),
-                'endTime': booking.endTime.isoformat(),
-                'totalPrice': float(booking.totalPrice),
-                'status': booking.status,
-                'bookingType': booking.bookingType, # Đảm bảo trả về
-                'createdAt': booking.createdAt.isoformat(),
-                # Thêm Complex address/city cho modal chi tiết
-                'complexAddress': booking.court.complex.address,
-                'complexCity': booking.court.complex.city,
-            })
+        # Khách đã đăng ký hoặc khách vãng lai (walk-in), xem serialize_owner_booking
+        bookings_data = serialize_many(serialize_owner_booking, paginated_bookings.items)
         
         return jsonify({
             'bookings': bookings_data,
@@ -530,6 +455,54 @@ def get_bookings():
 
 
 
+@owner_bp.route('/bookings/export', methods=['GET'])
+@jwt_required()
+def export_bookings():
+    """
+    Export booking của owner dạng stream (không phân trang).
+    Query Params:
+        format (str): 'csv' (mặc định) hoặc 'ndjson'
+        report (str): 'bookings' (mặc định, mỗi dòng một booking) hoặc 'revenue' (doanh thu theo ngày và khu phức hợp)
+        status, courtComplexId, date, search: giống /bookings
+    Với report=revenue, nếu không lọc theo status thì chỉ tính booking Confirmed/Completed.
+    """
+    try:
+        user_id = get_jwt_identity()
+        owner_user = User.query.get(user_id)
+        
+        if not owner_user or owner_user.role != 'Owner':
+            return jsonify({'error': 'Access denied'}), 403
+        
+        export_format = request.args.get('format', 'csv')
+        report = request.args.get('report', 'bookings')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        if report not in EXPORT_REPORTS:
+            return jsonify({'error': f"report must be one of: {', '.join(EXPORT_REPORTS)}"}), 400
+        
+        try:
+            statement = _filter_owner_bookings(bookings_export_select(user_id), booking=BookingHistory)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+        
+        if report == 'revenue':
+            if not request.args.get('status'):
+                statement = statement.where(BookingHistory.status.in_(REVENUE_STATUSES))
+            statement = revenue_export_select(statement)
+        else:
+            statement = statement.order_by(BookingHistory.startTime, BookingHistory.id)
+        
+        # Kết thúc session của request trước khi stream: export chạy trên connection riêng
+        # (của read replica nếu request được đọc từ replica)
+        engine = database_router.read_engine()
+        db.session.close()
+        return export_response(engine, statement, report, export_format)
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @owner_bp.route('/court-complexes/<int:complex_id>', methods=['GET'])
 @jwt_required()
 def get_court_complex(complex_id):
@@ -580,7 +553,9 @@ def get_court_complex(complex_id):
             'mainImage': complex.mainImage,
             'rating': float(complex.rating) if complex.rating else 0,
             'totalReviews': complex.totalReviews,
-            'status': complex.status
+            'status': complex.status,
+            'autoCompleteAfterMinutes': complex.autoCompleteAfterMinutes,
+            'pendingExpiryMinutes': complex.pendingExpiryMinutes
         }
         
         return jsonify(complex_data)
@@ -616,6 +591,16 @@ def update_court_complex(complex_id):
         complex.bankCode = data.get('bankCode', complex.bankCode)
         complex.accountNumber = data.get('accountNumber', complex.accountNumber)
         complex.accountName = data.get('accountName', complex.accountName)
+        if 'googleMapLink' in data or 'latitude' in data or 'longitude' in data:
+            apply_complex_coordinates(complex, data)
+        
+        # Quy tắc tự động chuyển trạng thái booking (null = tắt)
+        for field in ('autoCompleteAfterMinutes', 'pendingExpiryMinutes'):
+            if field in data:
+                value = data[field]
+                if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+                    return jsonify({'error': f'{field} must be a non-negative number of minutes or null'}), 400
+                setattr(complex, field, value)
         
         # Update times
         if data.get('openTime'):
@@ -668,6 +653,7 @@ def update_court_complex(complex_id):
                 )
                 db.session.add(new_amenity)
         
+        record_complex_change(complex.id)
         db.session.commit()
         
         return jsonify({'message': 'Court complex updated successfully'})
@@ -757,6 +743,7 @@ def create_court(complex_id):
             )
             db.session.add(new_rate)
         
+        record_complex_change(complex_id)
         db.session.commit()
         
         return jsonify({
@@ -814,6 +801,7 @@ def update_court(court_id):
                 )
                 db.session.add(new_rate)
         
+        record_complex_change(court.complexId)
         db.session.commit()
         
         return jsonify({'message': 'Court updated successfully'})
@@ -851,6 +839,7 @@ def delete_court(court_id):
         HourlyPriceRate.query.filter_by(courtId=court_id).delete()
         
         # Delete court
+        record_complex_change(court.complexId)
         db.session.delete(court)
         db.session.commit()
         
@@ -888,6 +877,7 @@ def approve_booking(booking_id):
             return jsonify({'error': 'Only pending bookings can be approved'}), 400
         
         booking.status = 'Confirmed'
+        record_booking_change(booking, 'Pending')
         db.session.commit()
         
         # Send status update email to customer
@@ -956,6 +946,7 @@ def reject_booking(booking_id):
         reason = data.get('reason', 'Không có lý do được cung cấp.') # Có lý do mặc định cho trường hợp không có lý do được gửi lên
         
         booking.status = 'Rejected' # <<< CẬP NHẬT TRẠNG THÁI LÀ 'Rejected'
+        record_booking_change(booking, 'Pending')
         db.session.commit()
         
         # Send status update email to customer
@@ -1004,41 +995,8 @@ def get_pending_bookings():
         if not user or user.role != 'Owner':
             return jsonify({'error': 'Access denied'}), 403
         
-        pending_bookings = db.session.query(Booking).join(Court).join(CourtComplex).filter(
-            CourtComplex.ownerId == user_id,
-            Booking.status == 'Pending'
-        ).order_by(Booking.createdAt.desc()).all()
-        
-        bookings_data = []
-        for booking in pending_bookings:
-            customer_info = {}
-            if booking.customerId:
-                customer = User.query.get(booking.customerId)
-                customer_info = {
-                    'fullName': customer.fullName,
-                    'email': customer.email,
-                    'phone': customer.phoneNumber if hasattr(customer, 'phoneNumber') else ''
-                }
-            else:
-                customer_info = {
-                    'fullName': booking.walkInCustomerName,
-                    'email': '',
-                    'phone': booking.walkInCustomerPhone
-                }
-            
-            bookings_data.append({
-                'id': booking.id,
-                'customer': customer_info,
-                'court': {
-                    'name': booking.court.name,
-                    'complex': booking.court.complex.name
-                },
-                'startTime': booking.startTime.isoformat(),
-                'endTime': booking.endTime.isoformat(),
-                'totalPrice': float(booking.totalPrice),
-                'bookingType': booking.bookingType,
-                'createdAt': booking.createdAt.isoformat()
-            })
+        # Một query kèm sân, complex và khách hàng (không query User theo từng booking)
+        bookings_data = [serialize_pending_booking(row) for row in OwnerWorkspaceService.pending_bookings(db.session, user_id)]
         
         return jsonify({'bookings': bookings_data})
         
@@ -1089,77 +1047,159 @@ def get_court_availability(complex_id):
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
             
         if not end_date:
-            end_date = start_date + timedelta(days=7)
+            end_date = start_date + timedelta(days=DEFAULT_AVAILABILITY_DAYS)
         else:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        if (end_date - start_date).days > MAX_AVAILABILITY_DAYS:
+            return jsonify({'error': f'Date range must not exceed {MAX_AVAILABILITY_DAYS} days'}), 400
+        
+        # format=compact: mỗi sân/ngày là run-length (encoding=rle) hoặc bitset base64 (encoding=bitset)
+        encoding, error = AvailabilityService.calendar_encoding(request.args)
+        if error:
+            return jsonify({'error': error}), 400
         
         # Get courts
         courts = Court.query.filter_by(complexId=complex_id, status='Active').all()
         
         # Get bookings in date range
-        bookings = Booking.query.join(Court).filter(
+        # Chỉ lấy các cột cần để so khoảng thời gian, không dựng ORM object
+        bookings = db.session.query(Booking.courtId, Booking.startTime, Booking.endTime).join(Court).filter(
             Court.complexId == complex_id,
-            Booking.startTime >= datetime.combine(start_date, datetime.min.time()),
-            Booking.endTime <= datetime.combine(end_date, datetime.max.time()),
+            starts_on_days(start_date, end_date),
             Booking.status.in_(['Pending', 'Confirmed'])
         ).all()
+        bookings_by_court_day = {}
+        for booking in bookings:
+            bookings_by_court_day.setdefault((booking.courtId, booking.startTime.date()), []).append(booking)
+        
+        # Generate time slots (every 30 minutes from open to close), giống nhau cho mọi ngày
+        open_time = complex.openTime or datetime.strptime('06:00', '%H:%M').time()
+        close_time = complex.closeTime or datetime.strptime('22:00', '%H:%M').time()
+        slots = AvailabilityService.calendar_slots(open_time, close_time)
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        # Lịch đóng sân được tính như booking
+        blackouts_by_court_day = BlackoutService.by_court_day(BlackoutService.court_blackouts(
+            db.session, {court.id: court.complexId for court in courts},
+            datetime.combine(start_date, datetime.min.time()),
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        ), days)
+        
+        def flags_for(court, day):
+            key = (court.id, day)
+            return AvailabilityService.calendar_booked_flags(
+                day, slots, bookings_by_court_day.get(key, []) + blackouts_by_court_day.get(key, [])
+            )
         
-        # Build availability data
-        availability_data = {}
-        current_date = start_date
+        return jsonify(AvailabilityService.build_calendar(complex, courts, days, slots, flags_for, encoding))
         
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            availability_data[date_str] = {}
-            
-            for court in courts:
-                court_bookings = [b for b in bookings if b.courtId == court.id and b.startTime.date() == current_date]
-                
-                # Generate time slots (every 30 minutes from open to close)
-                open_time = complex.openTime or datetime.strptime('06:00', '%H:%M').time()
-                close_time = complex.closeTime or datetime.strptime('22:00', '%H:%M').time()
-                
-                slots = []
-                current_time = datetime.combine(current_date, open_time)
-                end_time = datetime.combine(current_date, close_time)
-                
-                while current_time < end_time:
-                    slot_end = current_time + timedelta(minutes=30)
-                    
-                    # Check if this slot is booked
-                    is_booked = any(
-                        booking.startTime <= current_time < booking.endTime or
-                        booking.startTime < slot_end <= booking.endTime or
-                        (current_time <= booking.startTime and slot_end >= booking.endTime)
-                        for booking in court_bookings
-                    )
-                    
-                    slots.append({
-                        'time': current_time.strftime('%H:%M'),
-                        'available': not is_booked
-                    })
-                    
-                    current_time = slot_end
-                
-                availability_data[date_str][court.id] = {
-                    'courtName': court.name,
-                    'slots': slots
-                }
-            
-            current_date += timedelta(days=1)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@owner_bp.route('/court-complexes/<int:complex_id>/blackouts', methods=['GET'])
+@jwt_required()
+def get_blackouts(complex_id):
+    """
+    Lịch đóng sân của complex (cả complex và từng sân).
+    Mặc định chỉ trả về lịch còn hiệu lực; includePast=true để lấy cả lịch đã qua.
+    """
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role != 'Owner':
+            return jsonify({'error': 'Access denied'}), 403
+        
+        complex = CourtComplex.query.filter_by(id=complex_id, ownerId=user_id).first()
+        if not complex:
+            return jsonify({'error': 'Court complex not found'}), 404
+        
+        blackouts_query = CourtBlackout.query.filter_by(complexId=complex_id)
+        if request.args.get('includePast', 'false').lower() != 'true':
+            now = datetime.now()
+            blackouts_query = blackouts_query.filter(db.or_(
+                db.and_(CourtBlackout.recurrence.is_(None), CourtBlackout.endTime > now),
+                db.and_(
+                    CourtBlackout.recurrence.isnot(None),
+                    db.or_(CourtBlackout.recurrenceUntil.is_(None), CourtBlackout.recurrenceUntil >= now.date())
+                )
+            ))
+        blackouts = blackouts_query.order_by(CourtBlackout.startTime).all()
         
+        court_names = dict(db.session.query(Court.id, Court.name).filter(Court.complexId == complex_id).all())
         return jsonify({
-            'complex': {
-                'id': complex.id,
-                'name': complex.name,
-                'openTime': complex.openTime.strftime('%H:%M') if complex.openTime else '06:00',
-                'closeTime': complex.closeTime.strftime('%H:%M') if complex.closeTime else '22:00'
-            },
-            'courts': [{'id': c.id, 'name': c.name} for c in courts],
-            'availability': availability_data
+            'blackouts': [BlackoutService.serialize(blackout, court_names) for blackout in blackouts]
         })
         
     except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@owner_bp.route('/court-complexes/<int:complex_id>/blackouts', methods=['POST'])
+@jwt_required()
+def create_blackout(complex_id):
+    """
+    Tạo lịch đóng sân (một sân hoặc cả complex, có thể lặp daily/weekly).
+    Các booking Pending/Confirmed bị trùng được hủy trong cùng transaction và khách được báo qua email.
+    """
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role != 'Owner':
+            return jsonify({'error': 'Access denied'}), 403
+        
+        complex = CourtComplex.query.filter_by(id=complex_id, ownerId=user_id).first()
+        if not complex:
+            return jsonify({'error': 'Court complex not found'}), 404
+        
+        blackout = BlackoutService.parse_request(complex, request.get_json() or {})
+        cancelled = BlackoutService.create(user_id, blackout)
+        
+        court_names = dict(db.session.query(Court.id, Court.name).filter(Court.complexId == complex_id).all())
+        return jsonify({
+            'message': 'Blackout created successfully',
+            'blackout': BlackoutService.serialize(blackout, court_names),
+            'cancelledBookings': cancelled or {'action': 'cancel', 'updated': 0, 'skipped': 0, 'emailsSent': 0, 'results': []}
+        }), 201
+        
+    except (BlackoutError, BulkActionError) as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@owner_bp.route('/blackouts/<int:blackout_id>', methods=['DELETE'])
+@jwt_required()
+def delete_blackout(blackout_id):
+    """Xóa lịch đóng sân (booking đã bị hủy không được khôi phục)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role != 'Owner':
+            return jsonify({'error': 'Access denied'}), 403
+        
+        blackout = CourtBlackout.query.join(CourtComplex, CourtBlackout.complexId == CourtComplex.id).filter(
+            CourtBlackout.id == blackout_id,
+            CourtComplex.ownerId == user_id
+        ).first()
+        if not blackout:
+            return jsonify({'error': 'Blackout not found'}), 404
+        
+        BlackoutService.delete(blackout)
+        return jsonify({'message': 'Blackout deleted successfully'})
+        
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 @owner_bp.route('/bookings/<int:booking_id>/cancel', methods=['PUT']) # HOẶC DELETE
@@ -1191,8 +1231,10 @@ def cancel_booking(booking_id):
         data = request.get_json() # Có thể có lý do hủy
         reason = data.get('reason', 'Đơn đặt sân đã bị hủy bởi chủ sân.')
 
+        previous_status = booking.status
         booking.status = 'Cancelled'
         # booking.cancellationReason = reason # Nếu bạn có trường này trong model Booking
+        record_booking_change(booking, previous_status)
         db.session.commit()
 
         # Gửi email thông báo hủy cho khách hàng
@@ -1258,12 +1300,60 @@ def mark_booking_completed(booking_id):
 
         booking.status = 'Completed'
         # Nếu có trường actual_end_time = datetime.now() thì có thể cập nhật
+        record_booking_change(booking, 'Confirmed')
         db.session.commit()
 
         # Có thể gửi email thông báo hoặc log sự kiện nếu cần
 
         return jsonify({'message': 'Booking marked as completed successfully'}), 200
 
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@owner_bp.route('/bookings/bulk/<action>', methods=['PUT'])
+@jwt_required()
+def bulk_update_bookings(action):
+    """
+    Approve / reject / cancel / complete nhiều booking trong một transaction.
+    Body JSON:
+        bookingIds (list[int]): các booking cần cập nhật, HOẶC
+        filter (dict): status, courtComplexId, date, search (giống /bookings)
+        reason (str, tùy chọn): lý do từ chối / hủy, gửi trong email cho khách
+    Booking không ở trạng thái phù hợp được bỏ qua và trả về trong results.
+    """
+    try:
+        user_id = get_jwt_identity()
+        owner_user = User.query.get(user_id)
+
+        if not owner_user or owner_user.role != 'Owner':
+            return jsonify({'error': 'Access denied'}), 403
+
+        if action not in BULK_ACTIONS:
+            return jsonify({'error': f"Invalid action. Use one of: {', '.join(BULK_ACTIONS)}"}), 400
+
+        data = request.get_json() or {}
+        statement = bulk_bookings_select(user_id)
+        booking_ids = None
+        if 'bookingIds' in data:
+            booking_ids = parse_booking_ids(data['bookingIds'])
+        elif isinstance(data.get('filter'), dict):
+            try:
+                statement = _filter_owner_bookings(statement, data['filter'])
+            except ValueError:
+                return jsonify({'error': 'Invalid filter: date must be YYYY-MM-DD and courtComplexId an integer'}), 400
+        else:
+            return jsonify({'error': 'Provide bookingIds or filter'}), 400
+
+        result = BookingBulkService.apply(action, statement, booking_ids, data.get('reason'))
+        return jsonify(result), 200
+
+    except BulkActionError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.status_code
     except Exception as e:
         db.session.rollback()
         import traceback
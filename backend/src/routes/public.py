@@ -1,46 +1,104 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from src.models.database import db, CourtComplex, Court, HourlyPriceRate, Booking, CourtComplexImage, Amenity, CourtComplexAmenity, Review
+from src.services.availability_service import AvailabilityService, availability_channel
+from src.services.blackout_service import BlackoutService
+from src.services.booking_ranges import starts_on_days
+from src.services.complex_documents import ComplexDocumentStore
+from src.services.event_hub import event_hub, sse_response
+from src.services.facet_service import complex_facets, bitmap_from_ids, ids_from_bitmap, popcount
+from src.services.occupancy_store import occupancy_store, cells_mask, is_cell_aligned
+from src.services.reference_data import reference_data
+from src.services.response_cache import cached_response, complex_tags
+from src.services.response_versioning import conditional_get, complex_etag, complex_grid_etag, complex_listing_etag
+from src.services.serializers import serialize_complex_summary
+from src.services.geo_service import complex_geo_index, valid_coordinates
 from datetime import datetime, timedelta
 from sqlalchemy import func, and_, or_
 
 public_bp = Blueprint('public', __name__, url_prefix='/public')
 
+# Giới hạn cho tìm kiếm "gần tôi"
+MAX_SEARCH_RADIUS_KM = 100
+MAX_NEAREST_RESULTS = 100
+
+# TTL của response cache (giây)
+LISTING_CACHE_TTL = 60
+GRID_CACHE_TTL = 60
+
+
+def _current_minute(**kwargs):
+    # Lưới mặc định là hôm nay và isPast đổi theo thời gian: key đổi mỗi phút
+    return datetime.now().strftime('%Y-%m-%d %H:%M')
+
 @public_bp.route('/court-complexes', methods=['GET'])
+@conditional_get(complex_listing_etag)
+@cached_response(LISTING_CACHE_TTL, tags=lambda **kwargs: ['complex-listing'])
 def get_court_complexes():
     """Get all active court complexes for public viewing"""
     try:
         # Get query parameters
-        city = request.args.get('city')
-        sport_type = request.args.get('sportType')
+        # city, sportType, amenity, priceBand có thể truyền nhiều lần (?city=A&city=B)
+        filters = {
+            'city': request.args.getlist('city'),
+            'sportType': request.args.getlist('sportType'),
+            'amenity': request.args.getlist('amenity'),
+            'priceBand': request.args.getlist('priceBand')
+        }
         search = request.args.get('search')
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 12))
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        radius = request.args.get('radius', type=float)
         
-        # Build query
-        query = CourtComplex.query.filter_by(status='Active')
+        near_me = lat is not None or lng is not None
+        if near_me and not valid_coordinates(lat, lng):
+            return jsonify({'error': 'Invalid lat/lng'}), 400
+        if radius is not None and not 0 < radius <= MAX_SEARCH_RADIUS_KM:
+            return jsonify({'error': f'radius must be between 0 and {MAX_SEARCH_RADIUS_KM} km'}), 400
         
-        if city:
-            query = query.filter(CourtComplex.city == city)
-        
-        if sport_type:
-            query = query.filter(CourtComplex.sportType == sport_type)
+        # Tập ứng viên (bitmap) từ tìm kiếm theo từ khóa và theo vị trí
+        candidates = None
         
         if search:
             search_term = f"%{search}%"
-            query = query.filter(
+            matched = db.session.query(CourtComplex.id).filter(
+                CourtComplex.status == 'Active',
                 or_(
                     CourtComplex.name.ilike(search_term),
                     CourtComplex.address.ilike(search_term),
                     CourtComplex.description.ilike(search_term)
                 )
             )
+            candidates = bitmap_from_ids(row.id for row in matched)
+        
+        distances = {}
+        if near_me:
+            if radius is not None:
+                nearby = complex_geo_index.within(lat, lng, radius)
+            else:
+                nearby = complex_geo_index.nearest(lat, lng, MAX_NEAREST_RESULTS)
+            distances = dict(nearby)
+            nearby_bitmap = bitmap_from_ids(distances)
+            candidates = nearby_bitmap if candidates is None else candidates & nearby_bitmap
         
-        # Get total count
-        total = query.count()
+        # Lọc theo facet bằng bitmap, đồng thời đếm facet
+        result, facets = complex_facets.search(filters, candidates)
         
-        # Apply pagination
         offset = (page - 1) * limit
-        complexes = query.offset(offset).limit(limit).all()
+        if near_me:
+            matched_ids = sorted(ids_from_bitmap(result), key=distances.get)
+            total = len(matched_ids)
+            page_ids = matched_ids[offset:offset + limit]
+        else:
+            total = popcount(result)
+            page_ids = ids_from_bitmap(result, offset, limit)
+        
+        complexes_by_id = {
+            complex.id: complex
+            for complex in CourtComplex.query.filter(CourtComplex.id.in_(page_ids), CourtComplex.status == 'Active')
+        }
+        complexes = [complexes_by_id[complex_id] for complex_id in page_ids if complex_id in complexes_by_id]
         
         complexes_data = []
         for complex in complexes:
@@ -64,20 +122,8 @@ def get_court_complexes():
             ).all()
             amenity_names = [a.name for a in amenities]
             
-            complexes_data.append({
-                'id': complex.id,
-                'name': complex.name,
-                'address': complex.address,
-                'city': complex.city,
-                'sportType': complex.sportType,
-                'description': complex.description,
-                'phoneNumber': complex.phoneNumber,
-                'googleMapLink': complex.googleMapLink,
-                'openTime': complex.openTime.strftime('%H:%M') if complex.openTime else '06:00',
-                'closeTime': complex.closeTime.strftime('%H:%M') if complex.closeTime else '22:00',
-                'mainImage': complex.mainImage,
-                'rating': float(complex.rating) if complex.rating else 0,
-                'totalReviews': complex.totalReviews,
+            complex_data = serialize_complex_summary(complex)
+            complex_data.update({
                 'courtCount': court_count,
                 'priceRange': {
                     'min': float(min_price),
@@ -85,9 +131,13 @@ def get_court_complexes():
                 },
                 'amenities': amenity_names
             })
+            if near_me:
+                complex_data['distanceKm'] = round(distances[complex.id], 2)
+            complexes_data.append(complex_data)
         
         return jsonify({
             'courtComplexes': complexes_data,
+            'facets': facets,
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -100,93 +150,18 @@ def get_court_complexes():
         return jsonify({'error': str(e)}), 500
 
 @public_bp.route('court-complexes/<int:complex_id>', methods=['GET'])
+@conditional_get(complex_etag)
 def get_court_complex_details(complex_id):
     """Get details of a specific court complex by ID"""
     try:
-        # Load complex and its relationships efficiently
-        complex = db.session.query(CourtComplex).options(
-            db.joinedload(CourtComplex.images), # Load tất cả ảnh
-            db.joinedload(CourtComplex.amenities_rel).joinedload(CourtComplexAmenity.amenity), # Load tiện ích và thông tin chi tiết của tiện ích
-            db.joinedload(CourtComplex.courts), # Load sân
-            db.joinedload(CourtComplex.reviews) # Load reviews (để hiển thị sau)
-        ).filter(CourtComplex.id == complex_id).first()
-
-        if not complex or complex.status != 'Active':
+        # Document dựng sẵn khi complex thay đổi (bảng complex_documents), trả nguyên văn
+        body, stored = ComplexDocumentStore.document_json(complex_id, 'public')
+        if body is None:
             return jsonify({'error': 'Court complex not found or inactive'}), 404
 
-        # Lấy tất cả URLs của ảnh
-        all_image_urls = [img.imageUrl for img in complex.images] # Dùng complex.images đã được joinedload
-
-        # Tìm mainImageIndex (nếu có)
-        main_image_index = 0
-        if complex.mainImage and complex.mainImage in all_image_urls:
-            main_image_index = all_image_urls.index(complex.mainImage)
-
-        # Lấy amenities
-        amenities_data = [{'id': cca.amenity.id, 'name': cca.amenity.name, 'icon': cca.amenity.icon} for cca in complex.amenities_rel]
-
-        # Lấy courts
-        courts_data = []
-        for court in complex.courts:
-            courts_data.append({
-                'id': court.id,
-                'name': court.name,
-                'status': court.status,
-                # Không cần load pricing ở đây cho trang detail chung
-            })
-
-        # Lấy reviews
-        reviews_data = []
-        for review in complex.reviews:
-            reviews_data.append({
-                'id': review.id,
-                'rating': review.rating,
-                'comment': review.comment,
-                'customerName': review.customer.fullName if review.customer else 'Khách ẩn danh',
-                'date': review.createdAt.isoformat() # Dùng createdAt để làm ngày đánh giá
-            })
-
-        # Tính min/max price range (có thể lấy từ HourlyPriceRate nếu bạn có logic chung)
-        # Hoặc bạn có thể thêm logic này vào Python để tính toán
-        min_price = None
-        max_price = None
-        
-        # Nếu bạn muốn tính min/max price dựa trên các HourlyPriceRate, bạn sẽ cần một truy vấn riêng
-        # vì HourlyPriceRate không được load cùng với Complex ở đây để tránh quá tải.
-        # Ví dụ:
-        # if complex.courts:
-        #     court_ids = [c.id for c in complex.courts]
-        #     min_max_prices = db.session.query(
-        #         func.min(HourlyPriceRate.price),
-        #         func.max(HourlyPriceRate.price)
-        #     ).filter(HourlyPriceRate.courtId.in_(court_ids)).first()
-        #     min_price = float(min_max_prices[0]) if min_max_prices[0] else None
-        #     max_price = float(min_max_prices[1]) if min_max_prices[1] else None
-
-        complex_details = {
-            'id': complex.id,
-            'name': complex.name,
-            'address': complex.address,
-            'city': complex.city,
-            'description': complex.description,
-            'phoneNumber': complex.phoneNumber,
-            'sportType': complex.sportType,
-            'googleMapLink': complex.googleMapLink,
-            'openTime': complex.openTime.strftime('%H:%M') if complex.openTime else None,
-            'closeTime': complex.closeTime.strftime('%H:%M') if complex.closeTime else None,
-            'amenities': amenities_data, # Trả về full objects {id, name, icon}
-            'images': all_image_urls, # <<< TRẢ VỀ TẤT CẢ URL HÌNH ẢNH
-            'mainImageIndex': main_image_index,
-            'mainImage': complex.mainImage,
-            'rating': float(complex.rating) if complex.rating else 0,
-            'reviewCount': complex.totalReviews, # reviewCount là totalReviews
-            'status': complex.status,
-            'courts': courts_data, # Trả về các sân
-            'reviews': reviews_data, # Trả về các reviews
-            'priceRange': {'min': min_price, 'max': max_price} # Có thể tính toán hoặc trả về null nếu không có
-        }
-        
-        return jsonify(complex_details)
+        response = Response(body, mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT' if stored else 'MISS'
+        return response
 
     except Exception as e:
         import traceback
@@ -194,6 +169,7 @@ def get_court_complex_details(complex_id):
         return jsonify({'error': str(e)}), 500
 
 @public_bp.route('/court-complexes/<int:complex_id>/courts/<int:court_id>/availability', methods=['GET'])
+@conditional_get(complex_etag)
 def get_court_availability(complex_id, court_id):
     """Get court availability for a specific date range"""
     try:
@@ -238,11 +214,17 @@ def get_court_availability(complex_id, court_id):
         # Get existing bookings
         bookings = Booking.query.filter(
             Booking.courtId == court_id,
-            Booking.startTime >= datetime.combine(start_date, datetime.min.time()),
-            Booking.endTime <= datetime.combine(end_date, datetime.max.time()),
+            starts_on_days(start_date, end_date),
             Booking.status.in_(['Pending', 'Confirmed'])
         ).all()
         
+        # Get blackouts (lịch đóng sân) in date range
+        blackouts = BlackoutService.court_blackouts(
+            db.session, {court.id: court.complexId},
+            datetime.combine(start_date, datetime.min.time()),
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        )[court.id]
+        
         # Build availability data
         availability_data = []
         current_date = start_date
@@ -264,11 +246,24 @@ def get_court_availability(complex_id, court_id):
                 if booking.startTime.date() == current_date
             ]
             
+            # Get blackouts overlapping this day
+            day_start = datetime.combine(current_date, datetime.min.time())
+            day_blackouts = [
+                {
+                    'startTime': blackout.startTime.isoformat(),
+                    'endTime': blackout.endTime.isoformat(),
+                    'reason': blackout.reason
+                }
+                for blackout in blackouts
+                if blackout.startTime < day_start + timedelta(days=1) and blackout.endTime > day_start
+            ]
+            
             availability_data.append({
                 'date': current_date.isoformat(),
                 'dayOfWeek': day_name,
                 'pricing': day_pricing,
-                'bookings': day_bookings
+                'bookings': day_bookings,
+                'blackouts': day_blackouts
             })
             
             current_date += timedelta(days=1)
@@ -289,9 +284,7 @@ def get_court_availability(complex_id, court_id):
 def get_cities():
     """Get list of cities with court complexes"""
     try:
-        cities = db.session.query(CourtComplex.city).filter_by(status='Active').distinct().all()
-        city_list = [city[0] for city in cities]
-        return jsonify({'cities': sorted(city_list)})
+        return reference_data.response('cities')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -299,14 +292,13 @@ def get_cities():
 def get_sport_types():
     """Get list of sport types"""
     try:
-        sport_types = db.session.query(CourtComplex.sportType).filter_by(status='Active').distinct().all()
-        sport_type_list = [sport[0] for sport in sport_types]
-        return jsonify({'sportTypes': sorted(sport_type_list)})
+        return reference_data.response('sport-types')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @public_bp.route('/court-complexes/<int:complex_id>/availability', methods=['GET'])
+@conditional_get(complex_etag)
 def get_public_availability(complex_id):
     """Get availability calendar for a court complex (public access)"""
     try:
@@ -330,76 +322,64 @@ def get_public_availability(complex_id):
         if not complex:
             return jsonify({'error': 'Court complex not found'}), 404
         
+        # format=compact: mỗi sân/ngày là run-length (encoding=rle) hoặc bitset base64 (encoding=bitset)
+        encoding, error = AvailabilityService.calendar_encoding(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        
         # Get courts
         courts = Court.query.filter_by(complexId=complex_id, status='Active').all()
         
-        # Get bookings in date range
-        bookings = Booking.query.join(Court).filter(
-            Court.complexId == complex_id,
-            Booking.startTime >= datetime.combine(start_date, datetime.min.time()),
-            Booking.endTime <= datetime.combine(end_date, datetime.max.time()),
-            Booking.status.in_(['Pending', 'Confirmed'])
-        ).all()
-        
-        # Build availability data
-        availability_data = {}
-        current_date = start_date
-        
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            availability_data[date_str] = {}
+        # Generate time slots (every 30 minutes from open to close), giống nhau cho mọi ngày
+        open_time = complex.openTime or datetime.strptime('06:00', '%H:%M').time()
+        close_time = complex.closeTime or datetime.strptime('22:00', '%H:%M').time()
+        slots = AvailabilityService.calendar_slots(open_time, close_time)
+        
+        # Dùng bitmap chiếm chỗ dùng chung (booking + lịch đóng sân) khi các slot nằm đúng biên ô 5 phút
+        # (kết quả giống hệt so sánh thời gian)
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        use_bitmaps = occupancy_store.enabled and is_cell_aligned(open_time) and bool(days)
+        if use_bitmaps:
+            occupancy = occupancy_store.get_many([court.id for court in courts], days)
+            # Mask của từng slot chỉ phụ thuộc vào giờ trong ngày
+            midnight = datetime.combine(start_date, datetime.min.time())
+            slot_masks = [cells_mask(midnight + start, midnight + end, start_date) for _, start, end in slots]
             
-            for court in courts:
-                court_bookings = [b for b in bookings if b.courtId == court.id and b.startTime.date() == current_date]
-                
-                # Generate time slots (every 30 minutes from open to close)
-                open_time = complex.openTime or datetime.strptime('06:00', '%H:%M').time()
-                close_time = complex.closeTime or datetime.strptime('22:00', '%H:%M').time()
-                
-                slots = []
-                current_time = datetime.combine(current_date, open_time)
-                end_time = datetime.combine(current_date, close_time)
-                
-                while current_time < end_time:
-                    slot_end = current_time + timedelta(minutes=30)
-                    
-                    # Check if this slot is booked
-                    is_booked = any(
-                        booking.startTime <= current_time < booking.endTime or
-                        booking.startTime < slot_end <= booking.endTime or
-                        (current_time <= booking.startTime and slot_end >= booking.endTime)
-                        for booking in court_bookings
-                    )
-                    
-                    slots.append({
-                        'time': current_time.strftime('%H:%M'),
-                        'available': not is_booked
-                    })
-                    
-                    current_time = slot_end
-                
-                availability_data[date_str][court.id] = {
-                    'courtName': court.name,
-                    'slots': slots
-                }
+            def flags_for(court, day):
+                court_bitmap = occupancy[(court.id, day)]
+                return [bool(court_bitmap & mask) for mask in slot_masks]
+        else:
+            # Get bookings in date range
+            # Chỉ lấy các cột cần để so khoảng thời gian, không dựng ORM object
+            bookings = db.session.query(Booking.courtId, Booking.startTime, Booking.endTime).join(Court).filter(
+                Court.complexId == complex_id,
+                starts_on_days(start_date, end_date),
+                Booking.status.in_(['Pending', 'Confirmed'])
+            ).all()
+            bookings_by_court_day = {}
+            for booking in bookings:
+                bookings_by_court_day.setdefault((booking.courtId, booking.startTime.date()), []).append(booking)
+            # Lịch đóng sân được tính như booking
+            blackouts_by_court_day = BlackoutService.by_court_day(BlackoutService.court_blackouts(
+                db.session, {court.id: court.complexId for court in courts},
+                datetime.combine(start_date, datetime.min.time()),
+                datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+            ), days)
             
-            current_date += timedelta(days=1)
+            def flags_for(court, day):
+                key = (court.id, day)
+                return AvailabilityService.calendar_booked_flags(
+                    day, slots, bookings_by_court_day.get(key, []) + blackouts_by_court_day.get(key, [])
+                )
         
-        return jsonify({
-            'complex': {
-                'id': complex.id,
-                'name': complex.name,
-                'openTime': complex.openTime.strftime('%H:%M') if complex.openTime else '06:00',
-                'closeTime': complex.closeTime.strftime('%H:%M') if complex.closeTime else '22:00'
-            },
-            'courts': [{'id': c.id, 'name': c.name} for c in courts],
-            'availability': availability_data
-        })
+        return jsonify(AvailabilityService.build_calendar(complex, courts, days, slots, flags_for, encoding))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @public_bp.route('/court-complexes/<int:complex_id>/availability-grid', methods=['GET'])
+@conditional_get(complex_grid_etag)
+@cached_response(GRID_CACHE_TTL, tags=complex_tags, vary=_current_minute)
 def get_availability_grid(complex_id):
     """Get availability in grid format (courts x time slots)"""
     try:
@@ -417,29 +397,27 @@ def get_availability_grid(complex_id):
         courts = Court.query.filter_by(complexId=complex_id, status='Active').all()
         
         # Get bookings for the selected date
-        bookings = Booking.query.join(Court).filter(
+        bookings = Booking.query.options(db.joinedload(Booking.customer)).join(Court).filter(
             Court.complexId == complex_id,
-            Booking.startTime >= datetime.combine(selected_date, datetime.min.time()),
-            Booking.endTime <= datetime.combine(selected_date, datetime.max.time()),
+            starts_on_days(selected_date),
             Booking.status.in_(['Pending', 'Confirmed'])
         ).all()
         
         # Generate time slots (every 1 hour from open to close)
-        open_time = complex.openTime or datetime.strptime('06:00', '%H:%M').time()
-        close_time = complex.closeTime or datetime.strptime('22:00', '%H:%M').time()
-        
-        time_slots = []
-        current_time = datetime.combine(selected_date, open_time)
-        end_time = datetime.combine(selected_date, close_time)
+        slot_datetimes = AvailabilityService.grid_time_slots(selected_date, complex.openTime, complex.closeTime)
+        time_slots = [slot.strftime('%H:%M') for slot in slot_datetimes]
         
-        while current_time < end_time:
-            time_slots.append(current_time.strftime('%H:%M'))
-            current_time += timedelta(hours=1)
+        # Lịch đóng sân trong ngày
+        day_start = datetime.combine(selected_date, datetime.min.time())
+        blackouts = BlackoutService.court_blackouts(
+            db.session, {court.id: court.complexId for court in courts}, day_start, day_start + timedelta(days=1)
+        )
         
         # Build grid data
+        now = datetime.now()
         grid_data = []
         for court in courts:
-            court_bookings = [b for b in bookings if b.courtId == court.id]
+            court_bookings = [AvailabilityService.grid_booking_from_model(b) for b in bookings if b.courtId == court.id]
             
             court_row = {
                 'courtId': court.id,
@@ -447,40 +425,8 @@ def get_availability_grid(complex_id):
                 'slots': {}
             }
             
-            for time_slot in time_slots:
-                slot_datetime = datetime.combine(selected_date, datetime.strptime(time_slot, '%H:%M').time())
-                slot_end = slot_datetime + timedelta(hours=1)
-                
-                # Check if this slot is booked
-                is_booked = any(
-                    booking.startTime <= slot_datetime < booking.endTime or
-                    booking.startTime < slot_end <= booking.endTime or
-                    (slot_datetime <= booking.startTime and slot_end >= booking.endTime)
-                    for booking in court_bookings
-                )
-                
-                # Check if this slot is in the past
-                now = datetime.now()
-                is_past = slot_datetime < now
-                
-                court_row['slots'][time_slot] = {
-                    'available': not is_booked and not is_past,
-                    'booking': None,
-                    'isPast': is_past
-                }
-                
-                # Add booking info if slot is booked
-                if is_booked:
-                    booking = next((b for b in court_bookings 
-                                  if b.startTime <= slot_datetime < b.endTime), None)
-                    if booking:
-                        court_row['slots'][time_slot]['booking'] = {
-                            'id': booking.id,
-                            'customerName': booking.customer.fullName if booking.customer else booking.walkInCustomerName,
-                            'startTime': booking.startTime.strftime('%H:%M'),
-                            'endTime': booking.endTime.strftime('%H:%M'),
-                            'status': booking.status
-                        }
+            for time_slot, slot_datetime in zip(time_slots, slot_datetimes):
+                court_row['slots'][time_slot] = AvailabilityService.grid_slot_state(slot_datetime, court_bookings, now, blackouts[court.id])
             
             grid_data.append(court_row)
         
@@ -497,4 +443,27 @@ def get_availability_grid(complex_id):
         })
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@public_bp.route('/court-complexes/<int:complex_id>/availability-grid/stream', methods=['GET'])
+def stream_availability_grid(complex_id):
+    """
+    SSE stream các thay đổi của lưới availability cho một ngày.
+    Mỗi event 'slots' chỉ chứa các ô bị ảnh hưởng, cùng định dạng với /availability-grid.
+    """
+    try:
+        date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+        try:
+            selected_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+
+        complex_exists = db.session.query(CourtComplex.id).filter_by(id=complex_id, status='Active').first()
+        if not complex_exists:
+            return jsonify({'error': 'Court complex not found'}), 404
+
+        subscription = event_hub.subscribe(availability_channel(complex_id, selected_date))
+        return sse_response(subscription)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -3,6 +3,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.database import db, User, CourtComplex, Review, Booking, Court
 from datetime import datetime
 from decimal import Decimal
+from src.services.response_versioning import conditional_get, complex_etag
+from src.services.serializers import serialize_many, serialize_review
+from src.services.signals import record_complex_change
 
 review_bp = Blueprint('review', __name__)
 
@@ -68,6 +71,7 @@ def create_review():
         complex.rating = avg_rating
         complex.totalReviews = total_reviews
         
+        record_complex_change(complex.id)
         db.session.commit()
         
         return jsonify({
@@ -85,6 +89,7 @@ def create_review():
         return jsonify({'error': str(e)}), 500
 
 @review_bp.route('/complex/<int:complex_id>', methods=['GET'])
+@conditional_get(complex_etag)
 def get_complex_reviews(complex_id):
     try:
         # Lấy query parameters
@@ -104,18 +109,7 @@ def get_complex_reviews(complex_id):
             error_out=False
         )
         
-        reviews_data = []
-        for review in reviews_pagination.items:
-            reviews_data.append({
-                'id': review.id,
-                'customer': {
-                    'fullName': review.customer.fullName if review.customer else None,
-                    'image': review.customer.image if review.customer else None
-                },
-                'rating': float(review.rating),
-                'comment': review.comment,
-                'createdAt': review.createdAt.isoformat() if review.createdAt else None
-            })
+        reviews_data = serialize_many(serialize_review, reviews_pagination.items)
         
         # Thống kê rating
         rating_stats = {}
@@ -173,6 +167,7 @@ def update_review(review_id):
         complex = review.complex
         avg_rating = db.session.query(db.func.avg(Review.rating)).filter_by(complexId=complex.id).scalar()
         complex.rating = avg_rating
+        record_complex_change(complex.id)
         db.session.commit()
         
         return jsonify({'message': 'Review updated successfully'}), 200
@@ -207,6 +202,7 @@ def delete_review(review_id):
         complex.rating = avg_rating if avg_rating else 0
         complex.totalReviews = total_reviews
         
+        record_complex_change(complex.id)
         db.session.commit()
         
         return jsonify({'message': 'Review deleted successfully'}), 200
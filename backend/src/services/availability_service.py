@@ -0,0 +1,280 @@
+import base64
+from collections import namedtuple
+from datetime import date, datetime, timedelta, time
+import traceback
+
+from sqlalchemy import select, func
+
+from src.models.database import db, Booking, CourtComplex, User
+from src.services.blackout_service import BlackoutService
+from src.services.booking_ranges import starts_on_days
+from src.services.event_hub import event_hub
+from src.services.signals import booking_changed
+
+ACTIVE_BOOKING_STATUSES = ('Pending', 'Confirmed')
+DEFAULT_OPEN_TIME = time(6, 0)
+DEFAULT_CLOSE_TIME = time(22, 0)
+GRID_SLOT = timedelta(hours=1)
+CALENDAR_SLOT = timedelta(minutes=30)
+# Định dạng rút gọn của lịch availability (?format=compact&encoding=...)
+COMPACT_ENCODINGS = ('rle', 'bitset')
+
+# Booking tối giản dùng để dựng ô trên lưới availability (từ ORM object hoặc Core row)
+GridBooking = namedtuple('GridBooking', ['id', 'startTime', 'endTime', 'status', 'customerName'])
+
+
+def availability_channel(complex_id, day):
+    """Channel pub/sub của lưới availability theo (complex, ngày)"""
+    return f'availability:{complex_id}:{day.isoformat()}'
+
+
+class AvailabilityService:
+    @staticmethod
+    def grid_time_slots(day, open_time, close_time):
+        """Các mốc bắt đầu slot 1 giờ từ giờ mở cửa tới giờ đóng cửa"""
+        current_time = datetime.combine(day, open_time or DEFAULT_OPEN_TIME)
+        end_time = datetime.combine(day, close_time or DEFAULT_CLOSE_TIME)
+
+        slots = []
+        while current_time < end_time:
+            slots.append(current_time)
+            current_time += GRID_SLOT
+        return slots
+
+    @staticmethod
+    def calendar_slots(open_time, close_time):
+        """
+        Các slot 30 phút của lịch availability: list (giờ 'HH:MM', offset bắt đầu, offset kết thúc)
+        tính từ nửa đêm. Giống nhau cho mọi ngày nên chỉ tính một lần cho cả khoảng ngày.
+        """
+        midnight = datetime.combine(date(2000, 1, 1), time.min)
+        current_time = datetime.combine(midnight.date(), open_time or DEFAULT_OPEN_TIME)
+        end_time = datetime.combine(midnight.date(), close_time or DEFAULT_CLOSE_TIME)
+
+        slots = []
+        while current_time < end_time:
+            slot_end = current_time + CALENDAR_SLOT
+            slots.append((current_time.strftime('%H:%M'), current_time - midnight, slot_end - midnight))
+            current_time = slot_end
+        return slots
+
+    @staticmethod
+    def calendar_booked_flags(day, slots, court_bookings):
+        """
+        Mỗi slot có trùng booking nào của sân trong ngày không (list bool theo thứ tự slot).
+        Các slot cách đều nhau nên mỗi booking chỉ cần xét vài slot quanh khoảng của nó.
+        """
+        flags = [False] * len(slots)
+        if not slots:
+            return flags
+        first_start = datetime.combine(day, time.min) + slots[0][1]
+        for booking in court_bookings:
+            low = max(0, int((booking.startTime - first_start) / CALENDAR_SLOT) - 1)
+            high = min(len(slots), int((booking.endTime - first_start) / CALENDAR_SLOT) + 2)
+            for index in range(low, high):
+                if flags[index]:
+                    continue
+                slot_start = first_start + index * CALENDAR_SLOT
+                slot_end = slot_start + CALENDAR_SLOT
+                flags[index] = (
+                    booking.startTime <= slot_start < booking.endTime or
+                    booking.startTime < slot_end <= booking.endTime or
+                    (slot_start <= booking.startTime and slot_end >= booking.endTime)
+                )
+        return flags
+
+    @staticmethod
+    def encode_calendar_day(slots, flags, encoding=None):
+        """
+        Dữ liệu một sân trong một ngày.
+          encoding=None   -> list {'time', 'available'} như định dạng cũ
+          encoding='rle'    -> độ dài các đoạn liên tiếp, xen kẽ trống/đã đặt, luôn bắt đầu bằng đoạn trống
+                               (có thể dài 0), ví dụ [4, 2, 26]
+          encoding='bitset' -> base64 của bitset, bit i (LSB trước, byte i // 8) = 1 nếu slot i đã được đặt
+        """
+        if encoding is None:
+            return [{'time': label, 'available': not booked} for (label, _, _), booked in zip(slots, flags)]
+
+        if encoding == 'rle':
+            runs = []
+            current, length = False, 0
+            for booked in flags:
+                if booked != current:
+                    runs.append(length)
+                    current, length = booked, 0
+                length += 1
+            runs.append(length)
+            return runs
+
+        value = 0
+        for index, booked in enumerate(flags):
+            if booked:
+                value |= 1 << index
+        return base64.b64encode(value.to_bytes((len(flags) + 7) // 8, 'little')).decode('ascii')
+
+    @staticmethod
+    def build_calendar(complex, courts, days, slots, flags_for, encoding=None):
+        """
+        Body JSON của lịch availability nhiều ngày (/availability của public và owner).
+        flags_for(court, day) trả về list bool đã đặt theo thứ tự slot.
+        Với định dạng rút gọn, mốc bắt đầu, bước và số slot được khai báo một lần ở 'slot'.
+        """
+        availability_data = {}
+        for day in days:
+            day_data = availability_data[day.strftime('%Y-%m-%d')] = {}
+            for court in courts:
+                encoded = AvailabilityService.encode_calendar_day(slots, flags_for(court, day), encoding)
+                day_data[court.id] = {'courtName': court.name, 'slots': encoded} if encoding is None else encoded
+
+        body = {
+            'complex': {
+                'id': complex.id,
+                'name': complex.name,
+                'openTime': complex.openTime.strftime('%H:%M') if complex.openTime else '06:00',
+                'closeTime': complex.closeTime.strftime('%H:%M') if complex.closeTime else '22:00'
+            },
+            'courts': [{'id': c.id, 'name': c.name} for c in courts],
+            'availability': availability_data
+        }
+        if encoding is not None:
+            body['format'] = 'compact'
+            body['encoding'] = encoding
+            body['slot'] = {
+                'origin': slots[0][0] if slots else None,
+                'minutes': int(CALENDAR_SLOT.total_seconds() // 60),
+                'count': len(slots)
+            }
+        return body
+
+    @staticmethod
+    def calendar_encoding(args):
+        """Đọc ?format=compact&encoding=rle|bitset, trả về (encoding, lỗi)"""
+        if args.get('format', 'full') != 'compact':
+            return None, None
+        encoding = args.get('encoding', 'rle')
+        if encoding not in COMPACT_ENCODINGS:
+            return None, f"encoding must be one of: {', '.join(COMPACT_ENCODINGS)}"
+        return encoding, None
+
+    @staticmethod
+    def grid_booking_from_model(booking):
+        return GridBooking(
+            id=booking.id,
+            startTime=booking.startTime,
+            endTime=booking.endTime,
+            status=booking.status,
+            customerName=booking.customer.fullName if booking.customer else booking.walkInCustomerName
+        )
+
+    @staticmethod
+    def grid_slot_state(slot_datetime, court_bookings, now, court_blackouts=()):
+        """
+        Trạng thái một ô trên lưới availability (cùng định dạng với /availability-grid).
+        court_blackouts: các lần đóng sân (BlackoutInterval) của sân trong ngày.
+        """
+        slot_end = slot_datetime + GRID_SLOT
+
+        is_booked = any(
+            booking.startTime <= slot_datetime < booking.endTime or
+            booking.startTime < slot_end <= booking.endTime or
+            (slot_datetime <= booking.startTime and slot_end >= booking.endTime)
+            for booking in court_bookings
+        )
+        is_past = slot_datetime < now
+        blackout = next((b for b in court_blackouts
+                         if b.startTime < slot_end and b.endTime > slot_datetime), None)
+
+        state = {
+            'available': not is_booked and not is_past and blackout is None,
+            'booking': None,
+            'blackout': None,
+            'isPast': is_past
+        }
+        if blackout:
+            state['blackout'] = {
+                'id': blackout.id,
+                'reason': blackout.reason,
+                'startTime': blackout.startTime.isoformat(),
+                'endTime': blackout.endTime.isoformat()
+            }
+
+        if is_booked:
+            booking = next((b for b in court_bookings
+                            if b.startTime <= slot_datetime < b.endTime), None)
+            if booking:
+                state['booking'] = {
+                    'id': booking.id,
+                    'customerName': booking.customerName,
+                    'startTime': booking.startTime.strftime('%H:%M'),
+                    'endTime': booking.endTime.strftime('%H:%M'),
+                    'status': booking.status
+                }
+        return state
+
+    @staticmethod
+    def build_grid_delta(conn, change):
+        """
+        Tính các ô thay đổi trên lưới availability của sân khi một booking đổi trạng thái.
+        Chỉ đọc lại các booking của đúng sân đó trong khoảng slot bị ảnh hưởng.
+        """
+        day = change.startTime.date()
+
+        complex_row = conn.execute(
+            select(CourtComplex.openTime, CourtComplex.closeTime).where(CourtComplex.id == change.complexId)
+        ).first()
+        if complex_row is None:
+            return None
+
+        affected_slots = [
+            slot for slot in AvailabilityService.grid_time_slots(day, complex_row.openTime, complex_row.closeTime)
+            if slot < change.endTime and slot + GRID_SLOT > change.startTime
+        ]
+        if not affected_slots:
+            return None
+
+        rows = conn.execute(
+            select(
+                Booking.id, Booking.startTime, Booking.endTime, Booking.status,
+                func.coalesce(User.fullName, Booking.walkInCustomerName).label('customerName')
+            )
+            .outerjoin(User, Booking.customerId == User.id)
+            .where(
+                Booking.courtId == change.courtId,
+                Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+                starts_on_days(day),
+                Booking.startTime < affected_slots[-1] + GRID_SLOT,
+                Booking.endTime > affected_slots[0]
+            )
+        ).all()
+        court_bookings = [GridBooking(*row) for row in rows]
+        court_blackouts = BlackoutService.court_blackouts(
+            conn, {change.courtId: change.complexId}, affected_slots[0], affected_slots[-1] + GRID_SLOT
+        )[change.courtId]
+
+        now = datetime.now()
+        return {
+            'date': day.isoformat(),
+            'courtId': change.courtId,
+            'bookingId': change.id,
+            'status': change.status,
+            'slots': {
+                slot.strftime('%H:%M'): AvailabilityService.grid_slot_state(slot, court_bookings, now, court_blackouts)
+                for slot in affected_slots
+            }
+        }
+
+
+@booking_changed.connect
+def _push_availability_delta(sender, change, **kwargs):
+    channel = availability_channel(change.complexId, change.startTime.date())
+    if not event_hub.wants(channel):
+        return  # Không ai đang xem lưới này, khỏi tính
+
+    try:
+        with db.engine.connect() as conn:
+            delta = AvailabilityService.build_grid_delta(conn, change)
+        if delta:
+            event_hub.publish(channel, 'slots', delta)
+    except Exception as e:
+        print(f"Failed to push availability delta: {str(e)}")
+        traceback.print_exc()
@@ -0,0 +1,266 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from src.models.database import db, Booking, Court, CourtBlackout
+from src.services.booking_bulk import BookingBulkService, bulk_bookings_select
+from src.services.signals import record_blackout_change
+
+# Lịch đóng sân (bảo trì, sự kiện...) của một sân hoặc cả khu phức hợp, có thể lặp hằng ngày / hằng tuần.
+# Các lần đóng được trải ra thành khoảng thời gian giống booking, nên lưới availability, bitmap
+# chiếm chỗ và kiểm tra trùng lịch đều dùng chung một cách so khoảng.
+
+ACTIVE_BOOKING_STATUSES = ('Pending', 'Confirmed')
+BLACKOUT_RECURRENCES = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+# Lịch lặp không có ngày kết thúc: chỉ hủy các booking trong khoảng này kể từ bây giờ
+BLACKOUT_CANCEL_HORIZON = timedelta(days=366)
+
+# Một lần đóng sân cụ thể (đã trải theo recurrence)
+BlackoutInterval = namedtuple('BlackoutInterval', ['id', 'startTime', 'endTime', 'reason'])
+
+
+class BlackoutError(Exception):
+    """Yêu cầu tạo lịch đóng sân không hợp lệ; route trả về status_code"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+    def to_dict(self):
+        return {'error': str(self)}
+
+
+def blackout_occurrences(blackout, range_start, range_end):
+    """Các lần đóng (start, end) của `blackout` (model hoặc Core row) giao với [range_start, range_end)"""
+    step = BLACKOUT_RECURRENCES.get(blackout.recurrence)
+    if step is None:
+        if blackout.startTime < range_end and blackout.endTime > range_start:
+            yield blackout.startTime, blackout.endTime
+        return
+
+    duration = blackout.endTime - blackout.startTime
+    # Bỏ qua thẳng các lần đã kết thúc trước range_start
+    start = blackout.startTime + max(0, (range_start - blackout.endTime) // step) * step
+    while start < range_end and (blackout.recurrenceUntil is None or start.date() <= blackout.recurrenceUntil):
+        if start + duration > range_start:
+            yield start, start + duration
+        start += step
+
+
+def blackout_message(interval):
+    message = f"Sân tạm đóng từ {interval.startTime.strftime('%d/%m/%Y %H:%M')} đến {interval.endTime.strftime('%d/%m/%Y %H:%M')}"
+    return f'{message}: {interval.reason}' if interval.reason else f'{message}.'
+
+
+class BlackoutService:
+    @staticmethod
+    def court_blackouts(conn, court_complexes, range_start, range_end):
+        """
+        Các lần đóng của từng sân trong [range_start, range_end), một query.
+        court_complexes: dict courtId -> complexId (lịch đóng cả complex áp dụng cho mọi sân của nó).
+        `conn` là Connection hoặc db.session. Trả về dict courtId -> list BlackoutInterval theo thời gian.
+        """
+        result = {court_id: [] for court_id in court_complexes}
+        if not court_complexes:
+            return result
+
+        longest_step = max(BLACKOUT_RECURRENCES.values())
+        rows = conn.execute(
+            select(
+                CourtBlackout.id, CourtBlackout.complexId, CourtBlackout.courtId,
+                CourtBlackout.startTime, CourtBlackout.endTime,
+                CourtBlackout.recurrence, CourtBlackout.recurrenceUntil, CourtBlackout.reason
+            ).where(
+                CourtBlackout.complexId.in_(set(court_complexes.values())),
+                db.or_(CourtBlackout.courtId.is_(None), CourtBlackout.courtId.in_(list(court_complexes))),
+                CourtBlackout.startTime < range_end,
+                db.or_(
+                    db.and_(CourtBlackout.recurrence.is_(None), CourtBlackout.endTime > range_start),
+                    db.and_(
+                        CourtBlackout.recurrence.isnot(None),
+                        db.or_(
+                            CourtBlackout.recurrenceUntil.is_(None),
+                            CourtBlackout.recurrenceUntil >= (range_start - longest_step).date()
+                        )
+                    )
+                )
+            )
+        ).all()
+
+        for row in rows:
+            intervals = [
+                BlackoutInterval(row.id, start, end, row.reason)
+                for start, end in blackout_occurrences(row, range_start, range_end)
+            ]
+            if not intervals:
+                continue
+            court_ids = [row.courtId] if row.courtId else [
+                court_id for court_id, complex_id in court_complexes.items() if complex_id == row.complexId
+            ]
+            for court_id in court_ids:
+                if court_id in result:
+                    result[court_id].extend(intervals)
+
+        for intervals in result.values():
+            intervals.sort(key=lambda interval: interval.startTime)
+        return result
+
+    @staticmethod
+    def court_complex_ids(conn, court_ids):
+        """dict courtId -> complexId, dùng khi chỉ có id của sân"""
+        rows = conn.execute(select(Court.id, Court.complexId).where(Court.id.in_(list(court_ids)))).all()
+        return {court_id: complex_id for court_id, complex_id in rows}
+
+    @staticmethod
+    def by_court_day(blackouts, days):
+        """Nhóm các lần đóng theo (courtId, ngày) giống cách nhóm booking của lịch availability"""
+        grouped = {}
+        for court_id, intervals in blackouts.items():
+            for day in days:
+                day_start = datetime.combine(day, datetime.min.time())
+                day_end = day_start + timedelta(days=1)
+                day_intervals = [i for i in intervals if i.startTime < day_end and i.endTime > day_start]
+                if day_intervals:
+                    grouped[(court_id, day)] = day_intervals
+        return grouped
+
+    @staticmethod
+    def find_overlapping(court, start_dt, end_dt):
+        """Lần đóng sân đầu tiên giao với [start_dt, end_dt), None nếu không có"""
+        intervals = BlackoutService.court_blackouts(db.session, {court.id: court.complexId}, start_dt, end_dt)[court.id]
+        return intervals[0] if intervals else None
+
+    @staticmethod
+    def unavailable_reason(court, start_dt, end_dt):
+        """Lý do khoảng thời gian bị chiếm (bitmap chiếm chỗ gồm cả booking và lịch đóng sân)"""
+        blackout = BlackoutService.find_overlapping(court, start_dt, end_dt)
+        return blackout_message(blackout) if blackout else 'Time slot is already booked'
+
+    @staticmethod
+    def parse_request(complex, data):
+        """
+        Đọc body tạo lịch đóng sân:
+            courtId (tùy chọn): bỏ trống để đóng cả khu phức hợp
+            startTime, endTime: lần đóng đầu tiên
+            recurrence (tùy chọn): daily | weekly
+            recurrenceUntil (tùy chọn, YYYY-MM-DD): ngày của lần lặp cuối
+            reason (tùy chọn)
+        Trả về CourtBlackout chưa được thêm vào session.
+        """
+        for field in ['startTime', 'endTime']:
+            if not data.get(field):
+                raise BlackoutError(f'Missing required field: {field}')
+
+        try:
+            start_dt = datetime.fromisoformat(data['startTime'].replace('Z', '+00:00')).replace(tzinfo=None)
+            end_dt = datetime.fromisoformat(data['endTime'].replace('Z', '+00:00')).replace(tzinfo=None)
+            until = datetime.strptime(data['recurrenceUntil'], '%Y-%m-%d').date() if data.get('recurrenceUntil') else None
+        except (TypeError, ValueError):
+            raise BlackoutError('Invalid startTime, endTime or recurrenceUntil')
+
+        if start_dt >= end_dt:
+            raise BlackoutError('Start time must be before end time')
+
+        recurrence = data.get('recurrence') or None
+        if recurrence is not None:
+            if recurrence not in BLACKOUT_RECURRENCES:
+                raise BlackoutError(f"recurrence must be one of: {', '.join(BLACKOUT_RECURRENCES)}")
+            if end_dt - start_dt >= BLACKOUT_RECURRENCES[recurrence]:
+                raise BlackoutError('A recurring blackout must be shorter than its recurrence period')
+            if until is not None and until < start_dt.date():
+                raise BlackoutError('recurrenceUntil must not be before startTime')
+        elif until is not None:
+            raise BlackoutError('recurrenceUntil requires recurrence')
+
+        last_end = end_dt
+        if recurrence is not None:
+            last_end = datetime.max if until is None else datetime.combine(until, start_dt.time()) + (end_dt - start_dt)
+        if last_end <= datetime.now():
+            raise BlackoutError('Cannot create a blackout in the past')
+
+        court_id = data.get('courtId')
+        if court_id:
+            court = Court.query.filter_by(id=court_id, complexId=complex.id).first()
+            if not court:
+                raise BlackoutError('Court not found', 404)
+            court_id = court.id
+
+        return CourtBlackout(
+            complexId=complex.id,
+            courtId=court_id or None,
+            startTime=start_dt,
+            endTime=end_dt,
+            recurrence=recurrence,
+            recurrenceUntil=until,
+            reason=(data.get('reason') or '').strip() or None
+        )
+
+    @staticmethod
+    def overlapping_booking_ids(blackout):
+        """Id các booking đang hoạt động, chưa kết thúc, trùng một lần đóng của `blackout`"""
+        now = datetime.now()
+        if blackout.recurrence is None:
+            range_end = blackout.endTime
+        else:
+            range_end = now + BLACKOUT_CANCEL_HORIZON
+            if blackout.recurrenceUntil is not None:
+                range_end = min(range_end, datetime.combine(blackout.recurrenceUntil, datetime.max.time()) + (blackout.endTime - blackout.startTime))
+
+        court_filter = Booking.courtId == blackout.courtId if blackout.courtId else Court.complexId == blackout.complexId
+        candidates = db.session.execute(
+            select(Booking.id, Booking.startTime, Booking.endTime).join(Court, Booking.courtId == Court.id).where(
+                court_filter,
+                Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+                Booking.endTime > max(now, blackout.startTime),
+                Booking.startTime < range_end
+            ).order_by(Booking.startTime)
+        ).all()
+        return [
+            row.id for row in candidates
+            if next(blackout_occurrences(blackout, row.startTime, row.endTime), None) is not None
+        ]
+
+    @staticmethod
+    def create(owner_id, blackout):
+        """
+        Lưu lịch đóng sân và hủy các booking bị trùng trong cùng transaction.
+        Không giới hạn MAX_BULK_BOOKINGS: lịch lặp dài có thể trùng hàng nghìn booking, được hủy theo từng lô.
+        Khách của các booking bị hủy nhận email hủy qua một lần gửi batch.
+        Trả về kết quả hủy của BookingBulkService (None nếu không có booking nào bị trùng).
+        """
+        db.session.add(blackout)
+        db.session.flush()
+        record_blackout_change(blackout.complexId, blackout.courtId)
+
+        booking_ids = BlackoutService.overlapping_booking_ids(blackout)
+        if not booking_ids:
+            db.session.commit()
+            return None
+
+        reason = f'Sân tạm đóng: {blackout.reason}' if blackout.reason else 'Sân tạm đóng để bảo trì.'
+        return BookingBulkService.apply_in_batches('cancel', bulk_bookings_select(owner_id), booking_ids, reason)
+
+    @staticmethod
+    def delete(blackout):
+        record_blackout_change(blackout.complexId, blackout.courtId)
+        db.session.delete(blackout)
+        db.session.commit()
+
+    @staticmethod
+    def serialize(blackout, court_names=None):
+        return {
+            'id': blackout.id,
+            'complexId': blackout.complexId,
+            'courtId': blackout.courtId,
+            'courtName': (court_names or {}).get(blackout.courtId) if blackout.courtId else None,
+            'startTime': blackout.startTime.isoformat(),
+            'endTime': blackout.endTime.isoformat(),
+            'recurrence': blackout.recurrence,
+            'recurrenceUntil': blackout.recurrenceUntil.isoformat() if blackout.recurrenceUntil else None,
+            'reason': blackout.reason,
+            'createdAt': blackout.createdAt.isoformat() if blackout.createdAt else None
+        }
@@ -0,0 +1,217 @@
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, insert, literal, select, text, union_all
+from sqlalchemy.orm import aliased
+
+from src.models.database import db, Booking, BookingArchive, BookingProduct, BookingProductArchive
+
+# Lưu trữ lịch sử booking.
+#  - PostgreSQL: bảng bookings được chia partition theo tháng của startTime (migration 9b41e7d2c053),
+#    các query nóng (trùng lịch, availability, booking chờ duyệt...) đều lọc theo startTime nên chỉ
+#    quét partition của vài tháng. ensure_partitions tạo trước partition cho các tháng sắp tới,
+#    booking ngoài các tháng đó nằm ở partition mặc định.
+#  - Booking đã kết thúc (Completed / Cancelled / Rejected / Expired) cũ hơn BOOKING_ARCHIVE_AFTER_DAYS
+#    được chuyển sang bảng bookings_archive (booking_products của chúng sang booking_products_archive),
+#    sau đó partition cũ đã trống bị bỏ đi. Chỉ chạy khi đặt BOOKING_ARCHIVE_AFTER_DAYS (mặc định tắt).
+#  - Báo cáo (thống kê, export) và lịch sử booking (danh sách booking của khách và của owner) đọc
+#    BookingHistory = bookings UNION ALL bookings_archive nên vẫn thấy booking đã lưu trữ. Các màn hình
+#    vận hành (lịch sân, availability, booking chờ duyệt, thao tác hàng loạt) chỉ đọc bảng bookings:
+#    booking đã lưu trữ đều đã kết thúc.
+
+ARCHIVE_STATUSES = ('Completed', 'Cancelled', 'Rejected', 'Expired')
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_INTERVAL = timedelta(days=1)  # Scheduler chạy lưu trữ + bảo trì partition mỗi ngày một lần
+PARTITION_MONTHS_AHEAD = 3
+DEFAULT_PARTITION = 'bookings_pdefault'
+
+_HISTORY_COLUMNS = [column.name for column in Booking.__table__.columns]
+_PRODUCT_COLUMNS = [column.name for column in BookingProduct.__table__.columns]
+
+# Booking ở cả bảng nóng và bảng lưu trữ, dùng như Booking trong query báo cáo
+# (ví dụ select(func.sum(BookingHistory.totalPrice)).join(Court, BookingHistory.courtId == Court.id))
+booking_history = union_all(
+    select(*[Booking.__table__.c[name] for name in _HISTORY_COLUMNS]),
+    select(*[BookingArchive.__table__.c[name] for name in _HISTORY_COLUMNS]),
+).subquery('booking_history')
+BookingHistory = aliased(Booking, booking_history, adapt_on_names=True)
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'bookings_p{month:%Y%m}'
+
+
+def parse_archive_after_days(value):
+    """Đọc BOOKING_ARCHIVE_AFTER_DAYS: số ngày (>= 1), None khi bỏ trống / 'off' (không lưu trữ)"""
+    value = str(value if value is not None else '').strip()
+    if value in ('', 'off'):
+        return None
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f"Invalid BOOKING_ARCHIVE_AFTER_DAYS '{value}', archiving disabled")
+        return None
+
+
+class BookingArchiver:
+    @staticmethod
+    def is_partitioned():
+        if db.engine.dialect.name != 'postgresql':
+            return False
+        return bool(db.session.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('bookings'))"
+        )).scalar())
+
+    @staticmethod
+    def partitions():
+        """dict tên partition theo tháng -> tháng (không gồm partition mặc định)"""
+        names = db.session.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('bookings')"
+        )).scalars().all()
+        result = {}
+        for name in names:
+            if name == DEFAULT_PARTITION:
+                continue
+            try:
+                result[name] = datetime.strptime(name[len('bookings_p'):], '%Y%m').date()
+            except ValueError:
+                continue  # Partition không theo quy ước tên, bỏ qua
+        return result
+
+    @staticmethod
+    def ensure_partitions(today, months_ahead=PARTITION_MONTHS_AHEAD):
+        """
+        Tạo partition cho tháng hiện tại và `months_ahead` tháng tới nếu chưa có.
+        Booking của tháng đó đã nằm ở partition mặc định được chuyển sang partition mới
+        trước khi ATTACH (PostgreSQL không cho attach khi partition mặc định còn dòng thuộc khoảng đó).
+        Trả về tên các partition đã tạo.
+        """
+        existing = BookingArchiver.partitions()
+        created = []
+        month = month_start(today)
+        for _ in range(months_ahead + 1):
+            name = partition_name(month)
+            if name not in existing:
+                bounds = {'start': month, 'end': next_month(month)}
+                db.session.execute(text(f'CREATE TABLE {name} (LIKE bookings INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+                db.session.execute(text(
+                    f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+                    f'WHERE "startTime" >= :start AND "startTime" < :end RETURNING *) '
+                    f'INSERT INTO {name} SELECT * FROM moved'
+                ), bounds)
+                db.session.execute(text(
+                    f"ALTER TABLE bookings ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+                ))
+                db.session.commit()
+                created.append(name)
+            month = next_month(month)
+        return created
+
+    @staticmethod
+    def drop_empty_partitions(before):
+        """Bỏ các partition của những tháng kết thúc trước `before` đã trống (booking đã được lưu trữ hết)"""
+        dropped = []
+        for name, month in sorted(BookingArchiver.partitions().items(), key=lambda item: item[1]):
+            if next_month(month) > month_start(before):
+                continue
+            if db.session.execute(text(f'SELECT EXISTS (SELECT 1 FROM {name})')).scalar():
+                continue
+            db.session.execute(text(f'ALTER TABLE bookings DETACH PARTITION {name}'))
+            db.session.execute(text(f'DROP TABLE {name}'))
+            db.session.commit()
+            dropped.append(name)
+        return dropped
+
+    @staticmethod
+    def archive(before, batch_size=ARCHIVE_BATCH_SIZE):
+        """
+        Chuyển các booking đã kết thúc (endTime < before) sang bookings_archive theo lô id:
+        INSERT ... SELECT rồi DELETE trong cùng transaction, mỗi lô một commit.
+        booking_products của lô được chuyển sang booking_products_archive trước (khóa ngoại tới bookings,
+        trên PostgreSQL là constraint trigger của migration 9b41e7d2c053). Trả về số booking đã chuyển.
+        """
+        columns = [Booking.__table__.c[name] for name in _HISTORY_COLUMNS]
+        product_columns = [BookingProduct.__table__.c[name] for name in _PRODUCT_COLUMNS]
+        archived_at = literal(datetime.utcnow(), BookingArchive.archivedAt.type)
+        total = 0
+        while True:
+            booking_ids = db.session.execute(
+                select(Booking.id).where(
+                    Booking.status.in_(ARCHIVE_STATUSES),
+                    Booking.endTime < before
+                ).order_by(Booking.id).limit(batch_size).with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not booking_ids:
+                break
+
+            db.session.execute(
+                insert(BookingProductArchive).from_select(
+                    _PRODUCT_COLUMNS,
+                    select(*product_columns).where(BookingProduct.bookingId.in_(booking_ids))
+                )
+            )
+            db.session.execute(
+                delete(BookingProduct).where(BookingProduct.bookingId.in_(booking_ids)).execution_options(synchronize_session=False)
+            )
+            db.session.execute(
+                insert(BookingArchive).from_select(
+                    _HISTORY_COLUMNS + ['archivedAt'],
+                    select(*columns, archived_at).where(Booking.id.in_(booking_ids))
+                )
+            )
+            db.session.execute(
+                delete(Booking).where(Booking.id.in_(booking_ids)).execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            total += len(booking_ids)
+            if len(booking_ids) < batch_size:
+                break
+        return total
+
+    @staticmethod
+    def run(archive_after_days, now=None):
+        """
+        Một lượt bảo trì: tạo partition sắp tới, lưu trữ booking cũ, bỏ partition cũ đã trống.
+        archive_after_days None: chỉ bảo trì partition. Trả về dict kết quả.
+        """
+        now = now or datetime.now()
+        result = {'archived': 0, 'partitionsCreated': [], 'partitionsDropped': []}
+        try:
+            partitioned = BookingArchiver.is_partitioned()
+            if partitioned:
+                result['partitionsCreated'] = BookingArchiver.ensure_partitions(now.date())
+            if archive_after_days is not None:
+                before = now - timedelta(days=archive_after_days)
+                result['archived'] = BookingArchiver.archive(before)
+                if partitioned:
+                    result['partitionsDropped'] = BookingArchiver.drop_empty_partitions(before.date())
+        except Exception:
+            db.session.rollback()
+            raise
+        return result
+
+
+@click.command('booking-archive')
+@click.option('--after-days', default=None, help="Lưu trữ booking kết thúc trước số ngày này (mặc định BOOKING_ARCHIVE_AFTER_DAYS, bỏ trống = không lưu trữ), 'off' = chỉ bảo trì partition")
+@with_appcontext
+def run_archive_command(after_days):
+    """Lưu trữ booking cũ sang bookings_archive và bảo trì partition của bảng bookings"""
+    value = after_days if after_days is not None else current_app.config.get('BOOKING_ARCHIVE_AFTER_DAYS')
+    result = BookingArchiver.run(parse_archive_after_days(value))
+    click.echo(
+        f"archived: {result['archived']}, "
+        f"partitions created: {', '.join(result['partitionsCreated']) or '-'}, "
+        f"partitions dropped: {', '.join(result['partitionsDropped']) or '-'}"
+    )
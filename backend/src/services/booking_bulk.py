@@ -0,0 +1,200 @@
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from src.models.database import db, Booking, Court, CourtComplex, User
+import src.services.email_service as email_service_module
+from src.services.signals import record_booking_status_changes
+
+# Duyệt / từ chối / hủy / hoàn thành nhiều booking của owner trong một request:
+# một SELECT lấy các booking (kèm sân, complex, khách), một UPDATE theo tập id, một commit,
+# và tất cả email cho khách được gửi bằng một lần gọi batch sau khi commit.
+
+MAX_BULK_BOOKINGS = 500
+
+# action -> (trạng thái mới, các trạng thái được phép chuyển, lỗi khi trạng thái không hợp lệ)
+BULK_ACTIONS = {
+    'approve': ('Confirmed', ('Pending',), 'Only pending bookings can be approved'),
+    'reject': ('Rejected', ('Pending',), 'Only pending bookings can be rejected'),
+    'cancel': ('Cancelled', ('Pending', 'Confirmed'), 'Only pending or confirmed bookings can be cancelled'),
+    'complete': ('Completed', ('Confirmed',), 'Only confirmed bookings can be marked as completed'),
+}
+DEFAULT_REASONS = {
+    'reject': 'Không có lý do được cung cấp.',
+    'cancel': 'Đơn đặt sân đã bị hủy bởi chủ sân.',
+}
+
+
+class BulkActionError(Exception):
+    """Yêu cầu thao tác hàng loạt không hợp lệ; route trả về status_code"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+    def to_dict(self):
+        return {'error': str(self)}
+
+
+def bulk_bookings_select(owner_id):
+    """Select các cột cần cho thao tác hàng loạt: kiểm tra trạng thái, signal và email"""
+    return select(
+        Booking.id,
+        Booking.status,
+        Booking.courtId,
+        Booking.customerId,
+        Booking.startTime,
+        Booking.endTime,
+        Booking.totalPrice,
+        Court.name.label('courtName'),
+        CourtComplex.id.label('complexId'),
+        CourtComplex.name.label('complexName'),
+        CourtComplex.ownerId,
+        User.email.label('customerEmail'),
+        User.fullName.label('customerName'),
+    ).select_from(Booking).join(Court, Booking.courtId == Court.id).join(
+        CourtComplex, Court.complexId == CourtComplex.id
+    ).outerjoin(User, Booking.customerId == User.id).where(
+        CourtComplex.ownerId == owner_id
+    )
+
+
+def parse_booking_ids(value):
+    if not isinstance(value, list) or not value:
+        raise BulkActionError('bookingIds must be a non-empty list')
+    try:
+        booking_ids = list(dict.fromkeys(int(booking_id) for booking_id in value))  # Bỏ trùng, giữ thứ tự
+    except (TypeError, ValueError):
+        raise BulkActionError('bookingIds must contain booking ids')
+    if len(booking_ids) > MAX_BULK_BOOKINGS:
+        raise BulkActionError(f'At most {MAX_BULK_BOOKINGS} bookings can be updated at once')
+    return booking_ids
+
+
+class BookingBulkService:
+    @staticmethod
+    def apply(action, statement, booking_ids=None, reason=None):
+        """
+        Chuyển trạng thái các booking của `statement` (bulk_bookings_select đã lọc) theo `action`.
+        booking_ids: danh sách id yêu cầu (None khi chọn bằng bộ lọc); id không thuộc owner
+        được trả về với kết quả 'not_found'.
+        Trả về body JSON: số booking đã cập nhật / bỏ qua và kết quả của từng booking.
+        """
+        if booking_ids is not None:
+            statement = statement.where(Booking.id.in_(booking_ids))
+        rows = BookingBulkService._lock_rows(statement.limit(MAX_BULK_BOOKINGS + 1))
+        if len(rows) > MAX_BULK_BOOKINGS:
+            raise BulkActionError(
+                f'The filter matches more than {MAX_BULK_BOOKINGS} bookings, narrow it down or send bookingIds'
+            )
+
+        eligible, results_by_id = BookingBulkService._update(action, rows)
+        db.session.commit()
+
+        if booking_ids is None:
+            booking_ids = [row.id for row in rows]
+        return BookingBulkService._summary(action, booking_ids, eligible, results_by_id, reason)
+
+    @staticmethod
+    def apply_in_batches(action, statement, booking_ids, reason=None):
+        """
+        Giống apply nhưng không giới hạn MAX_BULK_BOOKINGS, dùng cho thao tác hệ thống tự chọn booking
+        (hủy booking trùng lịch đóng sân). Các id được khóa và cập nhật theo từng lô MAX_BULK_BOOKINGS
+        trong transaction hiện tại, sau đó commit một lần và gửi email bằng một lần gọi batch.
+        """
+        eligible, results_by_id = [], {}
+        for offset in range(0, len(booking_ids), MAX_BULK_BOOKINGS):
+            batch = booking_ids[offset:offset + MAX_BULK_BOOKINGS]
+            batch_eligible, batch_results = BookingBulkService._update(
+                action, BookingBulkService._lock_rows(statement.where(Booking.id.in_(batch)))
+            )
+            eligible.extend(batch_eligible)
+            results_by_id.update(batch_results)
+        db.session.commit()
+        return BookingBulkService._summary(action, booking_ids, eligible, results_by_id, reason)
+
+    @staticmethod
+    def _lock_rows(statement):
+        # Khóa các dòng booking tới khi commit (PostgreSQL) để không đổi trạng thái hai lần
+        return db.session.execute(statement.order_by(Booking.id).with_for_update(of=Booking)).all()
+
+    @staticmethod
+    def _update(action, rows):
+        """UPDATE các dòng hợp lệ (chưa commit); trả về (dòng đã cập nhật, dict id -> kết quả)"""
+        new_status, allowed_statuses, status_error = BULK_ACTIONS[action]
+        now = datetime.now()
+        eligible, results_by_id = [], {}
+        for row in rows:
+            if row.status not in allowed_statuses:
+                results_by_id[row.id] = {'id': row.id, 'result': 'skipped', 'status': row.status, 'error': status_error}
+            elif action == 'complete' and now < row.endTime:
+                results_by_id[row.id] = {
+                    'id': row.id, 'result': 'skipped', 'status': row.status,
+                    'error': 'Cannot mark booking as completed before its end time'
+                }
+            else:
+                eligible.append(row)
+                results_by_id[row.id] = {'id': row.id, 'result': 'updated', 'status': new_status, 'previousStatus': row.status}
+
+        if eligible:
+            db.session.execute(
+                update(Booking)
+                .where(Booking.id.in_([row.id for row in eligible]), Booking.status.in_(allowed_statuses))
+                .values(status=new_status)
+                .execution_options(synchronize_session=False)
+            )
+            record_booking_status_changes(eligible, new_status)
+        return eligible, results_by_id
+
+    @staticmethod
+    def _summary(action, booking_ids, eligible, results_by_id, reason):
+        """Sau commit: gửi email batch cho khách và dựng body JSON theo thứ tự booking_ids"""
+        results = [
+            results_by_id.get(booking_id) or {
+                'id': booking_id, 'result': 'not_found', 'error': 'Booking not found or not owned by you'
+            }
+            for booking_id in booking_ids
+        ]
+
+        new_status = BULK_ACTIONS[action][0]
+        emails = BookingBulkService.customer_emails(action, eligible, new_status, reason or DEFAULT_REASONS.get(action))
+        email_result = email_service_module.EmailService.send_batch(emails) if emails else None
+
+        return {
+            'action': action,
+            'updated': len(eligible),
+            'skipped': len(results) - len(eligible),
+            'emailsSent': email_result['sent'] if email_result else 0,
+            'results': results
+        }
+
+    @staticmethod
+    def customer_emails(action, rows, new_status, reason):
+        """Email cho khách đã đăng ký của các booking vừa đổi trạng thái (giống các route đơn lẻ)"""
+        EmailService = email_service_module.EmailService
+        emails = []
+        for row in rows:
+            if action == 'complete' or not row.customerEmail:
+                continue
+            booking_data = {
+                'id': row.id,
+                'courtName': row.courtName,
+                'complexName': row.complexName,
+                'startTime': row.startTime.isoformat(),
+                'endTime': row.endTime.isoformat(),
+                'totalPrice': float(row.totalPrice),
+            }
+            try:
+                if action == 'cancel':
+                    booking_data['cancellationReason'] = reason
+                    emails.append(EmailService.build_booking_cancellation_email(row.customerEmail, row.customerName, booking_data))
+                else:
+                    booking_data['status'] = new_status
+                    emails.append(EmailService.build_booking_status_update_email(
+                        row.customerEmail, row.customerName, booking_data,
+                        new_status=new_status,
+                        reason=reason if action == 'reject' else None
+                    ))
+            except Exception as e:
+                print(f"Failed to build {action} email for booking {row.id}: {e}")
+        return emails
@@ -0,0 +1,150 @@
+import csv
+from datetime import datetime
+import io
+import json
+
+from flask import Response
+from sqlalchemy import func, select
+
+from src.models.database import Court, CourtComplex, User
+from src.services.booking_archive import BookingHistory
+
+# Export booking / doanh thu của owner dạng CSV hoặc NDJSON.
+# Query chạy bằng Core (tuple, không dựng ORM object) trên một connection riêng với
+# stream_results + yield_per (server-side cursor trên PostgreSQL): bộ nhớ không phụ thuộc
+# số dòng và byte đầu tiên được gửi ngay khi có kết quả.
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_REPORTS = ('bookings', 'revenue')
+EXPORT_YIELD_PER = 1000
+EXPORT_CHUNK_ROWS = 500  # Gom N dòng vào một chunk gửi đi
+REVENUE_STATUSES = ('Confirmed', 'Completed')  # Giống thống kê doanh thu của owner
+
+BOOKING_COLUMNS = [
+    'id', 'complexId', 'complexName', 'courtName', 'startTime', 'endTime', 'status', 'bookingType',
+    'totalPrice', 'customerName', 'customerEmail', 'customerPhone', 'createdAt'
+]
+REVENUE_COLUMNS = ['date', 'complexId', 'complexName', 'bookings', 'revenue']
+
+
+def bookings_export_select(owner_id):
+    """
+    Select Core của booking thuộc owner (chưa lọc), chỉ các cột cần cho export.
+    Đọc BookingHistory nên gồm cả booking đã lưu trữ.
+    """
+    return select(
+        BookingHistory.id,
+        CourtComplex.id.label('complexId'),
+        CourtComplex.name.label('complexName'),
+        Court.name.label('courtName'),
+        BookingHistory.startTime,
+        BookingHistory.endTime,
+        BookingHistory.bookingDate,
+        BookingHistory.status,
+        BookingHistory.bookingType,
+        BookingHistory.totalPrice,
+        BookingHistory.customerId,
+        User.fullName.label('customerFullName'),
+        User.email.label('customerEmail'),
+        BookingHistory.walkInCustomerName,
+        BookingHistory.walkInCustomerPhone,
+        BookingHistory.createdAt,
+    ).select_from(BookingHistory).join(Court, BookingHistory.courtId == Court.id).join(
+        CourtComplex, Court.complexId == CourtComplex.id
+    ).outerjoin(User, BookingHistory.customerId == User.id).where(
+        CourtComplex.ownerId == owner_id
+    )
+
+
+def revenue_export_select(filtered_bookings):
+    """Doanh thu theo (ngày, complex) từ select booking đã lọc"""
+    bookings = filtered_bookings.subquery()
+    day = bookings.c.bookingDate
+    return select(
+        day.label('date'),
+        bookings.c.complexId,
+        bookings.c.complexName,
+        func.count(bookings.c.id).label('bookings'),
+        func.coalesce(func.sum(bookings.c.totalPrice), 0).label('revenue'),
+    ).group_by(day, bookings.c.complexId, bookings.c.complexName).order_by(day, bookings.c.complexId)
+
+
+def _booking_record(row):
+    if row.customerId:
+        # Giống danh sách booking của owner: user không còn tồn tại thì ghi chú thay cho tên
+        name = row.customerFullName if row.customerFullName is not None else 'Người dùng không tồn tại'
+        email, phone = row.customerEmail or '', ''
+    else:
+        name, email, phone = row.walkInCustomerName, '', row.walkInCustomerPhone
+    return [
+        row.id, row.complexId, row.complexName, row.courtName,
+        row.startTime.isoformat(), row.endTime.isoformat(), row.status, row.bookingType,
+        float(row.totalPrice), name, email, phone,
+        row.createdAt.isoformat() if row.createdAt else None,
+    ]
+
+
+def _revenue_record(row):
+    day = row.date.isoformat() if hasattr(row.date, 'isoformat') else str(row.date)
+    return [day, row.complexId, row.complexName, row.bookings, float(row.revenue)]
+
+
+def _iter_rows(engine, statement):
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER).execute(statement)
+        for partition in result.partitions():
+            yield from partition
+
+
+def _csv_chunks(columns, records):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM để Excel đọc đúng tiếng Việt
+    writer.writerow(columns)
+    yield buffer.getvalue()  # Header gửi ngay, trước khi query trả dòng đầu tiên
+
+    buffer.seek(0)
+    buffer.truncate()
+    pending = 0
+    for record in records:
+        writer.writerow(record)
+        pending += 1
+        if pending >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(columns, records):
+    lines = []
+    for record in records:
+        lines.append(json.dumps(dict(zip(columns, record)), ensure_ascii=False))
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_response(engine, statement, report, export_format):
+    """
+    Response stream của export. `engine` lấy trước từ db.engine: generator chạy sau khi view
+    đã trả về, không dùng db.session/app context.
+    """
+    columns, to_record = (BOOKING_COLUMNS, _booking_record) if report == 'bookings' else (REVENUE_COLUMNS, _revenue_record)
+    records = (to_record(row) for row in _iter_rows(engine, statement))
+
+    if export_format == 'csv':
+        body, mimetype = _csv_chunks(columns, records), 'text/csv'
+    else:
+        body, mimetype = _ndjson_chunks(columns, records), 'application/x-ndjson'
+
+    filename = f"{report}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'  # Tắt buffering của nginx
+    })
@@ -0,0 +1,245 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import traceback
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, text, update
+
+from src.models.database import db, Booking, Court, CourtComplex
+from src.services.booking_archive import ARCHIVE_INTERVAL, BookingArchiver, parse_archive_after_days, run_archive_command
+from src.services.complex_changes import prune_complex_changes
+from src.services.signals import record_booking_status_changes
+
+# Tự động chuyển trạng thái các booking đã qua theo quy tắc của từng complex:
+#   Confirmed -> Completed sau endTime + autoCompleteAfterMinutes
+#   Pending   -> Expired   sau startTime + pendingExpiryMinutes
+# (cột bằng NULL: tắt quy tắc cho complex đó, mặc định của pendingExpiryMinutes). Mỗi lượt chạy là các UPDATE
+# theo lô id, mỗi lô một commit.
+# Thread nền chỉ được bật từ entry point của server (wsgi.py, `python src/main.py`) hoặc
+# `flask booking-lifecycle --loop`, không chạy khi create_app() cho các lệnh CLI khác (`flask db upgrade`...).
+# Mọi worker đều chạy thread nhưng chỉ worker giữ khóa (advisory lock của PostgreSQL, hoặc flock
+# trên file với database khác) mới thực hiện. Cấu hình bằng LIFECYCLE_INTERVAL (giây, 'off' = tắt).
+# Leader cũng chạy lưu trữ booking cũ / bảo trì partition (booking_archive.py) và dọn nhật ký
+# complex_changes (complex_changes.py) mỗi ngày một lần.
+
+DEFAULT_INTERVAL_SECONDS = 60
+LIFECYCLE_BATCH_SIZE = 500
+ADVISORY_LOCK_KEY = 0x5353_4C43  # Khóa chung của mọi worker (pg_try_advisory_lock)
+
+LifecycleRule = namedtuple('LifecycleRule', ['name', 'from_status', 'to_status', 'minutes_column', 'time_column'])
+
+LIFECYCLE_RULES = (
+    LifecycleRule('completed', 'Confirmed', 'Completed', CourtComplex.autoCompleteAfterMinutes, Booking.endTime),
+    LifecycleRule('expired', 'Pending', 'Expired', CourtComplex.pendingExpiryMinutes, Booking.startTime),
+)
+
+
+class BookingLifecycle:
+    @staticmethod
+    def run_rule(rule, now, batch_size=LIFECYCLE_BATCH_SIZE):
+        """
+        Áp dụng một quy tắc cho mọi complex, trả về số booking đã chuyển.
+        Các complex dùng chung số phút được xử lý cùng nhau (ít giá trị khác nhau nên ít query),
+        mốc thời gian được tính sẵn nên điều kiện dùng được index, không cần cộng thời gian trong SQL.
+        """
+        minute_values = db.session.execute(
+            select(rule.minutes_column).where(rule.minutes_column.isnot(None)).distinct()
+        ).scalars().all()
+
+        total = 0
+        for minutes in minute_values:
+            cutoff = now - timedelta(minutes=minutes)
+            while True:
+                rows = db.session.execute(
+                    select(
+                        Booking.id, Booking.status, Booking.courtId, Booking.customerId,
+                        Booking.startTime, Booking.endTime,
+                        CourtComplex.id.label('complexId'), CourtComplex.ownerId
+                    ).join(Court, Booking.courtId == Court.id).join(
+                        CourtComplex, Court.complexId == CourtComplex.id
+                    ).where(
+                        Booking.status == rule.from_status,
+                        rule.minutes_column == minutes,
+                        rule.time_column <= cutoff
+                    ).order_by(Booking.id).limit(batch_size).with_for_update(of=Booking, skip_locked=True)
+                ).all()
+                if not rows:
+                    break
+
+                db.session.execute(
+                    update(Booking)
+                    .where(Booking.id.in_([row.id for row in rows]), Booking.status == rule.from_status)
+                    .values(status=rule.to_status)
+                    .execution_options(synchronize_session=False)
+                )
+                record_booking_status_changes(rows, rule.to_status)
+                db.session.commit()
+                total += len(rows)
+                if len(rows) < batch_size:
+                    break
+        return total
+
+    @staticmethod
+    def run_once(now=None):
+        """Một lượt của tất cả quy tắc, trả về dict tên quy tắc -> số booking đã chuyển"""
+        now = now or datetime.now()
+        result = {}
+        for rule in LIFECYCLE_RULES:
+            try:
+                result[rule.name] = BookingLifecycle.run_rule(rule, now)
+            except Exception:
+                db.session.rollback()
+                raise
+        return result
+
+
+class LeaderLock:
+    """
+    Khóa bầu leader giữa các worker. Worker giữ khóa tới khi tiến trình chết / mất kết nối,
+    khi đó worker khác lấy được ở lượt kế tiếp.
+    """
+
+    def __init__(self, engine, lock_path=None):
+        self.engine = engine
+        self.lock_path = lock_path or self.default_lock_path(engine)
+        self._conn = None
+        self._fd = None
+
+    @staticmethod
+    def default_lock_path(engine):
+        # Một file khóa cho mỗi database: các app trỏ tới database khác nhau trên cùng máy có leader riêng
+        suffix = hashlib.sha256(engine.url.render_as_string(hide_password=True).encode()).hexdigest()[:16]
+        return os.path.join(tempfile.gettempdir(), f'sportsync-lifecycle-{suffix}.lock')
+
+    def acquire(self):
+        """True nếu worker này đang (hoặc vừa trở thành) leader"""
+        if self.engine.dialect.name == 'postgresql':
+            return self._acquire_advisory()
+        return self._acquire_file()
+
+    def _acquire_advisory(self):
+        if self._conn is not None:
+            try:
+                self._conn.execute(text('SELECT 1'))
+                return True
+            except Exception:
+                # Mất kết nối: khóa session-level đã tự nhả
+                self._release_connection()
+        # Autocommit: connection giữ khóa không nằm mãi ở trạng thái "idle in transaction" giữa các lần SELECT 1
+        conn = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        try:
+            acquired = conn.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY}).scalar()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn  # Giữ connection để giữ khóa
+        return True
+
+    def _release_connection(self):
+        try:
+            self._conn.invalidate()
+        except Exception:
+            pass
+        self._conn = None
+
+    def _acquire_file(self):
+        if self._fd is not None:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+
+class LifecycleScheduler:
+    def __init__(self):
+        self.app = None
+        self.interval = None
+        self.archive_after_days = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        """Đọc cấu hình và đăng ký lệnh CLI; thread chỉ chạy khi gọi start()"""
+        app.cli.add_command(run_lifecycle_command)
+        app.cli.add_command(run_archive_command)
+        self.app = app
+        config = str(app.config.get('LIFECYCLE_INTERVAL', DEFAULT_INTERVAL_SECONDS))
+        if config == 'off':
+            self.interval = None
+            return
+        try:
+            self.interval = max(1, int(config))
+        except ValueError:
+            print(f"Invalid LIFECYCLE_INTERVAL '{config}', using {DEFAULT_INTERVAL_SECONDS}")
+            self.interval = DEFAULT_INTERVAL_SECONDS
+        self.archive_after_days = parse_archive_after_days(app.config.get('BOOKING_ARCHIVE_AFTER_DAYS'))
+
+    def start(self, app=None):
+        """Bật thread nền (gọi từ entry point của server). Trả về False nếu LIFECYCLE_INTERVAL=off"""
+        if app is not None and app is not self.app:
+            self.init_app(app)
+        if self.interval is None or self._thread is not None:
+            return self._thread is not None
+        self._thread = threading.Thread(target=self._run, name='booking-lifecycle', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        with self.app.app_context():
+            leader_lock = LeaderLock(db.engine)
+        last_archive = None
+        # Lượt đầu chạy sau một interval: không chạy trong lúc khởi động (ví dụ `flask db upgrade`)
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    if not leader_lock.acquire():
+                        continue
+                    result = BookingLifecycle.run_once()
+                    if any(result.values()):
+                        print(f"Booking lifecycle: {result}")
+
+                    if last_archive is None or datetime.now() - last_archive >= ARCHIVE_INTERVAL:
+                        last_archive = datetime.now()
+                        archive_result = BookingArchiver.run(self.archive_after_days)
+                        if any(archive_result.values()):
+                            print(f"Booking archive: {archive_result}")
+                        prune_complex_changes(db.session.connection())
+                        db.session.commit()
+                except Exception as e:
+                    print(f"Booking lifecycle run failed: {str(e)}")
+                    traceback.print_exc()
+
+
+lifecycle_scheduler = LifecycleScheduler()
+
+
+@click.command('booking-lifecycle')
+@click.option('--loop', is_flag=True, help='Chạy scheduler ở foreground (tiến trình riêng thay vì thread trong worker)')
+@with_appcontext
+def run_lifecycle_command(loop):
+    """Chạy một lượt tự động hoàn thành / hết hạn booking (ví dụ từ cron khi tắt scheduler)"""
+    if loop:
+        if lifecycle_scheduler.interval is None:
+            raise click.ClickException('LIFECYCLE_INTERVAL=off')
+        click.echo(f'booking lifecycle every {lifecycle_scheduler.interval}s')
+        lifecycle_scheduler._run()
+        return
+    result = BookingLifecycle.run_once()
+    click.echo(', '.join(f'{name}: {count}' for name, count in result.items()))
@@ -0,0 +1,89 @@
+from sqlalchemy import event, update
+
+from src.models.database import db, Notification, User
+from src.services.event_hub import event_hub
+from src.services.serializers import serialize_notification
+from src.services.signals import pending_booking_changes
+
+# Thông báo trong ứng dụng cho các thay đổi trạng thái booking.
+# Mọi đường đổi trạng thái (route của khách / chủ sân, thao tác hàng loạt, lịch đóng sân, lifecycle)
+# đều ghi nhận BookingChange trước khi commit; listener before_commit tạo notification trong cùng
+# transaction (kể cả bộ đếm unread), after_commit đẩy event 'notification' lên SSE stream của người nhận.
+# Nhiều booking cùng người nhận, cùng trạng thái trong một commit gộp thành một notification.
+
+# status mới -> (type, tiêu đề, động từ) gửi cho khách của booking
+CUSTOMER_NOTIFICATIONS = {
+    'Confirmed': ('success', 'Đơn đặt sân đã được xác nhận', 'đã được chủ sân xác nhận'),
+    'Rejected': ('error', 'Đơn đặt sân bị từ chối', 'đã bị chủ sân từ chối'),
+    'Cancelled': ('warning', 'Đơn đặt sân đã hủy', 'đã bị hủy'),
+    'Expired': ('warning', 'Đơn đặt sân đã hết hạn', 'đã hết hạn do chưa được xác nhận'),
+}
+# Booking mới của khách (không tính walk-in do chủ sân tự tạo) -> chủ sân
+OWNER_NEW_BOOKING = ('info', 'Đơn đặt sân mới', 'vừa được đặt')
+# Số mã đơn tối đa liệt kê trong nội dung của notification gộp
+MAX_LISTED_BOOKINGS = 5
+
+_PUBLISH_KEY = 'pending_notification_events'
+
+
+def _recipients(change):
+    """(userId, (type, tiêu đề, động từ)) nhận thông báo cho một BookingChange"""
+    if not change.customerId:
+        return
+    if change.previousStatus is None:
+        if change.ownerId and change.ownerId != change.customerId:
+            yield change.ownerId, OWNER_NEW_BOOKING
+    elif change.status != change.previousStatus and change.status in CUSTOMER_NOTIFICATIONS:
+        yield change.customerId, CUSTOMER_NOTIFICATIONS[change.status]
+
+
+def _message(booking_ids, verb):
+    if len(booking_ids) == 1:
+        return f'Đơn đặt sân #{booking_ids[0]} {verb}.'
+    listed = ', '.join(f'#{booking_id}' for booking_id in booking_ids[:MAX_LISTED_BOOKINGS])
+    if len(booking_ids) > MAX_LISTED_BOOKINGS:
+        listed += ', ...'
+    return f'{len(booking_ids)} đơn đặt sân ({listed}) {verb}.'
+
+
+@event.listens_for(db.session, 'before_commit')
+def _create_booking_notifications(session):
+    groups = {}  # (userId, kind) -> [booking id]
+    for change in pending_booking_changes(session):
+        for user_id, kind in _recipients(change):
+            groups.setdefault((user_id, kind), []).append(change.id)
+    if not groups:
+        return
+
+    notifications = []
+    for (user_id, (notification_type, title, verb)), booking_ids in groups.items():
+        notifications.append(Notification(
+            userId=user_id, title=title, message=_message(sorted(booking_ids), verb),
+            type=notification_type, isRead=False
+        ))
+    session.add_all(notifications)
+    session.flush()
+
+    added = {}
+    for notification in notifications:
+        added[notification.userId] = added.get(notification.userId, 0) + 1
+    for user_id, count in added.items():
+        session.connection().execute(
+            update(User.__table__).where(User.__table__.c.id == user_id)
+            .values(unreadNotificationCount=User.__table__.c.unreadNotificationCount + count)
+        )
+
+    session.info.setdefault(_PUBLISH_KEY, []).extend(
+        (notification.userId, serialize_notification(notification)) for notification in notifications
+    )
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_notifications(session):
+    for user_id, payload in session.info.pop(_PUBLISH_KEY, None) or []:
+        event_hub.publish(f'user:{user_id}', 'notification', payload)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop(_PUBLISH_KEY, None)
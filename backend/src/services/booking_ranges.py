@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, literal_column
+
+from src.models.database import db, Booking
+
+# Điều kiện thời gian dùng được index cho query booking.
+# Khoảng ngày luôn là nửa mở [ngày đầu 00:00, ngày sau ngày cuối 00:00) trên cột gốc, không bọc cột
+# trong date() / extract() (không dùng được index, và không loại được partition theo tháng trên PostgreSQL).
+# Lọc / nhóm theo đúng một ngày dùng cột Booking.bookingDate đã lưu sẵn.
+
+# Trên PostgreSQL có GiST index trên biểu thức này (migration 2e7c94a1d6b8), query phải dùng đúng biểu thức
+BOOKING_TIME_RANGE = func.tsrange(Booking.startTime, Booking.endTime, literal_column("'[)'"))
+
+
+def day_bounds(first_day, last_day=None):
+    """(đầu ngày first_day, đầu ngày sau last_day): khoảng nửa mở phủ các ngày [first_day, last_day]"""
+    start = datetime.combine(first_day, datetime.min.time())
+    end = datetime.combine(last_day or first_day, datetime.min.time()) + timedelta(days=1)
+    return start, end
+
+
+def month_bounds(day):
+    """(đầu tháng, đầu tháng sau) của tháng chứa `day`"""
+    start = datetime(day.year, day.month, 1)
+    end = datetime(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return start, end
+
+
+def within(column, start, end):
+    """start <= column < end"""
+    return and_(column >= start, column < end)
+
+
+def starts_on_days(first_day, last_day=None, booking=Booking):
+    """Booking bắt đầu trong các ngày [first_day, last_day]"""
+    return within(booking.startTime, *day_bounds(first_day, last_day))
+
+
+def overlaps(start_dt, end_dt, dialect_name=None):
+    """
+    Booking có khoảng [startTime, endTime) giao với [start_dt, end_dt).
+    PostgreSQL: toán tử && trên tsrange (dùng GiST index, không phải quét mọi booking bắt đầu trước
+    end_dt), kèm startTime < end_dt để loại các partition của những tháng sau.
+    dialect_name: mặc định theo db.engine.
+    """
+    if (dialect_name or db.engine.dialect.name) == 'postgresql':
+        requested = func.tsrange(start_dt, end_dt, literal_column("'[)'"))
+        return and_(BOOKING_TIME_RANGE.op('&&')(requested), Booking.startTime < end_dt)
+    return and_(Booking.startTime < end_dt, Booking.endTime > start_dt)
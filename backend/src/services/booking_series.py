@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta
+import uuid
+
+from src.models.database import db, Booking, Court
+from src.services.blackout_service import BlackoutService
+from src.services.booking_ranges import overlaps
+from src.services.pricing_service import PricingService, PricingError
+from src.services.signals import record_booking_change
+
+# Đặt sân định kỳ: mở rộng quy tắc lặp hàng tuần thành các buổi, kiểm tra trùng lịch của
+# tất cả các buổi bằng một query, tính giá với một lần tải bảng giá và thêm tất cả booking
+# trong một transaction.
+
+MAX_SERIES_OCCURRENCES = 52
+ACTIVE_BOOKING_STATUSES = ('Pending', 'Confirmed')
+
+
+class SeriesError(Exception):
+    """Yêu cầu đặt định kỳ không hợp lệ; route trả về status_code cùng payload"""
+
+    def __init__(self, message, status_code=400, payload=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def to_dict(self):
+        return {'error': str(self), **self.payload}
+
+
+def parse_series_datetime(value):
+    # Giờ trong DB là giờ địa phương không có timezone: bỏ timezone nếu client gửi kèm
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def _interval_dict(start_dt, end_dt):
+    return {'startTime': start_dt.isoformat(), 'endTime': end_dt.isoformat()}
+
+
+class BookingSeriesService:
+    @staticmethod
+    def parse_request(data):
+        """
+        Đọc body của yêu cầu đặt định kỳ:
+            courtId, startTime, endTime: sân và buổi đầu tiên
+            occurrences (int) hoặc until (YYYY-MM-DD): số buổi hoặc ngày kết thúc
+            intervalWeeks (int, mặc định 1): lặp mỗi N tuần
+            skipConflicts (bool): bỏ qua các buổi bị trùng thay vì từ chối cả chuỗi
+        Trả về (court, occurrences, skip_conflicts).
+        """
+        for field in ['courtId', 'startTime', 'endTime']:
+            if not data.get(field):
+                raise SeriesError(f'Missing required field: {field}')
+
+        try:
+            start_dt = parse_series_datetime(data['startTime'])
+            end_dt = parse_series_datetime(data['endTime'])
+            occurrences = int(data['occurrences']) if data.get('occurrences') else None
+            until = datetime.strptime(data['until'], '%Y-%m-%d').date() if data.get('until') else None
+            interval_weeks = int(data.get('intervalWeeks') or 1)
+        except (TypeError, ValueError):
+            raise SeriesError('Invalid startTime, endTime, occurrences, until or intervalWeeks')
+
+        if start_dt >= end_dt:
+            raise SeriesError('Start time must be before end time')
+        if (end_dt - start_dt).total_seconds() < 30 * 60:
+            raise SeriesError('Minimum booking duration is 30 minutes')
+        if start_dt < datetime.now():
+            raise SeriesError('Cannot book in the past')
+        if interval_weeks < 1:
+            raise SeriesError('intervalWeeks must be at least 1')
+
+        court = Court.query.options(db.joinedload(Court.complex)).get(data['courtId'])
+        if not court or court.status != 'Active':
+            raise SeriesError('Court not found or inactive', 404)
+
+        complex = court.complex
+        # Các buổi cùng giờ trong ngày nên chỉ cần kiểm tra giờ hoạt động một lần
+        if start_dt.time() < complex.openTime or end_dt.time() > complex.closeTime:
+            raise SeriesError(
+                f'Giờ đặt sân nằm ngoài giờ hoạt động của khu phức hợp ({complex.openTime.strftime("%H:%M")} - {complex.closeTime.strftime("%H:%M")}).'
+            )
+
+        series = BookingSeriesService.expand_weekly(start_dt, end_dt, occurrences, until, interval_weeks)
+        return court, series, bool(data.get('skipConflicts'))
+
+    @staticmethod
+    def expand_weekly(start_dt, end_dt, occurrences=None, until=None, interval_weeks=1):
+        """Các buổi (start, end) của quy tắc lặp hàng tuần, tối đa MAX_SERIES_OCCURRENCES buổi"""
+        if not occurrences and not until:
+            raise SeriesError('Provide either occurrences or until')
+        if occurrences and occurrences > MAX_SERIES_OCCURRENCES:
+            raise SeriesError(f'A series can have at most {MAX_SERIES_OCCURRENCES} occurrences')
+
+        step = timedelta(weeks=interval_weeks)
+        series = []
+        current_start, current_end = start_dt, end_dt
+        while (not occurrences or len(series) < occurrences) and (not until or current_start.date() <= until):
+            if len(series) == MAX_SERIES_OCCURRENCES:
+                raise SeriesError(f'A series can have at most {MAX_SERIES_OCCURRENCES} occurrences')
+            series.append((current_start, current_end))
+            current_start += step
+            current_end += step
+
+        if not series:
+            raise SeriesError('The recurrence rule produces no occurrences')
+        return series
+
+    @staticmethod
+    def find_conflicts(court, series):
+        """
+        Chỉ số các buổi bị trùng booking đang hoạt động hoặc lịch đóng của sân.
+        Một query booking cho cả chuỗi: OR các điều kiện overlap (dùng được index, xem booking_ranges),
+        và một query lịch đóng sân cho cả khoảng của chuỗi.
+        """
+        existing = db.session.query(Booking.startTime, Booking.endTime).filter(
+            Booking.courtId == court.id,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            db.or_(*(overlaps(start_dt, end_dt) for start_dt, end_dt in series))
+        ).all()
+        existing += BlackoutService.court_blackouts(
+            db.session, {court.id: court.complexId}, series[0][0], series[-1][1]
+        )[court.id]
+
+        return {
+            index for index, (start_dt, end_dt) in enumerate(series)
+            if any(row.startTime < end_dt and row.endTime > start_dt for row in existing)
+        }
+
+    @staticmethod
+    def create_series(court, series, skip_conflicts, **booking_fields):
+        """
+        Tạo booking cho các buổi của chuỗi (trong một transaction).
+        booking_fields: customerId / walkInCustomerName / walkInCustomerPhone / status / bookingType.
+        Trả về series_summary, trong đó 'skipped' là các buổi bị trùng (booking hoặc lịch đóng sân) đã bỏ qua.
+        """
+        conflicts = BookingSeriesService.find_conflicts(court, series)
+        skipped = [_interval_dict(*series[index]) for index in sorted(conflicts)]
+        if conflicts and not skip_conflicts:
+            raise SeriesError('Some occurrences are already booked', 409, {'conflicts': skipped})
+
+        to_create = [interval for index, interval in enumerate(series) if index not in conflicts]
+        if not to_create:
+            raise SeriesError('All occurrences are already booked', 409, {'conflicts': skipped})
+
+        # Một lần tải bảng giá cho cả chuỗi; các buổi cùng thứ và cùng giờ có cùng giá
+        rates = PricingService.load_rates(court.id, [start_dt for start_dt, _ in to_create])
+        prices = {}
+        try:
+            for start_dt, end_dt in to_create:
+                key = (start_dt.weekday(), start_dt.time(), end_dt.time())
+                if key not in prices:
+                    prices[key] = float(PricingService.price_interval(rates, start_dt, end_dt))
+        except PricingError as e:
+            raise SeriesError(str(e))
+
+        series_id = str(uuid.uuid4())
+        bookings = [
+            Booking(
+                courtId=court.id,
+                startTime=start_dt,
+                endTime=end_dt,
+                totalPrice=prices[(start_dt.weekday(), start_dt.time(), end_dt.time())],
+                seriesId=series_id,
+                **booking_fields
+            )
+            for start_dt, end_dt in to_create
+        ]
+        db.session.add_all(bookings)
+        db.session.flush()  # Insert nhiều dòng một lần và lấy id
+        for booking in bookings:
+            record_booking_change(booking, complex=court.complex)
+        # Dựng kết quả trước khi commit làm hết hạn các object (tránh một SELECT cho mỗi booking)
+        summary = BookingSeriesService.series_summary(court, bookings, skipped)
+        db.session.commit()
+        return summary
+
+    @staticmethod
+    def series_summary(court, bookings, skipped):
+        """Body JSON (và dữ liệu email) của một chuỗi vừa tạo"""
+        booking_data = [
+            {
+                'id': booking.id,
+                'startTime': booking.startTime.isoformat(),
+                'endTime': booking.endTime.isoformat(),
+                'totalPrice': float(booking.totalPrice)
+            }
+            for booking in bookings
+        ]
+        return {
+            'seriesId': bookings[0].seriesId,
+            'courtId': court.id,
+            'courtName': court.name,
+            'complexName': court.complex.name,
+            'status': bookings[0].status,
+            'bookings': booking_data,
+            'skipped': skipped,
+            'totalPrice': sum(item['totalPrice'] for item in booking_data)
+        }
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+import time
+
+from sqlalchemy import delete, func, insert, or_, select
+
+from src.models.database import db, ComplexChange
+
+# Nhật ký thay đổi thông tin complex (bảng complex_changes) cho dữ liệu giữ trong bộ nhớ của mỗi worker
+# (index facet, geo, dữ liệu tham chiếu). Mỗi commit có record_complex_change thêm một dòng cho mỗi complex,
+# seq tăng dần; commit sửa loại sân / tiện ích thêm một dòng complexId NULL (reference_data.py).
+# Trước mỗi lần dùng, index chỉ đọc các dòng có seq lớn hơn seq đã thấy (range scan trên khóa chính, thường
+# không có dòng nào) và nạp lại đúng các complex đó, kể cả khi thay đổi được ghi ở worker khác.
+# Booking không ghi vào nhật ký: index không phụ thuộc booking.
+#
+# Seq được cấp lúc INSERT nhưng transaction commit theo thứ tự khác: seq còn thiếu bên dưới seq lớn nhất đã thấy
+# được giữ lại và đọc lại ở các lần sau, tới khi thấy hoặc quá CHANGE_GAP_SECONDS (transaction đã rollback).
+
+CHANGE_GAP_SECONDS = 60
+# Bỏ theo dõi khoảng trống quá lớn (sequence bị đặt lại...): lần nạp lại toàn bộ định kỳ của index sẽ bù
+MAX_TRACKED_GAPS = 1000
+# Nhật ký cũ hơn số ngày này được xóa (leader của booking lifecycle chạy mỗi ngày)
+CHANGE_RETENTION_DAYS = 1
+
+_changes = ComplexChange.__table__
+
+
+def log_complex_changes(conn, complex_ids):
+    """Ghi các complex vừa thay đổi vào nhật ký, trong transaction hiện tại của `conn` (None: dữ liệu tham chiếu)"""
+    if complex_ids:
+        conn.execute(insert(_changes), [{'complexId': complex_id} for complex_id in complex_ids])
+
+
+def prune_complex_changes(conn, now=None):
+    """Xóa nhật ký cũ hơn CHANGE_RETENTION_DAYS, trả về số dòng đã xóa"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=CHANGE_RETENTION_DAYS)
+    return conn.execute(delete(_changes).where(_changes.c.createdAt < cutoff)).rowcount
+
+
+class ComplexChangeSync:
+    """
+    Mixin cho index trong bộ nhớ: _start_position() trước khi nạp toàn bộ, sync_changed() trước mỗi lần dùng.
+    Class dùng mixin cần có self._lock và refresh_complex(conn, complex_id); reference_data_changed() được gọi
+    khi có dòng complexId NULL (mặc định bỏ qua).
+    """
+
+    _last_seq = None  # None: chưa nạp
+    _gaps = None  # seq còn thiếu -> thời điểm phát hiện (time.monotonic()), thay bằng dict mới mỗi lần đổi
+
+    def _start_position(self, conn):
+        """
+        (seq lớn nhất, khoảng trống) của nhật ký; gọi trước khi đọc dữ liệu để thay đổi xen giữa được thấy lần sau.
+        Seq còn thiếu gần cuối nhật ký có thể thuộc transaction chưa commit nên cũng được theo dõi.
+        """
+        last_seq = conn.execute(select(func.coalesce(func.max(_changes.c.seq), 0))).scalar()
+        recent = set(conn.execute(
+            select(_changes.c.seq).where(_changes.c.seq > last_seq - MAX_TRACKED_GAPS)
+        ).scalars())
+        now = time.monotonic()
+        first = max(1, last_seq - MAX_TRACKED_GAPS + 1)
+        return last_seq, {seq: now for seq in range(first, last_seq) if seq not in recent}
+
+    def reference_data_changed(self):
+        pass
+
+    def _pending_changes(self, conn, last_seq, gaps):
+        condition = _changes.c.seq > last_seq
+        if gaps:
+            condition = or_(condition, _changes.c.seq.in_(list(gaps)))
+        return conn.execute(select(_changes.c.seq, _changes.c.complexId).where(condition).order_by(_changes.c.seq)).all()
+
+    def sync_changed(self, conn):
+        if self._last_seq is None:
+            return
+        rows = self._pending_changes(conn, self._last_seq, self._gaps)
+        now = time.monotonic()
+        if not rows and all(now - seen < CHANGE_GAP_SECONDS for seen in self._gaps.values()):
+            return
+
+        with self._lock:
+            # Đọc lại trong lock: thread khác có thể vừa áp dụng các thay đổi này
+            last_seq, gaps = self._last_seq, dict(self._gaps)
+            rows = self._pending_changes(conn, last_seq, gaps)
+            for complex_id in dict.fromkeys(row.complexId for row in rows):
+                if complex_id is None:
+                    self.reference_data_changed()
+                else:
+                    self.refresh_complex(conn, complex_id)
+
+            for row in rows:
+                gaps.pop(row.seq, None)
+            seen = {row.seq for row in rows}
+            max_seq = max([last_seq] + list(seen))
+            if max_seq - last_seq <= MAX_TRACKED_GAPS:
+                gaps.update((seq, now) for seq in range(last_seq + 1, max_seq) if seq not in seen)
+            self._gaps = {seq: found for seq, found in gaps.items() if now - found < CHANGE_GAP_SECONDS}
+            self._last_seq = max_seq
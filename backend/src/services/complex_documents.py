@@ -0,0 +1,155 @@
+import traceback
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from src.models.database import db, Amenity, ComplexDocument, CourtComplex, CourtComplexAmenity, Review, User
+from src.services.complex_loading import build_detail_document, build_full_document, load_complex, load_complexes
+from src.services.signals import pending_complex_changes, record_complex_change
+
+# Document JSON dựng sẵn của trang chi tiết complex (bảng complex_documents), mỗi complex một dòng cho mỗi loại:
+#   public -> /api/public/court-complexes/<id> (chỉ có khi complex Active)
+#   full   -> /api/court-complexes/<id>
+# Khi commit một transaction có record_complex_change (owner sửa complex, sân, giá, ảnh, tiện ích, review...),
+# document của các complex đó được dựng lại và ghi trong chính transaction đó: đọc là một lookup theo khóa
+# và trả nguyên văn body, không serialize lại.
+# Document còn chứa dữ liệu của bảng khác (tên khách trong review, tên / icon tiện ích): sửa / xóa các dòng đó
+# qua ORM cũng đánh dấu các complex liên quan (listener before_flush bên dưới). UPDATE hàng loạt không qua ORM
+# trên các cột này thì phải tự gọi record_complex_change.
+# Complex chưa có document (dữ liệu cũ trước khi chạy `flask complex-documents`) được dựng trực tiếp khi đọc.
+
+DOCUMENT_KINDS = {
+    # kind -> (strategy load quan hệ, hàm dựng document, complex có được hiển thị không)
+    'public': ('detail', build_detail_document, lambda complex: complex.status == 'Active'),
+    'full': ('full', build_full_document, lambda complex: True),
+}
+REBUILD_BATCH_SIZE = 100
+
+# Cột của bảng khác được chép vào document -> query các complex có document chứa dòng đó
+DOCUMENT_SOURCES = (
+    (User, ('fullName',), lambda ids: select(Review.complexId).where(Review.customerId.in_(ids))),
+    (Amenity, ('name', 'icon'), lambda ids: select(CourtComplexAmenity.complexId).where(CourtComplexAmenity.amenityId.in_(ids))),
+)
+
+
+class ComplexDocumentStore:
+    @staticmethod
+    def build(complex, kind):
+        """Body JSON của document `kind`, None nếu complex không hiển thị ở loại này"""
+        _, builder, visible = DOCUMENT_KINDS[kind]
+        if not visible(complex):
+            return None
+        return current_app.json.dumps(builder(complex))
+
+    @staticmethod
+    def regenerate(connection, complex_ids):
+        """Dựng lại mọi document của các complex, ghi qua `connection` (trong transaction hiện tại)"""
+        complex_ids = sorted(set(complex_ids))
+        if not complex_ids:
+            return
+
+        rows = []
+        try:
+            # Session riêng trên cùng connection: identity map mới nên đọc đúng dữ liệu vừa flush
+            # (collection đã load trong db.session có thể chưa có ảnh / sân vừa thêm)
+            with Session(bind=connection) as session:
+                strategies = {strategy for strategy, _, _ in DOCUMENT_KINDS.values()}
+                for complex in load_complexes(complex_ids, sorted(strategies), session):
+                    for kind in DOCUMENT_KINDS:
+                        body = ComplexDocumentStore.build(complex, kind)
+                        if body is not None:
+                            rows.append({'complexId': complex.id, 'kind': kind, 'version': complex.version, 'body': body})
+        except Exception as e:
+            # Không để lỗi dựng document làm hỏng thao tác ghi: xóa document cũ, lần đọc sau dựng trực tiếp
+            print(f"Failed to build complex documents for {complex_ids}: {str(e)}")
+            traceback.print_exc()
+            rows = []
+
+        table = ComplexDocument.__table__
+        connection.execute(delete(table).where(table.c.complexId.in_(complex_ids)))
+        if rows:
+            connection.execute(insert(table), rows)
+
+    @staticmethod
+    def get(complex_id, kind):
+        """Body đã lưu, None nếu chưa có"""
+        return db.session.query(ComplexDocument.body).filter(
+            ComplexDocument.complexId == complex_id,
+            ComplexDocument.kind == kind
+        ).scalar()
+
+    @staticmethod
+    def document_json(complex_id, kind):
+        """
+        (body JSON, lấy từ bảng hay không); (None, False) nếu complex không tồn tại / không hiển thị.
+        Không có document lưu sẵn thì dựng trực tiếp (không ghi khi đang đọc, request có thể đang ở replica).
+        """
+        body = ComplexDocumentStore.get(complex_id, kind)
+        if body is not None:
+            return body, True
+        complex = load_complex(complex_id, DOCUMENT_KINDS[kind][0])
+        if complex is None:
+            return None, False
+        return ComplexDocumentStore.build(complex, kind), False
+
+    @staticmethod
+    def rebuild_all(batch_size=REBUILD_BATCH_SIZE):
+        """Dựng lại document của mọi complex, mỗi lô một transaction. Trả về số complex"""
+        total = 0
+        last_id = 0
+        while True:
+            complex_ids = db.session.query(CourtComplex.id).filter(CourtComplex.id > last_id).order_by(
+                CourtComplex.id
+            ).limit(batch_size).all()
+            if not complex_ids:
+                return total
+            complex_ids = [row.id for row in complex_ids]
+            try:
+                ComplexDocumentStore.regenerate(db.session.connection(), complex_ids)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            total += len(complex_ids)
+            last_id = complex_ids[-1]
+
+
+def _changed_ids(session, model, fields):
+    """id các object `model` bị xóa hoặc đổi một trong `fields` trong lần flush này"""
+    ids = {obj.id for obj in session.deleted if isinstance(obj, model)}
+    for obj in session.dirty:
+        if isinstance(obj, model) and obj.id not in ids:
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in fields):
+                ids.add(obj.id)
+    return ids
+
+
+@event.listens_for(db.session, 'before_flush')
+def _track_document_sources(session, flush_context, instances):
+    for model, fields, complexes_of in DOCUMENT_SOURCES:
+        ids = _changed_ids(session, model, fields)
+        if not ids:
+            continue
+        # Đang flush: query thẳng trên connection (không autoflush)
+        for complex_id in session.connection().execute(complexes_of(sorted(ids)).distinct()).scalars():
+            record_complex_change(complex_id, session)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _regenerate_changed_documents(session):
+    # Đăng ký sau listener tăng version của signals.py: document lưu version mới
+    complex_ids = pending_complex_changes(session)
+    if complex_ids:
+        session.flush()  # before_commit chạy trước lần flush cuối của commit: ghi các thay đổi còn chờ trước khi đọc
+        ComplexDocumentStore.regenerate(session.connection(), complex_ids)
+
+
+@click.command('complex-documents')
+@with_appcontext
+def rebuild_documents_command():
+    """Dựng lại document chi tiết của mọi complex (chạy sau migration tạo bảng complex_documents)"""
+    click.echo(f'complex documents rebuilt: {ComplexDocumentStore.rebuild_all()}')
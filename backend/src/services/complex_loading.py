@@ -0,0 +1,124 @@
+from operator import attrgetter
+
+from sqlalchemy.orm import selectinload
+
+from src.models.database import db, Court, CourtComplex, CourtComplexAmenity, Review
+from src.services.serializers import serialize_many, serialize_court, serialize_review_summary
+
+# Cách load quan hệ của CourtComplex theo từng màn hình.
+# Quy tắc: collection (ảnh, sân, tiện ích, review) dùng selectinload, mỗi collection một query
+# "WHERE complexId IN (...)"; joinedload chỉ dùng cho quan hệ many-to-one (amenity của một dòng
+# CourtComplexAmenity, customer của một review) vì không nhân số dòng.
+# Nhiều joinedload collection trong cùng một câu lệnh sinh tích Descartes
+# ảnh × tiện ích × sân × review mà SQLAlchemy phải khử trùng lặp trong Python.
+
+COMPLEX_LOADERS = {
+    # Trang chi tiết công khai
+    'detail': (
+        selectinload(CourtComplex.images),
+        selectinload(CourtComplex.amenities_rel).joinedload(CourtComplexAmenity.amenity),
+        selectinload(CourtComplex.courts),
+        selectinload(CourtComplex.reviews).joinedload(Review.customer),
+    ),
+    # /api/court-complexes/<id>: sân kèm bảng giá
+    'full': (
+        selectinload(CourtComplex.images),
+        selectinload(CourtComplex.amenities_rel).joinedload(CourtComplexAmenity.amenity),
+        selectinload(CourtComplex.courts).selectinload(Court.hourly_rates),
+    ),
+}
+
+_by_id = attrgetter('id')
+
+
+def load_complexes(complex_ids, strategies=('detail',), session=None):
+    """Các complex theo id, load quan hệ theo các strategy (gộp options khi cần nhiều document)"""
+    options = [option for strategy in strategies for option in COMPLEX_LOADERS[strategy]]
+    return (session or db.session).query(CourtComplex).options(*options).filter(
+        CourtComplex.id.in_(list(complex_ids))
+    ).all()
+
+
+def load_complex(complex_id, strategy='detail', session=None):
+    complexes = load_complexes([complex_id], (strategy,), session)
+    return complexes[0] if complexes else None
+
+
+def build_detail_document(complex):
+    """Body của /api/public/court-complexes/<id> từ complex đã load theo strategy 'detail'"""
+    # Các collection sắp theo id: document giống nhau mỗi lần dựng lại
+    all_image_urls = [img.imageUrl for img in sorted(complex.images, key=_by_id)]
+
+    # Tìm mainImageIndex (nếu có)
+    main_image_index = 0
+    if complex.mainImage and complex.mainImage in all_image_urls:
+        main_image_index = all_image_urls.index(complex.mainImage)
+
+    return {
+        'id': complex.id,
+        'name': complex.name,
+        'address': complex.address,
+        'city': complex.city,
+        'description': complex.description,
+        'phoneNumber': complex.phoneNumber,
+        'sportType': complex.sportType,
+        'googleMapLink': complex.googleMapLink,
+        'openTime': complex.openTime.strftime('%H:%M') if complex.openTime else None,
+        'closeTime': complex.closeTime.strftime('%H:%M') if complex.closeTime else None,
+        'amenities': [{'id': cca.amenity.id, 'name': cca.amenity.name, 'icon': cca.amenity.icon} for cca in sorted(complex.amenities_rel, key=_by_id)],
+        'images': all_image_urls,
+        'mainImageIndex': main_image_index,
+        'mainImage': complex.mainImage,
+        'rating': float(complex.rating) if complex.rating else 0,
+        'reviewCount': complex.totalReviews,
+        'status': complex.status,
+        'courts': serialize_many(serialize_court, sorted(complex.courts, key=_by_id)),
+        'reviews': serialize_many(serialize_review_summary, sorted(complex.reviews, key=_by_id)),
+        # Trang chi tiết chưa tính khoảng giá (cần thêm query trên HourlyPriceRate)
+        'priceRange': {'min': None, 'max': None}
+    }
+
+
+
+def build_full_document(complex):
+    """Body của /api/court-complexes/<id> (sân Active kèm bảng giá, ảnh, tiện ích) từ strategy 'full'"""
+    courts_data = []
+    for court in sorted(complex.courts, key=_by_id):
+        if court.status != 'Active':
+            continue
+        courts_data.append({
+            'id': court.id,
+            'name': court.name,
+            'status': court.status,
+            'pricing': [{
+                'id': rate.id,
+                'dayOfWeek': rate.dayOfWeek,
+                'startTime': rate.startTime.strftime('%H:%M'),
+                'endTime': rate.endTime.strftime('%H:%M'),
+                'price': float(rate.price)
+            } for rate in sorted(court.hourly_rates, key=_by_id)]
+        })
+
+    return {
+        'id': complex.id,
+        'ownerId': complex.ownerId,
+        'name': complex.name,
+        'address': complex.address,
+        'city': complex.city,
+        'description': complex.description,
+        'phoneNumber': complex.phoneNumber,
+        'sportType': complex.sportType,
+        'openTime': complex.openTime.strftime('%H:%M') if complex.openTime else None,
+        'closeTime': complex.closeTime.strftime('%H:%M') if complex.closeTime else None,
+        'mainImage': complex.mainImage,
+        'rating': float(complex.rating) if complex.rating else 0,
+        'totalReviews': complex.totalReviews or 0,
+        'status': complex.status,
+        'createdAt': complex.createdAt.isoformat(),
+        'courts': courts_data,
+        'images': [{'id': img.id, 'imageUrl': img.imageUrl, 'isMain': img.isMain} for img in sorted(complex.images, key=_by_id)],
+        'amenities': [
+            {'id': cca.amenity.id, 'name': cca.amenity.name, 'icon': cca.amenity.icon}
+            for cca in sorted(complex.amenities_rel, key=_by_id) if cca.amenity
+        ]
+    }
@@ -0,0 +1,261 @@
+import gzip
+import mimetypes
+import os
+import re
+import zlib
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:  # brotli là tùy chọn: không có thì chỉ dùng gzip
+    brotli = None
+
+# Nén response động (JSON lớn: danh sách booking của owner, availability nhiều ngày, danh sách user...)
+# theo Accept-Encoding của client, và phục vụ file tĩnh của frontend bằng bản nén sẵn (.br/.gz).
+# Cấu hình bằng COMPRESSION_MIN_SIZE: kích thước tối thiểu (byte) để nén, 'off' để tắt
+# (ví dụ khi reverse proxy đã nén).
+
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Response động: ưu tiên tốc độ nén
+STREAM_FLUSH_BYTES = 64 * 1024
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'application/x-ndjson', 'application/xml',
+    'image/svg+xml', 'text/css', 'text/csv', 'text/html', 'text/javascript', 'text/plain', 'text/xml',
+}
+
+# File tĩnh: nén sẵn ở mức cao nhất bằng `flask precompress-static`
+STATIC_COMPRESSIBLE_EXTENSIONS = ('.css', '.html', '.js', '.json', '.map', '.mjs', '.svg', '.txt', '.xml', '.ico')
+STATIC_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+# Output của Vite trong assets/ có hash 8 ký tự base64url trong tên file (assets/index-CPSPqwm_.css): nội dung
+# không bao giờ đổi. File public/ (favicon, apple-touch-icon.png...) được copy nguyên tên ra thư mục gốc, luôn revalidate.
+HASHED_ASSET_PATTERN = re.compile(r'^assets/[^/]+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(available=None):
+    """Encoding tốt nhất mà client chấp nhận (q > 0) trong số các encoding có sẵn, None nếu không có"""
+    accept = request.accept_encodings
+    for encoding in available or _supported_encodings():
+        if accept.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compress_stream(chunks, encoding):
+    """
+    Nén response dạng stream. Dữ liệu được flush sau mỗi STREAM_FLUSH_BYTES byte đầu vào
+    để client nhận dần trong khi server còn đang sinh, mà không flush từng dòng nhỏ (làm hỏng tỉ lệ nén).
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # Định dạng gzip
+        compress, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    pending = 0
+    for chunk in chunks:
+        data = compress(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            data += flush()
+            pending = 0
+        if data:
+            yield data
+    yield finish()
+
+
+def _add_vary(response):
+    response.vary.add('Accept-Encoding')
+
+
+def _weaken_etag(response):
+    # Bản nén là biểu diễn khác của cùng nội dung: ETag mạnh đổi thành ETag yếu
+    # (If-None-Match vẫn so sánh yếu nên 304 hoạt động như cũ)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+class ResponseCompressor:
+    def __init__(self):
+        self.min_size = DEFAULT_MIN_SIZE
+
+    def init_app(self, app):
+        config = str(app.config.get('COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE))
+        if config == 'off':
+            self.min_size = None
+            return
+        try:
+            self.min_size = int(config)
+        except ValueError:
+            print(f"Invalid COMPRESSION_MIN_SIZE '{config}', using {DEFAULT_MIN_SIZE}")
+            self.min_size = DEFAULT_MIN_SIZE
+        app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        if (
+            request.method == 'HEAD'
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or response.direct_passthrough  # send_file / file tĩnh: xử lý riêng bằng bản nén sẵn
+        ):
+            return response
+
+        if response.is_streamed:
+            # Không biết trước kích thước (export CSV/NDJSON...): luôn nén dạng stream
+            _add_vary(response)
+            encoding = negotiate_encoding()
+            if encoding is None:
+                return response
+            response.response = _compress_stream(response.iter_encoded(), encoding)
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Length', None)
+            _weaken_etag(response)
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        _add_vary(response)
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+        compressed = _compress(data, encoding)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        _weaken_etag(response)
+        return response
+
+
+response_compressor = ResponseCompressor()
+
+
+class StaticAssets:
+    """
+    Manifest các file tĩnh của frontend, dựng một lần lúc khởi động:
+    path -> (các bản nén sẵn còn mới, có phải asset có hash hay không).
+    Route serve tra manifest thay vì gọi os.path.exists cho mỗi request.
+    """
+
+    def __init__(self):
+        self.folder = None
+        self.manifest = {}
+
+    def init_app(self, app):
+        self.folder = app.static_folder
+        self.manifest = self.build_manifest(self.folder) if self.folder else {}
+        app.cli.add_command(precompress_static_command)
+
+    @staticmethod
+    def build_manifest(folder):
+        manifest = {}
+        if not os.path.isdir(folder):
+            return manifest
+        variant_suffixes = tuple(suffix for _, suffix in STATIC_VARIANTS)
+        for root, _, files in os.walk(folder):
+            names = set(files)
+            for name in files:
+                if name.endswith(variant_suffixes):
+                    continue
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, folder).replace(os.sep, '/')
+                source_mtime = os.path.getmtime(full_path)
+
+                # Chỉ dùng bản nén không cũ hơn file gốc (file gốc có thể đã được build lại)
+                variants = {}
+                for encoding, suffix in STATIC_VARIANTS:
+                    if name + suffix in names and os.path.getmtime(full_path + suffix) >= source_mtime:
+                        variants[encoding] = path + suffix
+
+                manifest[path] = {
+                    'mimetype': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                    'variants': variants,
+                    'immutable': bool(HASHED_ASSET_PATTERN.match(path)),
+                }
+        return manifest
+
+    def has(self, path):
+        return path in self.manifest
+
+    def send(self, path):
+        entry = self.manifest[path]
+        variants = entry['variants']
+        encoding = negotiate_encoding([e for e, _ in STATIC_VARIANTS if e in variants]) if variants else None
+
+        response = send_from_directory(
+            self.folder, variants[encoding] if encoding else path,
+            mimetype=entry['mimetype'],
+            max_age=IMMUTABLE_MAX_AGE if entry['immutable'] else None,
+        )
+        if variants:
+            _add_vary(response)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if entry['immutable']:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True  # index.html...: luôn revalidate để nhận bản build mới
+        return response
+
+
+static_assets = StaticAssets()
+
+
+def precompress_folder(folder, min_size=DEFAULT_MIN_SIZE):
+    """Tạo bản .gz (và .br nếu có brotli) cho các file tĩnh nén được; trả về số file đã ghi"""
+    written = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if not name.endswith(STATIC_COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+
+            outputs = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                outputs.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, compressed in outputs:
+                if len(compressed) >= len(data):
+                    continue
+                tmp_path = f'{path}{suffix}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path + suffix)
+                written += 1
+    return written
+
+
+@click.command('precompress-static')
+@click.option('--min-size', default=DEFAULT_MIN_SIZE, show_default=True, help='Bỏ qua file nhỏ hơn (byte)')
+@with_appcontext
+def precompress_static_command(min_size):
+    """Nén sẵn file tĩnh của frontend (.gz, .br) sau khi build"""
+    folder = current_app.static_folder
+    written = precompress_folder(folder, min_size)
+    if brotli is None:
+        click.echo('brotli is not installed, only .gz files were generated')
+    click.echo(f'Wrote {written} precompressed files in {folder}')
@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+# Đọc từ read replica (DATABASE_REPLICA_URLS, mỗi URL là một bind 'replica_N' của Flask-SQLAlchemy).
+#  - Request GET/HEAD và các endpoint đánh dấu @replica_read đọc từ một replica chọn ngẫu nhiên cho cả request.
+#    @primary_read bắt một endpoint GET luôn đọc primary.
+#  - Mọi thao tác ghi (flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE, text()) đi primary;
+#    sau lần ghi đầu tiên phần còn lại của request cũng đọc primary.
+#  - Read-your-writes: sau request có ghi, user (theo JWT identity trong worker này, và theo cookie
+#    cho mọi worker) được ghim vào primary trong REPLICA_PIN_SECONDS giây.
+#  - Replica lỗi kết nối bị bỏ qua REPLICA_RETRY_SECONDS giây, các request đó đọc primary.
+# Ngoài request (scheduler, CLI, receiver của signal) luôn dùng primary.
+
+REPLICA_BIND_PREFIX = 'replica_'
+DEFAULT_PIN_SECONDS = 5
+REPLICA_RETRY_SECONDS = 30
+PIN_COOKIE = 'db_primary_until'
+READ_METHODS = ('GET', 'HEAD')
+
+
+def replica_urls(value):
+    """Đọc DATABASE_REPLICA_URLS (phân cách bằng dấu phẩy) thành SQLALCHEMY_BINDS của các replica"""
+    urls = [url.strip() for url in (value or '').split(',') if url.strip()]
+    return {f'{REPLICA_BIND_PREFIX}{index}': url for index, url in enumerate(urls)}
+
+
+def replica_read(view):
+    """Endpoint chỉ đọc (kể cả POST, ví dụ kiểm tra lịch trống) được phép đọc từ replica"""
+    view._db_route = 'replica'
+    return view
+
+
+def primary_read(view):
+    """Endpoint GET cần dữ liệu mới nhất: luôn đọc primary"""
+    view._db_route = 'primary'
+    return view
+
+
+def _is_write(clause):
+    if clause is None:
+        return False
+    if isinstance(clause, (UpdateBase, TextClause)):
+        return True
+    return getattr(clause, '_for_update_arg', None) is not None
+
+
+class RoutingSession(Session):
+    """db.session: đọc từ replica đã chọn cho request, ghi về primary"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or _is_write(clause):
+                database_router.mark_write()
+            else:
+                engine = database_router.request_read_engine()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class DatabaseRouter:
+    def __init__(self):
+        self.replica_keys = []
+        self.pin_seconds = DEFAULT_PIN_SECONDS
+        self._down_until = {}
+        self._pinned_until = {}  # identity -> thời điểm hết ghim (trong worker này)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        binds = app.config.get('SQLALCHEMY_BINDS') or {}
+        self.replica_keys = sorted(key for key in binds if key.startswith(REPLICA_BIND_PREFIX))
+        try:
+            self.pin_seconds = max(0, int(app.config.get('REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)))
+        except (TypeError, ValueError):
+            self.pin_seconds = DEFAULT_PIN_SECONDS
+        if not self.replica_keys:
+            return
+
+        with app.app_context():
+            engines = app.extensions['sqlalchemy'].engines
+            for key in self.replica_keys:
+                event.listen(engines[key], 'handle_error', self._make_error_handler(key))
+        app.before_request(self._choose_route)
+        app.after_request(self._pin_after_write)
+        print(f"Read replicas enabled: {len(self.replica_keys)}")
+
+    @property
+    def enabled(self):
+        return bool(self.replica_keys)
+
+    def _make_error_handler(self, key):
+        def handle_error(context):
+            if context.is_disconnect or context.connection is None:
+                # Không kết nối được replica: tạm bỏ qua, các request sau đọc primary
+                self._down_until[key] = time.monotonic() + REPLICA_RETRY_SECONDS
+                print(f"Read replica {key} unavailable, falling back to primary for {REPLICA_RETRY_SECONDS}s")
+        return handle_error
+
+    def _request_identity(self):
+        try:
+            verify_jwt_in_request(optional=True)
+            return get_jwt_identity()
+        except Exception:
+            return None  # Token sai / hết hạn: view sẽ tự trả lỗi
+
+    def _is_pinned(self, identity):
+        now = time.time()
+        try:
+            if float(request.cookies.get(PIN_COOKIE, 0)) > now:
+                return True
+        except ValueError:
+            pass
+        return identity is not None and self._pinned_until.get(identity, 0) > now
+
+    def _choose_route(self):
+        g.db_replica = None
+        g.db_wrote = False
+        view = current_app.view_functions.get(request.endpoint)
+        route = getattr(view, '_db_route', None)
+        if route == 'primary' or (route is None and request.method not in READ_METHODS):
+            return
+
+        g.db_identity = self._request_identity()
+        if self._is_pinned(g.db_identity):
+            return
+
+        now = time.monotonic()
+        healthy = [key for key in self.replica_keys if self._down_until.get(key, 0) <= now]
+        if healthy:
+            g.db_replica = random.choice(healthy)
+
+    def mark_write(self):
+        if self.enabled:
+            g.db_wrote = True
+
+    def request_read_engine(self):
+        """Engine replica của request hiện tại, None nếu request đọc primary"""
+        if not self.enabled or g.get('db_wrote') or not g.get('db_replica'):
+            return None
+        return current_app.extensions['sqlalchemy'].engines[g.db_replica]
+
+    def read_engine(self):
+        """Engine để đọc bằng Core ngoài db.session (ví dụ export dạng stream)"""
+        return self.request_read_engine() or current_app.extensions['sqlalchemy'].engine
+
+    def _pin_after_write(self, response):
+        if not g.get('db_wrote') or not self.pin_seconds:
+            return response
+        until = time.time() + self.pin_seconds
+        identity = g.get('db_identity', None)
+        if identity is None:
+            identity = self._request_identity()
+        if identity is not None:
+            with self._lock:
+                self._pinned_until[identity] = until
+                # Dọn các user đã hết ghim
+                if len(self._pinned_until) > 10000:
+                    now = time.time()
+                    self._pinned_until = {k: v for k, v in self._pinned_until.items() if v > now}
+        response.set_cookie(PIN_COOKIE, f'{until:.3f}', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+database_router = DatabaseRouter()
@@ -8,6 +8,9 @@ import traceback # <<< Đảm bảo traceback được import
 # Configure Resend
 resend.api_key = os.getenv('RESEND_API_KEY', 'your-resend-api-key')
 
+# Số email tối đa trong một lần gọi batch API của Resend
+BATCH_SIZE = 100
+
 class EmailService:
     @staticmethod
     def send_booking_confirmation(user_email, user_name, booking_data):
@@ -101,78 +104,84 @@ class EmailService:
             return {"success": False, "error": str(e)}
     
     @staticmethod
-    def send_booking_cancellation(user_email, user_name, booking_data):
-        """Send booking cancellation email to customer."""
-        try:
-            start_time = datetime.fromisoformat(booking_data['startTime'].replace('Z', '+00:00'))
-            formatted_date = start_time.strftime('%d/%m/%Y')
-            formatted_start_time = start_time.strftime('%H:%M')
-            formatted_end_time = datetime.fromisoformat(booking_data['endTime'].replace('Z', '+00:00')).strftime('%H:%M')
+    def build_booking_cancellation_email(user_email, user_name, booking_data):
+        """Resend params of the booking cancellation email (used alone or in a batch)."""
+        start_time = datetime.fromisoformat(booking_data['startTime'].replace('Z', '+00:00'))
+        formatted_date = start_time.strftime('%d/%m/%Y')
+        formatted_start_time = start_time.strftime('%H:%M')
+        formatted_end_time = datetime.fromisoformat(booking_data['endTime'].replace('Z', '+00:00')).strftime('%H:%M')
 
-            total_price_formatted = f"{booking_data['totalPrice']:,}đ"
+        total_price_formatted = f"{booking_data['totalPrice']:,}đ"
 
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <title>Hủy đặt sân</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ background: #dc2626; color: white; padding: 20px; text-align: center; }}
-                    h1 {{ margin: 0; padding: 0; }}
-                    h2 {{ margin-top: 5px; }}
-                    .content {{ padding: 20px; background: #f9f9f9; }}
-                    .booking-details {{ background: white; padding: 15px; margin: 15px 0; border-radius: 5px; }}
-                    .footer {{ text-align: center; padding: 20px; color: #666; font-size: 0.9em; }}
-                    strong {{ color: #dc2626; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>SportSync</h1>
-                        <h2>Thông báo hủy đặt sân</h2>
-                    </div>
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <title>Hủy đặt sân</title>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background: #dc2626; color: white; padding: 20px; text-align: center; }}
+                h1 {{ margin: 0; padding: 0; }}
+                h2 {{ margin-top: 5px; }}
+                .content {{ padding: 20px; background: #f9f9f9; }}
+                .booking-details {{ background: white; padding: 15px; margin: 15px 0; border-radius: 5px; }}
+                .footer {{ text-align: center; padding: 20px; color: #666; font-size: 0.9em; }}
+                strong {{ color: #dc2626; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>SportSync</h1>
+                    <h2>Thông báo hủy đặt sân</h2>
+                </div>
+                
+                <div class="content">
+                    <p>Xin chào <strong>{user_name}</strong>,</p>
                     
-                    <div class="content">
-                        <p>Xin chào <strong>{user_name}</strong>,</p>
-                        
-                        <p>Đơn đặt sân của bạn với mã <strong>#{booking_data['id']}</strong> đã được hủy.</p>
-                        <p>Thông tin chi tiết:</p>
-                        
-                        <div class="booking-details">
-                            <h3>Chi tiết đơn đã hủy</h3>
-                            <p><strong>Mã đơn:</strong> #{booking_data['id']}</p>
-                            <p><strong>Sân:</strong> {booking_data.get('courtName', 'N/A')}</p>
-                            <p><strong>Khu phức hợp:</strong> {booking_data.get('complexName', 'N/A')}</p>
-                            <p><strong>Ngày:</strong> {formatted_date}</p>
-                            <p><strong>Thời gian:</strong> {formatted_start_time} - {formatted_end_time}</p>
-                            <p><strong>Tổng tiền:</strong> {total_price_formatted}</p>
-                        </div>
-                        
-                        <p>Lý do hủy: {booking_data.get('cancellationReason', 'Không rõ lý do')}</p>
-                        <p>Số tiền sẽ được hoàn lại trong vòng 3-5 ngày làm việc (nếu có chính sách hoàn tiền áp dụng).</p>
-                        
-                        <p>Cảm ơn bạn đã sử dụng dịch vụ của SportSync!</p>
-                    </div>
+                    <p>Đơn đặt sân của bạn với mã <strong>#{booking_data['id']}</strong> đã được hủy.</p>
+                    <p>Thông tin chi tiết:</p>
                     
-                    <div class="footer">
-                        <p>© 2025 SportSync. Tất cả quyền được bảo lưu.</p>
+                    <div class="booking-details">
+                        <h3>Chi tiết đơn đã hủy</h3>
+                        <p><strong>Mã đơn:</strong> #{booking_data['id']}</p>
+                        <p><strong>Sân:</strong> {booking_data.get('courtName', 'N/A')}</p>
+                        <p><strong>Khu phức hợp:</strong> {booking_data.get('complexName', 'N/A')}</p>
+                        <p><strong>Ngày:</strong> {formatted_date}</p>
+                        <p><strong>Thời gian:</strong> {formatted_start_time} - {formatted_end_time}</p>
+                        <p><strong>Tổng tiền:</strong> {total_price_formatted}</p>
                     </div>
+                    
+                    <p>Lý do hủy: {booking_data.get('cancellationReason', 'Không rõ lý do')}</p>
+                    <p>Số tiền sẽ được hoàn lại trong vòng 3-5 ngày làm việc (nếu có chính sách hoàn tiền áp dụng).</p>
+                    
+                    <p>Cảm ơn bạn đã sử dụng dịch vụ của SportSync!</p>
                 </div>
-            </body>
-            </html>
-            """
-            
-            params = {
-                "from": "SportSync <noreply@sannhanh.online>",
-                "to": [user_email],
-                "subject": f"Đơn đặt sân #{booking_data['id']} đã hủy - SportSync",
-                "html": html_content,
-            }
-            
+                
+                <div class="footer">
+                    <p>© 2025 SportSync. Tất cả quyền được bảo lưu.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        params = {
+            "from": "SportSync <noreply@sannhanh.online>",
+            "to": [user_email],
+            "subject": f"Đơn đặt sân #{booking_data['id']} đã hủy - SportSync",
+            "html": html_content,
+        }
+        return params
+
+
+    @staticmethod
+    def send_booking_cancellation(user_email, user_name, booking_data):
+        """Send booking cancellation email to customer."""
+        try:
+            params = EmailService.build_booking_cancellation_email(user_email, user_name, booking_data)
             email = resend.Emails.send(params)
             return {"success": True, "email_id": email.get('id')}
             
@@ -340,72 +349,169 @@ class EmailService:
             traceback.print_exc()
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    def build_booking_status_update_email(customer_email, customer_name, booking_data, new_status, reason=None):
+        """Resend params of the booking status update email (used alone or in a batch)."""
+        start_time = datetime.fromisoformat(booking_data['startTime'].replace('Z', '+00:00'))
+        end_time = datetime.fromisoformat(booking_data['endTime'].replace('Z', '+00:00'))
+        
+        formatted_date = start_time.strftime('%d/%m/%Y')
+        formatted_start_time = start_time.strftime('%H:%M')
+        formatted_end_time = end_time.strftime('%H:%M')
+        
+        total_price_formatted = f"{booking_data['totalPrice']:,}đ"
+
+        status_color = "#10b981" # Green for Approved
+        status_text = "đã được xác nhận"
+        if new_status == 'Rejected':
+            status_color = "#dc2626" # Red for Rejected
+            status_text = "đã bị từ chối"
+
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <title>Cập nhật trạng thái đơn đặt sân - SportSync</title>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background: {status_color}; color: white; padding: 20px; text-align: center; }}
+                h1 {{ margin: 0; padding: 0; }}
+                h2 {{ margin-top: 5px; }}
+                .content {{ padding: 20px; background: #f9f9f9; }}
+                .booking-details {{ background: white; padding: 15px; margin: 15px 0; border-radius: 5px; }}
+                .footer {{ text-align: center; padding: 20px; color: #666; font-size: 0.9em; }}
+                .button {{ display: inline-block; padding: 10px 20px; background: #2563eb; color: white; text-decoration: none; border-radius: 5px; }}
+                strong {{ color: {status_color}; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>SportSync</h1>
+                    <h2>Đơn đặt sân của bạn {status_text}!</h2>
+                </div>
+                
+                <div class="content">
+                    <p>Xin chào <strong>{customer_name}</strong>,</p>
+                    
+                    <p>Chúng tôi xin thông báo trạng thái đơn đặt sân <strong>#{booking_data['id']}</strong> của bạn {status_text}.</p>
+                    
+                    <div class="booking-details">
+                        <h3>Chi tiết đơn đặt</h3>
+                        <p><strong>Mã đơn:</strong> #{booking_data['id']}</p>
+                        <p><strong>Sân:</strong> {booking_data.get('courtName', 'N/A')}</p>
+                        <p><strong>Khu phức hợp:</strong> {booking_data.get('complexName', 'N/A')}</p>
+                        <p><strong>Ngày:</strong> {formatted_date}</p>
+                        <p><strong>Thời gian:</strong> {formatted_start_time} - {formatted_end_time}</p>
+                        <p><strong>Tổng tiền:</strong> {total_price_formatted}</p>
+                        <p><strong>Trạng thái mới:</strong> <span style="color: {status_color}; font-weight: bold;">{new_status}</span></p>
+                        {reason and f"<p><strong>Lý do:</strong> {reason}</p>"}
+                    </div>
+                    
+                    <p>Bạn có thể kiểm tra chi tiết đơn đặt sân của mình tại đây:</p>
+                    <p style="text-align: center;">
+                        <a href="https://sannhanh.online/my-bookings" class="button">Xem đơn đặt của tôi</a>
+                    </p>
+                </div>
+                
+                <div class="footer">
+                    <p>Cảm ơn bạn đã tin tưởng SportSync!</p>
+                    <p>© 2025 SportSync. Tất cả quyền được bảo lưu.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        params = {
+            "from": "SportSync <noreply@sannhanh.online>",
+            "to": [customer_email],
+            "subject": f"Trạng thái đơn #{booking_data['id']} {status_text} - SportSync",
+            "html": html_content,
+        }
+        return params
+
+
     @staticmethod
     def send_booking_status_update_to_customer(customer_email, customer_name, booking_data, new_status, reason=None):
         """Send email to customer when booking status is updated (Approved/Rejected)."""
         try:
-            start_time = datetime.fromisoformat(booking_data['startTime'].replace('Z', '+00:00'))
-            end_time = datetime.fromisoformat(booking_data['endTime'].replace('Z', '+00:00'))
-            
-            formatted_date = start_time.strftime('%d/%m/%Y')
-            formatted_start_time = start_time.strftime('%H:%M')
-            formatted_end_time = end_time.strftime('%H:%M')
+            params = EmailService.build_booking_status_update_email(customer_email, customer_name, booking_data, new_status, reason)
+            email = resend.Emails.send(params)
+            return {"success": True, "email_id": email.get('id')}
             
-            total_price_formatted = f"{booking_data['totalPrice']:,}đ"
+        except Exception as e:
+            print(f"Error sending booking status update email: {str(e)}")
+            traceback.print_exc()
+            return {"success": False, "error": str(e)}
 
-            status_color = "#10b981" # Green for Approved
-            status_text = "đã được xác nhận"
-            if new_status == 'Rejected':
-                status_color = "#dc2626" # Red for Rejected
-                status_text = "đã bị từ chối"
+    @staticmethod
+    def send_booking_series_summary(recipient_email, recipient_name, series_data, for_owner=False):
+        """Send one summary email for a recurring booking series (to the customer, or to the owner)."""
+        try:
+            rows = []
+            for booking in series_data['bookings']:
+                start_time = datetime.fromisoformat(booking['startTime'])
+                end_time = datetime.fromisoformat(booking['endTime'])
+                rows.append(
+                    f"<tr><td>#{booking['id']}</td><td>{start_time.strftime('%d/%m/%Y')}</td>"
+                    f"<td>{start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}</td>"
+                    f"<td>{booking['totalPrice']:,}đ</td></tr>"
+                )
+            skipped_dates = ', '.join(
+                datetime.fromisoformat(item['startTime']).strftime('%d/%m/%Y') for item in series_data.get('skipped', [])
+            )
+            total_price_formatted = f"{series_data['totalPrice']:,}đ"
+            color = '#10b981' if for_owner else '#2563eb'
+            if for_owner:
+                heading = 'Đơn đặt sân định kỳ mới về sân của bạn!'
+                intro = f"Khách hàng <strong>{series_data.get('customerName', 'N/A')}</strong> vừa đặt lịch định kỳ gồm {len(series_data['bookings'])} buổi:"
+            else:
+                heading = 'Xác nhận đặt sân định kỳ'
+                intro = f"Lịch đặt sân định kỳ của bạn gồm {len(series_data['bookings'])} buổi đã được ghi nhận:"
 
             html_content = f"""
             <!DOCTYPE html>
             <html>
             <head>
                 <meta charset="utf-8">
-                <title>Cập nhật trạng thái đơn đặt sân - SportSync</title>
+                <title>{heading} - SportSync</title>
                 <style>
                     body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
                     .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ background: {status_color}; color: white; padding: 20px; text-align: center; }}
+                    .header {{ background: {color}; color: white; padding: 20px; text-align: center; }}
                     h1 {{ margin: 0; padding: 0; }}
                     h2 {{ margin-top: 5px; }}
                     .content {{ padding: 20px; background: #f9f9f9; }}
                     .booking-details {{ background: white; padding: 15px; margin: 15px 0; border-radius: 5px; }}
+                    table {{ width: 100%; border-collapse: collapse; }}
+                    td {{ padding: 4px 6px; border-bottom: 1px solid #eee; }}
                     .footer {{ text-align: center; padding: 20px; color: #666; font-size: 0.9em; }}
-                    .button {{ display: inline-block; padding: 10px 20px; background: #2563eb; color: white; text-decoration: none; border-radius: 5px; }}
-                    strong {{ color: {status_color}; }}
+                    strong {{ color: {color}; }}
                 </style>
             </head>
             <body>
                 <div class="container">
                     <div class="header">
                         <h1>SportSync</h1>
-                        <h2>Đơn đặt sân của bạn {status_text}!</h2>
+                        <h2>{heading}</h2>
                     </div>
                     
                     <div class="content">
-                        <p>Xin chào <strong>{customer_name}</strong>,</p>
+                        <p>Xin chào <strong>{recipient_name}</strong>,</p>
                         
-                        <p>Chúng tôi xin thông báo trạng thái đơn đặt sân <strong>#{booking_data['id']}</strong> của bạn {status_text}.</p>
+                        <p>{intro}</p>
                         
                         <div class="booking-details">
-                            <h3>Chi tiết đơn đặt</h3>
-                            <p><strong>Mã đơn:</strong> #{booking_data['id']}</p>
-                            <p><strong>Sân:</strong> {booking_data.get('courtName', 'N/A')}</p>
-                            <p><strong>Khu phức hợp:</strong> {booking_data.get('complexName', 'N/A')}</p>
-                            <p><strong>Ngày:</strong> {formatted_date}</p>
-                            <p><strong>Thời gian:</strong> {formatted_start_time} - {formatted_end_time}</p>
+                            <p><strong>Sân:</strong> {series_data.get('courtName', 'N/A')}</p>
+                            <p><strong>Khu phức hợp:</strong> {series_data.get('complexName', 'N/A')}</p>
+                            <table>{''.join(rows)}</table>
                             <p><strong>Tổng tiền:</strong> {total_price_formatted}</p>
-                            <p><strong>Trạng thái mới:</strong> <span style="color: {status_color}; font-weight: bold;">{new_status}</span></p>
-                            {reason and f"<p><strong>Lý do:</strong> {reason}</p>"}
+                            <p><strong>Trạng thái:</strong> <span style="color: {color}; font-weight: bold;">{series_data.get('status', 'Pending')}</span></p>
+                            {f'<p><strong>Các ngày bị trùng lịch (không đặt):</strong> {skipped_dates}</p>' if skipped_dates else ''}
                         </div>
-                        
-                        <p>Bạn có thể kiểm tra chi tiết đơn đặt sân của mình tại đây:</p>
-                        <p style="text-align: center;">
-                            <a href="https://sannhanh.online/my-bookings" class="button">Xem đơn đặt của tôi</a>
-                        </p>
                     </div>
                     
                     <div class="footer">
@@ -419,8 +525,8 @@ class EmailService:
             
             params = {
                 "from": "SportSync <noreply@sannhanh.online>",
-                "to": [customer_email],
-                "subject": f"Trạng thái đơn #{booking_data['id']} {status_text} - SportSync",
+                "to": [recipient_email],
+                "subject": f"{heading} ({len(series_data['bookings'])} buổi) - SportSync",
                 "html": html_content,
             }
             
@@ -428,6 +534,24 @@ class EmailService:
             return {"success": True, "email_id": email.get('id')}
             
         except Exception as e:
-            print(f"Error sending booking status update email: {str(e)}")
+            print(f"Error sending booking series summary email: {str(e)}")
             traceback.print_exc()
-            return {"success": False, "error": str(e)}
\ No newline at end of file
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def send_batch(params_list):
+        """
+        Send many prepared emails (build_*_email params) with Resend's batch API,
+        BATCH_SIZE emails per API call instead of one call per email.
+        """
+        sent, errors = 0, []
+        for offset in range(0, len(params_list), BATCH_SIZE):
+            chunk = params_list[offset:offset + BATCH_SIZE]
+            try:
+                resend.Batch.send(chunk)
+                sent += len(chunk)
+            except Exception as e:
+                print(f"Error sending email batch: {str(e)}")
+                traceback.print_exc()
+                errors.append(str(e))
+        return {"success": not errors, "sent": sent, "errors": errors}
@@ -0,0 +1,330 @@
+import atexit
+import json
+import os
+import queue
+import select
+import socket
+import threading
+import traceback
+import uuid
+
+from flask import Response, jsonify
+
+from src.services.signals import booking_changed
+
+# Hub pub/sub trong tiến trình cho Server-Sent Events.
+# Mỗi client SSE giữ một Subscription (một queue) trên một hoặc nhiều channel, ví dụ 'user:<id>'.
+# Khi chạy nhiều gunicorn worker, bật EVENT_BRIDGE để chuyển event giữa các worker:
+#   EVENT_BRIDGE=postgres             -> dùng PostgreSQL LISTEN/NOTIFY
+#   EVENT_BRIDGE=unix:/tmp/sportsync  -> mỗi worker bind một Unix datagram socket trong thư mục này
+
+PG_NOTIFY_CHANNEL = 'sportsync_events'
+SUBSCRIBER_QUEUE_SIZE = 256
+# Khoảng thời gian gửi comment keep-alive trên SSE stream (giây)
+STREAM_HEARTBEAT_SECONDS = 20
+# Mỗi SSE stream chiếm một thread của gthread worker trong suốt thời gian mở: giới hạn số stream
+# mỗi worker (SSE_MAX_STREAMS) để các request khác vẫn còn thread, vượt quá thì trả 503.
+# Tiến trình `stream` trong Procfile phục vụ riêng các stream với giới hạn cao hơn.
+DEFAULT_MAX_STREAMS = 8
+STREAM_RETRY_AFTER_SECONDS = 30
+
+
+class Subscription:
+    def __init__(self, channels):
+        self.channels = tuple(channels)
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def get(self, timeout=None):
+        """Lấy message kế tiếp, trả về None nếu hết timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # Client đọc quá chậm: đánh dấu để stream đóng lại, client sẽ tự kết nối lại
+            self.overflowed = True
+
+
+class EventHub:
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._subscribers = {}  # channel -> set(Subscription)
+        self._lock = threading.Lock()
+        self._bridge = None
+        self.max_streams = DEFAULT_MAX_STREAMS
+        self._open_streams = 0
+
+    def init_app(self, app):
+        try:
+            self.max_streams = max(0, int(app.config.get('SSE_MAX_STREAMS') or DEFAULT_MAX_STREAMS))
+        except (TypeError, ValueError):
+            print(f"Invalid SSE_MAX_STREAMS '{app.config.get('SSE_MAX_STREAMS')}', using {DEFAULT_MAX_STREAMS}")
+            self.max_streams = DEFAULT_MAX_STREAMS
+
+        bridge_config = app.config.get('EVENT_BRIDGE', '')
+        if self._bridge is not None or not bridge_config:
+            return
+
+        try:
+            if bridge_config == 'postgres':
+                from src.models.database import db
+                with app.app_context():
+                    engine = db.engine
+                self._bridge = PostgresBridge(self, engine)
+            elif bridge_config.startswith('unix:'):
+                self._bridge = UnixSocketBridge(self, bridge_config[len('unix:'):])
+            else:
+                print(f"Unknown EVENT_BRIDGE '{bridge_config}', events stay in-process")
+                return
+            self._bridge.start()
+        except Exception as e:
+            print(f"Failed to start event bridge: {str(e)}")
+            traceback.print_exc()
+            self._bridge = None
+
+    def subscribe(self, *channels):
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def open_stream(self):
+        """Giữ một chỗ stream của worker này, False nếu đã đủ max_streams"""
+        with self._lock:
+            if self._open_streams >= self.max_streams:
+                return False
+            self._open_streams += 1
+            return True
+
+    def close_stream(self):
+        with self._lock:
+            self._open_streams -= 1
+
+    def has_subscribers(self, channel):
+        return channel in self._subscribers
+
+    def wants(self, channel):
+        """Có cần publish lên channel không (có subscriber local, hoặc có bridge tới worker khác)"""
+        return self._bridge is not None or channel in self._subscribers
+
+    def publish(self, channel, event, data):
+        """Gửi event tới mọi subscriber của channel (ở worker này và các worker khác nếu có bridge)"""
+        self._deliver(channel, event, data)
+        if self._bridge is not None:
+            try:
+                self._bridge.send(json.dumps({'o': self.origin, 'c': channel, 'e': event, 'd': data}, default=str))
+            except Exception as e:
+                print(f"Failed to forward event to bridge: {str(e)}")
+
+    def _deliver(self, channel, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        if not subscribers:
+            return
+        message = format_sse(event, data)
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def _receive_from_bridge(self, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get('o') == self.origin:
+            return  # Event do chính worker này gửi, đã deliver local rồi
+        self._deliver(message['c'], message['e'], message['d'])
+
+
+def format_sse(event, data):
+    """Định dạng một message theo chuẩn text/event-stream"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+
+def sse_response(subscription, initial_messages=()):
+    """
+    Tạo Flask Response text/event-stream từ một Subscription, 503 nếu worker đã mở đủ SSE_MAX_STREAMS.
+    Generator không dùng db.session nên không giữ connection DB trong suốt stream.
+    """
+    if not event_hub.open_stream():
+        event_hub.unsubscribe(subscription)
+        response = jsonify({'error': 'Too many open event streams, retry later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(STREAM_RETRY_AFTER_SECONDS)
+        return response
+
+    def generate():
+        yield 'retry: 5000\n\n'
+        for message in initial_messages:
+            yield message
+        while not subscription.overflowed:
+            message = subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+            yield message if message is not None else ': keep-alive\n\n'
+
+    closed = []
+
+    def close():
+        # Server gọi close() khi stream kết thúc, kể cả khi client ngắt trước lúc generator chạy
+        if not closed:
+            closed.append(True)
+            event_hub.unsubscribe(subscription)
+            event_hub.close_stream()
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Tắt buffering của nginx
+    })
+    response.call_on_close(close)
+    return response
+
+
+class PostgresBridge:
+    """Chuyển event giữa các worker qua PostgreSQL LISTEN/NOTIFY"""
+
+    def __init__(self, hub, engine):
+        if engine.dialect.name != 'postgresql':
+            raise RuntimeError('EVENT_BRIDGE=postgres requires a PostgreSQL database')
+        self.hub = hub
+        self.engine = engine
+        # Một connection autocommit giữ lại cho mọi lần publish (không mở connection mới mỗi event)
+        self._send_conn = None
+        self._send_lock = threading.Lock()
+
+    def start(self):
+        thread = threading.Thread(target=self._listen, name='event-hub-pg-listener', daemon=True)
+        thread.start()
+
+    def send(self, payload):
+        from sqlalchemy import text
+        with self._send_lock:
+            for attempt in range(2):
+                try:
+                    if self._send_conn is None:
+                        self._send_conn = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+                    self._send_conn.execute(text('SELECT pg_notify(:channel, :payload)'), {'channel': PG_NOTIFY_CHANNEL, 'payload': payload})
+                    return
+                except Exception:
+                    # Connection đã hỏng (DB restart...): bỏ đi, thử lại một lần với connection mới
+                    self._close_send_conn()
+                    if attempt:
+                        raise
+
+    def _close_send_conn(self):
+        if self._send_conn is not None:
+            try:
+                self._send_conn.close()
+            except Exception:
+                pass
+            self._send_conn = None
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        dsn = self.engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+        while True:
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {PG_NOTIFY_CHANNEL};')
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.hub._receive_from_bridge(notify.payload)
+            except Exception as e:
+                print(f"Event bridge listener error, reconnecting: {str(e)}")
+                threading.Event().wait(5)
+
+
+class UnixSocketBridge:
+    """Chuyển event giữa các worker trên cùng máy qua Unix datagram socket"""
+
+    def __init__(self, hub, directory):
+        self.hub = hub
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{os.getpid()}-{hub.origin[:8]}.sock')
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        atexit.register(self._cleanup)
+
+    def _cleanup(self):
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def start(self):
+        thread = threading.Thread(target=self._listen, name='event-hub-unix-listener', daemon=True)
+        thread.start()
+
+    def send(self, payload):
+        data = payload.encode('utf-8')
+        for name in os.listdir(self.directory):
+            if not name.endswith('.sock'):
+                continue
+            peer = os.path.join(self.directory, name)
+            if peer == self.path:
+                continue
+            try:
+                self.send_sock.sendto(data, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker đã chết, dọn socket cũ
+                try:
+                    os.unlink(peer)
+                except OSError:
+                    pass
+            except OSError as e:
+                print(f"Failed to send event to {peer}: {str(e)}")
+
+    def _listen(self):
+        while True:
+            try:
+                payload = self.sock.recv(65536)
+                self.hub._receive_from_bridge(payload.decode('utf-8'))
+            except Exception as e:
+                print(f"Event bridge listener error: {str(e)}")
+
+
+event_hub = EventHub()
+
+
+def _booking_event_payload(change):
+    return {
+        'bookingId': change.id,
+        'courtId': change.courtId,
+        'complexId': change.complexId,
+        'status': change.status,
+        'previousStatus': change.previousStatus,
+        'startTime': change.startTime.isoformat(),
+        'endTime': change.endTime.isoformat()
+    }
+
+
+@booking_changed.connect
+def _publish_booking_change(sender, change, **kwargs):
+    payload = _booking_event_payload(change)
+    if change.customerId:
+        event_hub.publish(f'user:{change.customerId}', 'booking', payload)
+    if change.ownerId and change.ownerId != change.customerId:
+        event_hub.publish(f'user:{change.ownerId}', 'booking', payload)
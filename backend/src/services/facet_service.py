@@ -0,0 +1,230 @@
+import threading
+import time
+
+from sqlalchemy import select, func
+
+from src.models.database import db, CourtComplex, Court, HourlyPriceRate, Amenity, CourtComplexAmenity
+from src.services.complex_changes import ComplexChangeSync
+
+# Complex có trong nhật ký complex_changes (ghi ở bất kỳ worker nào) được nạp lại ngay trước lần tìm kiếm kế tiếp;
+# index còn được nạp lại toàn bộ sau khoảng thời gian này cho thay đổi không ghi nhật ký (UPDATE hàng loạt...) (giây)
+FACET_INDEX_REFRESH_SECONDS = 300
+
+# Khoảng giá theo giờ (VND): (key, giá thấp nhất, giá cao nhất - không bao gồm)
+PRICE_BANDS = [
+    ('under-100k', 0, 100000),
+    ('100k-200k', 100000, 200000),
+    ('200k-300k', 200000, 300000),
+    ('over-300k', 300000, None),
+]
+
+# Cách kết hợp nhiều giá trị trong cùng một facet:
+#   'any' -> complex khớp một trong các giá trị (city=A hoặc city=B)
+#   'all' -> complex phải có đủ mọi giá trị (có cả wifi và bãi đỗ xe)
+FACETS = {
+    'city': 'any',
+    'sportType': 'any',
+    'amenity': 'all',
+    'priceBand': 'any',
+}
+
+
+def popcount(bitmap):
+    return bin(bitmap).count('1')
+
+
+def bitmap_from_ids(ids):
+    bitmap = 0
+    for item_id in ids:
+        bitmap |= 1 << item_id
+    return bitmap
+
+
+def ids_from_bitmap(bitmap, offset=0, limit=None):
+    """Các ID (tăng dần) có bit bật trong bitmap, bỏ qua offset phần tử đầu"""
+    ids = []
+    index = 0
+    while bitmap and (limit is None or len(ids) < limit):
+        lowest = bitmap & -bitmap
+        if index >= offset:
+            ids.append(lowest.bit_length() - 1)
+        bitmap ^= lowest
+        index += 1
+    return ids
+
+
+def price_bands_for_range(min_price, max_price):
+    """Các khoảng giá giao với [min_price, max_price]"""
+    if min_price is None or max_price is None:
+        return []
+    return [
+        key for key, low, high in PRICE_BANDS
+        if max_price >= low and (high is None or min_price < high)
+    ]
+
+
+class FacetIndex:
+    """
+    Bitmap các complex ID (Python int, bit thứ i = complex i) cho từng giá trị của từng facet.
+    Lọc bằng phép AND/OR giữa các bitmap và đếm facet bằng popcount, không cần query DB.
+    """
+
+    def __init__(self):
+        self._bitmaps = {facet: {} for facet in FACETS}  # facet -> value -> bitmap
+        self._memberships = {}  # complex id -> [(facet, value)]
+        self._all = 0  # bitmap các complex đang Active
+        self._lock = threading.RLock()
+        self._loaded_at = None
+
+    def clear(self):
+        with self._lock:
+            self._bitmaps = {facet: {} for facet in FACETS}
+            self._memberships = {}
+            self._all = 0
+
+    def set_complex(self, complex_id, memberships):
+        """Thay toàn bộ facet của một complex. memberships = [(facet, value)], rỗng/None để gỡ complex"""
+        with self._lock:
+            self.remove_complex(complex_id)
+            if memberships is None:
+                return
+
+            bit = 1 << complex_id
+            self._all |= bit
+            for facet, value in memberships:
+                values = self._bitmaps[facet]
+                values[value] = values.get(value, 0) | bit
+            self._memberships[complex_id] = list(memberships)
+
+    def remove_complex(self, complex_id):
+        with self._lock:
+            bit = 1 << complex_id
+            self._all &= ~bit
+            for facet, value in self._memberships.pop(complex_id, ()):
+                values = self._bitmaps[facet]
+                remaining = values.get(value, 0) & ~bit
+                if remaining:
+                    values[value] = remaining
+                else:
+                    values.pop(value, None)
+
+    def _facet_filter(self, facet, selected):
+        values = self._bitmaps[facet]
+        if FACETS[facet] == 'all':
+            bitmap = self._all
+            for value in selected:
+                bitmap &= values.get(value, 0)
+            return bitmap
+
+        bitmap = 0
+        for value in selected:
+            bitmap |= values.get(value, 0)
+        return bitmap
+
+    def search(self, filters, candidates=None):
+        """
+        Lọc complex theo các facet và đếm số kết quả cho từng giá trị facet.
+
+        Args:
+            filters: dict facet -> list giá trị được chọn
+            candidates: bitmap giới hạn thêm (ví dụ kết quả tìm theo từ khóa / vị trí), None = tất cả
+
+        Returns:
+            (bitmap kết quả, dict facet -> {value: count})
+            Count của một facet 'any' được tính khi bỏ qua lựa chọn của chính facet đó,
+            để người dùng thấy được số kết quả nếu chọn thêm giá trị khác.
+        """
+        with self._lock:
+            base = self._all if candidates is None else self._all & candidates
+            facet_filters = {
+                facet: self._facet_filter(facet, selected)
+                for facet, selected in filters.items() if facet in FACETS and selected
+            }
+
+            result = base
+            for bitmap in facet_filters.values():
+                result &= bitmap
+
+            counts = {}
+            for facet, mode in FACETS.items():
+                scope = base
+                for other, bitmap in facet_filters.items():
+                    if other != facet or mode == 'all':
+                        scope &= bitmap
+
+                facet_counts = {}
+                for value, bitmap in self._bitmaps[facet].items():
+                    count = popcount(scope & bitmap)
+                    if count or value in filters.get(facet, ()):
+                        facet_counts[value] = count
+                counts[facet] = facet_counts
+
+        return result, counts
+
+
+class ComplexFacetIndex(ComplexChangeSync, FacetIndex):
+    """FacetIndex của các court complex đang Active, nạp lười từ DB và cập nhật theo nhật ký complex_changes"""
+
+    @staticmethod
+    def _load_memberships(conn, complex_id=None):
+        complexes = select(CourtComplex.id, CourtComplex.city, CourtComplex.sportType).where(
+            CourtComplex.status == 'Active'
+        )
+        amenities = select(CourtComplexAmenity.complexId, Amenity.name).join(
+            Amenity, CourtComplexAmenity.amenityId == Amenity.id
+        )
+        prices = select(
+            Court.complexId, func.min(HourlyPriceRate.price), func.max(HourlyPriceRate.price)
+        ).join(HourlyPriceRate, HourlyPriceRate.courtId == Court.id).where(
+            Court.status == 'Active'
+        ).group_by(Court.complexId)
+
+        if complex_id is not None:
+            complexes = complexes.where(CourtComplex.id == complex_id)
+            amenities = amenities.where(CourtComplexAmenity.complexId == complex_id)
+            prices = prices.where(Court.complexId == complex_id)
+
+        memberships = {}
+        for row in conn.execute(complexes):
+            memberships[row.id] = [('city', row.city), ('sportType', row.sportType)]
+        for complex_id_, name in conn.execute(amenities):
+            if complex_id_ in memberships:
+                memberships[complex_id_].append(('amenity', name))
+        for complex_id_, min_price, max_price in conn.execute(prices):
+            if complex_id_ in memberships:
+                memberships[complex_id_].extend(
+                    ('priceBand', band) for band in price_bands_for_range(float(min_price), float(max_price))
+                )
+        return memberships
+
+    def ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < FACET_INDEX_REFRESH_SECONDS:
+            with db.engine.connect() as conn:
+                self.sync_changed(conn)
+            return
+
+        with self._lock:
+            if self._loaded_at != loaded_at:
+                return  # Thread khác vừa nạp xong
+            with db.engine.connect() as conn:
+                last_seq, gaps = self._start_position(conn)
+                memberships = self._load_memberships(conn)
+            self.clear()
+            for complex_id, complex_memberships in memberships.items():
+                self.set_complex(complex_id, complex_memberships)
+            self._last_seq, self._gaps = last_seq, gaps
+            self._loaded_at = time.monotonic()
+
+    def refresh_complex(self, conn, complex_id):
+        if self._loaded_at is None:
+            return  # Chưa nạp, lần truy vấn đầu tiên sẽ đọc dữ liệu mới nhất
+        memberships = self._load_memberships(conn, complex_id)
+        self.set_complex(complex_id, memberships.get(complex_id))
+
+    def search(self, filters, candidates=None):
+        self.ensure_loaded()
+        return super().search(filters, candidates)
+
+
+complex_facets = ComplexFacetIndex()
@@ -0,0 +1,239 @@
+import math
+import re
+import threading
+import time
+
+from sqlalchemy import select
+
+from src.models.database import db, CourtComplex
+from src.services.complex_changes import ComplexChangeSync
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Kích thước một ô của lưới (độ). 0.05° ~ 5.5km theo vĩ độ
+GEO_CELL_DEGREES = 0.05
+# Complex có trong nhật ký complex_changes (ghi ở bất kỳ worker nào) được cập nhật ngay trước lần tìm kế tiếp;
+# index còn được nạp lại toàn bộ sau khoảng thời gian này (giây)
+GEO_INDEX_REFRESH_SECONDS = 300
+# Bán kính tối đa khi tìm k sân gần nhất (km)
+GEO_NEAREST_MAX_RADIUS_KM = 200
+
+# Các dạng tọa độ thường gặp trong link Google Maps, theo thứ tự ưu tiên:
+#   .../data=!3d21.0285!4d105.8542   (vị trí chính xác của địa điểm)
+#   .../@21.0285,105.8542,17z        (tâm bản đồ)
+#   ...?q=21.0285,105.8542  /  ?ll=  /  ?query=  /  ?destination=
+_MAP_LINK_PATTERNS = [
+    re.compile(r'!3d(-?\d{1,2}(?:\.\d+)?)!4d(-?\d{1,3}(?:\.\d+)?)'),
+    re.compile(r'@(-?\d{1,2}(?:\.\d+)?),(-?\d{1,3}(?:\.\d+)?)'),
+    re.compile(r'[?&](?:q|ll|query|destination|center)=(-?\d{1,2}(?:\.\d+)?)(?:,|%2C)\s*(-?\d{1,3}(?:\.\d+)?)', re.IGNORECASE),
+]
+
+
+def valid_coordinates(lat, lng):
+    return lat is not None and lng is not None and -90 <= lat <= 90 and -180 <= lng <= 180
+
+
+def parse_map_link(link):
+    """
+    Lấy (latitude, longitude) từ link Google Maps.
+    Trả về (None, None) nếu link không chứa tọa độ (ví dụ link rút gọn maps.app.goo.gl).
+    """
+    if not link:
+        return None, None
+
+    for pattern in _MAP_LINK_PATTERNS:
+        match = pattern.search(link)
+        if match:
+            lat, lng = float(match.group(1)), float(match.group(2))
+            if valid_coordinates(lat, lng):
+                return lat, lng
+    return None, None
+
+
+def apply_complex_coordinates(complex, data):
+    """
+    Cập nhật latitude/longitude của complex khi tạo/sửa.
+    Ưu tiên tọa độ gửi kèm trong request, nếu không có thì parse từ googleMapLink.
+    """
+    try:
+        lat = float(data['latitude']) if data.get('latitude') not in (None, '') else None
+        lng = float(data['longitude']) if data.get('longitude') not in (None, '') else None
+    except (TypeError, ValueError):
+        lat, lng = None, None
+
+    if not valid_coordinates(lat, lng):
+        lat, lng = parse_map_link(complex.googleMapLink)
+
+    complex.latitude = lat
+    complex.longitude = lng
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Khoảng cách đường tròn lớn giữa 2 điểm (km)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGridIndex:
+    """
+    Spatial index trong bộ nhớ: chia mặt phẳng lat/lng thành các ô cố định (tương tự geohash).
+    Truy vấn chỉ duyệt các ô quanh điểm tìm kiếm, nên thời gian phụ thuộc mật độ sân
+    quanh điểm đó chứ không phụ thuộc tổng số sân.
+    """
+
+    def __init__(self, cell_degrees=GEO_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._points = {}  # id -> (lat, lng)
+        self._cells = {}  # (row, col) -> set(id)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, lat, lng):
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lng / self.cell_degrees))
+
+    def clear(self):
+        with self._lock:
+            self._points = {}
+            self._cells = {}
+
+    def upsert(self, item_id, lat, lng):
+        with self._lock:
+            self.remove(item_id)
+            self._points[item_id] = (lat, lng)
+            self._cells.setdefault(self._cell(lat, lng), set()).add(item_id)
+
+    def remove(self, item_id):
+        with self._lock:
+            point = self._points.pop(item_id, None)
+            if point is None:
+                return
+            cell = self._cell(*point)
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(item_id)
+                if not members:
+                    del self._cells[cell]
+
+    def _cells_in_ring(self, center, ring):
+        row0, col0 = center
+        if ring == 0:
+            yield center
+            return
+        for col in range(col0 - ring, col0 + ring + 1):
+            yield row0 - ring, col
+            yield row0 + ring, col
+        for row in range(row0 - ring + 1, row0 + ring):
+            yield row, col0 - ring
+            yield row, col0 + ring
+
+    def _ring_clearance_km(self, lat, ring):
+        """Khoảng cách tối thiểu mà mọi điểm ngoài các ring đã duyệt chắc chắn vượt qua"""
+        lng_km = KM_PER_DEGREE_LAT * math.cos(math.radians(min(abs(lat) + ring * self.cell_degrees, 89.9)))
+        return ring * self.cell_degrees * min(KM_PER_DEGREE_LAT, lng_km)
+
+    def within(self, lat, lng, radius_km):
+        """Các điểm trong bán kính radius_km, trả về [(id, distance_km)] sắp xếp theo khoảng cách"""
+        d_lat = radius_km / KM_PER_DEGREE_LAT
+        d_lng = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(min(abs(lat) + d_lat, 89.9))), 1e-6))
+        row_min, col_min = self._cell(lat - d_lat, lng - d_lng)
+        row_max, col_max = self._cell(lat + d_lat, lng + d_lng)
+
+        results = []
+        with self._lock:
+            for row in range(row_min, row_max + 1):
+                for col in range(col_min, col_max + 1):
+                    for item_id in self._cells.get((row, col), ()):
+                        point_lat, point_lng = self._points[item_id]
+                        distance = haversine_km(lat, lng, point_lat, point_lng)
+                        if distance <= radius_km:
+                            results.append((item_id, distance))
+
+        results.sort(key=lambda item: item[1])
+        return results
+
+    def nearest(self, lat, lng, k, max_radius_km=GEO_NEAREST_MAX_RADIUS_KM):
+        """k điểm gần nhất (trong giới hạn max_radius_km), duyệt các ring ô lan dần ra ngoài"""
+        if k <= 0:
+            return []
+
+        center = self._cell(lat, lng)
+        max_rings = int(math.ceil(max_radius_km / (self.cell_degrees * KM_PER_DEGREE_LAT))) + 1
+        candidates = []
+        with self._lock:
+            for ring in range(max_rings + 1):
+                for cell in self._cells_in_ring(center, ring):
+                    for item_id in self._cells.get(cell, ()):
+                        point_lat, point_lng = self._points[item_id]
+                        distance = haversine_km(lat, lng, point_lat, point_lng)
+                        if distance <= max_radius_km:
+                            candidates.append((item_id, distance))
+
+                if len(candidates) >= k:
+                    candidates.sort(key=lambda item: item[1])
+                    # Các ô chưa duyệt đều xa hơn clearance, nên top-k hiện tại đã chắc chắn
+                    if candidates[k - 1][1] <= self._ring_clearance_km(lat, ring):
+                        break
+
+        candidates.sort(key=lambda item: item[1])
+        return candidates[:k]
+
+
+class ComplexGeoIndex(ComplexChangeSync, GeoGridIndex):
+    """Index tọa độ của các court complex đang Active, nạp lười từ DB và cập nhật theo nhật ký complex_changes"""
+
+    def __init__(self):
+        super().__init__()
+        self._loaded_at = None
+
+    @staticmethod
+    def _active_located_query():
+        return select(CourtComplex.id, CourtComplex.latitude, CourtComplex.longitude).where(
+            CourtComplex.status == 'Active',
+            CourtComplex.latitude.isnot(None),
+            CourtComplex.longitude.isnot(None)
+        )
+
+    def ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < GEO_INDEX_REFRESH_SECONDS:
+            with db.engine.connect() as conn:
+                self.sync_changed(conn)
+            return
+
+        with self._lock:
+            if self._loaded_at != loaded_at:
+                return  # Thread khác vừa nạp xong
+            with db.engine.connect() as conn:
+                last_seq, gaps = self._start_position(conn)
+                rows = conn.execute(self._active_located_query()).all()
+            self.clear()
+            for row in rows:
+                self.upsert(row.id, row.latitude, row.longitude)
+            self._last_seq, self._gaps = last_seq, gaps
+            self._loaded_at = time.monotonic()
+
+    def refresh_complex(self, conn, complex_id):
+        if self._loaded_at is None:
+            return  # Chưa nạp, lần truy vấn đầu tiên sẽ đọc dữ liệu mới nhất
+        row = conn.execute(self._active_located_query().where(CourtComplex.id == complex_id)).first()
+        if row is None:
+            self.remove(complex_id)
+        else:
+            self.upsert(row.id, row.latitude, row.longitude)
+
+    def within(self, lat, lng, radius_km):
+        self.ensure_loaded()
+        return super().within(lat, lng, radius_km)
+
+    def nearest(self, lat, lng, k, max_radius_km=GEO_NEAREST_MAX_RADIUS_KM):
+        self.ensure_loaded()
+        return super().nearest(lat, lng, k, max_radius_km)
+
+
+complex_geo_index = ComplexGeoIndex()
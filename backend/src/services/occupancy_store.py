@@ -0,0 +1,342 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import traceback
+
+from sqlalchemy import select
+
+from src.models.database import db, Booking, Court
+from src.services.blackout_service import BlackoutService
+from src.services.booking_ranges import starts_on_days
+from src.services.signals import blackout_changed, booking_changed
+
+# Bitmap chiếm chỗ của từng sân theo ngày, lưu trong một file mmap dùng chung giữa các gunicorn worker.
+# Mỗi bit là một ô 5 phút trong ngày (288 ô), bị chiếm bởi booking đang hoạt động hoặc lịch đóng sân. Ghi bằng giao thức seqlock:
+#   writer (giữ flock trên file): seq += 1 (lẻ) -> ghi dữ liệu -> seq += 1 (chẵn)
+#   reader (không khóa): đọc seq -> đọc dữ liệu -> đọc lại seq, thử lại nếu seq lẻ hoặc đã đổi
+# Cấu hình bằng OCCUPANCY_STORE: đường dẫn file (mặc định trong /dev/shm, tên theo DATABASE_URL) hoặc 'off'.
+
+CELL_MINUTES = 5
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+BITMAP_BYTES = (CELLS_PER_DAY + 7) // 8
+
+STORE_MAGIC = b'SSOC'
+STORE_LAYOUT_VERSION = 2
+STORE_CAPACITY = 32768  # Số entry (sân x ngày), ~2MB
+HEADER_SIZE = 64
+ENTRY_SIZE = 64
+MAX_PROBES = 8
+# Bộ đếm invalidation theo sân (ô courtId % COUNTER_SLOTS), nằm sau vùng entry. Reader chụp bộ đếm trước khi
+# đọc DB và chỉ ghi bitmap vào store nếu bộ đếm chưa đổi: không ghi lại dữ liệu đọc trước một thay đổi đã commit
+COUNTER_SLOTS = 4096
+COUNTERS_OFFSET = HEADER_SIZE + STORE_CAPACITY * ENTRY_SIZE
+# Entry được đọc lại từ DB sau khoảng thời gian này, phòng khi có thay đổi không đi qua signal (giây)
+OCCUPANCY_TTL_SECONDS = 600
+
+_HEADER = struct.Struct('<4sII')
+_ENTRY_META = struct.Struct('<IIII')  # seq, courtId, day (ordinal), loadedAt (epoch giây)
+_ENTRY_FIELDS = struct.Struct('<III')  # Phần sau seq
+_SEQ = struct.Struct('<I')
+_COUNTER = struct.Struct('<I')
+
+ACTIVE_BOOKING_STATUSES = ('Pending', 'Confirmed')
+
+
+def default_store_path(database_url):
+    """File mặc định riêng cho mỗi database: các app / bản staging trên cùng máy không dùng chung bitmap"""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    digest = hashlib.sha1(str(database_url).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(directory, f'sportsync-occupancy-{digest}')
+
+
+def cells_mask(start_dt, end_dt, day):
+    """Bitmap các ô 5 phút của `day` giao với khoảng [start_dt, end_dt)"""
+    midnight = datetime.combine(day, datetime.min.time())
+    start_minutes = (start_dt - midnight).total_seconds() / 60
+    end_minutes = (end_dt - midnight).total_seconds() / 60
+
+    first = max(0, int(start_minutes // CELL_MINUTES))
+    last = min(CELLS_PER_DAY, int(-(-end_minutes // CELL_MINUTES)))  # ceil
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def is_cell_aligned(t):
+    """Mốc giờ nằm đúng biên ô 5 phút: khi đó so sánh bằng bitmap cho kết quả giống hệt so sánh thời gian"""
+    return t.minute % CELL_MINUTES == 0 and t.second == 0 and t.microsecond == 0
+
+
+class OccupancyStore:
+    def __init__(self):
+        self.path = None
+        self._fd = None
+        self._map = None
+        self._thread_lock = threading.Lock()  # flock không chặn các thread trong cùng tiến trình
+
+    def init_app(self, app):
+        config = app.config.get('OCCUPANCY_STORE', '')
+        if config == 'off':
+            return
+        path = config or default_store_path(app.config.get('SQLALCHEMY_DATABASE_URI'))
+        if self._map is not None and self.path == path:
+            return
+
+        try:
+            self._open(path)
+        except Exception as e:
+            print(f"Occupancy store disabled: {str(e)}")
+            self._map = None
+
+    def _open(self, path):
+        size = COUNTERS_OFFSET + COUNTER_SLOTS * _COUNTER.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(fd, _HEADER.size, 0)
+            if len(header) < _HEADER.size or _HEADER.unpack(header) != (STORE_MAGIC, STORE_LAYOUT_VERSION, STORE_CAPACITY):
+                # File mới hoặc khác layout: khởi tạo lại
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, _HEADER.pack(STORE_MAGIC, STORE_LAYOUT_VERSION, STORE_CAPACITY), 0)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+        self._map = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self._fd = fd
+        self.path = path
+
+    @property
+    def enabled(self):
+        return self._map is not None
+
+    @staticmethod
+    def _slots(court_id, day_ordinal):
+        start = ((court_id * 2654435761) ^ (day_ordinal * 40503)) % STORE_CAPACITY
+        for probe in range(MAX_PROBES):
+            offset = HEADER_SIZE + ((start + probe) % STORE_CAPACITY) * ENTRY_SIZE
+            yield offset
+
+    def _read_entry(self, offset):
+        """Đọc một entry theo seqlock, trả về (courtId, day, loadedAt, bitmap) hoặc None nếu đang bị ghi"""
+        view = self._map
+        for _ in range(100):
+            seq, court_id, day_ordinal, loaded_at = _ENTRY_META.unpack_from(view, offset)
+            if seq & 1:
+                continue  # Writer đang ghi
+            bitmap = int.from_bytes(view[offset + _ENTRY_META.size:offset + _ENTRY_META.size + BITMAP_BYTES], 'little')
+            if _SEQ.unpack_from(view, offset)[0] == seq:
+                return court_id, day_ordinal, loaded_at, bitmap
+        return None
+
+    def _lookup(self, court_id, day_ordinal, now):
+        for offset in self._slots(court_id, day_ordinal):
+            entry = self._read_entry(offset)
+            if entry is None:
+                return None
+            entry_court, entry_day, loaded_at, bitmap = entry
+            if entry_court == court_id and entry_day == day_ordinal:
+                return bitmap if now - loaded_at < OCCUPANCY_TTL_SECONDS else None
+            if entry_court == 0:
+                return None
+        return None
+
+    def _write_entry(self, offset, court_id, day_ordinal, loaded_at, bitmap):
+        view = self._map
+        seq = _SEQ.unpack_from(view, offset)[0]
+        _SEQ.pack_into(view, offset, (seq + 1) & 0xFFFFFFFF)
+        _ENTRY_FIELDS.pack_into(view, offset + _SEQ.size, court_id, day_ordinal, loaded_at)
+        view[offset + _ENTRY_META.size:offset + _ENTRY_META.size + BITMAP_BYTES] = bitmap.to_bytes(BITMAP_BYTES, 'little')
+        _SEQ.pack_into(view, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def _store(self, items, now, overwrite=True):
+        """
+        Ghi nhiều (courtId, day) -> bitmap. Phải gọi khi đang giữ _locked().
+        overwrite=False: không ghi đè entry còn hạn (có thể mới hơn dữ liệu vừa đọc).
+        """
+        for (court_id, day_ordinal), bitmap in items:
+            target = None
+            oldest = None
+            for offset in self._slots(court_id, day_ordinal):
+                _, entry_court, entry_day, loaded_at = _ENTRY_META.unpack_from(self._map, offset)
+                if entry_court == 0 or (entry_court == court_id and entry_day == day_ordinal):
+                    target = offset
+                    break
+                if oldest is None or loaded_at < oldest[1]:
+                    oldest = (offset, loaded_at)
+
+            if target is None:
+                target = oldest[0]  # Đầy: thay entry cũ nhất trong chuỗi probe
+            elif not overwrite and entry_court != 0 and now - loaded_at < OCCUPANCY_TTL_SECONDS:
+                continue
+            self._write_entry(target, court_id, day_ordinal, now, bitmap)
+
+    @staticmethod
+    def _counter_offset(court_id):
+        return COUNTERS_OFFSET + (court_id % COUNTER_SLOTS) * _COUNTER.size
+
+    def _counters(self, court_ids):
+        return {court_id: _COUNTER.unpack_from(self._map, self._counter_offset(court_id))[0] for court_id in court_ids}
+
+    def _bump_counters(self, court_ids):
+        """Báo cho các reader đang đọc DB rằng dữ liệu của sân đã đổi. Phải gọi khi đang giữ _locked()"""
+        for court_id in set(court_ids):
+            offset = self._counter_offset(court_id)
+            _COUNTER.pack_into(self._map, offset, (_COUNTER.unpack_from(self._map, offset)[0] + 1) & 0xFFFFFFFF)
+
+    @contextmanager
+    def _locked(self):
+        """flock trên file: chỉ một writer (trong mọi worker) tại một thời điểm"""
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _load_bitmaps(conn, court_ids, days):
+        """Tính bitmap từ DB cho mọi (sân, ngày) yêu cầu: một query booking, một query lịch đóng sân"""
+        bitmaps = {(court_id, day.toordinal()): 0 for court_id in court_ids for day in days}
+        first_day, last_day = min(days), max(days)
+        rows = conn.execute(
+            select(Booking.courtId, Booking.startTime, Booking.endTime).where(
+                Booking.courtId.in_(list(court_ids)),
+                Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+                starts_on_days(first_day, last_day)
+            )
+        ).all()
+        for court_id, start_time, end_time in rows:
+            # Booking qua nửa đêm được cắt ở cuối ngày bắt đầu (cells_mask tự giới hạn trong ngày)
+            day = start_time.date()
+            key = (court_id, day.toordinal())
+            if key in bitmaps:
+                bitmaps[key] |= cells_mask(start_time, end_time, day)
+
+        # Lịch đóng sân có thể kéo dài nhiều ngày: cells_mask tự cắt theo từng ngày
+        blackouts = BlackoutService.court_blackouts(
+            conn, BlackoutService.court_complex_ids(conn, court_ids),
+            datetime.combine(first_day, datetime.min.time()),
+            datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+        )
+        for court_id, intervals in blackouts.items():
+            for day in days:
+                key = (court_id, day.toordinal())
+                for interval in intervals:
+                    bitmaps[key] |= cells_mask(interval.startTime, interval.endTime, day)
+        return bitmaps
+
+    def get_many(self, court_ids, days):
+        """
+        Bitmap chiếm chỗ cho mọi (sân, ngày), dict (courtId, date) -> int.
+        Entry thiếu hoặc hết hạn được tính lại từ DB một lần cho cả nhóm rồi ghi vào store.
+        """
+        now = int(time.time())
+        result = {}
+        missing_courts, missing_days = set(), set()
+        for court_id in court_ids:
+            for day in days:
+                bitmap = self._lookup(court_id, day.toordinal(), now) if self.enabled else None
+                if bitmap is None:
+                    missing_courts.add(court_id)
+                    missing_days.add(day)
+                else:
+                    result[(court_id, day)] = bitmap
+
+        if missing_courts:
+            counters = self._counters(missing_courts) if self.enabled else None
+            with db.engine.connect() as conn:
+                loaded = self._load_bitmaps(conn, missing_courts, missing_days)
+            if self.enabled:
+                with self._locked():
+                    # Sân bị refresh / invalidate trong lúc đọc DB: dữ liệu vừa đọc có thể cũ, không ghi vào store
+                    current = self._counters(missing_courts)
+                    self._store(
+                        [(key, bitmap) for key, bitmap in loaded.items() if current[key[0]] == counters[key[0]]],
+                        now, overwrite=False
+                    )
+            for (court_id, day_ordinal), bitmap in loaded.items():
+                result.setdefault((court_id, datetime.fromordinal(day_ordinal).date()), bitmap)
+        return result
+
+    def is_occupied(self, court_id, start_dt, end_dt):
+        """
+        Kiểm tra nhanh khoảng [start_dt, end_dt) có trùng booking đang hoạt động không.
+        Chỉ dùng để từ chối sớm: False không đảm bảo còn trống (vẫn phải kiểm tra trong DB).
+        """
+        if not self.enabled or start_dt.tzinfo is not None or start_dt.date() != end_dt.date():
+            return False
+        if not (is_cell_aligned(start_dt) and is_cell_aligned(end_dt)):
+            return False  # Bitmap chỉ chính xác khi hai đầu khoảng nằm đúng biên ô
+        day = start_dt.date()
+        bitmap = self.get_many([court_id], [day])[(court_id, day)]
+        return bool(bitmap & cells_mask(start_dt, end_dt, day))
+
+    def refresh(self, conn, court_id, days):
+        """Tính lại bitmap của sân cho các ngày bị ảnh hưởng sau khi booking đổi trạng thái"""
+        if not self.enabled:
+            return
+        # Query trong lúc giữ khóa: writer sau luôn đọc dữ liệu mới hơn writer trước
+        with self._locked():
+            loaded = self._load_bitmaps(conn, [court_id], days)
+            self._bump_counters([court_id])
+            self._store(loaded.items(), int(time.time()))
+
+    def invalidate_courts(self, court_ids):
+        """
+        Cho hết hạn mọi entry của các sân (lịch đóng sân có thể ảnh hưởng nhiều ngày không biết trước).
+        Entry được tính lại từ DB ở lần đọc tiếp theo.
+        """
+        if not self.enabled or not court_ids:
+            return
+        court_ids = set(court_ids)
+        with self._locked():
+            self._bump_counters(court_ids)
+            for index in range(STORE_CAPACITY):
+                offset = HEADER_SIZE + index * ENTRY_SIZE
+                _, entry_court, entry_day, loaded_at = _ENTRY_META.unpack_from(self._map, offset)
+                if entry_court in court_ids and loaded_at:
+                    self._write_entry(offset, entry_court, entry_day, 0, 0)
+
+
+occupancy_store = OccupancyStore()
+
+
+@booking_changed.connect
+def _refresh_occupancy(sender, change, **kwargs):
+    if not occupancy_store.enabled:
+        return
+    try:
+        days = []
+        day = change.startTime.date()
+        while day <= change.endTime.date():
+            days.append(day)
+            day += timedelta(days=1)
+        with db.engine.connect() as conn:
+            occupancy_store.refresh(conn, change.courtId, days)
+    except Exception as e:
+        print(f"Failed to refresh occupancy for court {change.courtId}: {str(e)}")
+        traceback.print_exc()
+
+
+@blackout_changed.connect
+def _invalidate_blackout_courts(sender, change, **kwargs):
+    if not occupancy_store.enabled:
+        return
+    try:
+        if change.courtId:
+            court_ids = [change.courtId]
+        else:
+            with db.engine.connect() as conn:
+                court_ids = conn.execute(select(Court.id).where(Court.complexId == change.complexId)).scalars().all()
+        occupancy_store.invalidate_courts(court_ids)
+    except Exception as e:
+        print(f"Failed to invalidate occupancy for complex {change.complexId}: {str(e)}")
+        traceback.print_exc()
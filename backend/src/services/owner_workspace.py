@@ -0,0 +1,381 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from src.models.database import Booking, Court, CourtComplex, HourlyPriceRate, User
+from src.services.availability_service import AvailabilityService
+from src.services.blackout_service import BlackoutService
+from src.services.booking_archive import BookingHistory
+from src.services.booking_ranges import month_bounds, starts_on_days, within
+
+# Snapshot dashboard của owner (/api/owner/workspace): setup status, danh sách complex, thống kê,
+# booking chờ duyệt, sân + bảng giá và lịch availability của mọi complex.
+# Mỗi phần dữ liệu là một query gộp cho tất cả complex của owner (số query cố định, không theo số complex),
+# các query độc lập chạy song song, mỗi query trên một connection riêng lấy từ pool.
+
+WORKSPACE_WORKERS = 4
+DEFAULT_AVAILABILITY_DAYS = 7
+# Khoảng ngày tối đa của lịch availability (end_date - start_date): lịch là complex x sân x ngày
+MAX_AVAILABILITY_DAYS = 31
+MONTHLY_STATUSES = ('Confirmed', 'Completed')
+CALENDAR_STATUSES = ('Pending', 'Confirmed')
+
+# Section của response -> các loader cần chạy (?sections= chọn một phần, mặc định tất cả)
+SECTION_LOADERS = {
+    'setupStatus': ('complexes', 'courts', 'rates'),
+    'courtComplexes': ('complexes', 'courts', 'monthly'),
+    'statistics': ('complexes', 'courts', 'monthly'),
+    'pendingBookings': ('pending',),
+    'courts': ('complexes', 'courts', 'rates'),
+    'availability': ('complexes', 'courts', 'occupied'),
+}
+WORKSPACE_SECTIONS = tuple(SECTION_LOADERS)
+
+COMPLEX_COLUMNS = (
+    CourtComplex.id, CourtComplex.name, CourtComplex.address, CourtComplex.city,
+    CourtComplex.sportType, CourtComplex.phoneNumber, CourtComplex.openTime, CourtComplex.closeTime,
+    CourtComplex.mainImage, CourtComplex.rating, CourtComplex.totalReviews, CourtComplex.status
+)
+
+# Dùng chung cho mọi request của worker: giới hạn số connection workspace lấy cùng lúc từ pool
+_executor = ThreadPoolExecutor(max_workers=WORKSPACE_WORKERS, thread_name_prefix='owner-workspace')
+
+
+def estimate_occupancy_rate(monthly_bookings, total_courts):
+    """
+    Tỷ lệ lấp đầy ước lượng (%) của tháng: giả định mỗi booking 1 giờ, mỗi sân mở 10 giờ/ngày * 30 ngày.
+    Để chính xác cần tổng giờ có thể đặt theo giờ mở cửa của từng complex và tổng thời lượng booking.
+    """
+    if monthly_bookings <= 0 or total_courts <= 0:
+        return 0.0
+    occupancy_rate = (monthly_bookings / (total_courts * 30 * 10)) * 100
+    return round(min(occupancy_rate, 100.0), 1)
+
+
+def setup_status(complexes, courts_by_complex, rated_court_ids):
+    """
+    Body của /setup-status. complexes theo thứ tự id, courts_by_complex: complexId -> list sân,
+    rated_court_ids: tập id các sân đã có bảng giá.
+    """
+    if not complexes:
+        return {
+            'hasCourtComplex': False,
+            'setupStep': 'create_complex',
+            'message': 'Bạn cần tạo khu phức hợp sân đầu tiên để bắt đầu kinh doanh.'
+        }
+
+    for complex_item in complexes:
+        courts = courts_by_complex.get(complex_item.id, [])
+        if not courts:
+            return {
+                'hasCourtComplex': True,
+                'setupStep': 'complete_complex',
+                'complexId': complex_item.id,
+                'message': f'Khu phức hợp "{complex_item.name}" cần được hoàn thiện thông tin sân và giá cả.'
+            }
+        for court in courts:
+            if court.id not in rated_court_ids:
+                return {
+                    'hasCourtComplex': True,
+                    'setupStep': 'complete_complex',
+                    'complexId': complex_item.id,
+                    'message': f'Sân "{court.name}" cần được thiết lập giá theo khung giờ.'
+                }
+
+    return {
+        'hasCourtComplex': True,
+        'message': 'Thiết lập đã hoàn tất.'
+    }
+
+
+def serialize_owner_complex(complex_item, court_count, monthly_bookings, monthly_revenue):
+    """Một complex trong danh sách /court-complexes của owner"""
+    return {
+        'id': complex_item.id,
+        'name': complex_item.name,
+        'address': complex_item.address,
+        'city': complex_item.city,
+        'sportType': complex_item.sportType,
+        'phoneNumber': complex_item.phoneNumber,
+        'openTime': complex_item.openTime.strftime('%H:%M') if complex_item.openTime else None,
+        'closeTime': complex_item.closeTime.strftime('%H:%M') if complex_item.closeTime else None,
+        'mainImage': complex_item.mainImage,
+        'rating': float(complex_item.rating) if complex_item.rating else 0,
+        'totalReviews': complex_item.totalReviews,
+        'status': complex_item.status,
+        'courtCount': court_count,
+        'monthlyBookings': monthly_bookings,
+        'monthlyRevenue': float(monthly_revenue)
+    }
+
+
+def serialize_rate(rate):
+    return {
+        'dayOfWeek': rate.dayOfWeek,
+        'startTime': rate.startTime.strftime('%H:%M') if rate.startTime else '06:00',
+        'endTime': rate.endTime.strftime('%H:%M') if rate.endTime else '22:00',
+        'price': float(rate.price)
+    }
+
+
+def serialize_pending_booking(row):
+    """Một booking chờ duyệt (/bookings/pending) từ một dòng của OwnerWorkspaceService.pending_bookings"""
+    if row.customerId:
+        # User không lưu số điện thoại
+        customer_info = {'fullName': row.customerName, 'email': row.customerEmail, 'phone': ''}
+    else:
+        customer_info = {'fullName': row.walkInCustomerName, 'email': '', 'phone': row.walkInCustomerPhone}
+    return {
+        'id': row.id,
+        'customer': customer_info,
+        'court': {
+            'name': row.courtName,
+            'complex': row.complexName
+        },
+        'startTime': row.startTime.isoformat(),
+        'endTime': row.endTime.isoformat(),
+        'totalPrice': float(row.totalPrice),
+        'bookingType': row.bookingType,
+        'createdAt': row.createdAt.isoformat()
+    }
+
+
+class OwnerWorkspaceService:
+    """
+    Các loader nhận `conn` (Connection hoặc db.session) và trả về các dòng của mọi complex thuộc owner.
+    Chỉ chọn cột, không dựng ORM object, để chạy được trên connection riêng ở thread khác.
+    """
+
+    @staticmethod
+    def complexes(conn, owner_id):
+        return conn.execute(
+            select(*COMPLEX_COLUMNS).where(CourtComplex.ownerId == owner_id).order_by(CourtComplex.id)
+        ).all()
+
+    @staticmethod
+    def courts(conn, owner_id):
+        return conn.execute(
+            select(Court.id, Court.complexId, Court.name, Court.status)
+            .join(CourtComplex, Court.complexId == CourtComplex.id)
+            .where(CourtComplex.ownerId == owner_id)
+            .order_by(Court.id)
+        ).all()
+
+    @staticmethod
+    def price_rates(conn, owner_id):
+        return conn.execute(
+            select(
+                HourlyPriceRate.courtId, HourlyPriceRate.dayOfWeek, HourlyPriceRate.startTime,
+                HourlyPriceRate.endTime, HourlyPriceRate.price
+            ).join(Court, HourlyPriceRate.courtId == Court.id)
+            .join(CourtComplex, Court.complexId == CourtComplex.id)
+            .where(CourtComplex.ownerId == owner_id)
+            .order_by(HourlyPriceRate.id)
+        ).all()
+
+    @staticmethod
+    def monthly_totals_select(owner_id, day=None):
+        """Số booking, doanh thu Confirmed/Completed tạo trong tháng chứa `day` (kể cả đã lưu trữ), gộp theo complexId"""
+        month_start, next_month_start = month_bounds(day or datetime.now())
+        return select(
+            Court.complexId,
+            func.count(BookingHistory.id).label('bookings'),
+            func.coalesce(func.sum(BookingHistory.totalPrice), 0).label('revenue')
+        ).select_from(BookingHistory).join(
+            Court, BookingHistory.courtId == Court.id
+        ).join(CourtComplex, Court.complexId == CourtComplex.id).where(
+            CourtComplex.ownerId == owner_id,
+            within(BookingHistory.createdAt, month_start, next_month_start),
+            BookingHistory.status.in_(MONTHLY_STATUSES)
+        ).group_by(Court.complexId)
+
+    @staticmethod
+    def monthly_totals(conn, owner_id, day=None):
+        """complexId -> (số booking, doanh thu) trong tháng, xem monthly_totals_select"""
+        rows = conn.execute(OwnerWorkspaceService.monthly_totals_select(owner_id, day)).all()
+        return {row.complexId: (row.bookings, row.revenue) for row in rows}
+
+    @staticmethod
+    def complex_listing(conn, owner_id, day=None):
+        """
+        Các complex của owner kèm courtCount, monthlyBookings, monthlyRevenue trong một query:
+        số sân và tổng theo tháng là subquery đã gộp theo complexId, nối vào từng complex.
+        """
+        court_counts = select(
+            Court.complexId, func.count(Court.id).label('courtCount')
+        ).join(CourtComplex, Court.complexId == CourtComplex.id).where(
+            CourtComplex.ownerId == owner_id
+        ).group_by(Court.complexId).subquery()
+        monthly = OwnerWorkspaceService.monthly_totals_select(owner_id, day).subquery()
+
+        return conn.execute(
+            select(
+                *COMPLEX_COLUMNS,
+                func.coalesce(court_counts.c.courtCount, 0).label('courtCount'),
+                func.coalesce(monthly.c.bookings, 0).label('monthlyBookings'),
+                func.coalesce(monthly.c.revenue, 0).label('monthlyRevenue')
+            ).outerjoin(court_counts, court_counts.c.complexId == CourtComplex.id)
+            .outerjoin(monthly, monthly.c.complexId == CourtComplex.id)
+            .where(CourtComplex.ownerId == owner_id)
+            .order_by(CourtComplex.id)
+        ).all()
+
+    @staticmethod
+    def pending_bookings(conn, owner_id):
+        return conn.execute(
+            select(
+                Booking.id, Booking.customerId, Booking.walkInCustomerName, Booking.walkInCustomerPhone,
+                Booking.startTime, Booking.endTime, Booking.totalPrice, Booking.bookingType, Booking.createdAt,
+                Court.name.label('courtName'), CourtComplex.name.label('complexName'),
+                User.fullName.label('customerName'), User.email.label('customerEmail')
+            ).join(Court, Booking.courtId == Court.id)
+            .join(CourtComplex, Court.complexId == CourtComplex.id)
+            .outerjoin(User, Booking.customerId == User.id)
+            .where(CourtComplex.ownerId == owner_id, Booking.status == 'Pending')
+            .order_by(Booking.createdAt.desc())
+        ).all()
+
+    @staticmethod
+    def calendar_occupancy(conn, owner_id, start_date, end_date):
+        """Booking và lịch đóng của các sân Active trong [start_date, end_date], nhóm theo (courtId, ngày)"""
+        courts = conn.execute(
+            select(Court.id, Court.complexId)
+            .join(CourtComplex, Court.complexId == CourtComplex.id)
+            .where(CourtComplex.ownerId == owner_id, Court.status == 'Active')
+        ).all()
+        bookings = conn.execute(
+            select(Booking.courtId, Booking.startTime, Booking.endTime)
+            .join(Court, Booking.courtId == Court.id)
+            .join(CourtComplex, Court.complexId == CourtComplex.id)
+            .where(
+                CourtComplex.ownerId == owner_id,
+                starts_on_days(start_date, end_date),
+                Booking.status.in_(CALENDAR_STATUSES)
+            )
+        ).all()
+
+        occupied = {}
+        for booking in bookings:
+            occupied.setdefault((booking.courtId, booking.startTime.date()), []).append(booking)
+
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        blackouts = BlackoutService.court_blackouts(
+            conn, {court.id: court.complexId for court in courts},
+            datetime.combine(start_date, datetime.min.time()),
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        )
+        for key, intervals in BlackoutService.by_court_day(blackouts, days).items():
+            occupied.setdefault(key, []).extend(intervals)
+        return occupied
+
+    @staticmethod
+    def load(engine, loaders):
+        """
+        Chạy song song các loader (dict tên -> hàm(conn)), mỗi loader trên một connection riêng của `engine`.
+        Trả về dict tên -> kết quả; lỗi của loader được ném lại ở đây.
+        """
+        def run(loader):
+            with engine.connect() as conn:
+                return loader(conn)
+
+        futures = {name: _executor.submit(run, loader) for name, loader in loaders.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    @staticmethod
+    def parse_sections(value):
+        """?sections=a,b (mặc định tất cả), trả về (tuple section, lỗi)"""
+        if not value:
+            return WORKSPACE_SECTIONS, None
+        sections = tuple(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+        unknown = [section for section in sections if section not in WORKSPACE_SECTIONS]
+        if unknown or not sections:
+            return None, f"sections must be a comma separated subset of: {', '.join(WORKSPACE_SECTIONS)}"
+        return sections, None
+
+    @staticmethod
+    def build(engine, owner_id, start_date, end_date, encoding=None, sections=WORKSPACE_SECTIONS):
+        """Body của /workspace gồm các `sections`; start_date, end_date: khoảng ngày của lịch availability"""
+        loaders = {
+            'complexes': lambda conn: OwnerWorkspaceService.complexes(conn, owner_id),
+            'courts': lambda conn: OwnerWorkspaceService.courts(conn, owner_id),
+            'rates': lambda conn: OwnerWorkspaceService.price_rates(conn, owner_id),
+            'monthly': lambda conn: OwnerWorkspaceService.monthly_totals(conn, owner_id),
+            'pending': lambda conn: OwnerWorkspaceService.pending_bookings(conn, owner_id),
+            'occupied': lambda conn: OwnerWorkspaceService.calendar_occupancy(conn, owner_id, start_date, end_date),
+        }
+        needed = {name for section in sections for name in SECTION_LOADERS[section]}
+        data = OwnerWorkspaceService.load(engine, {name: loaders[name] for name in loaders if name in needed})
+
+        complexes = data.get('complexes', [])
+        courts_by_complex = {}
+        for court in data.get('courts', []):
+            courts_by_complex.setdefault(court.complexId, []).append(court)
+        rates_by_court = {}
+        for rate in data.get('rates', []):
+            rates_by_court.setdefault(rate.courtId, []).append(rate)
+
+        body = {}
+        if 'setupStatus' in sections:
+            body['setupStatus'] = setup_status(complexes, courts_by_complex, set(rates_by_court))
+
+        if 'courtComplexes' in sections or 'statistics' in sections:
+            court_complexes = []
+            total_bookings, total_revenue = 0, 0
+            for complex_item in complexes:
+                bookings, revenue = data['monthly'].get(complex_item.id, (0, 0))
+                total_bookings += bookings
+                total_revenue += revenue
+                court_complexes.append(serialize_owner_complex(
+                    complex_item, len(courts_by_complex.get(complex_item.id, [])), bookings, revenue
+                ))
+            total_courts = len(data['courts'])
+            if 'courtComplexes' in sections:
+                body['courtComplexes'] = court_complexes
+            if 'statistics' in sections:
+                body['statistics'] = {
+                    'overview': {
+                        'totalComplexes': len(complexes),
+                        'totalCourts': total_courts,
+                        'monthlyBookings': total_bookings,
+                        'monthlyRevenue': float(total_revenue),
+                        'occupancyRate': estimate_occupancy_rate(total_bookings, total_courts)
+                    }
+                }
+
+        if 'pendingBookings' in sections:
+            body['pendingBookings'] = [serialize_pending_booking(row) for row in data['pending']]
+
+        if 'courts' in sections:
+            body['courts'] = {
+                complex_item.id: [
+                    {
+                        'id': court.id,
+                        'name': court.name,
+                        'status': court.status,
+                        'pricing': [serialize_rate(rate) for rate in rates_by_court.get(court.id, [])]
+                    }
+                    for court in courts_by_complex.get(complex_item.id, [])
+                ]
+                for complex_item in complexes
+            }
+
+        if 'availability' in sections:
+            # Giống /court-complexes/<id>/availability, một lịch cho mỗi complex
+            occupied = data['occupied']
+            days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+            def calendar(complex_item):
+                slots = AvailabilityService.calendar_slots(complex_item.openTime, complex_item.closeTime)
+                courts = [court for court in courts_by_complex.get(complex_item.id, []) if court.status == 'Active']
+
+                def flags_for(court, day):
+                    return AvailabilityService.calendar_booked_flags(day, slots, occupied.get((court.id, day), []))
+                return AvailabilityService.build_calendar(complex_item, courts, days, slots, flags_for, encoding)
+
+            body['availability'] = {complex_item.id: calendar(complex_item) for complex_item in complexes}
+            body['availabilityRange'] = {
+                'startDate': start_date.strftime('%Y-%m-%d'),
+                'endDate': end_date.strftime('%Y-%m-%d')
+            }
+        return body
@@ -0,0 +1,67 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# Phân trang keyset (seek): trang sau lọc theo giá trị sắp xếp của dòng cuối trang trước
+# thay vì OFFSET, nên chi phí mỗi trang không tăng theo số dòng đã bỏ qua.
+# Thứ tự luôn kết thúc bằng một cột duy nhất (id) để không bỏ sót / lặp dòng có giá trị trùng.
+# Cursor gửi cho client là chuỗi base64 (không cần giải mã phía client).
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class CursorError(ValueError):
+    pass
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """?limit=: mặc định `default`, giới hạn trong [1, MAX_PAGE_SIZE]"""
+    if value is None:
+        return default
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(key, values):
+    """Cursor tới sau dòng có các giá trị sắp xếp `values`; `key` (ví dụ 'createdAt:desc') gắn cursor với một thứ tự"""
+    raw = json.dumps({'k': key, 'v': [_encode_value(value) for value in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, key):
+    """Các giá trị sắp xếp trong cursor; CursorError nếu cursor sai hoặc thuộc thứ tự khác"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        values = [_decode_value(value) for value in data['v']]
+    except (ValueError, TypeError, KeyError):
+        raise CursorError('Invalid cursor')
+    if data.get('k') != key:
+        raise CursorError('Cursor does not match sortBy / sortOrder')
+    return values
+
+
+def keyset_after(columns, values, descending=False):
+    """
+    Điều kiện "đứng sau (values) theo thứ tự columns" cho các cột cùng chiều sắp xếp
+    (tương đương (c1, c2) > (v1, v2), hoặc < khi descending).
+    """
+    conditions = []
+    for index, column in enumerate(columns):
+        beyond = column < values[index] if descending else column > values[index]
+        conditions.append(and_(*[columns[i] == values[i] for i in range(index)], beyond))
+    return or_(*conditions)
@@ -0,0 +1,82 @@
+from datetime import datetime
+from decimal import Decimal
+
+from src.models.database import db, HourlyPriceRate
+
+DAY_NAMES = {
+    0: "Monday", 1: "Tuesday", 2: "Wednesday", 3: "Thursday",
+    4: "Friday", 5: "Saturday", 6: "Sunday"
+}
+
+
+class PricingError(Exception):
+    """Không tính được giá (thiếu bảng giá cho ngày / khung giờ)"""
+
+
+class PricingService:
+    @staticmethod
+    def load_rates(court_id, days):
+        """
+        Bảng giá của sân cho các ngày trong tuần của `days` (datetime/date) và 'All', một query.
+        Dùng chung cho nhiều khoảng thời gian (ví dụ cả chuỗi booking định kỳ).
+        """
+        day_names = {DAY_NAMES[day.weekday()] for day in days}
+        return HourlyPriceRate.query.filter(
+            HourlyPriceRate.courtId == court_id,
+            db.or_(
+                HourlyPriceRate.dayOfWeek.in_(day_names),
+                HourlyPriceRate.dayOfWeek == 'All'
+            )
+        ).order_by(HourlyPriceRate.startTime).all()
+
+    @staticmethod
+    def price_interval(rates, start_dt, end_dt):
+        """
+        Tổng giá (Decimal) của khoảng [start_dt, end_dt): chia theo các khung giờ của bảng giá,
+        ưu tiên giá riêng của ngày trong tuần rồi mới tới giá 'All'.
+        Raises PricingError với thông báo hiển thị cho người dùng.
+        """
+        current_day_name = DAY_NAMES[start_dt.weekday()]
+        all_rates_for_court = [rate for rate in rates if rate.dayOfWeek in (current_day_name, 'All')]
+
+        if not all_rates_for_court:
+            raise PricingError('Không tìm thấy bảng giá cho sân này trong khung giờ yêu cầu.')
+
+        estimated_price_decimal = Decimal(0)
+        time_pointer = start_dt
+
+        while time_pointer < end_dt:
+            current_segment_time_only = time_pointer.time()
+
+            applicable_rate = None
+            for rate in all_rates_for_court:
+                if rate.dayOfWeek == current_day_name and \
+                   rate.startTime <= current_segment_time_only and \
+                   rate.endTime > current_segment_time_only:
+                    applicable_rate = rate
+                    break
+
+            if not applicable_rate:
+                for rate in all_rates_for_court:
+                    if rate.dayOfWeek == 'All' and \
+                       rate.startTime <= current_segment_time_only and \
+                       rate.endTime > current_segment_time_only:
+                        applicable_rate = rate
+                        break
+
+            if not applicable_rate:
+                raise PricingError(
+                    f'Không tìm thấy giá cho khung giờ {current_segment_time_only.strftime("%H:%M")} vào {current_day_name}.'
+                )
+
+            segment_end_dt_at_rate = datetime.combine(time_pointer.date(), applicable_rate.endTime)
+            current_segment_end = min(end_dt, segment_end_dt_at_rate)
+
+            duration_seconds_in_segment = (current_segment_end - time_pointer).total_seconds()
+            duration_hours_decimal = Decimal(str(duration_seconds_in_segment / 3600))
+
+            estimated_price_decimal += applicable_rate.price * duration_hours_decimal
+
+            time_pointer = current_segment_end
+
+        return estimated_price_decimal
@@ -0,0 +1,116 @@
+from collections import namedtuple
+import hashlib
+import json
+import threading
+
+from flask import Response, request
+from sqlalchemy import event, select
+
+from src.models.database import db, SportType, Amenity, CourtComplex
+from src.services.complex_changes import ComplexChangeSync, log_complex_changes
+
+# Dữ liệu tham chiếu (loại sân, tiện ích, thành phố) gần như không đổi.
+# Store giữ sẵn body JSON + ETag của từng endpoint. Trước mỗi lần dùng đọc phần mới của nhật ký complex_changes
+# (complex_changes.py): có thay đổi complex (thành phố, loại sân, trạng thái) hoặc loại sân / tiện ích ở bất kỳ
+# worker nào thì nạp lại.
+
+# Các thành phố phổ biến, gợi ý khi owner tạo complex
+SETUP_CITIES = [
+    'Hà Nội', 'Hồ Chí Minh', 'Đà Nẵng', 'Hải Phòng', 'Cần Thơ',
+    'Biên Hòa', 'Huế', 'Nha Trang', 'Buôn Ma Thuột', 'Quy Nhon',
+    'Vũng Tàu', 'Nam Định', 'Phan Thiết', 'Long Xuyên', 'Hạ Long'
+]
+
+_REFERENCE_MODELS = (SportType, Amenity)
+_CHANGED_KEY = 'reference_data_changed'
+
+# Một document đã serialize sẵn: body (bytes) và strong ETag tính từ nội dung
+ReferenceDocument = namedtuple('ReferenceDocument', ['body', 'etag'])
+
+
+def _document(data):
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return ReferenceDocument(body=body, etag=hashlib.sha1(body).hexdigest()[:20])
+
+
+class ReferenceDataStore(ComplexChangeSync):
+    def __init__(self):
+        self._documents = None
+        self._stale = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Nạp sẵn khi khởi động; nếu DB chưa sẵn sàng (chưa migrate) thì để nạp lười"""
+        try:
+            with app.app_context():
+                self._reload()
+        except Exception as e:
+            print(f"Reference data not preloaded: {str(e)}")
+
+    def refresh_complex(self, conn, complex_id):
+        self._stale = True
+
+    def reference_data_changed(self):
+        self._stale = True
+
+    def _reload(self):
+        self._stale = False
+        with db.engine.connect() as conn:
+            last_seq, gaps = self._start_position(conn)
+            sport_types = conn.execute(select(SportType.id, SportType.name).order_by(SportType.id)).all()
+            amenities = conn.execute(select(Amenity.id, Amenity.name, Amenity.icon).order_by(Amenity.id)).all()
+            active = select(CourtComplex.city, CourtComplex.sportType).where(CourtComplex.status == 'Active').subquery()
+            complex_cities = conn.execute(select(active.c.city).distinct()).scalars().all()
+            complex_sport_types = conn.execute(select(active.c.sportType).distinct()).scalars().all()
+
+        self._documents = {
+            'cities': _document({'cities': sorted(complex_cities)}),
+            'sport-types': _document({'sportTypes': sorted(complex_sport_types)}),
+            'setup-data': _document({
+                'sportTypes': [{'id': row.id, 'name': row.name} for row in sport_types],
+                'amenities': [{'id': row.id, 'name': row.name, 'icon': row.icon} for row in amenities],
+                'cities': SETUP_CITIES
+            })
+        }
+        self._last_seq, self._gaps = last_seq, gaps
+
+    def get(self, name):
+        if self._documents is not None:
+            with db.engine.connect() as conn:
+                self.sync_changed(conn)
+        if self._documents is None or self._stale:
+            with self._lock:
+                if self._documents is None or self._stale:
+                    self._reload()
+        return self._documents[name]
+
+    def response(self, name):
+        """Response JSON với strong ETag, trả 304 nếu client đã có bản hiện tại"""
+        document = self.get(name)
+        response = Response(document.body, mimetype='application/json')
+        response.set_etag(document.etag)
+        response.headers['Cache-Control'] = 'no-cache'  # Luôn revalidate bằng ETag
+        return response.make_conditional(request)
+
+
+reference_data = ReferenceDataStore()
+
+
+@event.listens_for(db.session, 'before_flush')
+def _track_reference_writes(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, _REFERENCE_MODELS):
+            session.info[_CHANGED_KEY] = True
+            return
+
+
+@event.listens_for(db.session, 'before_commit')
+def _log_reference_writes(session):
+    session.flush()  # Thay đổi chỉ được flush lúc commit cũng phải được thấy
+    if session.info.pop(_CHANGED_KEY, False):
+        log_complex_changes(session.connection(), [None])
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,308 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+
+from flask import Response, g, make_response, request
+
+from src.services.signals import blackout_changed, booking_changed, complex_changed
+
+# Cache response cho các endpoint đọc nhiều (detail complex, lưới availability, danh sách).
+# Cấu hình bằng RESPONSE_CACHE:
+#   memory (mặc định)                -> LRU trong từng worker
+#   filesystem:/tmp/sportsync-cache  -> dùng chung giữa các worker trên cùng máy
+#   off                              -> tắt cache
+# Mỗi entry gắn với các tag (ví dụ 'complex:12'). Invalidate một tag bằng cách tăng generation
+# của tag đó: key của entry chứa generation nên entry cũ không còn được đọc tới nữa.
+# Generation chỉ tăng ở worker đã ghi (backend memory), nên key còn chứa version mà @conditional_get
+# vừa đọc từ DB (g.etag_parts): worker khác cũng không trả body cũ cho version mới.
+
+MEMORY_CACHE_MAX_ENTRIES = 2048
+FILESYSTEM_PRUNE_EVERY = 500  # Dọn các file hết hạn sau mỗi N lần ghi
+
+
+class MemoryBackend:
+    """LRU trong bộ nhớ của một worker"""
+
+    def __init__(self, max_entries=MEMORY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, tag):
+        return self._generations.get(tag, 0)
+
+    def bump_generation(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    @contextmanager
+    def lock(self, key):
+        # Trong một worker, single-flight đã đảm bảo chỉ một thread tính
+        yield
+
+
+class FileSystemBackend:
+    """Cache dùng chung giữa các worker trên cùng máy, mỗi entry là một file JSON"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, 'entries'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'tags'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'locks'), exist_ok=True)
+        self._writes = 0
+
+    @staticmethod
+    def _hash(value):
+        return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, 'entries', self._hash(key))
+
+    def _tag_path(self, tag):
+        return os.path.join(self.directory, 'tags', self._hash(tag))
+
+    def get(self, key):
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if item['expiresAt'] < time.time():
+            return None
+        return item['value']
+
+    def set(self, key, value, ttl):
+        path = self._entry_path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'expiresAt': time.time() + ttl, 'value': value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)  # Ghi nguyên tử, worker khác không đọc được file dở dang
+
+        self._writes += 1
+        if self._writes % FILESYSTEM_PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self):
+        entries_dir = os.path.join(self.directory, 'entries')
+        now = time.time()
+        for name in os.listdir(entries_dir):
+            path = os.path.join(entries_dir, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    expired = json.load(f)['expiresAt'] < now
+            except (OSError, ValueError, KeyError):
+                expired = name.endswith('.tmp')
+            if expired:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def generation(self, tag):
+        try:
+            with open(self._tag_path(tag), 'r') as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump_generation(self, tag):
+        with open(self._tag_path(tag), 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                current = int(f.read() or 0)
+                f.seek(0)
+                f.truncate()
+                f.write(str(current + 1))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def lock(self, key):
+        """Khóa giữa các worker để chỉ một worker tính entry còn thiếu"""
+        path = os.path.join(self.directory, 'locks', self._hash(key)[:3])
+        with open(path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Gộp các request đồng thời cùng key: chỉ thread đầu tiên tính, các thread khác chờ kết quả"""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+class ResponseCache:
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.flight = SingleFlight()
+
+    def init_app(self, app):
+        config = app.config.get('RESPONSE_CACHE', 'memory')
+        if config == 'off':
+            self.backend = None
+        elif config.startswith('filesystem:'):
+            self.backend = FileSystemBackend(config[len('filesystem:'):])
+        else:
+            if config != 'memory':
+                print(f"Unknown RESPONSE_CACHE '{config}', using in-process memory cache")
+            self.backend = MemoryBackend()
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            return
+        for tag in tags:
+            try:
+                self.backend.bump_generation(tag)
+            except Exception as e:
+                print(f"Failed to invalidate cache tag {tag}: {str(e)}")
+
+    def make_key(self, endpoint, view_args, tags, vary=None):
+        # Chuẩn hóa tham số: thứ tự query string không ảnh hưởng tới key
+        params = sorted(request.args.items(multi=True))
+        generations = [(tag, self.backend.generation(tag)) for tag in tags]
+        version = g.get('etag_parts')  # Do @conditional_get bọc ngoài đặt, None nếu không có
+        raw = json.dumps([endpoint, sorted(view_args.items()), params, generations, vary, version], default=str)
+        return f'{endpoint}:{hashlib.sha1(raw.encode("utf-8")).hexdigest()}'
+
+    def get_or_compute(self, key, ttl, compute):
+        value = self.backend.get(key)
+        if value is not None:
+            return value, True
+
+        def leader():
+            with self.backend.lock(key):
+                # Worker khác có thể vừa tính xong trong lúc chờ khóa
+                cached = self.backend.get(key)
+                if cached is not None:
+                    return cached
+                value = compute()
+                if value['status'] == 200:
+                    self.backend.set(key, value, ttl)
+                return value
+
+        return self.flight.do(key, leader), False
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(ttl, tags, vary=None):
+    """
+    Decorator cache response JSON của route GET.
+
+    Args:
+        ttl: thời gian sống của entry (giây)
+        tags: hàm(**view_args) -> list tag dùng để invalidate, ví dụ ['complex:12']
+        vary: hàm(**view_args) -> giá trị thêm vào key (ví dụ ngày mặc định, mốc giờ)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not response_cache.enabled:
+                return view(*args, **kwargs)
+
+            key = response_cache.make_key(
+                request.endpoint, kwargs, tags(**kwargs), vary(**kwargs) if vary else None
+            )
+
+            def compute():
+                response = make_response(view(*args, **kwargs))
+                return {
+                    'status': response.status_code,
+                    'mimetype': response.mimetype,
+                    'body': response.get_data(as_text=True)
+                }
+
+            value, hit = response_cache.get_or_compute(key, ttl, compute)
+            response = Response(value['body'], status=value['status'], mimetype=value['mimetype'])
+            response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def complex_tags(complex_id, **kwargs):
+    return [f'complex:{complex_id}']
+
+
+@complex_changed.connect
+def _invalidate_complex(sender, complex_id, **kwargs):
+    response_cache.invalidate(f'complex:{complex_id}', 'complex-listing')
+
+
+@booking_changed.connect
+def _invalidate_complex_bookings(sender, change, **kwargs):
+    response_cache.invalidate(f'complex:{change.complexId}')
+
+
+@blackout_changed.connect
+def _invalidate_complex_blackouts(sender, change, **kwargs):
+    response_cache.invalidate(f'complex:{change.complexId}')
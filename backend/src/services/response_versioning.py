@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from functools import wraps
+import hashlib
+
+from flask import Response, g, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import func
+
+from src.models.database import db, CourtComplex
+
+# ETag cho các endpoint đọc công khai, tính từ version của court complex (cột court_complexes.version).
+# Kiểm tra If-None-Match chỉ tốn một query theo primary key, trả 304 trước khi chạy
+# các query nặng và serialize JSON.
+
+
+def complex_version_parts(complex_id):
+    """(version, openTime) của complex đang Active, None nếu không tồn tại / không Active"""
+    return db.session.query(CourtComplex.version, CourtComplex.openTime).filter(
+        CourtComplex.id == complex_id,
+        CourtComplex.status == 'Active'
+    ).first()
+
+
+def all_complexes_version():
+    """Version tổng của toàn bộ complex: đổi khi bất kỳ complex nào thay đổi hoặc được thêm"""
+    count, version_sum = db.session.query(func.count(CourtComplex.id), func.coalesce(func.sum(CourtComplex.version), 0)).one()
+    return f'{count}.{version_sum}'
+
+
+def owner_complexes_version(owner_id):
+    """Version tổng các complex của một owner (booking, sân, giá... của complex nào đổi cũng tăng)"""
+    count, version_sum = db.session.query(func.count(CourtComplex.id), func.coalesce(func.sum(CourtComplex.version), 0)).filter(
+        CourtComplex.ownerId == owner_id
+    ).one()
+    return f'{count}.{version_sum}'
+
+
+def grid_time_token(now, open_time):
+    """
+    Mốc thời gian mà trạng thái isPast của lưới 1 giờ có thể đổi.
+    Slot bắt đầu theo phút của giờ mở cửa, nên chỉ cần đổi token mỗi giờ tại phút đó.
+    """
+    offset = open_time.minute if open_time else 0
+    return (now - timedelta(minutes=offset)).strftime('%Y-%m-%d %H')
+
+
+def _make_etag(parts):
+    raw = '|'.join(str(part) for part in parts) + '|' + request.full_path
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def _not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def conditional_get(etag_parts):
+    """
+    Decorator cho route GET: etag_parts(**view_args) trả về tuple các thành phần của ETag
+    (ví dụ version của complex), hoặc None để bỏ qua (route tự xử lý 404...).
+    Nếu client gửi If-None-Match khớp thì trả 304 ngay, không gọi view.
+    Đặt ngoài @cached_response để key của cache gồm cả version (g.etag_parts).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                parts = etag_parts(*args, **kwargs)
+            except Exception as e:
+                print(f"Failed to compute ETag: {str(e)}")
+                parts = None
+
+            if parts is None:
+                return view(*args, **kwargs)
+
+            etag = _make_etag(parts)
+            if request.if_none_match.contains_weak(etag):
+                return _not_modified(etag)
+
+            # cached_response đưa các thành phần này vào key: body cache luôn đi cùng version mà nó được dựng từ
+            g.etag_parts = parts
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'no-cache'  # Luôn revalidate bằng ETag
+            return response
+        return wrapper
+    return decorator
+
+
+def complex_etag(complex_id, **kwargs):
+    """ETag của dữ liệu thuộc một complex (detail, review, availability theo ngày)"""
+    row = complex_version_parts(complex_id)
+    if row is None:
+        return None
+    # Ngày hiện tại: các endpoint mặc định lấy dữ liệu từ hôm nay khi không truyền ngày
+    return ('complex', complex_id, row.version, datetime.now().date())
+
+
+def complex_grid_etag(complex_id, **kwargs):
+    """ETag của lưới availability: thêm mốc giờ vì trạng thái isPast đổi theo thời gian"""
+    row = complex_version_parts(complex_id)
+    if row is None:
+        return None
+    return ('grid', complex_id, row.version, grid_time_token(datetime.now(), row.openTime))
+
+
+def complex_listing_etag(**kwargs):
+    return ('listing', all_complexes_version())
+
+
+def owner_workspace_etag(**kwargs):
+    """ETag của /api/owner/workspace: theo owner, version các complex của owner và ngày hiện tại (thống kê tháng, lịch mặc định)"""
+    owner_id = get_jwt_identity()
+    return ('workspace', owner_id, owner_complexes_version(owner_id), datetime.now().date())
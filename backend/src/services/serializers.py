@@ -0,0 +1,183 @@
+from flask import Response
+from flask.json.provider import DefaultJSONProvider, _default
+
+# Serializer cho từng loại resource: hàm phẳng đọc mỗi attribute một lần và dựng dict bằng một literal,
+# dùng chung cho các route thay cho vòng lặp dựng dict lặp lại ở từng route.
+# Định dạng output giữ nguyên như các route đang trả về.
+# Phần lớn thời gian trả JSON lớn nằm ở encoder (xem JSON_PROVIDER=orjson, benchmarks/serialization.py).
+
+
+def serialize_many(serializer, objects):
+    return [serializer(obj) for obj in objects]
+
+
+def _hhmm_or(value, default):
+    return value.strftime('%H:%M') if value else default
+
+
+def _owner_booking_customer(booking):
+    """(tên, email, số điện thoại) của khách: user đã đăng ký hoặc khách vãng lai"""
+    if booking.customerId:
+        customer = booking.customer
+        if customer:
+            return customer.fullName, customer.email, getattr(customer, 'phoneNumber', '')
+        return 'Người dùng không tồn tại', '', ''
+    return booking.walkInCustomerName, '', booking.walkInCustomerPhone
+
+
+def serialize_customer_booking(booking):
+    """Booking trong danh sách của khách hàng (/api/booking/my-bookings)"""
+    court = booking.court
+    complex = court.complex
+    return {
+        'id': booking.id,
+        'courtName': court.name,
+        'complexName': complex.name,
+        'startTime': booking.startTime.isoformat(),
+        'endTime': booking.endTime.isoformat(),
+        'totalPrice': float(booking.totalPrice),
+        'status': booking.status,
+        'bookingType': booking.bookingType,
+        'createdAt': booking.createdAt.isoformat(),
+        'complexAddress': complex.address,
+        'complexCity': complex.city,
+    }
+
+
+def serialize_owner_booking(booking):
+    """Booking trong danh sách của owner (/api/owner/bookings)"""
+    court = booking.court
+    complex = court.complex
+    customer_name, customer_email, customer_phone = _owner_booking_customer(booking)
+    return {
+        'id': booking.id,
+        'customerName': customer_name,
+        'customerEmail': customer_email,
+        'customerPhone': customer_phone,
+        'courtName': court.name,
+        'complexName': complex.name,
+        'startTime': booking.startTime.isoformat(),
+        'endTime': booking.endTime.isoformat(),
+        'totalPrice': float(booking.totalPrice),
+        'status': booking.status,
+        'bookingType': booking.bookingType,
+        'createdAt': booking.createdAt.isoformat(),
+        'complexAddress': complex.address,
+        'complexCity': complex.city,
+    }
+
+
+def serialize_notification(notification):
+    """Thông báo (/api/notifications và SSE)"""
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'type': notification.type,
+        'isRead': notification.isRead,
+        'createdAt': notification.createdAt.isoformat() if notification.createdAt else None,
+    }
+
+
+def serialize_review(review):
+    """Review của một complex (/api/reviews/complex/<id>)"""
+    customer = review.customer
+    return {
+        'id': review.id,
+        'customer': {
+            'fullName': customer.fullName if customer else None,
+            'image': customer.image if customer else None
+        },
+        'rating': float(review.rating),
+        'comment': review.comment,
+        'createdAt': review.createdAt.isoformat() if review.createdAt else None,
+    }
+
+
+def serialize_review_summary(review):
+    """Review rút gọn trong trang chi tiết complex"""
+    customer = review.customer
+    return {
+        'id': review.id,
+        'rating': review.rating,
+        'comment': review.comment,
+        'customerName': customer.fullName if customer else 'Khách ẩn danh',
+        'date': review.createdAt.isoformat(),
+    }
+
+
+def serialize_court(court):
+    """Sân trong trang chi tiết complex"""
+    return {'id': court.id, 'name': court.name, 'status': court.status}
+
+
+def serialize_complex_summary(complex):
+    """Phần thông tin cơ bản của complex trong danh sách công khai (route bổ sung courtCount, priceRange...)"""
+    return {
+        'id': complex.id,
+        'name': complex.name,
+        'address': complex.address,
+        'city': complex.city,
+        'sportType': complex.sportType,
+        'description': complex.description,
+        'phoneNumber': complex.phoneNumber,
+        'googleMapLink': complex.googleMapLink,
+        'latitude': complex.latitude,
+        'longitude': complex.longitude,
+        'openTime': _hhmm_or(complex.openTime, '06:00'),
+        'closeTime': _hhmm_or(complex.closeTime, '22:00'),
+        'mainImage': complex.mainImage,
+        'rating': float(complex.rating) if complex.rating else 0,
+        'totalReviews': complex.totalReviews,
+    }
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider dùng orjson (bật bằng JSON_PROVIDER=orjson).
+    Giữ nguyên hành vi của provider mặc định: sort key, datetime/Decimal/UUID qua _default của Flask.
+    Khác biệt duy nhất: ký tự không phải ASCII được ghi trực tiếp bằng UTF-8 thay vì escape \\uXXXX.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+        self._options = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME  # datetime/date/time đi qua _default như provider mặc định
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+            | orjson.OPT_PASSTHROUGH_SUBCLASS
+        )
+
+    def _dumps_bytes(self, obj):
+        options = self._options
+        if self.sort_keys:
+            options |= self._orjson.OPT_SORT_KEYS
+        return self._orjson.dumps(obj, default=_default, option=options)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Tham số riêng (indent, cls...) thì dùng lại json của thư viện chuẩn
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False:
+            return super().response(obj)
+        return Response(self._dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    if app.config.get('JSON_PROVIDER') != 'orjson':
+        return
+    try:
+        app.json = OrjsonProvider(app)
+    except ImportError:
+        print("JSON_PROVIDER=orjson but orjson is not installed, using the default JSON provider")
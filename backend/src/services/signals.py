@@ -0,0 +1,166 @@
+from collections import namedtuple
+import traceback
+
+from blinker import Namespace
+from sqlalchemy import event, update
+
+from src.models.database import db, CourtComplex
+from src.services.complex_changes import log_complex_changes
+
+# Các signal nội bộ của ứng dụng.
+# Route ghi nhận thay đổi TRƯỚC khi commit (record_*), signal chỉ được phát SAU khi
+# transaction commit thành công, nên receiver không bao giờ thấy dữ liệu đã bị rollback.
+# Receiver chạy trong after_commit nên KHÔNG được dùng db.session (dùng db.engine.connect() nếu cần query).
+_signals = Namespace()
+
+booking_changed = _signals.signal('booking-changed')
+complex_changed = _signals.signal('complex-changed')
+blackout_changed = _signals.signal('blackout-changed')
+
+# Snapshot của một booking tại thời điểm thay đổi trạng thái
+BookingChange = namedtuple('BookingChange', [
+    'id', 'courtId', 'complexId', 'ownerId', 'customerId',
+    'startTime', 'endTime', 'status', 'previousStatus'
+])
+
+_BOOKING_CHANGES_KEY = 'pending_booking_changes'
+_COMPLEX_CHANGES_KEY = 'pending_complex_changes'
+_BLACKOUT_CHANGES_KEY = 'pending_blackout_changes'
+
+# Lịch đóng sân vừa được thêm / xóa: courtId None nghĩa là cả khu phức hợp
+BlackoutChange = namedtuple('BlackoutChange', ['complexId', 'courtId'])
+
+
+def record_booking_change(booking, previous_status=None, complex=None):
+    """
+    Ghi nhận booking vừa được tạo hoặc đổi trạng thái trong transaction hiện tại.
+    Gọi sau khi đã gán status mới và trước db.session.commit().
+
+    Args:
+        booking: Booking object (mới hoặc đã tồn tại)
+        previous_status: Trạng thái trước khi đổi (None nếu là booking mới)
+        complex: CourtComplex của booking, truyền vào nếu đã load sẵn để tránh lazy load
+    """
+    if booking.id is None:
+        db.session.flush()  # Cần ID cho booking mới
+
+    if complex is None:
+        complex = booking.court.complex
+
+    change = BookingChange(
+        id=booking.id,
+        courtId=booking.courtId,
+        complexId=complex.id,
+        ownerId=complex.ownerId,
+        customerId=booking.customerId,
+        startTime=booking.startTime,
+        endTime=booking.endTime,
+        status=booking.status,
+        previousStatus=previous_status
+    )
+    db.session.info.setdefault(_BOOKING_CHANGES_KEY, []).append(change)
+    return change
+
+
+
+def record_booking_status_changes(rows, new_status):
+    """
+    Ghi nhận nhiều booking đổi trạng thái bằng một UPDATE hàng loạt (không có ORM object).
+    rows: các dòng có id, courtId, complexId, ownerId, customerId, startTime, endTime
+    và status (trạng thái trước khi đổi).
+    """
+    changes = db.session.info.setdefault(_BOOKING_CHANGES_KEY, [])
+    for row in rows:
+        changes.append(BookingChange(
+            id=row.id,
+            courtId=row.courtId,
+            complexId=row.complexId,
+            ownerId=row.ownerId,
+            customerId=row.customerId,
+            startTime=row.startTime,
+            endTime=row.endTime,
+            status=new_status,
+            previousStatus=row.status
+        ))
+
+def pending_booking_changes(session):
+    """Các BookingChange đã ghi nhận trong transaction của `session` (chưa commit)"""
+    return list(session.info.get(_BOOKING_CHANGES_KEY, ()))
+
+def record_complex_change(complex_id, session=None):
+    """
+    Ghi nhận thông tin của một court complex (địa chỉ, tọa độ, trạng thái, sân, giá, ảnh,
+    tiện ích, review...) vừa thay đổi trong transaction hiện tại. Gọi trước db.session.commit().
+    Version của complex được tăng khi commit.
+    session: Session đang flush khi gọi từ listener, mặc định db.session
+    """
+    changes = (session or db.session).info.setdefault(_COMPLEX_CHANGES_KEY, [])
+    if complex_id not in changes:
+        changes.append(complex_id)
+
+
+def pending_complex_changes(session):
+    """Các complex đã record_complex_change trong transaction của `session` (chưa commit)"""
+    return list(session.info.get(_COMPLEX_CHANGES_KEY, ()))
+
+
+
+def record_blackout_change(complex_id, court_id=None):
+    """
+    Ghi nhận lịch đóng sân của một sân (hoặc cả complex khi court_id là None) vừa thay đổi
+    trong transaction hiện tại. Gọi trước db.session.commit().
+    """
+    changes = db.session.info.setdefault(_BLACKOUT_CHANGES_KEY, [])
+    change = BlackoutChange(complex_id, court_id)
+    if change not in changes:
+        changes.append(change)
+
+def _send_safely(signal, sender, **kwargs):
+    try:
+        signal.send(sender, **kwargs)
+    except Exception as e:
+        print(f"Error dispatching signal {signal.name}: {str(e)}")
+        traceback.print_exc()
+
+
+@event.listens_for(db.session, 'before_commit')
+def _bump_complex_versions(session):
+    # Tăng version của các complex bị ảnh hưởng ngay trong transaction đang commit,
+    # để ETag dựa trên version không bao giờ đi trước dữ liệu thật.
+    # Flush trước: listener before_flush có thể ghi nhận thêm complex (vd. đổi tên user có review)
+    session.flush()
+    # Chỉ thay đổi thông tin complex vào nhật ký của các index trong bộ nhớ (booking không ảnh hưởng index)
+    log_complex_changes(session.connection(), sorted(session.info.get(_COMPLEX_CHANGES_KEY, ())))
+    complex_ids = set(session.info.get(_COMPLEX_CHANGES_KEY, ()))
+    complex_ids.update(change.complexId for change in session.info.get(_BOOKING_CHANGES_KEY, ()))
+    complex_ids.update(change.complexId for change in session.info.get(_BLACKOUT_CHANGES_KEY, ()))
+    if not complex_ids:
+        return
+
+    session.connection().execute(
+        update(CourtComplex.__table__)
+        .where(CourtComplex.__table__.c.id.in_(sorted(complex_ids)))
+        .values(version=CourtComplex.__table__.c.version + 1)
+    )
+
+
+@event.listens_for(db.session, 'after_commit')
+def _dispatch_after_commit(session):
+    booking_changes = session.info.pop(_BOOKING_CHANGES_KEY, None)
+    for change in booking_changes or []:
+        _send_safely(booking_changed, None, change=change)
+
+    complex_changes = session.info.pop(_COMPLEX_CHANGES_KEY, None)
+    for complex_id in complex_changes or []:
+        _send_safely(complex_changed, None, complex_id=complex_id)
+
+    blackout_changes = session.info.pop(_BLACKOUT_CHANGES_KEY, None)
+    for change in blackout_changes or []:
+        _send_safely(blackout_changed, None, change=change)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop(_BOOKING_CHANGES_KEY, None)
+    session.info.pop(_COMPLEX_CHANGES_KEY, None)
+    session.info.pop(_BLACKOUT_CHANGES_KEY, None)
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Test chạy trên SQLite tạm (không cần PostgreSQL): đặt biến môi trường trước khi import src.main
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DB_DIR = tempfile.mkdtemp(prefix='sportsync-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(TEST_DB_DIR, "primary.db")}'
+os.environ['DATABASE_REPLICA_URLS'] = ''
+os.environ['OCCUPANCY_STORE'] = 'off'
+os.environ['RESPONSE_CACHE'] = 'off'
+os.environ['LIFECYCLE_INTERVAL'] = 'off'
+os.environ['EVENT_BRIDGE'] = ''
+
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+
+@compiles(BigInteger, 'sqlite')
+def _sqlite_big_integer(type_, compiler, **kwargs):
+    # SQLite chỉ tự tăng khóa chính kiểu INTEGER
+    return 'INTEGER'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from src.main import app as flask_app
+    from src.models.database import db
+
+    with flask_app.app_context():
+        db.create_all(bind_key=None)
+    yield flask_app
+    with flask_app.app_context():
+        db.drop_all(bind_key=None)  # Chỉ database chính (test khác có thể thêm bind replica)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,114 @@
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+import src.services.booking_bulk as booking_bulk
+import src.services.email_service as email_service_module
+from src.models.database import db, Booking, Court, CourtBlackout, CourtComplex, User
+from src.services.blackout_service import BlackoutService, blackout_occurrences
+
+
+def _blackout(start, hours=2, recurrence=None, until=None):
+    return SimpleNamespace(startTime=start, endTime=start + timedelta(hours=hours), recurrence=recurrence, recurrenceUntil=until)
+
+
+def test_one_off_blackout_yields_only_when_overlapping():
+    blackout = _blackout(datetime(2025, 9, 1, 8))
+    assert list(blackout_occurrences(blackout, datetime(2025, 9, 1, 9), datetime(2025, 9, 1, 12))) == [
+        (datetime(2025, 9, 1, 8), datetime(2025, 9, 1, 10))
+    ]
+    # Khoảng nửa mở: chạm mép không tính là trùng
+    assert list(blackout_occurrences(blackout, datetime(2025, 9, 1, 10), datetime(2025, 9, 1, 12))) == []
+    assert list(blackout_occurrences(blackout, datetime(2025, 9, 1, 6), datetime(2025, 9, 1, 8))) == []
+
+
+def test_daily_blackout_skips_to_range_start():
+    blackout = _blackout(datetime(2025, 1, 1, 8), recurrence='daily')
+    occurrences = list(blackout_occurrences(blackout, datetime(2025, 3, 10), datetime(2025, 3, 12)))
+    assert occurrences == [
+        (datetime(2025, 3, 10, 8), datetime(2025, 3, 10, 10)),
+        (datetime(2025, 3, 11, 8), datetime(2025, 3, 11, 10)),
+    ]
+
+
+def test_recurring_blackout_keeps_occurrence_running_at_range_start():
+    # Lần đóng bắt đầu trước range_start nhưng chưa kết thúc vẫn được trả về
+    blackout = _blackout(datetime(2025, 1, 1, 22), hours=4, recurrence='daily')
+    assert next(blackout_occurrences(blackout, datetime(2025, 2, 2, 1), datetime(2025, 2, 2, 3))) == (
+        datetime(2025, 2, 1, 22), datetime(2025, 2, 2, 2)
+    )
+
+
+def test_weekly_blackout_skip_lands_on_same_weekday():
+    blackout = _blackout(datetime(2025, 1, 6, 18), recurrence='weekly')  # Thứ hai
+    occurrences = list(blackout_occurrences(blackout, datetime(2025, 6, 1), datetime(2025, 6, 30)))
+    assert [start.date() for start, _ in occurrences] == [date(2025, 6, 2), date(2025, 6, 9), date(2025, 6, 16), date(2025, 6, 23)]
+    assert all(start.hour == 18 and end - start == timedelta(hours=2) for start, end in occurrences)
+
+
+def test_range_before_first_occurrence_starts_at_first_occurrence():
+    blackout = _blackout(datetime(2025, 5, 1, 8), recurrence='daily')
+    assert next(blackout_occurrences(blackout, datetime(2025, 4, 1), datetime(2025, 5, 3)))[0] == datetime(2025, 5, 1, 8)
+
+
+def test_recurrence_until_is_the_last_occurrence_day():
+    blackout = _blackout(datetime(2025, 9, 1, 8), recurrence='daily', until=date(2025, 9, 3))
+    occurrences = list(blackout_occurrences(blackout, datetime(2025, 8, 1), datetime(2025, 10, 1)))
+    assert [start.date() for start, _ in occurrences] == [date(2025, 9, 1), date(2025, 9, 2), date(2025, 9, 3)]
+    assert list(blackout_occurrences(blackout, datetime(2025, 9, 4), datetime(2025, 9, 10))) == []
+
+
+def test_recurrence_until_counts_occurrence_ending_after_it():
+    # Lần cuối bắt đầu trong ngày recurrenceUntil nhưng kết thúc sang ngày sau
+    blackout = _blackout(datetime(2025, 9, 1, 23), recurrence='daily', until=date(2025, 9, 2))
+    assert list(blackout_occurrences(blackout, datetime(2025, 9, 3, 0), datetime(2025, 9, 3, 1))) == [
+        (datetime(2025, 9, 2, 23), datetime(2025, 9, 3, 1))
+    ]
+
+
+@pytest.fixture
+def sent_batches(monkeypatch):
+    batches = []
+
+    def send_batch(emails):
+        batches.append(emails)
+        return {'sent': len(emails)}
+
+    monkeypatch.setattr(email_service_module.EmailService, 'send_batch', staticmethod(send_batch))
+    return batches
+
+
+def test_blackout_cancels_more_than_bulk_limit_with_one_email_batch(app, monkeypatch, sent_batches):
+    monkeypatch.setattr(booking_bulk, 'MAX_BULK_BOOKINGS', 2)
+    start = (datetime.now() + timedelta(days=2)).replace(hour=8, minute=0, second=0, microsecond=0)
+    with app.app_context():
+        owner = User(fullName='Owner', email=f'{uuid.uuid4()}@test.local', role='Owner', accountStatus=1)
+        customer = User(fullName='Khách', email=f'{uuid.uuid4()}@test.local', role='Customer', accountStatus=1)
+        db.session.add_all([owner, customer])
+        db.session.flush()
+        complex_ = CourtComplex(ownerId=owner.id, name='Complex', address='A', city='Hà Nội',
+                                phoneNumber='1', sportType='Cầu lông', status='Active')
+        db.session.add(complex_)
+        db.session.flush()
+        court = Court(complexId=complex_.id, name='Sân 1')
+        db.session.add(court)
+        db.session.flush()
+        for day in range(5):
+            db.session.add(Booking(
+                courtId=court.id, customerId=customer.id,
+                startTime=start + timedelta(days=day), endTime=start + timedelta(days=day, hours=1),
+                totalPrice=Decimal('100000'), status='Confirmed', bookingType='Online'
+            ))
+        db.session.commit()
+
+        blackout = CourtBlackout(complexId=complex_.id, courtId=court.id, startTime=start,
+                                 endTime=start + timedelta(hours=2), recurrence='daily')
+        result = BlackoutService.create(owner.id, blackout)
+
+        assert result['updated'] == 5
+        assert {row['result'] for row in result['results']} == {'updated'}
+        assert Booking.query.filter_by(courtId=court.id, status='Cancelled').count() == 5
+    assert [len(batch) for batch in sent_batches] == [5]
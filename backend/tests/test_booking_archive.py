@@ -0,0 +1,62 @@
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.models.database import db, Booking, BookingArchive, Court, CourtComplex, User
+from src.services.booking_archive import BookingArchiver
+
+
+@pytest.fixture
+def archived(app):
+    """Một booking đã lưu trữ và một booking còn trong bảng bookings của cùng khách / owner"""
+    with app.app_context():
+        owner = User(fullName='Owner', email=f'{uuid.uuid4()}@test.local', role='Owner', accountStatus=1)
+        customer = User(fullName='Khách', email=f'{uuid.uuid4()}@test.local', role='Customer', accountStatus=1)
+        db.session.add_all([owner, customer])
+        db.session.flush()
+        complex_ = CourtComplex(ownerId=owner.id, name='Complex', address='A', city='Hà Nội',
+                                phoneNumber='1', sportType='Cầu lông', status='Active')
+        db.session.add(complex_)
+        db.session.flush()
+        court = Court(complexId=complex_.id, name='Sân 1')
+        db.session.add(court)
+        db.session.flush()
+        old_start = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=400)
+        new_start = old_start + timedelta(days=405)
+        old = Booking(courtId=court.id, customerId=customer.id, startTime=old_start, endTime=old_start + timedelta(hours=1),
+                      totalPrice=Decimal('100000'), status='Completed', bookingType='Online')
+        new = Booking(courtId=court.id, customerId=customer.id, startTime=new_start, endTime=new_start + timedelta(hours=1),
+                      totalPrice=Decimal('100000'), status='Confirmed', bookingType='Online')
+        db.session.add_all([old, new])
+        db.session.commit()
+        ids = {'old': old.id, 'new': new.id}
+
+        assert BookingArchiver.archive(datetime.now() - timedelta(days=365)) == 1
+        assert db.session.get(BookingArchive, ids['old']) is not None
+        return {
+            'ids': ids,
+            'customer': {'Authorization': 'Bearer ' + create_access_token(identity=customer.id)},
+            'owner': {'Authorization': 'Bearer ' + create_access_token(identity=owner.id)},
+        }
+
+
+def test_customer_history_includes_archived_bookings(client, archived):
+    body = client.get('/api/booking/my-bookings?sortBy=startTime&sortOrder=asc', headers=archived['customer']).get_json()
+    assert [booking['id'] for booking in body['bookings']] == [archived['ids']['old'], archived['ids']['new']]
+    assert body['bookings'][0]['complexName'] == 'Complex'
+    assert body['totalItems'] == 2
+
+
+def test_owner_booking_list_includes_archived_bookings(client, archived):
+    body = client.get('/api/owner/bookings?status=Completed', headers=archived['owner']).get_json()
+    assert [booking['id'] for booking in body['bookings']] == [archived['ids']['old']]
+    body = client.get('/api/owner/bookings?sortBy=customerName', headers=archived['owner']).get_json()
+    assert body['totalItems'] == 2
+
+
+def test_customer_history_search_and_sort_on_archived_bookings(client, archived):
+    body = client.get('/api/booking/my-bookings?search=Complex&sortBy=complexName', headers=archived['customer']).get_json()
+    assert {booking['id'] for booking in body['bookings']} == set(archived['ids'].values())
@@ -0,0 +1,137 @@
+import uuid
+
+import pytest
+from sqlalchemy import event, insert, update
+
+from src.models.database import db, ComplexChange, CourtComplex, User
+from src.services import complex_changes
+from src.services.facet_service import ComplexFacetIndex
+from src.services.geo_service import ComplexGeoIndex
+from src.services.signals import record_complex_change
+
+HANOI = (21.0285, 105.8542)
+SAIGON = (10.77, 106.70)
+
+
+@pytest.fixture
+def located_complex(app):
+    with app.app_context():
+        owner = User(fullName='Owner', email=f'{uuid.uuid4()}@test.local', role='Owner', accountStatus=1)
+        db.session.add(owner)
+        db.session.flush()
+        complex_ = CourtComplex(ownerId=owner.id, name='Complex', address='A', city='Hà Nội', phoneNumber='1',
+                                sportType='Cầu lông', status='Active', latitude=HANOI[0], longitude=HANOI[1])
+        db.session.add(complex_)
+        db.session.commit()
+        return complex_.id
+
+
+@pytest.fixture
+def geo_index(app):
+    return ComplexGeoIndex()
+
+
+def _near(app, index, point):
+    with app.app_context():
+        return [item_id for item_id, _ in index.within(point[0], point[1], 5)]
+
+
+def _other_worker(app, complex_id, **values):
+    """Ghi như một worker khác: UPDATE + dòng nhật ký, không đi qua index của test"""
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(update(CourtComplex.__table__).where(CourtComplex.__table__.c.id == complex_id).values(**values))
+            complex_changes.log_complex_changes(conn, [complex_id])
+
+
+def _statements_during(app, action):
+    with app.app_context():
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            action()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return statements
+
+
+def _statements(app, index, point):
+    return _statements_during(app, lambda: index.within(point[0], point[1], 5))
+
+
+def test_changes_from_other_workers_are_applied(app, geo_index, located_complex):
+    assert located_complex in _near(app, geo_index, HANOI)
+
+    _other_worker(app, located_complex, latitude=SAIGON[0], longitude=SAIGON[1])
+    assert located_complex not in _near(app, geo_index, HANOI)
+    assert located_complex in _near(app, geo_index, SAIGON)
+
+    _other_worker(app, located_complex, status='Inactive')
+    assert located_complex not in _near(app, geo_index, SAIGON)
+
+
+def test_lookup_without_changes_reads_only_the_log_tail(app, geo_index, located_complex):
+    _near(app, geo_index, HANOI)
+    statements = _statements(app, geo_index, HANOI)
+    assert len(statements) == 1
+    assert 'FROM complex_changes' in statements[0] and 'count(' not in statements[0].lower()
+
+
+def test_booking_version_bumps_do_not_touch_the_index(app, geo_index, located_complex):
+    _near(app, geo_index, HANOI)
+    with app.app_context():
+        # Booking tăng version của complex nhưng không ghi nhật ký
+        with db.engine.begin() as conn:
+            conn.execute(update(CourtComplex.__table__).values(version=CourtComplex.__table__.c.version + 1))
+    assert len(_statements(app, geo_index, HANOI)) == 1
+
+
+def test_record_complex_change_logs_on_commit(app, located_complex):
+    with app.app_context():
+        before = db.session.query(db.func.count(ComplexChange.seq)).scalar()
+        record_complex_change(located_complex)
+        db.session.commit()
+        assert db.session.query(db.func.count(ComplexChange.seq)).scalar() == before + 1
+
+
+def test_late_commit_below_the_last_seq_is_seen(app, geo_index, located_complex):
+    _near(app, geo_index, HANOI)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            last_seq = conn.execute(db.select(db.func.max(ComplexChange.seq))).scalar() or 0
+            # Seq last+2 commit trước, last+1 (transaction chậm hơn) commit sau
+            conn.execute(insert(ComplexChange.__table__).values(seq=last_seq + 2, complexId=0))
+    _near(app, geo_index, HANOI)
+    assert last_seq + 1 in geo_index._gaps
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(update(CourtComplex.__table__).where(CourtComplex.__table__.c.id == located_complex)
+                         .values(latitude=SAIGON[0], longitude=SAIGON[1]))
+            conn.execute(insert(ComplexChange.__table__).values(seq=last_seq + 1, complexId=located_complex))
+    assert located_complex in _near(app, geo_index, SAIGON)
+    assert not geo_index._gaps
+
+
+def test_expired_gaps_are_dropped(app, geo_index, located_complex, monkeypatch):
+    _near(app, geo_index, HANOI)
+    geo_index._gaps = {geo_index._last_seq - 1: 0}
+    monkeypatch.setattr(complex_changes.time, 'monotonic', lambda: complex_changes.CHANGE_GAP_SECONDS + 1)
+    _near(app, geo_index, HANOI)
+    assert geo_index._gaps == {}
+
+
+def test_facet_index_follows_the_log(app, located_complex):
+    index = ComplexFacetIndex()
+
+    def city_count(city):
+        with app.app_context():
+            _, counts = index.search({'city': [city]})
+        return counts['city'].get(city, 0)
+
+    hue_before = city_count('Huế')
+    _other_worker(app, located_complex, city='Huế')
+    assert city_count('Huế') == hue_before + 1
+    assert len(_statements_during(app, lambda: index.search({}))) == 1
+
@@ -0,0 +1,75 @@
+import json
+import uuid
+
+import pytest
+
+from src.models.database import db, Amenity, CourtComplex, CourtComplexAmenity, Review, User
+from src.services.complex_documents import ComplexDocumentStore
+from src.services.signals import record_complex_change
+
+
+@pytest.fixture
+def reviewed_complex(app):
+    """Complex Active có một tiện ích và một review, document đã dựng khi commit"""
+    with app.app_context():
+        customer = User(fullName='Nguyễn Văn A', email=f'{uuid.uuid4()}@test.local', role='Customer', accountStatus=1)
+        owner = User(fullName='Owner', email=f'{uuid.uuid4()}@test.local', role='Owner', accountStatus=1)
+        amenity = Amenity(name='WiFi', icon='wifi')
+        db.session.add_all([customer, owner, amenity])
+        db.session.flush()
+        complex_ = CourtComplex(
+            ownerId=owner.id, name='Complex', address='A', city='Hà Nội',
+            phoneNumber='1', sportType='Cầu lông', status='Active'
+        )
+        db.session.add(complex_)
+        db.session.flush()
+        db.session.add_all([
+            CourtComplexAmenity(complexId=complex_.id, amenityId=amenity.id),
+            Review(customerId=customer.id, complexId=complex_.id, rating=5, comment='Tốt'),
+        ])
+        record_complex_change(complex_.id)
+        db.session.commit()
+        return {'complex': complex_.id, 'customer': customer.id, 'amenity': amenity.id}
+
+
+def _document(complex_id, kind='public'):
+    body = ComplexDocumentStore.get(complex_id, kind)
+    assert body is not None
+    return json.loads(body)
+
+
+def _version(complex_id):
+    return db.session.get(CourtComplex, complex_id).version
+
+
+def test_renaming_reviewer_regenerates_document(app, reviewed_complex):
+    with app.app_context():
+        assert _document(reviewed_complex['complex'])['reviews'][0]['customerName'] == 'Nguyễn Văn A'
+        version = _version(reviewed_complex['complex'])
+
+        db.session.get(User, reviewed_complex['customer']).fullName = 'Nguyễn Văn B'
+        db.session.commit()
+
+        assert _document(reviewed_complex['complex'])['reviews'][0]['customerName'] == 'Nguyễn Văn B'
+        assert _version(reviewed_complex['complex']) == version + 1
+
+
+def test_renaming_amenity_regenerates_documents(app, reviewed_complex):
+    with app.app_context():
+        amenity = db.session.get(Amenity, reviewed_complex['amenity'])
+        amenity.name = 'WiFi 6'
+        amenity.icon = 'wifi-6'
+        db.session.commit()
+
+        for kind in ('public', 'full'):
+            assert _document(reviewed_complex['complex'], kind)['amenities'] == [
+                {'id': reviewed_complex['amenity'], 'name': 'WiFi 6', 'icon': 'wifi-6'}
+            ]
+
+
+def test_unrelated_user_change_keeps_version(app, reviewed_complex):
+    with app.app_context():
+        version = _version(reviewed_complex['complex'])
+        db.session.get(User, reviewed_complex['customer']).unreadNotificationCount = 3
+        db.session.commit()
+        assert _version(reviewed_complex['complex']) == version
@@ -0,0 +1,39 @@
+import pytest
+
+from src.services.compression import HASHED_ASSET_PATTERN, StaticAssets
+
+
+@pytest.mark.parametrize('path', [
+    'assets/index-CPSPqwm_.css',
+    'assets/index-L3iQcPWu.js',
+    'assets/logo-a-B_c9dE.svg',
+])
+def test_vite_hashed_assets_are_immutable(path):
+    assert HASHED_ASSET_PATTERN.match(path)
+
+
+@pytest.mark.parametrize('path', [
+    'apple-touch-icon.png',
+    'android-chrome-512x512.png',
+    'my-background.jpg',
+    'index.html',
+    'favicon.ico',
+    'index-CPSPqwm_.css',  # Không nằm trong assets/
+    'assets/my-background.jpg',
+    'assets/android-chrome-512x512.png',
+    'assets/images/hero-CPSPqwm_.png',
+])
+def test_other_files_are_not_immutable(path):
+    assert not HASHED_ASSET_PATTERN.match(path)
+
+
+def test_manifest_marks_only_vite_output_immutable(tmp_path):
+    (tmp_path / 'assets').mkdir()
+    for path in ('index.html', 'apple-touch-icon.png', 'assets/index-L3iQcPWu.js'):
+        (tmp_path / path).write_bytes(b'x')
+    manifest = StaticAssets.build_manifest(str(tmp_path))
+    assert {path: entry['immutable'] for path, entry in manifest.items()} == {
+        'index.html': False,
+        'apple-touch-icon.png': False,
+        'assets/index-L3iQcPWu.js': True,
+    }
@@ -0,0 +1,105 @@
+import pytest
+from flask import jsonify
+from flask_jwt_extended import create_access_token
+from sqlalchemy import update
+
+from src.models.database import db, CourtComplex
+from src.services.db_routing import PIN_COOKIE, database_router, primary_read, replica_read
+
+COMPLEX_ID = 1
+
+
+def _seed(engine, name):
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(CourtComplex.__table__.insert().values(
+            id=COMPLEX_ID, ownerId='owner', name=name, address='A', city='Hà Nội',
+            phoneNumber='1', sportType='Cầu lông', status='Active'
+        ))
+
+
+def _complex_name():
+    return jsonify({'name': db.session.get(CourtComplex, COMPLEX_ID).name})
+
+
+@pytest.fixture
+def routed_app(app, tmp_path, monkeypatch):
+    """App có primary và một replica là hai file SQLite khác nhau, cùng complex id nhưng khác tên"""
+    from src.main import create_app
+
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "primary.db"}')
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', f'sqlite:///{tmp_path / "replica.db"}')
+    monkeypatch.setenv('REPLICA_PIN_SECONDS', '5')
+    routed = create_app()
+
+    with routed.app_context():
+        engines = routed.extensions['sqlalchemy'].engines
+        _seed(engines[None], 'primary')
+        _seed(engines['replica_0'], 'replica')
+
+    # Mỗi route một hàm riêng: replica_read / primary_read gắn thuộc tính lên chính hàm view
+    routed.add_url_rule('/test/name', 'get_name', lambda: _complex_name(), methods=['GET'])
+    routed.add_url_rule('/test/name', 'post_name', lambda: _complex_name(), methods=['POST'])
+    routed.add_url_rule('/test/replica-name', 'replica_name', replica_read(lambda: _complex_name()), methods=['POST'])
+    routed.add_url_rule('/test/primary-name', 'primary_name', primary_read(lambda: _complex_name()), methods=['GET'])
+
+    def rename():
+        # Ghi rồi đọc lại trong cùng request: phần còn lại của request đọc primary
+        db.session.execute(update(CourtComplex).where(CourtComplex.id == COMPLEX_ID).values(name='primary renamed'))
+        db.session.commit()
+        return _complex_name()
+    routed.add_url_rule('/test/rename', 'rename', rename, methods=['POST'])
+
+    yield routed
+
+    with routed.app_context():
+        for engine in routed.extensions['sqlalchemy'].engines.values():
+            engine.dispose()
+    database_router.init_app(app)  # Router là singleton: trả lại cấu hình không replica cho các test khác
+
+
+def _name(response):
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()['name']
+
+
+def test_get_reads_replica(routed_app):
+    assert database_router.enabled
+    assert _name(routed_app.test_client().get('/test/name')) == 'replica'
+
+
+def test_post_reads_primary(routed_app):
+    assert _name(routed_app.test_client().post('/test/name')) == 'primary'
+
+
+def test_replica_read_post_reads_replica(routed_app):
+    assert _name(routed_app.test_client().post('/test/replica-name')) == 'replica'
+
+
+def test_primary_read_get_reads_primary(routed_app):
+    assert _name(routed_app.test_client().get('/test/primary-name')) == 'primary'
+
+
+def test_write_goes_to_primary_and_pins_the_client(routed_app):
+    client = routed_app.test_client()
+    response = client.post('/test/rename')
+    assert _name(response) == 'primary renamed'
+    assert PIN_COOKIE in response.headers.get('Set-Cookie', '')
+
+    # Cookie ghim: GET tiếp theo của client này đọc primary, client khác vẫn đọc replica
+    assert _name(client.get('/test/name')) == 'primary renamed'
+    assert _name(routed_app.test_client().get('/test/name')) == 'replica'
+
+
+def test_write_pins_the_identity(routed_app):
+    with routed_app.app_context():
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity='user-1')}
+    routed_app.test_client().post('/test/rename', headers=headers)
+
+    # Client khác (không có cookie) của cùng user đọc primary
+    assert _name(routed_app.test_client().get('/test/name', headers=headers)) == 'primary renamed'
+
+
+def test_check_availability_reads_primary(routed_app):
+    # Kiểm tra ngay trước khi tạo booking: không được đọc replica có thể trễ
+    assert getattr(routed_app.view_functions['booking.check_availability'], '_db_route', None) == 'primary'
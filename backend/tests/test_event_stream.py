@@ -0,0 +1,101 @@
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.models.database import db, Booking, Court, CourtComplex, Notification, User
+from src.services.event_hub import event_hub
+from src.services.signals import record_booking_change
+
+
+def _user(role):
+    user = User(fullName=role, email=f'{uuid.uuid4()}@test.local', role=role, accountStatus=1)
+    db.session.add(user)
+    return user
+
+
+@pytest.fixture
+def customer_headers(app):
+    with app.app_context():
+        customer = _user('Customer')
+        db.session.commit()
+        return {'Authorization': 'Bearer ' + create_access_token(identity=customer.id)}
+
+
+@pytest.fixture
+def max_streams_one():
+    previous = event_hub.max_streams
+    event_hub.max_streams = 1
+    yield
+    event_hub.max_streams = previous
+
+
+def test_streams_beyond_cap_get_503(client, customer_headers, max_streams_one):
+    first = client.get('/api/notifications/stream', headers=customer_headers, buffered=False)
+    assert first.status_code == 200
+
+    second = client.get('/api/notifications/stream', headers=customer_headers, buffered=False)
+    assert second.status_code == 503
+    assert second.headers['Retry-After']
+
+    # Đóng stream (client ngắt kết nối) trả lại chỗ, kể cả khi chưa đọc byte nào
+    first.close()
+    third = client.get('/api/notifications/stream', headers=customer_headers, buffered=False)
+    assert third.status_code == 200
+    third.close()
+
+
+@pytest.fixture
+def booking(app):
+    with app.app_context():
+        owner, customer = _user('Owner'), _user('Customer')
+        db.session.flush()
+        complex_ = CourtComplex(ownerId=owner.id, name='Complex', address='A', city='Hà Nội',
+                                phoneNumber='1', sportType='Cầu lông', status='Active')
+        db.session.add(complex_)
+        db.session.flush()
+        court = Court(complexId=complex_.id, name='Sân 1')
+        db.session.add(court)
+        db.session.flush()
+        start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        booking = Booking(courtId=court.id, customerId=customer.id, startTime=start, endTime=start + timedelta(hours=1),
+                          totalPrice=Decimal('100000'), status='Pending')
+        db.session.add(booking)
+        db.session.flush()
+        record_booking_change(booking, complex=complex_)
+        db.session.commit()
+        return {'id': booking.id, 'owner': owner.id, 'customer': customer.id}
+
+
+def _notifications(user_id):
+    return Notification.query.filter_by(userId=user_id).all()
+
+
+def test_new_booking_notifies_owner(app, booking):
+    with app.app_context():
+        notifications = _notifications(booking['owner'])
+        assert [n.title for n in notifications] == ['Đơn đặt sân mới']
+        assert f"#{booking['id']}" in notifications[0].message
+        assert db.session.get(User, booking['owner']).unreadNotificationCount == 1
+        assert _notifications(booking['customer']) == []
+
+
+def test_status_change_notifies_customer_and_publishes(app, booking):
+    subscription = event_hub.subscribe(f"user:{booking['customer']}")
+    try:
+        with app.app_context():
+            row = db.session.get(Booking, booking['id'])
+            row.status = 'Confirmed'
+            record_booking_change(row, 'Pending')
+            db.session.commit()
+
+            notifications = _notifications(booking['customer'])
+            assert [(n.type, n.title) for n in notifications] == [('success', 'Đơn đặt sân đã được xác nhận')]
+            assert db.session.get(User, booking['customer']).unreadNotificationCount == 1
+
+        events = [subscription.get(timeout=1), subscription.get(timeout=1)]
+        assert sorted(message.split('\n')[0] for message in events) == ['event: booking', 'event: notification']
+    finally:
+        event_hub.unsubscribe(subscription)
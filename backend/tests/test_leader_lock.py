@@ -0,0 +1,14 @@
+from sqlalchemy import create_engine
+
+from src.services.booking_lifecycle import LeaderLock
+
+
+def test_file_lock_is_scoped_to_database(tmp_path):
+    first = LeaderLock(create_engine(f'sqlite:///{tmp_path / "a.db"}'))
+    other_database = LeaderLock(create_engine(f'sqlite:///{tmp_path / "b.db"}'))
+    same_database = LeaderLock(create_engine(f'sqlite:///{tmp_path / "a.db"}'))
+
+    assert first.lock_path == same_database.lock_path != other_database.lock_path
+    assert first.acquire()
+    assert other_database.acquire()
+    assert not same_database.acquire()
@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+
+from src.models.database import db, Notification, User
+
+
+@pytest.fixture
+def user(app):
+    """User có 3 notification: chưa đọc, đã đọc và isRead NULL (dữ liệu cũ), bộ đếm = 2"""
+    with app.app_context():
+        user = User(fullName='Khách', email=f'{uuid.uuid4()}@test.local', role='Customer', accountStatus=1,
+                    unreadNotificationCount=2)
+        db.session.add(user)
+        db.session.flush()
+        ids = []
+        for is_read in (False, True, None):
+            ids.append(db.session.execute(insert(Notification).values(
+                userId=user.id, title='T', message='M', type='info', isRead=is_read
+            )).inserted_primary_key[0])
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=user.id)}
+        return {'id': user.id, 'headers': headers, 'notifications': ids}
+
+
+def _unread_count(client, user):
+    return client.get('/api/notifications/unread-count', headers=user['headers']).get_json()['unreadCount']
+
+
+def test_marking_twice_decrements_once(client, user):
+    unread_id = user['notifications'][0]
+    for _ in range(2):
+        assert client.put(f'/api/notifications/{unread_id}/read', headers=user['headers']).status_code == 200
+    assert _unread_count(client, user) == 1
+
+
+def test_marking_null_is_read_decrements(client, user):
+    null_id = user['notifications'][2]
+    client.put(f'/api/notifications/{null_id}/read', headers=user['headers'])
+    assert _unread_count(client, user) == 1
+
+
+def test_deleting_read_notification_keeps_counter(client, user):
+    read_id = user['notifications'][1]
+    assert client.delete(f'/api/notifications/{read_id}', headers=user['headers']).status_code == 200
+    assert client.delete(f'/api/notifications/{read_id}', headers=user['headers']).status_code == 404
+    assert _unread_count(client, user) == 2
+
+
+def test_bulk_delete_counts_null_is_read_as_unread(client, user):
+    response = client.post('/api/notifications/bulk-delete', headers=user['headers'],
+                           json={'ids': user['notifications']})
+    assert response.get_json()['deleted'] == 3
+    assert _unread_count(client, user) == 0
+
+    # Xóa lại cùng danh sách: không còn dòng nào, bộ đếm không bị trừ thêm
+    response = client.post('/api/notifications/bulk-delete', headers=user['headers'],
+                           json={'ids': user['notifications']})
+    assert response.get_json()['deleted'] == 0
+    assert _unread_count(client, user) == 0
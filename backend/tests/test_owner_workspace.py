@@ -0,0 +1,88 @@
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from src.models.database import db, Booking, Court, CourtComplex, User
+from src.services.owner_workspace import OwnerWorkspaceService
+
+
+def _add_complex(owner_id, index):
+    # Mỗi complex 2 sân, mỗi sân một booking Confirmed trong tháng này
+    complex_ = CourtComplex(
+        ownerId=owner_id, name=f'Complex {index}', address='A', city='Hà Nội',
+        phoneNumber='1', sportType='Cầu lông', status='Active'
+    )
+    db.session.add(complex_)
+    db.session.flush()
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    for court_index in range(2):
+        court = Court(complexId=complex_.id, name=f'Sân {court_index + 1}')
+        db.session.add(court)
+        db.session.flush()
+        db.session.add(Booking(
+            courtId=court.id, startTime=start, endTime=start + timedelta(hours=1),
+            totalPrice=Decimal('100000'), status='Confirmed', bookingType='WalkIn',
+            walkInCustomerName='Khách'
+        ))
+
+
+@pytest.fixture
+def owners(app):
+    """Hai owner: một có 1 complex, một có 5 complex"""
+    with app.app_context():
+        ids = {}
+        for count in (1, 5):
+            owner = User(fullName=f'Owner {count}', email=f'{uuid.uuid4()}@test.local', role='Owner', accountStatus=1)
+            db.session.add(owner)
+            db.session.flush()
+            for index in range(count):
+                _add_complex(owner.id, index)
+            ids[count] = owner.id
+        db.session.commit()
+    return ids
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def test_complex_listing_is_one_statement(app, owners):
+    counts = {}
+    with app.app_context():
+        for complex_count, owner_id in owners.items():
+            with StatementCounter(db.engine) as counter:
+                rows = OwnerWorkspaceService.complex_listing(db.session, owner_id)
+            assert len(rows) == complex_count
+            assert all(row.courtCount == 2 and row.monthlyBookings == 2 for row in rows)
+            counts[complex_count] = counter.count
+    assert counts == {1: 1, 5: 1}
+
+
+def test_court_complexes_route_cost_does_not_grow_with_complexes(app, client, owners):
+    counts = {}
+    for complex_count, owner_id in owners.items():
+        with app.app_context():
+            headers = {'Authorization': 'Bearer ' + create_access_token(identity=owner_id)}
+            engine = db.engine
+        with StatementCounter(engine) as counter:
+            response = client.get('/api/owner/court-complexes', headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert len(response.get_json()['courtComplexes']) == complex_count
+        counts[complex_count] = counter.count
+    assert counts[1] == counts[5]
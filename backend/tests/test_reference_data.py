@@ -0,0 +1,59 @@
+import json
+import uuid
+
+import pytest
+from sqlalchemy import update
+
+from src.models.database import db, CourtComplex, SportType, User
+from src.services.complex_changes import log_complex_changes
+from src.services.reference_data import ReferenceDataStore
+
+
+@pytest.fixture
+def store(app):
+    """Store của một worker khác: chỉ biết thay đổi qua nhật ký complex_changes"""
+    store = ReferenceDataStore()
+    with app.app_context():
+        store.get('cities')
+    return store
+
+
+def _read(app, store, name):
+    with app.app_context():
+        return json.loads(store.get(name).body)
+
+
+def test_complex_written_elsewhere_reloads_cities(app, store):
+    with app.app_context():
+        owner = User(fullName='Owner', email=f'{uuid.uuid4()}@test.local', role='Owner', accountStatus=1)
+        db.session.add(owner)
+        db.session.flush()
+        complex_ = CourtComplex(ownerId=owner.id, name='Complex', address='A', city='Cần Thơ',
+                                phoneNumber='1', sportType='Pickleball', status='Inactive')
+        db.session.add(complex_)
+        db.session.commit()
+        complex_id = complex_.id
+    assert 'Cần Thơ' not in _read(app, store, 'cities')['cities']
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(update(CourtComplex.__table__).where(CourtComplex.__table__.c.id == complex_id).values(status='Active'))
+            log_complex_changes(conn, [complex_id])
+    assert 'Cần Thơ' in _read(app, store, 'cities')['cities']
+    assert 'Pickleball' in _read(app, store, 'sport-types')['sportTypes']
+
+
+def test_sport_type_commit_reloads_setup_data(app, store):
+    name = f'Sport {uuid.uuid4().hex[:6]}'
+    with app.app_context():
+        db.session.add(SportType(name=name))
+        db.session.commit()
+    assert name in [row['name'] for row in _read(app, store, 'setup-data')['sportTypes']]
+
+
+def test_unchanged_store_does_not_reload(app, store):
+    with app.app_context():
+        etag = store.get('setup-data').etag
+        store.get('setup-data')
+        assert not store._stale
+        assert store.get('setup-data').etag == etag
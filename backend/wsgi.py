@@ -1,6 +1,8 @@
 from src.main import create_app
+from src.services.booking_lifecycle import lifecycle_scheduler
 
 app = create_app()
+lifecycle_scheduler.start(app)  # Thread tự động hoàn thành / hết hạn booking chỉ chạy trong tiến trình server
 
 if __name__ == "__main__":
     app.run()
\ No newline at end of file
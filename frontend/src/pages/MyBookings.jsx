@@ -54,6 +54,7 @@ const MyBookings = () => {
     { value: 'Completed', label: 'Hoàn thành' },
     { value: 'Rejected', label: 'Đã từ chối' },
     { value: 'Cancelled', label: 'Đã hủy' },
+    { value: 'Expired', label: 'Hết hạn' },
   ]);
   const [sortByOptions] = useState([
     { value: 'createdAt', label: 'Ngày tạo' },
@@ -273,6 +274,7 @@ const MyBookings = () => {
                         {booking.status === 'Pending' ? 'Chờ thanh toán' :
                          booking.status === 'Confirmed' ? 'Đã xác nhận' :
                          booking.status === 'Rejected' ? 'Đã từ chối' :
+                         booking.status === 'Expired' ? 'Hết hạn' :
                          booking.status === 'Cancelled' ? 'Đã hủy' :
                          booking.status === 'Completed' ? 'Hoàn thành' : booking.status}
                       </Badge>
@@ -388,6 +390,7 @@ const MyBookings = () => {
                             {selectedBookingDetails.status === 'Pending' ? 'Chờ thanh toán' :
                             selectedBookingDetails.status === 'Confirmed' ? 'Đã xác nhận' :
                             selectedBookingDetails.status === 'Rejected' ? 'Đã từ chối' :
+                            selectedBookingDetails.status === 'Expired' ? 'Hết hạn' :
                             selectedBookingDetails.status === 'Cancelled' ? 'Đã hủy' :
                             selectedBookingDetails.status === 'Completed' ? 'Hoàn thành' : selectedBookingDetails.status}
                         </Badge>
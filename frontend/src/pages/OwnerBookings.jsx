@@ -57,6 +57,7 @@ const OwnerBookings = () => {
     { value: 'Completed', label: 'Hoàn thành' },
     { value: 'Rejected', label: 'Đã từ chối' },
     { value: 'Cancelled', label: 'Đã hủy' },
+    { value: 'Expired', label: 'Hết hạn' },
   ]);
   const [sortByOptions] = useState([
     { value: 'createdAt', label: 'Ngày tạo' },
@@ -367,6 +368,7 @@ const OwnerBookings = () => {
                         {booking.status === 'Pending' ? 'Chờ duyệt' :
                          booking.status === 'Confirmed' ? 'Đã duyệt' :
                          booking.status === 'Rejected' ? 'Đã từ chối' :
+                         booking.status === 'Expired' ? 'Hết hạn' :
                          booking.status === 'Cancelled' ? 'Đã hủy' :
                          booking.status === 'Completed' ? 'Hoàn thành' : booking.status}
                       </Badge>
@@ -416,7 +418,7 @@ const OwnerBookings = () => {
                         </>
                     )}
 
-                    {(booking.status === 'Completed' || booking.status === 'Rejected' || booking.status === 'Cancelled') && (
+                    {(booking.status === 'Completed' || booking.status === 'Rejected' || booking.status === 'Cancelled' || booking.status === 'Expired') && (
                         <Button
                             size="sm"
                             variant="outline"
@@ -560,6 +562,7 @@ const OwnerBookings = () => {
                             {selectedBookingDetails.status === 'Pending' ? 'Chờ duyệt' :
                             selectedBookingDetails.status === 'Confirmed' ? 'Đã duyệt' :
                             selectedBookingDetails.status === 'Rejected' ? 'Đã từ chối' :
+                            selectedBookingDetails.status === 'Expired' ? 'Hết hạn' :
                             selectedBookingDetails.status === 'Cancelled' ? 'Đã hủy' :
                             selectedBookingDetails.status === 'Completed' ? 'Hoàn thành' : selectedBookingDetails.status}
                         </Badge>
@@ -59,12 +59,7 @@ const OwnerDashboard = () => {
 
   const checkSetupStatus = async () => {
     try {
-      const response = await api.get('/owner/setup-status');
-      setSetupStatus(response.data);
-      
-      if (response.data.hasCourtComplex) {
-        await fetchDashboardData();
-      }
+      await fetchDashboardData();
     } catch (error) {
       console.error('Error checking setup status:', error);
       setError('Không thể kiểm tra trạng thái thiết lập');
@@ -75,29 +70,24 @@ const OwnerDashboard = () => {
 
   const fetchDashboardData = async () => {
     try {
-      const [complexResponse, statsResponse, bookingsResponse] = await Promise.all([
-        api.get('/owner/court-complexes'),
-        api.get('/owner/statistics'),
+      // Một request /owner/workspace thay cho setup-status, court-complexes và statistics
+      const [workspaceResponse, bookingsResponse] = await Promise.all([
+        api.get('/owner/workspace?sections=setupStatus,courtComplexes,statistics'),
         api.get('/owner/bookings?limit=5')
       ]);
+      const workspace = workspaceResponse.data;
+      setSetupStatus(workspace.setupStatus);
 
-      console.log('API Response for court-complexes:', complexResponse.data);
-      console.log('API Response for statistics:', statsResponse.data); // DEBUG: Log stats response
-      console.log('Extracted courtComplexes array:', complexResponse.data.courtComplexes);
-
-      if (complexResponse.data.courtComplexes && complexResponse.data.courtComplexes.length > 0) {
-        const firstComplex = complexResponse.data.courtComplexes[0];
-        setCourtComplex(firstComplex);
-        console.log('Set courtComplex state with:', firstComplex);
-        console.log('ID being set:', firstComplex?.id);
+      if (workspace.courtComplexes && workspace.courtComplexes.length > 0) {
+        setCourtComplex(workspace.courtComplexes[0]);
       } else {
         setCourtComplex(null);
-        if (setupStatus?.hasCourtComplex) {
+        if (workspace.setupStatus?.hasCourtComplex) {
             setError('Không tìm thấy thông tin khu phức hợp sân, mặc dù trạng thái cho thấy đã thiết lập.');
         }
       }
       
-      setStatistics(statsResponse.data.overview); // Đảm bảo lấy đúng object overview
+      setStatistics(workspace.statistics.overview); // Đảm bảo lấy đúng object overview
       setRecentBookings(bookingsResponse.data.bookings || []);
     } catch (error) {
       console.error('Error fetching dashboard data:', error);
@@ -506,6 +496,7 @@ const OwnerDashboard = () => {
                         {booking.status === 'Pending' ? 'Chờ duyệt' : 
                          booking.status === 'Confirmed' ? 'Đã duyệt' : 
                          booking.status === 'Rejected' ? 'Đã từ chối' : 
+                         booking.status === 'Expired' ? 'Hết hạn' : 
                          booking.status === 'Cancelled' ? 'Đã hủy' : 
                          booking.status === 'Completed' ? 'Hoàn thành' : booking.status}
                       </p>
@@ -553,7 +544,7 @@ const OwnerDashboard = () => {
                             </>
                         )}
 
-                        {(booking.status === 'Completed' || booking.status === 'Rejected' || booking.status === 'Cancelled') && (
+                        {(booking.status === 'Completed' || booking.status === 'Rejected' || booking.status === 'Cancelled' || booking.status === 'Expired') && (
                             <Button
                                 size="sm"
                                 variant="outline"
@@ -674,6 +665,7 @@ const OwnerDashboard = () => {
                             {selectedBookingDetails.status === 'Pending' ? 'Chờ duyệt' :
                             selectedBookingDetails.status === 'Confirmed' ? 'Đã duyệt' :
                             selectedBookingDetails.status === 'Rejected' ? 'Đã từ chối' :
+                            selectedBookingDetails.status === 'Expired' ? 'Hết hạn' :
                             selectedBookingDetails.status === 'Cancelled' ? 'Đã hủy' :
                             selectedBookingDetails.status === 'Completed' ? 'Hoàn thành' : selectedBookingDetails.status}
                         </Badge>